@@ -27,6 +27,17 @@ API_SERVICE_OPTS = [
                default=1000,
                help='The maximum number of items returned in a single '
                     'response from a collection resource.'),
+    cfg.IntOpt('bulk_batch_size',
+               default=100,
+               help='The maximum number of resources created in a single '
+                    'database transaction by a bulk creation request.'),
+    cfg.IntOpt('list_cache_ttl',
+               default=0,
+               help='The number of seconds the responses of the node and '
+                    'port list requests are cached by each API worker. '
+                    'Changes made through other workers or by the '
+                    'conductors are not seen until the cached responses '
+                    'expire. 0 disables the cache.'),
     ]
 
 CONF = cfg.CONF
@@ -54,6 +54,10 @@ LOG = log.getLogger(__name__)
 # versions, the API service should be restarted.
 _VENDOR_METHODS = {}
 
+# The fields of the nodes returned by the non-detailed node lists
+_DEFAULT_RETURN_FIELDS = ('instance_uuid', 'maintenance', 'power_state',
+                          'provision_state', 'uuid', 'name')
+
 
 def hide_fields_in_newer_versions(obj):
     # if requested version is < 1.3, hide driver_internal_info
@@ -396,7 +400,7 @@ class NodeStatesController(rest.RestController):
             raise exception.NodeInMaintenance(op=_('provisioning'),
                                               node=rpc_node.uuid)
 
-        m = ir_states.machine.copy()
+        m = ir_states.machine.copy(shallow=True)
         m.initialize(rpc_node.provision_state)
         if not m.is_valid_event(ir_states.VERBS.get(target, target)):
             raise exception.InvalidStateRequested(
@@ -574,9 +578,7 @@ class Node(base.APIBase):
     @staticmethod
     def _convert_with_links(node, url, expand=True, show_password=True):
         if not expand:
-            except_list = ['instance_uuid', 'maintenance', 'power_state',
-                           'provision_state', 'uuid', 'name']
-            node.unset_fields_except(except_list)
+            node.unset_fields_except(_DEFAULT_RETURN_FIELDS)
         else:
             if not show_password:
                 node.driver_info = ast.literal_eval(strutils.mask_password(
@@ -658,6 +660,53 @@ class NodeCollection(collection.Collection):
         return sample
 
 
+class NodeBulkPatch(base.APIBase):
+    """API representation of the update of a node in a bulk request."""
+
+    node = wsme.wsattr(types.uuid_or_name, mandatory=True)
+    """The UUID or logical name of the node to update"""
+
+    patch = wsme.wsattr([types.jsontype], mandatory=True)
+    """The json PATCH document to apply to the node"""
+
+
+class NodeBulkResult(base.APIBase):
+    """API representation of the result of an item of a bulk request."""
+
+    status = int
+    """The HTTP status code of the creation or update of the node"""
+
+    node = Node
+    """The node, if it was created or updated"""
+
+    error = wtypes.text
+    """The error message, if the node was not created or updated"""
+
+    @classmethod
+    def from_node(cls, rpc_node, status):
+        return cls(status=status, node=Node.convert_with_links(rpc_node))
+
+    @classmethod
+    def from_error(cls, exc):
+        status, error = api_utils.get_bulk_item_error(exc)
+        return cls(status=status, error=error)
+
+
+class NodeBulkResultCollection(base.APIBase):
+    """API representation of the results of a bulk request on nodes."""
+
+    nodes = [NodeBulkResult]
+    """The result of each item of the request, in the same order"""
+
+    @classmethod
+    def sample(cls):
+        error = _("Node %s can not be updated while a state transition "
+                  "is in progress.") % 'database16-dc03'
+        return cls(nodes=[NodeBulkResult(status=201,
+                                         node=Node.sample(expand=False)),
+                          NodeBulkResult(status=409, error=error)])
+
+
 class NodeVendorPassthruController(rest.RestController):
     """REST controller for VendorPassthru.
 
@@ -784,6 +833,8 @@ class NodesController(rest.RestController):
     _custom_actions = {
         'detail': ['GET'],
         'validate': ['GET'],
+        'bulk_create': ['POST'],
+        'bulk_update': ['POST'],
     }
 
     def _get_nodes_collection(self, chassis_uuid, instance_uuid, associated,
@@ -796,13 +847,14 @@ class NodesController(rest.RestController):
         limit = api_utils.validate_limit(limit)
         sort_dir = api_utils.validate_sort_dir(sort_dir)
 
-        marker_obj = None
-        if marker:
-            marker_obj = objects.Node.get_by_uuid(pecan.request.context,
-                                                  marker)
-        if instance_uuid:
-            nodes = self._get_nodes_by_instance(instance_uuid)
-        else:
+        def get_nodes():
+            marker_obj = None
+            if marker:
+                marker_obj = objects.Node.get_by_uuid(pecan.request.context,
+                                                      marker)
+            if instance_uuid:
+                return self._get_nodes_by_instance(instance_uuid)
+
             filters = {}
             if chassis_uuid:
                 filters['chassis_uuid'] = chassis_uuid
@@ -811,19 +863,22 @@ class NodesController(rest.RestController):
             if maintenance is not None:
                 filters['maintenance'] = maintenance
 
-            nodes = objects.Node.list(pecan.request.context, limit, marker_obj,
-                                      sort_key=sort_key, sort_dir=sort_dir,
-                                      filters=filters)
+            # only load the fields which are returned
+            fields = None if expand else _DEFAULT_RETURN_FIELDS
+            return objects.Node.list(pecan.request.context, limit,
+                                     marker_obj, sort_key=sort_key,
+                                     sort_dir=sort_dir, filters=filters,
+                                     fields=fields)
 
         parameters = {'sort_key': sort_key, 'sort_dir': sort_dir}
         if associated:
             parameters['associated'] = associated
         if maintenance:
             parameters['maintenance'] = maintenance
-        return NodeCollection.convert_with_links(nodes, limit,
-                                                 url=resource_url,
-                                                 expand=expand,
-                                                 **parameters)
+        return api_utils.get_collection(
+            get_nodes,
+            lambda nodes: NodeCollection.convert_with_links(
+                nodes, limit, url=resource_url, expand=expand, **parameters))
 
     def _get_nodes_by_instance(self, instance_uuid):
         """Retrieve a node by its instance uuid.
@@ -932,17 +987,16 @@ class NodesController(rest.RestController):
             raise exception.OperationNotPermitted
 
         rpc_node = api_utils.get_rpc_node(node_ident)
+        if api_utils.check_etag(api_utils.get_etag(rpc_node)):
+            return
         return Node.convert_with_links(rpc_node)
 
-    @expose.expose(Node, body=Node, status_code=201)
-    def post(self, node):
-        """Create a new node.
+    def _prepare_new_node(self, node):
+        """Check a node to create.
 
-        :param node: a node within the request body.
+        :param node: the API representation of the node.
+        :returns: the objects.Node to create.
         """
-        if self.from_chassis:
-            raise exception.OperationNotPermitted
-
         # NOTE(deva): get_topic_for checks if node.driver is in the hash ring
         #             and raises NoValidHost if it is not.
         #             We need to ensure that node has a UUID before it can
@@ -969,24 +1023,62 @@ class NodesController(rest.RestController):
                 raise wsme.exc.ClientSideError(msg % {'name': node.name},
                                                status_code=400)
 
-        new_node = objects.Node(pecan.request.context,
-                                **node.as_dict())
+        return objects.Node(pecan.request.context, **node.as_dict())
+
+    @expose.expose(Node, body=Node, status_code=201)
+    def post(self, node):
+        """Create a new node.
+
+        :param node: a node within the request body.
+        """
+        if self.from_chassis:
+            raise exception.OperationNotPermitted
+
+        new_node = self._prepare_new_node(node)
         new_node.create()
         # Set the HTTP Location Header
         pecan.response.location = link.build_url('nodes', new_node.uuid)
         return Node.convert_with_links(new_node)
 
-    @wsme.validate(types.uuid, [NodePatchType])
-    @expose.expose(Node, types.uuid_or_name, body=[NodePatchType])
-    def patch(self, node_ident, patch):
-        """Update an existing node.
+    @expose.expose(NodeBulkResultCollection, body=[Node])
+    def bulk_create(self, nodes):
+        """Create several nodes.
 
-        :param node_ident: UUID or logical name of a node.
-        :param patch: a json PATCH document to apply to this node.
+        All the nodes are checked first, then the valid ones are created
+        in batches of CONF.api.bulk_batch_size nodes.
+
+        :param nodes: a list of nodes within the request body.
         """
         if self.from_chassis:
             raise exception.OperationNotPermitted
 
+        api_utils.check_bulk_request(nodes)
+
+        results = [None] * len(nodes)
+        new_nodes = []
+        for index, node in enumerate(nodes):
+            try:
+                new_nodes.append((index, self._prepare_new_node(node)))
+            except api_utils.BULK_ITEM_EXCEPTIONS as e:
+                results[index] = NodeBulkResult.from_error(e)
+
+        errors = objects.Node.create_many(
+            pecan.request.context, [n for i, n in new_nodes],
+            batch_size=CONF.api.bulk_batch_size)
+        for (index, new_node), error in zip(new_nodes, errors):
+            if error is None:
+                results[index] = NodeBulkResult.from_node(new_node, 201)
+            else:
+                results[index] = NodeBulkResult.from_error(error)
+        return NodeBulkResultCollection(nodes=results)
+
+    def _update_node(self, node_ident, patch):
+        """Update an existing node.
+
+        :param node_ident: UUID or logical name of a node.
+        :param patch: a json PATCH document to apply to this node.
+        :returns: the updated objects.Node.
+        """
         rpc_node = api_utils.get_rpc_node(node_ident)
 
         # Check if node is transitioning state, although nodes in some states
@@ -1066,11 +1158,51 @@ class NodesController(rest.RestController):
                   "enabled. Please stop the console first.") % node_ident,
                 status_code=409)
 
-        new_node = pecan.request.rpcapi.update_node(
-                         pecan.request.context, rpc_node, topic)
+        return pecan.request.rpcapi.update_node(
+                   pecan.request.context, rpc_node, topic)
+
+    @wsme.validate(types.uuid, [NodePatchType])
+    @expose.expose(Node, types.uuid_or_name, body=[NodePatchType])
+    def patch(self, node_ident, patch):
+        """Update an existing node.
+
+        :param node_ident: UUID or logical name of a node.
+        :param patch: a json PATCH document to apply to this node.
+        """
+        if self.from_chassis:
+            raise exception.OperationNotPermitted
 
+        new_node = self._update_node(node_ident, patch)
         return Node.convert_with_links(new_node)
 
+    @expose.expose(NodeBulkResultCollection, body=[NodeBulkPatch])
+    def bulk_update(self, updates):
+        """Update several existing nodes.
+
+        Each node is updated on its own, the failure to update a node
+        doesn't prevent the other ones from being updated.
+
+        :param updates: a list of updates within the request body, each one
+                        made of the UUID or logical name of a node and of a
+                        json PATCH document to apply to this node.
+        """
+        if self.from_chassis:
+            raise exception.OperationNotPermitted
+
+        api_utils.check_bulk_request(updates)
+
+        results = []
+        for update in updates:
+            try:
+                patch = api_utils.validate_bulk_patch(NodePatchType,
+                                                      update.patch)
+                new_node = self._update_node(update.node, patch)
+            except api_utils.BULK_ITEM_EXCEPTIONS as e:
+                results.append(NodeBulkResult.from_error(e))
+            else:
+                results.append(NodeBulkResult.from_node(new_node, 200))
+        return NodeBulkResultCollection(nodes=results)
+
     @expose.expose(None, types.uuid_or_name, status_code=204)
     def delete(self, node_ident):
         """Delete a node.
@@ -15,6 +15,7 @@
 
 import datetime
 
+from oslo_config import cfg
 from oslo_utils import uuidutils
 import pecan
 from pecan import rest
@@ -32,6 +33,9 @@ from ironic.common.i18n import _
 from ironic import objects
 
 
+CONF = cfg.CONF
+
+
 class PortPatchType(types.JsonPatchType):
 
     @staticmethod
@@ -124,8 +128,15 @@ class Port(base.APIBase):
         return port
 
     @classmethod
-    def convert_with_links(cls, rpc_port, expand=True):
-        port = Port(**rpc_port.as_dict())
+    def convert_with_links(cls, rpc_port, expand=True, node_uuid=None):
+        port_dict = rpc_port.as_dict()
+        if node_uuid is not None:
+            # NOTE: the caller already knows the UUID of the node, don't
+            # look the node up again.
+            del port_dict['node_id']
+        port = Port(**port_dict)
+        if node_uuid is not None:
+            port._node_uuid = node_uuid
         return cls._convert_with_links(port, pecan.request.host_url, expand)
 
     @classmethod
@@ -165,6 +176,76 @@ class PortCollection(collection.Collection):
         return sample
 
 
+class PortBulkCreate(base.APIBase):
+    """API representation of a port to create in a bulk request.
+
+    Unlike :class:`Port`, the node of the port is not looked up when the
+    request is parsed: the nodes of all the ports of the request are
+    looked up at once.
+    """
+
+    uuid = types.uuid
+    """Unique UUID for this port"""
+
+    address = wsme.wsattr(types.macaddress, mandatory=True)
+    """MAC Address for this port"""
+
+    extra = {wtypes.text: types.jsontype}
+    """This port's meta data"""
+
+    node_uuid = wsme.wsattr(types.uuid, mandatory=True)
+    """The UUID of the node this port belongs to"""
+
+
+class PortBulkPatch(base.APIBase):
+    """API representation of the update of a port in a bulk request."""
+
+    port = wsme.wsattr(types.uuid, mandatory=True)
+    """The UUID of the port to update"""
+
+    patch = wsme.wsattr([types.jsontype], mandatory=True)
+    """The json PATCH document to apply to the port"""
+
+
+class PortBulkResult(base.APIBase):
+    """API representation of the result of an item of a bulk request."""
+
+    status = int
+    """The HTTP status code of the creation or update of the port"""
+
+    port = Port
+    """The port, if it was created or updated"""
+
+    error = wtypes.text
+    """The error message, if the port was not created or updated"""
+
+    @classmethod
+    def from_port(cls, rpc_port, status, node_uuid=None):
+        return cls(status=status,
+                   port=Port.convert_with_links(rpc_port,
+                                                node_uuid=node_uuid))
+
+    @classmethod
+    def from_error(cls, exc):
+        status, error = api_utils.get_bulk_item_error(exc)
+        return cls(status=status, error=error)
+
+
+class PortBulkResultCollection(base.APIBase):
+    """API representation of the results of a bulk request on ports."""
+
+    ports = [PortBulkResult]
+    """The result of each item of the request, in the same order"""
+
+    @classmethod
+    def sample(cls):
+        error = _("A port with MAC address %s already exists.") % (
+            'fe:54:00:77:07:d9')
+        return cls(ports=[PortBulkResult(status=201,
+                                         port=Port.sample(expand=False)),
+                          PortBulkResult(status=409, error=error)])
+
+
 class PortsController(rest.RestController):
     """REST controller for Ports."""
 
@@ -174,6 +255,8 @@ class PortsController(rest.RestController):
 
     _custom_actions = {
         'detail': ['GET'],
+        'bulk_create': ['POST'],
+        'bulk_update': ['POST'],
     }
 
     def _get_ports_collection(self, node_ident, address, marker, limit,
@@ -186,33 +269,34 @@ class PortsController(rest.RestController):
         limit = api_utils.validate_limit(limit)
         sort_dir = api_utils.validate_sort_dir(sort_dir)
 
-        marker_obj = None
-        if marker:
-            marker_obj = objects.Port.get_by_uuid(pecan.request.context,
-                                                  marker)
-
-        if node_ident:
-            # FIXME(comstud): Since all we need is the node ID, we can
-            #                 make this more efficient by only querying
-            #                 for that column. This will get cleaned up
-            #                 as we move to the object interface.
-            node = api_utils.get_rpc_node(node_ident)
-            ports = objects.Port.list_by_node_id(pecan.request.context,
-                                                 node.id, limit, marker_obj,
-                                                 sort_key=sort_key,
-                                                 sort_dir=sort_dir)
-        elif address:
-            ports = self._get_ports_by_address(address)
-        else:
-            ports = objects.Port.list(pecan.request.context, limit,
-                                      marker_obj, sort_key=sort_key,
-                                      sort_dir=sort_dir)
-
-        return PortCollection.convert_with_links(ports, limit,
-                                                 url=resource_url,
-                                                 expand=expand,
-                                                 sort_key=sort_key,
-                                                 sort_dir=sort_dir)
+        def get_ports():
+            marker_obj = None
+            if marker:
+                marker_obj = objects.Port.get_by_uuid(pecan.request.context,
+                                                      marker)
+
+            if node_ident:
+                # FIXME(comstud): Since all we need is the node ID, we can
+                #                 make this more efficient by only querying
+                #                 for that column. This will get cleaned up
+                #                 as we move to the object interface.
+                node = api_utils.get_rpc_node(node_ident)
+                return objects.Port.list_by_node_id(pecan.request.context,
+                                                    node.id, limit,
+                                                    marker_obj,
+                                                    sort_key=sort_key,
+                                                    sort_dir=sort_dir)
+            if address:
+                return self._get_ports_by_address(address)
+            return objects.Port.list(pecan.request.context, limit,
+                                     marker_obj, sort_key=sort_key,
+                                     sort_dir=sort_dir)
+
+        return api_utils.get_collection(
+            get_ports,
+            lambda ports: PortCollection.convert_with_links(
+                ports, limit, url=resource_url, expand=expand,
+                sort_key=sort_key, sort_dir=sort_dir))
 
     def _get_ports_by_address(self, address):
         """Retrieve a port by its address.
@@ -310,6 +394,8 @@ class PortsController(rest.RestController):
             raise exception.OperationNotPermitted
 
         rpc_port = objects.Port.get_by_uuid(pecan.request.context, port_uuid)
+        if api_utils.check_etag(api_utils.get_etag(rpc_port)):
+            return
         return Port.convert_with_links(rpc_port)
 
     @expose.expose(Port, body=Port, status_code=201)
@@ -328,17 +414,63 @@ class PortsController(rest.RestController):
         pecan.response.location = link.build_url('ports', new_port.uuid)
         return Port.convert_with_links(new_port)
 
-    @wsme.validate(types.uuid, [PortPatchType])
-    @expose.expose(Port, types.uuid, body=[PortPatchType])
-    def patch(self, port_uuid, patch):
-        """Update an existing port.
+    @expose.expose(PortBulkResultCollection, body=[PortBulkCreate])
+    def bulk_create(self, ports):
+        """Create several ports.
 
-        :param port_uuid: UUID of a port.
-        :param patch: a json PATCH document to apply to this port.
+        The nodes of the ports are looked up in a single query, then the
+        ports whose node exists are created in batches of
+        CONF.api.bulk_batch_size ports.
+
+        :param ports: a list of ports within the request body.
         """
         if self.from_nodes:
             raise exception.OperationNotPermitted
 
+        api_utils.check_bulk_request(ports)
+
+        node_uuids = list(set(port.node_uuid for port in ports))
+        node_ids = dict((node.uuid, node.id) for node in objects.Node.list(
+            pecan.request.context, filters={'uuids': node_uuids},
+            fields=['uuid']))
+
+        results = [None] * len(ports)
+        new_ports = []
+        for index, port in enumerate(ports):
+            if port.node_uuid not in node_ids:
+                e = exception.NodeNotFound(node=port.node_uuid)
+                # Change error code because 404 (NotFound) is inappropriate
+                # response for a POST request to create a Port
+                e.code = 400  # BadRequest
+                results[index] = PortBulkResult.from_error(e)
+                continue
+            values = {'node_id': node_ids[port.node_uuid],
+                      'address': port.address}
+            if port.uuid != wtypes.Unset:
+                values['uuid'] = port.uuid
+            if port.extra != wtypes.Unset:
+                values['extra'] = port.extra
+            new_ports.append(
+                (index, objects.Port(pecan.request.context, **values)))
+
+        errors = objects.Port.create_many(
+            pecan.request.context, [p for i, p in new_ports],
+            batch_size=CONF.api.bulk_batch_size)
+        for (index, new_port), error in zip(new_ports, errors):
+            if error is None:
+                results[index] = PortBulkResult.from_port(
+                    new_port, 201, node_uuid=ports[index].node_uuid)
+            else:
+                results[index] = PortBulkResult.from_error(error)
+        return PortBulkResultCollection(ports=results)
+
+    def _update_port(self, port_uuid, patch):
+        """Update an existing port.
+
+        :param port_uuid: UUID of a port.
+        :param patch: a json PATCH document to apply to this port.
+        :returns: the updated objects.Port.
+        """
         rpc_port = objects.Port.get_by_uuid(pecan.request.context, port_uuid)
         try:
             port_dict = rpc_port.as_dict()
@@ -367,11 +499,51 @@ class PortsController(rest.RestController):
                                           rpc_port.node_id)
         topic = pecan.request.rpcapi.get_topic_for(rpc_node)
 
-        new_port = pecan.request.rpcapi.update_port(
-                                        pecan.request.context, rpc_port, topic)
+        return pecan.request.rpcapi.update_port(
+                   pecan.request.context, rpc_port, topic)
 
+    @wsme.validate(types.uuid, [PortPatchType])
+    @expose.expose(Port, types.uuid, body=[PortPatchType])
+    def patch(self, port_uuid, patch):
+        """Update an existing port.
+
+        :param port_uuid: UUID of a port.
+        :param patch: a json PATCH document to apply to this port.
+        """
+        if self.from_nodes:
+            raise exception.OperationNotPermitted
+
+        new_port = self._update_port(port_uuid, patch)
         return Port.convert_with_links(new_port)
 
+    @expose.expose(PortBulkResultCollection, body=[PortBulkPatch])
+    def bulk_update(self, updates):
+        """Update several existing ports.
+
+        Each port is updated on its own, the failure to update a port
+        doesn't prevent the other ones from being updated.
+
+        :param updates: a list of updates within the request body, each one
+                        made of the UUID of a port and of a json PATCH
+                        document to apply to this port.
+        """
+        if self.from_nodes:
+            raise exception.OperationNotPermitted
+
+        api_utils.check_bulk_request(updates)
+
+        results = []
+        for update in updates:
+            try:
+                patch = api_utils.validate_bulk_patch(PortPatchType,
+                                                      update.patch)
+                new_port = self._update_port(update.port, patch)
+            except api_utils.BULK_ITEM_EXCEPTIONS as e:
+                results.append(PortBulkResult.from_error(e))
+            else:
+                results.append(PortBulkResult.from_port(new_port, 200))
+        return PortBulkResultCollection(ports=results)
+
     @expose.expose(None, types.uuid, status_code=204)
     def delete(self, port_uuid):
         """Delete a port.
@@ -13,8 +13,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import hashlib
+import time
+
 import jsonpatch
+from oslo import messaging
 from oslo_config import cfg
+from oslo_serialization import jsonutils
 from oslo_utils import uuidutils
 import pecan
 import wsme
@@ -32,6 +38,13 @@ JSONPATCH_EXCEPTIONS = (jsonpatch.JsonPatchException,
                         jsonpatch.JsonPointerException,
                         KeyError)
 
+# The maximum number of responses in the list cache of a worker
+_LIST_CACHE_SIZE = 100
+
+# (request path and query, representation variant) ->
+#     (expiry time, ETag, API collection), least recently used first
+_list_cache = collections.OrderedDict()
+
 
 def validate_limit(limit):
     if limit is not None and limit <= 0:
@@ -69,6 +82,66 @@ def allow_node_logical_names():
     return pecan.request.version.minor >= 5
 
 
+def allow_bulk_operations():
+    # v1.7 added the bulk creation and update of nodes and ports
+    return pecan.request.version.minor >= 7
+
+
+def check_bulk_request(items):
+    """Check that a bulk request can be processed.
+
+    :param items: the list of items of the request.
+    :raises: NotAcceptable if the API version doesn't support bulk requests.
+    :raises: ClientSideError if the request has more items than allowed.
+    """
+    if not allow_bulk_operations():
+        raise exception.NotAcceptable()
+    if len(items) > CONF.api.max_limit:
+        raise wsme.exc.ClientSideError(
+            _("A bulk request can not have more than %d items.") %
+            CONF.api.max_limit)
+
+
+def validate_bulk_patch(patch_type, patch):
+    """Validate the json PATCH document of an item of a bulk request.
+
+    :param patch_type: the types.JsonPatchType subclass of the resource.
+    :param patch: the json PATCH document, as a list of dicts.
+    :returns: the validated json PATCH document, as a list of dicts.
+    :raises: ClientSideError if the document is invalid.
+    """
+    validated = []
+    for p in patch:
+        if not isinstance(p, dict) or 'op' not in p or 'path' not in p:
+            raise wsme.exc.ClientSideError(
+                _("Invalid json PATCH operation: %s") % p)
+        validated.append(patch_type.validate(patch_type(**p)))
+    return validated
+
+
+# The exceptions which make a single item of a bulk request fail
+BULK_ITEM_EXCEPTIONS = (exception.IronicException, wsme.exc.ClientSideError,
+                        messaging.MessagingTimeout, messaging.RemoteError)
+
+
+def get_bulk_item_error(exc):
+    """Return the HTTP status code and the message of an error.
+
+    :param exc: one of BULK_ITEM_EXCEPTIONS, raised processing an item of
+                a bulk request.
+    :returns: a (status code, message) tuple.
+    """
+    if isinstance(exc, wsme.exc.ClientSideError):
+        return exc.code, exc.faultstring
+    if isinstance(exc, messaging.MessagingTimeout):
+        return 503, _('Timed out waiting for a reply from the conductor.')
+    if isinstance(exc, messaging.RemoteError):
+        # NOTE: the traceback of the remote error is not returned
+        return 500, _('Remote error: %(exc_type)s %(value)s') % {
+            'exc_type': exc.exc_type, 'value': exc.value}
+    return exc.code, exc.format_message()
+
+
 def get_rpc_node(node_ident):
     """Get the RPC node from the node uuid or logical name.
 
@@ -102,3 +175,89 @@ def is_valid_node_name(name):
     :returns: True if the name is valid, False otherwise.
     """
     return utils.is_hostname_safe(name) and (not uuidutils.is_uuid_like(name))
+
+
+def _get_variant():
+    """Return what the representation of a resource depends on.
+
+    Besides the resource itself, the representation depends on the
+    requested API version, on whether the passwords are shown and on the
+    host URL used in the links.
+    """
+    return [pecan.request.version.major, pecan.request.version.minor,
+            pecan.request.context.show_password, pecan.request.host_url]
+
+
+def get_etag(objs):
+    """Compute the ETag of the representation of one or more objects.
+
+    The ETag is a hash of the fields of the objects loaded from the
+    database, which include their updated_at field, so it is computed
+    without converting the objects to their API representation.
+
+    :param objs: an object, or a list of objects.
+    :returns: the ETag, as a string.
+    """
+    if isinstance(objs, list):
+        fields = [obj.as_dict() for obj in objs]
+    else:
+        fields = objs.as_dict()
+    data = jsonutils.dumps([_get_variant(), fields], sort_keys=True)
+    return hashlib.md5(data.encode('utf-8')).hexdigest()
+
+
+def check_etag(etag):
+    """Set the ETag of the response and check the If-None-Match header.
+
+    If the header of the request matches etag, webob replaces the response
+    by an empty 304 (Not Modified) one, whatever the controller returns.
+
+    :param etag: the ETag of the representation of the resource.
+    :returns: True if the client already has the representation, the
+              controller doesn't need to build it then.
+    """
+    pecan.response.etag = etag
+    pecan.response.conditional_response = True
+    return etag in pecan.request.if_none_match
+
+
+def get_collection(get_objs, convert):
+    """Return the API representation of a collection of objects.
+
+    The ETag of the response is set and, if the client already has the
+    representation, it isn't built. When CONF.api.list_cache_ttl is set,
+    the representation is cached by the worker for this number of
+    seconds, and neither the database nor the objects are read again for
+    the same request until then.
+
+    :param get_objs: a function returning the list of objects of the
+                     collection.
+    :param convert: a function converting a list of objects to the API
+                    collection.
+    :returns: the API collection, or None if the client already has it.
+    """
+    ttl = CONF.api.list_cache_ttl
+    if ttl > 0:
+        key = (pecan.request.path_qs, tuple(_get_variant()))
+        cached = _list_cache.pop(key, None)
+        if cached is not None and cached[0] > time.time():
+            _list_cache[key] = cached
+            expires_at, etag, collection = cached
+            return None if check_etag(etag) else collection
+
+    objs = get_objs()
+    etag = get_etag(objs)
+    if check_etag(etag):
+        return None
+
+    collection = convert(objs)
+    if ttl > 0:
+        _list_cache[key] = (time.time() + ttl, etag, collection)
+        while len(_list_cache) > _LIST_CACHE_SIZE:
+            _list_cache.popitem(last=False)
+    return collection
+
+
+def clear_list_cache():
+    """Drop the responses of the list cache of the worker."""
+    _list_cache.clear()
@@ -20,6 +20,7 @@ from oslo_config import cfg
 from pecan import hooks
 from webob import exc
 
+from ironic.api.controllers.v1 import utils as api_utils
 from ironic.common import context
 from ironic.common import policy
 from ironic.conductor import rpcapi
@@ -92,10 +93,37 @@ class ContextHook(hooks.PecanHook):
 
 
 class RPCHook(hooks.PecanHook):
-    """Attach the rpcapi object to the request so controllers can get to it."""
+    """Attach the rpcapi object to the request so controllers can get to it.
+
+    The rpcapi object keeps no per-request state, so a single one, with its
+    RPC client and its hash rings, is shared by all the requests handled by
+    the application.
+    """
+
+    def __init__(self):
+        super(RPCHook, self).__init__()
+        self._rpcapi = None
 
     def before(self, state):
-        state.request.rpcapi = rpcapi.ConductorAPI()
+        # NOTE: created on first use, as the RPC transport may not be set
+        # up yet when the application is created.
+        if self._rpcapi is None:
+            self._rpcapi = rpcapi.ConductorAPI()
+        state.request.rpcapi = self._rpcapi
+
+
+class ListCacheHook(hooks.PecanHook):
+    """Clear the list cache of the worker after a change request.
+
+    The lists cached by the worker are dropped once a request which may
+    change a resource is handled, so that a client sees its own changes.
+    The changes made through other workers or by the conductors are seen
+    once the cached lists expire.
+    """
+
+    def after(self, state):
+        if state.request.method not in ('GET', 'HEAD'):
+            api_utils.clear_list_cache()
 
 
 class TrustedCallHook(hooks.PecanHook):
@@ -124,6 +124,15 @@ class Conflict(IronicException):
     code = 409
 
 
+class ReferenceNotFound(Invalid):
+    message = _("%(key)s references a row of %(key_table)s which does not "
+                "exist.")
+
+
+class DatabaseError(IronicException):
+    message = _("Database error: %(error)s")
+
+
 class TemporaryFailure(IronicException):
     message = _("Resource temporarily unavailable, please retry.")
     code = 503
@@ -444,6 +453,16 @@ class NodeNotLocked(Invalid):
     message = _("Node %(node)s found not to be locked on release")
 
 
+class NodeFiltersNotMatched(Conflict):
+    message = _("Node %(node)s could not be reserved because it does not "
+                "match the requested filters.")
+
+
+class NodeUpdateConflict(Conflict):
+    message = _("Node %(node)s could not be updated because it was changed "
+                "concurrently %(attempts)d times in a row.")
+
+
 class NoFreeConductorWorker(TemporaryFailure):
     message = _('Requested action cannot be performed due to lack of free '
                 'conductor workers.')
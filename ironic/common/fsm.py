@@ -51,6 +51,7 @@ class FSM(object):
         self._target_state = None
         # Note that _current is a _Jump instance
         self._current = None
+        self._frozen = False
 
     @property
     def start_state(self):
@@ -66,6 +67,10 @@ class FSM(object):
     def target_state(self):
         return self._target_state
 
+    @property
+    def frozen(self):
+        return self._frozen
+
     @property
     def terminated(self):
         """Returns whether the state machine is in a terminal state."""
@@ -90,6 +95,7 @@ class FSM(object):
                        can be used as a target it must have been previously
                        added and specified as 'stable'
         """
+        self._check_not_frozen()
         if state in self._states:
             raise excp.Duplicate(_("State '%s' already defined") % state)
         if on_enter is not None:
@@ -117,6 +123,7 @@ class FSM(object):
 
     def add_transition(self, start, end, event):
         """Adds an allowed transition from start -> end for the given event."""
+        self._check_not_frozen()
         if start not in self._states:
             raise excp.NotFound(
                 _("Can not add a transition on event '%(event)s' that "
@@ -131,6 +138,20 @@ class FSM(object):
                                                 self._states[end]['on_enter'],
                                                 self._states[start]['on_exit'])
 
+    def freeze(self):
+        """Prevents any further change to the states and transitions.
+
+        A frozen machine can safely share its state and transition tables
+        with shallow copies of it, which only hold their own current and
+        target states.
+        """
+        self._frozen = True
+
+    def _check_not_frozen(self):
+        if self._frozen:
+            raise excp.InvalidState(_("Can not modify a frozen state "
+                                      "machine"))
+
     def process_event(self, event):
         """Trigger a state change in response to the provided event."""
         current = self._current
@@ -201,6 +222,8 @@ class FSM(object):
                         and transitions + states that is defined somewhere
                         and want to use copies to run with (the copies have
                         the current state that is different between machines).
+
+        A deep copy of a frozen machine is not frozen, a shallow copy is.
         """
         c = FSM(self.start_state)
         if not shallow:
@@ -213,6 +236,7 @@ class FSM(object):
         else:
             c._transitions = self._transitions
             c._states = self._states
+            c._frozen = self._frozen
         return c
 
     def __contains__(self, state):
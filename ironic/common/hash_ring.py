@@ -14,10 +14,14 @@
 #    under the License.
 
 import bisect
+import copy
 import hashlib
+import heapq
 import threading
 
 from oslo_config import cfg
+from oslo_utils import timeutils
+import six
 
 from ironic.common import exception
 from ironic.common.i18n import _
@@ -46,11 +50,37 @@ hash_opts = [
                     'conductor services to prepare deployment environments '
                     'and potentially allow the Ironic cluster to recover '
                     'more quickly if a conductor instance is terminated.'),
+    cfg.IntOpt('hash_ring_reset_interval',
+               default=180,
+               help='Interval (in seconds) between checks of the set of '
+                    'active conductors to update the hash rings. Hosts are '
+                    'added to or removed from the existing rings, without '
+                    'rebuilding them.'),
 ]
 
 CONF = cfg.CONF
 CONF.register_opts(hash_opts)
 
+# Ring keys are the most significant bits of the 128 bit hash of some data,
+# truncated so they fit into a signed 64 bit integer database column.
+RING_KEY_BITS = 63
+MAX_RING_KEY = 2 ** RING_KEY_BITS - 1
+
+
+def get_ring_key(data):
+    """Get the ring key of some data, eg. the UUID of a node.
+
+    The ring key is a truncated version of the hash used to place the data
+    on a :class:`HashRing`, which is stored in the database so that nodes
+    mapped to a host can be selected by :meth:`HashRing.get_key_ranges`.
+
+    :param data: A string identifier to be mapped across the ring.
+    :returns: An integer between 0 and MAX_RING_KEY.
+    """
+    if isinstance(data, six.text_type):
+        data = data.encode('utf-8')
+    return int(hashlib.md5(data).hexdigest(), 16) >> (128 - RING_KEY_BITS)
+
 
 class HashRing(object):
     """A stable hash ring.
@@ -83,18 +113,67 @@ class HashRing(object):
         except TypeError:
             raise exception.Invalid(
                     _("Invalid hosts supplied when building HashRing."))
+        self._replicas = replicas
 
         self._host_hashes = {}
         for host in hosts:
-            key = str(host).encode('utf8')
-            key_hash = hashlib.md5(key)
-            for p in range(2 ** CONF.hash_partition_exponent):
-                key_hash.update(key)
-                hashed_key = self._hash2int(key_hash)
-                self._host_hashes[hashed_key] = host
+            self._host_hashes.update(self._hash_host(host))
         # Gather the (possibly colliding) resulting hashes into a bisectable
         # list.
         self._partitions = sorted(self._host_hashes.keys())
+        self._key_ranges = {}
+
+    def _hash_host(self, host):
+        """Hash a host into its partitions.
+
+        :returns: a dictionary mapping the hashes of the dividers of the
+                  partitions of the host to the host.
+        """
+        host_hashes = {}
+        key = str(host).encode('utf8')
+        key_hash = hashlib.md5(key)
+        for p in range(2 ** CONF.hash_partition_exponent):
+            key_hash.update(key)
+            hashed_key = self._hash2int(key_hash)
+            host_hashes[hashed_key] = host
+        return host_hashes
+
+    def rebuild(self, hosts):
+        """Build a new hash ring across another set of hosts.
+
+        Only the hosts which are not in this ring are hashed, and the
+        partitions of the hosts which are not in the new set are dropped,
+        which gives the same ring as building it from scratch. This ring is
+        not modified, so that it can still be used concurrently.
+
+        :param hosts: an iterable of hosts which will be mapped.
+        :returns: a new HashRing.
+        """
+        try:
+            hosts = set(hosts)
+        except TypeError:
+            raise exception.Invalid(
+                    _("Invalid hosts supplied when building HashRing."))
+        removed = self.hosts - hosts
+
+        ring = copy.copy(self)
+        ring.hosts = hosts
+        ring.replicas = min(self._replicas, len(hosts))
+        ring._host_hashes = dict((h, host)
+                                 for h, host in self._host_hashes.items()
+                                 if host not in removed)
+        partitions = [h for h in self._partitions
+                      if self._host_hashes[h] not in removed]
+        new_partitions = []
+        for host in hosts - self.hosts:
+            host_hashes = self._hash_host(host)
+            new_partitions.extend(h for h in host_hashes
+                                  if h not in ring._host_hashes)
+            ring._host_hashes.update(host_hashes)
+        ring._partitions = list(heapq.merge(partitions,
+                                            sorted(new_partitions)))
+        ring._key_ranges = {}
+        return ring
 
     def _hash2int(self, key_hash):
         """Convert the given hash's digest to a numerical value for the ring.
@@ -126,13 +205,66 @@ class HashRing(object):
                   this `HashRing` was created with. It may be less than this
                   if ignore_hosts is not None.
         """
-        hosts = []
-        if ignore_hosts is None:
-            ignore_hosts = set()
-        else:
-            ignore_hosts = set(ignore_hosts)
-            ignore_hosts.intersection_update(self.hosts)
+        ignore_hosts = self._get_ignore_hosts(ignore_hosts)
         partition = self._get_partition(data)
+        return self._get_partition_hosts(partition, ignore_hosts)
+
+    def get_hosts_many(self, data, ignore_hosts=None):
+        """Get the lists of hosts which several pieces of data map onto.
+
+        This is equivalent to calling get_hosts() for each piece of data,
+        but the data are sorted by hash and matched to the partitions in a
+        single walk over the ring, and the hosts of each partition are only
+        looked up once.
+
+        :param data: An iterable of string identifiers to be mapped across
+                     the ring.
+        :param ignore_hosts: A list of hosts to skip when performing the hash.
+                             Default: None.
+        :returns: a dictionary mapping each identifier to a list of hosts,
+                  as returned by get_hosts().
+        """
+        ignore_hosts = self._get_ignore_hosts(ignore_hosts)
+        try:
+            hashed_data = sorted((self._hash2int(hashlib.md5(d)), d)
+                                 for d in data)
+        except TypeError:
+            raise exception.Invalid(
+                    _("Invalid data supplied to HashRing.get_hosts_many."))
+
+        partitions = self._partitions
+        partitions_count = len(partitions)
+        partition_hosts = {}
+        result = {}
+        position = 0
+        for hashed_key, d in hashed_data:
+            # Same as bisect.bisect(), starting from the previous position
+            while (position < partitions_count and
+                   partitions[position] <= hashed_key):
+                position += 1
+            partition = position if position < partitions_count else 0
+            if partition not in partition_hosts:
+                partition_hosts[partition] = self._get_partition_hosts(
+                    partition, ignore_hosts)
+            result[d] = list(partition_hosts[partition])
+        return result
+
+    def _get_ignore_hosts(self, ignore_hosts):
+        """Get the set of hosts of the ring to skip."""
+        if ignore_hosts is None:
+            return set()
+        ignore_hosts = set(ignore_hosts)
+        ignore_hosts.intersection_update(self.hosts)
+        return ignore_hosts
+
+    def _get_partition_hosts(self, partition, ignore_hosts):
+        """Get the list of hosts serving a partition.
+
+        :param partition: The index of the partition in the partition map.
+        :param ignore_hosts: A set of hosts of the ring to skip.
+        :returns: a list of hosts.
+        """
+        hosts = []
         for replica in range(0, self.replicas):
             if len(hosts) + len(ignore_hosts) == len(self.hosts):
                 # prevent infinite loop - cannot allocate more fallbacks.
@@ -147,6 +279,48 @@ class HashRing(object):
             hosts.append(host)
         return hosts
 
+    def get_key_ranges(self, host):
+        """Get the ranges of ring keys which map onto a host.
+
+        Data whose ring key (see :func:`get_ring_key`) is not within these
+        ranges is never mapped onto the host. As ring keys are truncated
+        hashes, the boundaries of the ranges may also include a few keys of
+        data mapped onto other hosts, so get_hosts() still has to be used to
+        check the mapping of data within these ranges.
+
+        :param host: A host of the ring.
+        :returns: a sorted list of (first, last) tuples of inclusive bounds
+                  of ring keys.
+        """
+        if host in self._key_ranges:
+            return self._key_ranges[host]
+
+        shift = 128 - RING_KEY_BITS
+        ranges = []
+        no_hosts = set()
+        for partition, divider in enumerate(self._partitions):
+            if host not in self._get_partition_hosts(partition, no_hosts):
+                continue
+            # Hashes in [previous divider, divider) map onto a partition;
+            # the first partition also gets the hashes of the last one.
+            if partition:
+                first = self._partitions[partition - 1] >> shift
+            else:
+                first = 0
+                ranges.append((self._partitions[-1] >> shift, MAX_RING_KEY))
+            if divider:
+                ranges.append((first, (divider - 1) >> shift))
+
+        # Merge overlapping and adjacent ranges
+        merged = []
+        for first, last in sorted(ranges):
+            if merged and first <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(last, merged[-1][1]))
+            else:
+                merged.append((first, last))
+        self._key_ranges[host] = merged
+        return merged
+
     def _get_host(self, partition):
         """Find what host is serving a partition.
 
@@ -159,6 +333,7 @@ class HashRing(object):
 
 class HashRingManager(object):
     _hash_rings = None
+    _hash_rings_expire = 0
     _lock = threading.Lock()
 
     def __init__(self):
@@ -167,29 +342,54 @@ class HashRingManager(object):
     @property
     def ring(self):
         # Hot path, no lock
-        if self._hash_rings is not None:
+        if (self._hash_rings is not None and
+                timeutils.utcnow_ts() < self._hash_rings_expire):
             return self._hash_rings
 
         with self._lock:
-            if self._hash_rings is None:
+            if (self._hash_rings is None or
+                    timeutils.utcnow_ts() >= self._hash_rings_expire):
                 rings = self._load_hash_rings()
                 self.__class__._hash_rings = rings
+                self.__class__._hash_rings_expire = (
+                    timeutils.utcnow_ts() + CONF.hash_ring_reset_interval)
             return self._hash_rings
 
     def _load_hash_rings(self):
         rings = {}
         d2c = self.dbapi.get_active_driver_dict()
+        old_rings = self._hash_rings or {}
 
         for driver_name, hosts in d2c.iteritems():
-            rings[driver_name] = HashRing(hosts)
+            ring = old_rings.get(driver_name)
+            if ring is None:
+                rings[driver_name] = HashRing(hosts)
+            elif ring.hosts != set(hosts):
+                rings[driver_name] = ring.rebuild(hosts)
+            else:
+                rings[driver_name] = ring
         return rings
 
     @classmethod
     def reset(cls):
+        """Drop the hash rings, so that they are built from scratch."""
         with cls._lock:
             cls._hash_rings = None
 
+    @classmethod
+    def refresh(cls):
+        """Update the hash rings with the active conductors on next use."""
+        with cls._lock:
+            cls._hash_rings_expire = 0
+
     def __getitem__(self, driver_name):
+        try:
+            return self.ring[driver_name]
+        except KeyError:
+            pass
+        # A conductor supporting the driver may have registered since the
+        # hash rings were last updated.
+        self.refresh()
         try:
             return self.ring[driver_name]
         except KeyError:
@@ -12,6 +12,9 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import threading
+
+import eventlet
 from keystoneclient import exceptions as ksexception
 # NOTE(deva): import auth_token so oslo_config pulls in keystone_authtoken
 from keystonemiddleware import auth_token  # noqa
@@ -20,17 +23,35 @@ from six.moves.urllib import parse
 
 from ironic.common import exception
 from ironic.common.i18n import _
+from ironic.common.i18n import _LW
+from ironic.openstack.common import log as logging
 
 CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
 
 keystone_opts = [
     cfg.StrOpt('region_name',
                help='The region used for getting endpoints of OpenStack'
                     'services.'),
+    cfg.IntOpt('admin_token_refresh_margin',
+               default=300,
+               help='The admin token and service catalog are cached and '
+                    'shared by all the users of a process. They are '
+                    'refreshed in the background when the token expires '
+                    'within this number of seconds.'),
 ]
 
 CONF.register_opts(keystone_opts, group='keystone')
 
+# Seconds of validity below which a cached admin token is never used
+_MIN_TOKEN_VALIDITY = 30
+
+_admin_client = None
+_admin_client_lock = threading.Lock()
+_admin_client_refreshing = False
+
+_stats = {'authentications': 0, 'validations': 0, 'cache_hits': 0}
+
 
 def _is_apiv3(auth_url, auth_version):
     """Checks if V3 version of API is being used or not.
@@ -60,6 +81,7 @@ def _get_ksclient(token=None):
         from keystoneclient.v2_0 import client
 
     auth_url = get_keystone_url(auth_url, auth_version)
+    _stats['validations' if token else 'authentications'] += 1
     try:
         if token:
             return client.Client(token=token, auth_url=auth_url)
@@ -94,6 +116,69 @@ def get_keystone_url(auth_url, auth_version):
     return parse.urljoin(auth_url.rstrip('/'), api_version)
 
 
+def _refresh_admin_client():
+    """Authenticate as the admin user and cache the new client."""
+    global _admin_client, _admin_client_refreshing
+    try:
+        _admin_client = _get_ksclient()
+    except exception.IronicException as e:
+        LOG.warn(_LW('Failed to refresh the admin token, the current one '
+                     'is used until it expires: %s'), e)
+    finally:
+        _admin_client_refreshing = False
+
+
+def _get_admin_ksclient(valid_for=None):
+    """Get the cached Keystone client authenticated as the admin user.
+
+    The client, with its token and service catalog, is shared by all the
+    callers. A new client is authenticated if the token of the cached one
+    expires within valid_for seconds; the cached client is refreshed in the
+    background when its token expires within
+    CONF.keystone.admin_token_refresh_margin seconds.
+
+    :param valid_for: minimum number of seconds of validity of the token.
+    :returns: a Keystone client.
+    """
+    global _admin_client, _admin_client_refreshing
+    stale_duration = max(valid_for or 0, _MIN_TOKEN_VALIDITY)
+    ksclient = _admin_client
+    if (ksclient is None or
+            ksclient.auth_ref.will_expire_soon(stale_duration=stale_duration)):
+        with _admin_client_lock:
+            # Another caller may have authenticated in the meantime
+            ksclient = _admin_client
+            if (ksclient is None or ksclient.auth_ref.will_expire_soon(
+                    stale_duration=stale_duration)):
+                ksclient = _admin_client = _get_ksclient()
+                return ksclient
+
+    _stats['cache_hits'] += 1
+    if (not _admin_client_refreshing and ksclient.auth_ref.will_expire_soon(
+            stale_duration=CONF.keystone.admin_token_refresh_margin)):
+        _admin_client_refreshing = True
+        eventlet.spawn_n(_refresh_admin_client)
+    return ksclient
+
+
+def reset_admin_client():
+    """Drop the cached admin client, so that the next use authenticates."""
+    global _admin_client, _admin_client_refreshing
+    with _admin_client_lock:
+        _admin_client = None
+        _admin_client_refreshing = False
+
+
+def get_stats():
+    """Get the number of Keystone round trips since the process started.
+
+    :returns: a dict with the number of 'authentications' as the admin
+              user, of 'validations' of other tokens, and of the
+              'cache_hits' of the admin token and service catalog.
+    """
+    return dict(_stats)
+
+
 def get_service_url(service_type='baremetal', endpoint_type='internal'):
     """Wrapper for get service url from keystone service catalog.
 
@@ -104,7 +189,7 @@ def get_service_url(service_type='baremetal', endpoint_type='internal'):
     :param endpoint_type: the type of endpoint for the service.
     :returns: an http/https url for the desired endpoint.
     """
-    ksclient = _get_ksclient()
+    ksclient = _get_admin_ksclient()
 
     if not ksclient.has_service_catalog():
         raise exception.KeystoneFailure(_('No Keystone service catalog '
@@ -122,9 +207,12 @@ def get_service_url(service_type='baremetal', endpoint_type='internal'):
     return endpoint
 
 
-def get_admin_auth_token():
-    """Get an admin auth_token from the Keystone."""
-    ksclient = _get_ksclient()
+def get_admin_auth_token(valid_for=None):
+    """Get an admin auth_token from the Keystone.
+
+    :param valid_for: minimum number of seconds of validity of the token.
+    """
+    ksclient = _get_admin_ksclient(valid_for=valid_for)
     return ksclient.auth_token
 
 
@@ -134,5 +222,7 @@ def token_expires_soon(token, duration=None):
     :param duration: time interval in seconds
     :returns: boolean : true if expiration is within the given duration
     """
-    ksclient = _get_ksclient(token=token)
+    ksclient = _admin_client
+    if ksclient is None or ksclient.auth_token != token:
+        ksclient = _get_ksclient(token=token)
     return ksclient.auth_ref.will_expire_soon(stale_duration=duration)
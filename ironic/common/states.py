@@ -295,3 +295,7 @@ machine.add_transition(INSPECTFAIL, MANAGEABLE, 'manage')
 
 # Reinitiate the inspect after inspectfail.
 machine.add_transition(INSPECTFAIL, INSPECTING, 'inspect')
+
+# The tasks share the states and transitions of the machine, see
+# ironic.conductor.task_manager.TaskManager
+machine.freeze()
@@ -43,19 +43,22 @@ a change, etc.
 
 import collections
 import datetime
+import functools
 import inspect
 import tempfile
 import threading
+import time
 
 import eventlet
 from eventlet import greenpool
+from eventlet import semaphore
 from oslo import messaging
-from oslo_concurrency import lockutils
 from oslo_config import cfg
 from oslo_context import context as ironic_context
 from oslo_db import exception as db_exception
 from oslo_utils import excutils
 from oslo_utils import uuidutils
+import six
 
 from ironic.common import dhcp_factory
 from ironic.common import driver_factory
@@ -63,7 +66,6 @@ from ironic.common import exception
 from ironic.common.glance_service import service_utils as glance_utils
 from ironic.common import hash_ring as hash
 from ironic.common.i18n import _
-from ironic.common.i18n import _LC
 from ironic.common.i18n import _LE
 from ironic.common.i18n import _LI
 from ironic.common.i18n import _LW
@@ -72,15 +74,17 @@ from ironic.common import keystone
 from ironic.common import rpc
 from ironic.common import states
 from ironic.common import swift
+from ironic.conductor import periodics
+from ironic.conductor import power_sync
 from ironic.conductor import task_manager
 from ironic.conductor import utils
+from ironic.conductor import workers
 from ironic.db import api as dbapi
-from ironic import objects
+from ironic.drivers.modules import ipmitool
 from ironic.openstack.common import log
 from ironic.openstack.common import periodic_task
 
 MANAGER_TOPIC = 'ironic.conductor_manager'
-WORKER_SPAWN_lOCK = "conductor_worker_spawn"
 
 LOG = log.getLogger(__name__)
 
@@ -121,14 +125,97 @@ conductor_opts = [
                         'number of times Ironic should try syncing the '
                         'hardware node power state with the node power state '
                         'in DB'),
+        cfg.IntOpt('sync_power_state_workers',
+                   default=8,
+                   help='Number of greenthreads used to sync the power state '
+                        'of nodes in parallel during a single pass of the '
+                        'power state sync periodic task.'),
+        cfg.IntOpt('sync_power_state_bmc_concurrency',
+                   default=1,
+                   help='Maximum number of nodes sharing the same BMC address '
+                        'whose power state is synced at the same time.'),
+        cfg.IntOpt('sync_power_state_pass_timeout',
+                   default=0,
+                   help='Maximum time (in seconds) a single pass of the power '
+                        'state sync may take. Nodes that were not synced '
+                        'before this deadline are deferred to the beginning '
+                        'of the next pass. Set to 0 to disable the deadline.'),
+        cfg.IntOpt('sync_power_state_max_interval',
+                   default=0,
+                   help='Maximum interval (in seconds) between power state '
+                        'checks of a node whose power state is stable. The '
+                        'interval of such a node doubles after each check, '
+                        'starting from sync_power_state_interval, while nodes '
+                        'whose power state changed or could not be synced '
+                        'are checked again on the next pass. Set to 0 to '
+                        'check every node on each pass.'),
+        cfg.IntOpt('sync_power_state_max_rate',
+                   default=0,
+                   help='Maximum number of node power state checks per '
+                        'second, across all conductors. Each conductor '
+                        'uses an equal share of this rate. Set to 0 to '
+                        'disable the limit.'),
         cfg.IntOpt('periodic_max_workers',
                    default=8,
                    help='Maximum number of worker threads that can be started '
                         'simultaneously by a periodic task. Should be less '
                         'than RPC thread pool size.'),
+        cfg.IntOpt('periodic_node_batch_size',
+                   default=500,
+                   help='Number of nodes fetched from the database at once '
+                        'by periodic tasks iterating over the nodes mapped '
+                        'to this conductor.'),
         cfg.IntOpt('workers_pool_size',
                    default=100,
                    help='The size of the workers greenthread pool.'),
+        cfg.IntOpt('interactive_workers',
+                   default=0,
+                   help='Maximum number of workers running short operations '
+                        'requested by users, like power state changes or '
+                        'console toggles, at once. Set to 0 to only limit '
+                        'them by workers_pool_size.'),
+        cfg.IntOpt('provision_workers',
+                   default=70,
+                   help='Maximum number of workers running provisioning '
+                        'operations, like deploys, tear downs, cleaning '
+                        'or inspection, at once. Set to 0 to only limit '
+                        'them by workers_pool_size.'),
+        cfg.IntOpt('periodic_workers',
+                   default=20,
+                   help='Maximum number of workers started by periodic '
+                        'tasks running at once. Set to 0 to only limit them '
+                        'by workers_pool_size.'),
+        cfg.IntOpt('workers_queue_size',
+                   default=50,
+                   help='Maximum number of operations of each class '
+                        '(interactive, provision and periodic) waiting for '
+                        'a free worker. When the queue of a class is full, '
+                        'new operations of this class are refused.'),
+        cfg.IntOpt('workers_stats_interval',
+                   default=60,
+                   help='Interval between the logging of the statistics of '
+                        'the workers pool and of the periodic tasks, in '
+                        'seconds. Set to a negative value to disable it.'),
+        cfg.FloatOpt('periodic_tasks_jitter',
+                     default=0.1,
+                     help='Maximum random delay added to each run of the '
+                          'periodic tasks, as a fraction of their interval, '
+                          'so that conductors started together spread '
+                          'their periodic work over time. Set to 0 to run '
+                          'the tasks at fixed intervals.'),
+        cfg.IntOpt('bulk_operation_workers',
+                   default=8,
+                   help='Number of greenthreads used to run the per-node '
+                        'operations of a single bulk RPC call, like '
+                        'change_nodes_power_state, in parallel.'),
+        cfg.IntOpt('bulk_rpc_max_nodes',
+                   default=100,
+                   help='Maximum number of nodes sent to a conductor in a '
+                        'single bulk RPC call. The nodes of a bulk request '
+                        'mapped to the same conductor are split into '
+                        'several calls, sent in parallel, so that each call '
+                        'completes within the RPC timeout. Set to 0 for no '
+                        'limit.'),
         cfg.IntOpt('node_locked_retry_attempts',
                    default=3,
                    help='Number of attempts to grab a node lock.'),
@@ -143,6 +230,23 @@ conductor_opts = [
                    default=600,
                    help='Seconds between conductor sending sensor data message'
                         ' to ceilometer via the notification bus.'),
+        cfg.IntOpt('send_sensor_data_workers',
+                   default=1,
+                   help='Number of greenthreads used to collect the sensor '
+                        'data of nodes in parallel.'),
+        cfg.IntOpt('send_sensor_data_driver_concurrency',
+                   default=0,
+                   help='Maximum number of nodes using the same driver whose '
+                        'sensor data is collected at the same time. Set to 0 '
+                        'to only limit it by send_sensor_data_workers.'),
+        cfg.IntOpt('send_sensor_data_batch_size',
+                   default=1,
+                   help='Number of nodes whose sensor data is sent in a '
+                        'single notification. With the default value of 1, '
+                        'one "hardware.ipmi.metrics" notification is sent '
+                        'per node. Larger values send '
+                        '"hardware.ipmi.metrics.batch" notifications, whose '
+                        'payload holds the list of the per-node messages.'),
         cfg.ListOpt('send_sensor_data_types',
                    default=['ALL'],
                    help='List of comma separated meter types which need to be'
@@ -190,6 +294,15 @@ conductor_opts = [
 CONF = cfg.CONF
 CONF.register_opts(conductor_opts, 'conductor')
 
+SYNC_POWER_STATE_FILTERS = {
+    'maintenance': False,
+    # NOTE(deva): we should not acquire a lock on a node in DEPLOYWAIT,
+    #             as this could cause an error within a deploy ramdisk
+    #             POSTing back at the same time.
+    'provision_state_not_in': [states.DEPLOYWAIT],
+}
+"""Filters a node must match to have its power state synced."""
+
 CLEANING_INTERFACE_PRIORITY = {
     # When two clean steps have the same priority, their order is determined
     # by which interface is implementing the clean step. The clean step of the
@@ -201,21 +314,66 @@ CLEANING_INTERFACE_PRIORITY = {
 }
 
 
-class ConductorManager(periodic_task.PeriodicTasks):
+def _time():
+    """Broken out for testing."""
+    return time.time()
+
+
+def _count_db_queries(func):
+    """Log the number of database queries issued by a conductor method.
+
+    The queries issued by the workers the method spawns are counted too,
+    see _with_query_counters(), as long as they are issued before the
+    method returns.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with dbapi.get_instance().count_queries() as counter:
+            try:
+                return func(*args, **kwargs)
+            finally:
+                LOG.debug("%(method)s issued %(count)d database queries.",
+                          {'method': func.__name__, 'count': counter.count})
+    return wrapper
+
+
+def _with_query_counters(func):
+    """Make func count its queries with the counters of the calling thread.
+
+    :param func: a function to run in another greenthread.
+    :returns: a function calling func, whose database queries are counted
+              by the counters active in the thread which called
+              _with_query_counters().
+    """
+    db = dbapi.get_instance()
+    counters = db.get_query_counters()
+    if not counters:
+        return func
+
+    def wrapper(*args, **kwargs):
+        with db.inherit_query_counters(counters):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class ConductorManager(periodics.PeriodicTasks):
     """Ironic Conductor manager main class."""
 
     # NOTE(rloo): This must be in sync with rpcapi.ConductorAPI's.
-    RPC_API_VERSION = '1.27'
+    RPC_API_VERSION = '1.28'
 
     target = messaging.Target(version=RPC_API_VERSION)
 
     def __init__(self, host, topic):
-        super(ConductorManager, self).__init__()
+        super(ConductorManager, self).__init__(
+            jitter=CONF.conductor.periodic_tasks_jitter)
         if not host:
             host = CONF.host
         self.host = host
         self.topic = topic
         self.power_state_sync_count = collections.defaultdict(int)
+        self._power_sync_scheduler = power_sync.PowerSyncScheduler()
+        self._keystone_stats = keystone.get_stats()
         self.notifier = rpc.get_notifier()
 
     def _get_driver(self, driver_name):
@@ -238,9 +396,13 @@ class ConductorManager(periodic_task.PeriodicTasks):
         self._keepalive_evt = threading.Event()
         """Event for the keepalive thread."""
 
-        self._worker_pool = greenpool.GreenPool(
-                                size=CONF.conductor.workers_pool_size)
-        """GreenPool of background workers for performing tasks async."""
+        self._worker_pool = workers.WorkerPool(
+            CONF.conductor.workers_pool_size,
+            quotas={workers.INTERACTIVE: CONF.conductor.interactive_workers,
+                    workers.PROVISION: CONF.conductor.provision_workers,
+                    workers.PERIODIC: CONF.conductor.periodic_workers},
+            queue_size=CONF.conductor.workers_queue_size)
+        """Pool of background workers for performing tasks async."""
 
         self.ring_manager = hash.HashRingManager()
         """Consistent hash ring which maps drivers to conductors."""
@@ -287,16 +449,14 @@ class ConductorManager(periodic_task.PeriodicTasks):
                                                  update_existing=True)
         self.conductor = cdr
 
-        # Spawn a dedicated greenthread for the keepalive
-        try:
-            self._spawn_worker(self._conductor_service_record_keepalive)
-            LOG.info(_LI('Successfully started conductor with hostname '
-                         '%(hostname)s.'),
-                     {'hostname': self.host})
-        except exception.NoFreeConductorWorker:
-            with excutils.save_and_reraise_exception():
-                LOG.critical(_LC('Failed to start keepalive'))
-                self.del_host()
+        # Spawn a dedicated greenthread for the keepalive, outside of the
+        # workers pool: it runs as long as the conductor, and would hold a
+        # slot of the periodic workers forever.
+        self._keepalive_thread = eventlet.spawn(
+            self._conductor_service_record_keepalive)
+        LOG.info(_LI('Successfully started conductor with hostname '
+                     '%(hostname)s.'),
+                 {'hostname': self.host})
 
     def _collect_periodic_tasks(self, obj):
         for n, method in inspect.getmembers(obj, inspect.ismethod):
@@ -320,31 +480,54 @@ class ConductorManager(periodic_task.PeriodicTasks):
             LOG.info(_LI('Not deregistering conductor with hostname '
                          '%(hostname)s.'),
                      {'hostname': self.host})
+        self.stop_periodic_tasks()
         # Waiting here to give workers the chance to finish. This has the
         # benefit of releasing locks workers placed on nodes, as well as
         # having work complete normally.
         self._worker_pool.waitall()
+        # Stop the "ipmitool shell" processes once nothing uses them.
+        ipmitool.SHELL_SESSIONS.close()
 
     def periodic_tasks(self, context, raise_on_error=False):
         """Periodic tasks are run at pre-specified interval."""
         return self.run_periodic_tasks(context, raise_on_error=raise_on_error)
 
-    @lockutils.synchronized(WORKER_SPAWN_lOCK, 'ironic-')
     def _spawn_worker(self, func, *args, **kwargs):
 
-        """Create a greenthread to run func(*args, **kwargs).
+        """Create a greenthread to run the provisioning func(*args, **kwargs).
 
-        Spawns a greenthread if there are free slots in pool, otherwise raises
-        exception. Execution control returns immediately to the caller.
+        Spawns a greenthread which runs func once there is a free slot for
+        provisioning work in the pool. Execution control returns
+        immediately to the caller.
 
         :returns: GreenThread object.
-        :raises: NoFreeConductorWorker if worker pool is currently full.
+        :raises: NoFreeConductorWorker if the queue of provisioning work
+                 waiting for a free slot is full.
 
         """
-        if self._worker_pool.free():
-            return self._worker_pool.spawn(func, *args, **kwargs)
-        else:
-            raise exception.NoFreeConductorWorker()
+        return self._worker_pool.spawn(workers.PROVISION,
+                                       _with_query_counters(func),
+                                       *args, **kwargs)
+
+    def _spawn_interactive_worker(self, func, *args, **kwargs):
+        """Create a greenthread to run the short func(*args, **kwargs).
+
+        Like _spawn_worker(), for short operations requested by users, which
+        get free slots before provisioning and periodic work.
+        """
+        return self._worker_pool.spawn(workers.INTERACTIVE,
+                                       _with_query_counters(func),
+                                       *args, **kwargs)
+
+    def _spawn_periodic_worker(self, func, *args, **kwargs):
+        """Create a greenthread to run the background func(*args, **kwargs).
+
+        Like _spawn_worker(), for the work of periodic tasks, which gets
+        free slots after user requested work.
+        """
+        return self._worker_pool.spawn(workers.PERIODIC,
+                                       _with_query_counters(func),
+                                       *args, **kwargs)
 
     def _conductor_service_record_keepalive(self):
         while not self._keepalive_evt.is_set():
@@ -355,9 +538,56 @@ class ConductorManager(periodic_task.PeriodicTasks):
                                 'while heartbeating.'))
             self._keepalive_evt.wait(CONF.conductor.heartbeat_interval)
 
+    @periodic_task.periodic_task(
+            spacing=CONF.conductor.workers_stats_interval)
+    def _log_workers_stats(self, context):
+        """Log the queue depth and wait time of each class of workers."""
+        for priority, stats in sorted(self._worker_pool.stats().items()):
+            spawned = stats['spawned']
+            LOG.debug('Workers pool: %(priority)s: %(running)d running, '
+                      '%(waiting)d waiting; since start, %(spawned)d '
+                      'spawned, %(queued)d queued, %(refused)d refused, '
+                      'average wait %(average).3fs, maximum wait '
+                      '%(max_wait_time).3fs.',
+                      dict(stats, priority=priority,
+                           average=stats['wait_time'] / spawned
+                           if spawned else 0.0))
+
+    @periodic_task.periodic_task(
+            spacing=CONF.conductor.workers_stats_interval)
+    def _log_periodic_tasks_stats(self, context):
+        """Log the duration and overruns of each periodic task.
+
+        The Keystone round trips since the previous call, most of them made
+        by the periodic tasks, are logged as well.
+        """
+        for name, stats in sorted(self.periodic_tasks_stats().items()):
+            runs = stats['runs']
+            buckets = ['<=%ss: %d' % bucket for bucket in
+                       zip(periodics.DURATION_BUCKETS, stats['histogram'])]
+            buckets.append('longer: %d' % stats['histogram'][-1])
+            LOG.debug('Periodic task %(name)s: since start, %(runs)d runs, '
+                      '%(failures)d failed, %(overruns)d skipped because '
+                      'the previous run was still in progress; average '
+                      'duration %(average).3fs, maximum duration '
+                      '%(max_time).3fs; durations %(histogram)s.',
+                      dict(stats, name=name, histogram=', '.join(buckets),
+                           average=stats['total_time'] / runs
+                           if runs else 0.0))
+
+        keystone_stats = keystone.get_stats()
+        LOG.debug('Keystone: %(authentications)d admin authentications, '
+                  '%(validations)d token validations and %(cache_hits)d '
+                  'uses of the cached admin token since the previous '
+                  'statistics.',
+                  dict((key, value - self._keystone_stats[key])
+                       for key, value in keystone_stats.items()))
+        self._keystone_stats = keystone_stats
+
     @messaging.expected_exceptions(exception.InvalidParameterValue,
                                    exception.MissingParameterValue,
                                    exception.NodeLocked)
+    @_count_db_queries
     def update_node(self, context, node_obj):
         """Update a node with the supplied data.
 
@@ -394,6 +624,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
                                    exception.MissingParameterValue,
                                    exception.NoFreeConductorWorker,
                                    exception.NodeLocked)
+    @_count_db_queries
     def change_node_power_state(self, context, node_id, new_state):
         """RPC method to encapsulate changes to a node's state.
 
@@ -427,14 +658,75 @@ class ConductorManager(periodic_task.PeriodicTasks):
             task.node.save()
             task.set_spawn_error_hook(power_state_error_handler,
                                       task.node, task.node.power_state)
-            task.spawn_after(self._spawn_worker, utils.node_power_action,
-                             task, new_state)
+            task.spawn_after(self._spawn_interactive_worker,
+                             utils.node_power_action, task, new_state)
+
+    def _bulk_node_action(self, context, node_ids, method, *args, **kwargs):
+        """Call a method for several nodes in parallel.
+
+        :param context: request context.
+        :param node_ids: list of node ids or uuids.
+        :param method: the method to call as method(context, node_id,
+                       *args, **kwargs).
+        :returns: a dict mapping each node id to a dict, holding the
+                  'result' returned by the method for that node unless it
+                  is None, or the 'error' message and HTTP 'code' of the
+                  exception it raised.
+        """
+        results = {}
+
+        def call(node_id):
+            try:
+                try:
+                    result = method(context, node_id, *args, **kwargs)
+                    results[node_id] = ({} if result is None
+                                        else {'result': result})
+                except messaging.ExpectedException as e:
+                    # unwrap the exceptions of the @expected_exceptions
+                    six.reraise(*e.exc_info)
+            except exception.IronicException as e:
+                results[node_id] = {'error': six.text_type(e),
+                                    'code': e.code}
+            except Exception as e:
+                LOG.exception(_LE("Unexpected error while calling %(method)s "
+                                  "for node %(node)s."),
+                              {'method': method.__name__, 'node': node_id})
+                results[node_id] = {'error': six.text_type(e), 'code': 500}
+
+        call = _with_query_counters(call)
+        pool = greenpool.GreenPool(
+            size=CONF.conductor.bulk_operation_workers)
+        for node_id in node_ids:
+            pool.spawn_n(call, node_id)
+        pool.waitall()
+        return results
+
+    @_count_db_queries
+    def change_nodes_power_state(self, context, node_ids, new_state):
+        """RPC method to change the power state of several nodes.
+
+        This calls change_node_power_state() for each node, in parallel.
+
+        :param context: an admin context.
+        :param node_ids: list of node ids or uuids.
+        :param new_state: the desired power state of the nodes.
+        :returns: a dict mapping each node id to a dict, empty if the power
+                  state change was started, otherwise holding the 'error'
+                  message and HTTP 'code'.
+
+        """
+        LOG.debug("RPC change_nodes_power_state called for %(count)d "
+                  "nodes. The desired new state is %(state)s.",
+                  {'count': len(node_ids), 'state': new_state})
+        return self._bulk_node_action(context, node_ids,
+                                      self.change_node_power_state, new_state)
 
     @messaging.expected_exceptions(exception.NoFreeConductorWorker,
                                    exception.NodeLocked,
                                    exception.InvalidParameterValue,
                                    exception.UnsupportedDriverExtension,
                                    exception.MissingParameterValue)
+    @_count_db_queries
     def vendor_passthru(self, context, node_id, driver_method,
                         http_method, info):
         """RPC method to encapsulate vendor action.
@@ -528,6 +820,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
                                    exception.MissingParameterValue,
                                    exception.UnsupportedDriverExtension,
                                    exception.DriverNotFound)
+    @_count_db_queries
     def driver_vendor_passthru(self, context, driver_name, driver_method,
                                http_method, info):
         """Handle top-level vendor actions.
@@ -615,6 +908,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
         return (ret, is_async)
 
     @messaging.expected_exceptions(exception.UnsupportedDriverExtension)
+    @_count_db_queries
     def get_node_vendor_passthru_methods(self, context, node_id):
         """Retrieve information about vendor methods of the given node.
 
@@ -636,6 +930,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
 
     @messaging.expected_exceptions(exception.UnsupportedDriverExtension,
                                    exception.DriverNotFound)
+    @_count_db_queries
     def get_driver_vendor_passthru_methods(self, context, driver_name):
         """Retrieve information about vendor methods of the given driver.
 
@@ -661,6 +956,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
                                    exception.NodeInMaintenance,
                                    exception.InstanceDeployFailure,
                                    exception.InvalidStateRequested)
+    @_count_db_queries
     def do_node_deploy(self, context, node_id, rebuild=False,
                        configdrive=None):
         """RPC method to initiate deployment to a node.
@@ -750,6 +1046,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
                                    exception.NodeLocked,
                                    exception.InstanceDeployFailure,
                                    exception.InvalidStateRequested)
+    @_count_db_queries
     def do_node_tear_down(self, context, node_id):
         """RPC method to tear down an existing node deployment.
 
@@ -825,6 +1122,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
                 state=node.provision_state)
         self._do_node_clean(task)
 
+    @_count_db_queries
     def continue_node_clean(self, context, node_id):
         """RPC method to continue cleaning a node.
 
@@ -992,6 +1290,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
                                    exception.InvalidParameterValue,
                                    exception.MissingParameterValue,
                                    exception.InvalidStateRequested)
+    @_count_db_queries
     def do_provisioning_action(self, context, node_id, action):
         """RPC method to initiate certain provisioning state transitions.
 
@@ -1023,6 +1322,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
 
     @periodic_task.periodic_task(
             spacing=CONF.conductor.sync_power_state_interval)
+    @_count_db_queries
     def _sync_power_states(self, context):
         """Periodic task to sync power states for the nodes.
 
@@ -1034,6 +1334,24 @@ class ConductorManager(periodic_task.PeriodicTasks):
         3) Node is not in DEPLOYWAIT provision state.
         4) Node doesn't have a reservation
 
+        Conditions 2) to 4) are checked by the same DB query which takes
+        the lock, see :data:`SYNC_POWER_STATE_FILTERS`. The nodes which are
+        reserved when they are listed are skipped without trying to lock
+        them, and stay due. The node mapping is not re-checked because it
+        doesn't much matter if things happened to re-balance.
+
+        Nodes are synced in parallel by a pool of
+        CONF.conductor.sync_power_state_workers greenthreads, with at most
+        CONF.conductor.sync_power_state_bmc_concurrency nodes sharing the
+        same BMC being synced at once, and at most this conductor's share of
+        CONF.conductor.sync_power_state_max_rate nodes synced per second.
+        The nodes of a BMC are queued, they don't hold a greenthread of the
+        pool while the BMC is busy.
+
+        Nodes whose power state is stable are checked less and less often,
+        up to every CONF.conductor.sync_power_state_max_interval seconds,
+        see :class:`ironic.conductor.power_sync.PowerSyncScheduler`.
+
         NOTE: Grabbing a lock here can cause other methods to fail to
         grab it. We want to avoid trying to grab a lock while a
         node is in the DEPLOYWAIT state so we don't unnecessarily
@@ -1041,57 +1359,157 @@ class ConductorManager(periodic_task.PeriodicTasks):
         here to avoid failing a brand new deploy to a node that we've
         locked here, though.
         """
-        # FIXME(comstud): Since our initial state checks are outside
-        # of the lock (to try to avoid the lock), some checks are
-        # repeated after grabbing the lock so we can unlock quickly.
-        # The node mapping is not re-checked because it doesn't much
-        # matter if things happened to re-balance.
-        #
-        # This is inefficient and racey. We end up with calling DB API's
-        # get_node() twice (once here, and once in acquire(). Ideally we
-        # add a way to pass constraints to task_manager.acquire()
-        # (through to its DB API call) so that we can eliminate our call
-        # and first set of checks below.
-
-        filters = {'reserved': False, 'maintenance': False}
-        node_iter = self.iter_nodes(fields=['id'], filters=filters)
-        for (node_uuid, driver, node_id) in node_iter:
-            try:
-                # NOTE(deva): we should not acquire a lock on a node in
-                #             DEPLOYWAIT, as this could cause an error within
-                #             a deploy ramdisk POSTing back at the same time.
-                # TODO(deva): refactor this check, because it needs to be done
-                #             in every periodic task, not just this one.
-                node = objects.Node.get_by_id(context, node_id)
-                if (node.provision_state == states.DEPLOYWAIT or
-                        node.maintenance or node.reservation is not None):
-                    continue
+        # NOTE: the reserved nodes are listed too, so that they keep their
+        # place in the schedule. Only the BMC address of each node is kept,
+        # not its driver_info.
+        filters = {'maintenance': False}
+        bmc_addresses = collections.OrderedDict()
+        reserved = set()
+        for node_uuid, driver, driver_info, reservation in self.iter_nodes(
+                fields=['driver_info', 'reservation'], filters=filters):
+            bmc_addresses[node_uuid] = utils.get_bmc_address(driver_info)
+            if reservation is not None:
+                reserved.add(node_uuid)
+
+        # Nodes which were due but not synced by the previous passes, eg.
+        # because of the deadline, go first.
+        max_interval = self._get_power_sync_max_interval()
+        nodes = self._power_sync_scheduler.get_due_nodes(bmc_addresses,
+                                                         max_interval)
+
+        timeout = CONF.conductor.sync_power_state_pass_timeout
+        rate = self._get_power_sync_rate()
+        start = _time()
+        deadline = start + timeout if timeout > 0 else None
+        counters = collections.Counter()
+        # Nodes without a known BMC address get a queue of their own
+        bmc_queues = collections.OrderedDict()
+        for node_uuid in nodes:
+            if node_uuid in reserved:
+                counters['skipped'] += 1
+                continue
+            bmc = bmc_addresses[node_uuid] or node_uuid
+            bmc_queues.setdefault(bmc, collections.deque()).append(node_uuid)
+
+        # NOTE: the nodes of a BMC are synced one after the other by at
+        # most sync_power_state_bmc_concurrency greenthreads, so that the
+        # workers of the pool never wait for a busy BMC while the nodes of
+        # other BMCs are due.
+        pace = {'spawned': 0}
+        pool = greenpool.GreenPool(
+            size=CONF.conductor.sync_power_state_workers)
+        sync_node_power_state = _with_query_counters(
+            self._sync_node_power_state)
+
+        def _sync_bmc_queue(queue):
+            while queue:
+                if rate:
+                    # only the synced nodes count against the rate limit
+                    delay = start + pace['spawned'] / rate - _time()
+                    pace['spawned'] += 1
+                    if delay > 0:
+                        eventlet.sleep(delay)
+                if deadline is not None and _time() >= deadline:
+                    counters['deferred'] += len(queue)
+                    queue.clear()
+                    return
+                sync_node_power_state(context, queue.popleft(), counters,
+                                      max_interval)
+
+        concurrency = max(1, CONF.conductor.sync_power_state_bmc_concurrency)
+        for queue in bmc_queues.values():
+            for i in range(min(concurrency, len(queue))):
+                pool.spawn_n(_sync_bmc_queue, queue)
+        pool.waitall()
+
+        duration = _time() - start
+        LOG.debug("Power state sync pass took %(duration).2f seconds: "
+                  "%(synced)d of %(due)d due nodes synced (%(rate).1f "
+                  "nodes/sec), %(skipped)d skipped, %(deferred)d deferred, "
+                  "%(not_due)d not due.",
+                  {'duration': duration, 'synced': counters['synced'],
+                   'due': len(nodes),
+                   'rate': counters['synced'] / duration if duration else 0,
+                   'skipped': counters['skipped'],
+                   'deferred': counters['deferred'],
+                   'not_due': len(bmc_addresses) - len(nodes)})
+        if counters['deferred']:
+            LOG.warning(_LW("Power state sync pass exceeded its deadline of "
+                            "%(timeout)s seconds, %(deferred)d nodes were "
+                            "deferred to the next pass."),
+                        {'timeout': timeout,
+                         'deferred': counters['deferred']})
+
+    def _get_power_sync_max_interval(self):
+        """Get the maximum number of passes between syncs of a node."""
+        max_interval = CONF.conductor.sync_power_state_max_interval
+        interval = CONF.conductor.sync_power_state_interval
+        if max_interval <= 0 or interval <= 0:
+            return 1
+        return max(1, max_interval // interval)
+
+    def _get_power_sync_rate(self):
+        """Get the share of the power sync rate limit of this conductor.
+
+        :returns: a number of nodes per second, or None if unlimited.
+        """
+        max_rate = CONF.conductor.sync_power_state_max_rate
+        if max_rate <= 0:
+            return None
+        hosts = set()
+        for ring in self.ring_manager.ring.values():
+            hosts.update(ring.hosts)
+        return float(max_rate) / max(1, len(hosts))
 
-                with task_manager.acquire(context, node_uuid) as task:
-                    if (task.node.provision_state == states.DEPLOYWAIT or
-                            task.node.maintenance):
-                        continue
-                    count = do_sync_power_state(
-                            task, self.power_state_sync_count[node_uuid])
-                    if count:
-                        self.power_state_sync_count[node_uuid] = count
-                    else:
-                        # don't bloat the dict with non-failing nodes
-                        del self.power_state_sync_count[node_uuid]
-            except exception.NodeNotFound:
-                LOG.info(_LI("During sync_power_state, node %(node)s was not "
-                             "found and presumed deleted by another process."),
-                         {'node': node_uuid})
-            except exception.NodeLocked:
-                LOG.info(_LI("During sync_power_state, node %(node)s was "
-                             "already locked by another process. Skip."),
-                         {'node': node_uuid})
-            finally:
-                # Yield on every iteration
-                eventlet.sleep(0)
+    def _sync_node_power_state(self, context, node_uuid, counters,
+                               max_interval=1):
+        """Sync the power state of a single node.
+
+        Runs in a greenthread of the pool used by :meth:`_sync_power_states`.
+
+        :param context: request context.
+        :param node_uuid: the UUID of the node.
+        :param counters: a collections.Counter updated with the number of
+                         'synced' and 'skipped' nodes.
+        :param max_interval: maximum number of passes before the next sync
+                             of the node.
+        """
+        try:
+            with task_manager.acquire(context, node_uuid,
+                                      filters=SYNC_POWER_STATE_FILTERS,
+                                      retry=False) as task:
+                power_state = task.node.power_state
+                count = do_sync_power_state(
+                        task, self.power_state_sync_count[node_uuid])
+                if count:
+                    self.power_state_sync_count[node_uuid] = count
+                else:
+                    # don't bloat the dict with non-failing nodes
+                    del self.power_state_sync_count[node_uuid]
+                self._power_sync_scheduler.record(
+                    node_uuid,
+                    not count and power_state == task.node.power_state,
+                    max_interval)
+                counters['synced'] += 1
+        except exception.NodeFiltersNotMatched:
+            counters['skipped'] += 1
+        except exception.NodeNotFound:
+            counters['skipped'] += 1
+            LOG.info(_LI("During sync_power_state, node %(node)s was not "
+                         "found and presumed deleted by another process."),
+                     {'node': node_uuid})
+        except exception.NodeLocked:
+            counters['skipped'] += 1
+            LOG.info(_LI("During sync_power_state, node %(node)s was "
+                         "already locked by another process. Skip."),
+                     {'node': node_uuid})
+        finally:
+            # Yield on every iteration
+            eventlet.sleep(0)
 
     @periodic_task.periodic_task(
             spacing=CONF.conductor.check_provision_state_interval)
+    @_count_db_queries
     def _check_deploy_timeouts(self, context):
         callback_timeout = CONF.conductor.deploy_callback_timeout
         if not callback_timeout:
@@ -1119,6 +1537,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
 
     @periodic_task.periodic_task(
             spacing=CONF.conductor.sync_local_state_interval)
+    @_count_db_queries
     def _sync_local_state(self, context):
         """Perform any actions necessary to sync local state.
 
@@ -1128,7 +1547,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
         The ensuing actions could include preparing a PXE environment,
         updating the DHCP server, and so on.
         """
-        self.ring_manager.reset()
+        self.ring_manager.refresh()
         filters = {'reserved': False,
                    'maintenance': False,
                    'provision_state': states.ACTIVE}
@@ -1159,7 +1578,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
                             node.provision_state != states.ACTIVE):
                         continue
 
-                    task.spawn_after(self._spawn_worker,
+                    task.spawn_after(self._spawn_periodic_worker,
                                      self._do_takeover, task)
 
             except exception.NoFreeConductorWorker:
@@ -1185,11 +1604,23 @@ class ConductorManager(periodic_task.PeriodicTasks):
 
         return self.host in ring.get_hosts(node_uuid)
 
+    def _get_ring_key_ranges(self):
+        """Get the ranges of ring keys which may be mapped to this conductor.
+
+        :returns: a dictionary mapping driver names to lists of
+                  (first, last) ring key ranges, suitable for the
+                  ring_key_ranges filter of the database API.
+        """
+        return dict((driver, ring.get_key_ranges(self.host))
+                    for driver, ring in self.ring_manager.ring.items())
+
     def iter_nodes(self, fields=None, **kwargs):
         """Iterate over nodes mapped to this conductor.
 
-        Requests node set from and filters out nodes that are not
-        mapped to this conductor.
+        Requests from the database the set of nodes whose ring keys fall
+        into the ranges mapped to this conductor, and filters out the few
+        remaining nodes that are not mapped to this conductor. Nodes are
+        fetched in batches of CONF.conductor.periodic_node_batch_size.
 
         Yields tuples (node_uuid, driver, ...) where ... is derived from
         fields argument, e.g.: fields=None means yielding ('uuid', 'driver'),
@@ -1201,12 +1632,17 @@ class ConductorManager(periodic_task.PeriodicTasks):
         :return: generator yielding tuples of requested fields
         """
         columns = ['uuid', 'driver'] + list(fields or ())
-        node_list = self.dbapi.get_nodeinfo_list(columns=columns, **kwargs)
-        for result in node_list:
+        filters = dict(kwargs.pop('filters', None) or {})
+        filters['ring_key_ranges'] = self._get_ring_key_ranges()
+        node_iter = self.dbapi.iter_nodeinfo(
+            columns=columns, filters=filters,
+            batch_size=CONF.conductor.periodic_node_batch_size, **kwargs)
+        for result in node_iter:
             if self._mapped_to_this_conductor(*result[:2]):
                 yield result
 
     @messaging.expected_exceptions(exception.NodeLocked)
+    @_count_db_queries
     def validate_driver_interfaces(self, context, node_id):
         """Validate the `core` and `standardized` interfaces for drivers.
 
@@ -1254,6 +1690,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
     @messaging.expected_exceptions(exception.NodeLocked,
                                    exception.NodeAssociated,
                                    exception.NodeInWrongPowerState)
+    @_count_db_queries
     def destroy_node(self, context, node_id):
         """Delete a node.
 
@@ -1287,6 +1724,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
 
     @messaging.expected_exceptions(exception.NodeLocked,
                                    exception.NodeNotFound)
+    @_count_db_queries
     def destroy_port(self, context, port):
         """Delete a port.
 
@@ -1311,6 +1749,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
                                    exception.NodeConsoleNotEnabled,
                                    exception.InvalidParameterValue,
                                    exception.MissingParameterValue)
+    @_count_db_queries
     def get_console_information(self, context, node_id):
         """Get connection information about the console.
 
@@ -1341,6 +1780,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
                                    exception.UnsupportedDriverExtension,
                                    exception.InvalidParameterValue,
                                    exception.MissingParameterValue)
+    @_count_db_queries
     def set_console_mode(self, context, node_id, enabled):
         """Enable/Disable the console.
 
@@ -1378,7 +1818,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
             else:
                 node.last_error = None
                 node.save()
-                task.spawn_after(self._spawn_worker,
+                task.spawn_after(self._spawn_interactive_worker,
                                  self._set_console_mode, task, enabled)
 
     def _set_console_mode(self, task, enabled):
@@ -1409,6 +1849,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
     @messaging.expected_exceptions(exception.NodeLocked,
                                    exception.FailedToUpdateMacOnPort,
                                    exception.MACAlreadyExists)
+    @_count_db_queries
     def update_port(self, context, port_obj):
         """Update a port.
 
@@ -1444,6 +1885,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
             return port_obj
 
     @messaging.expected_exceptions(exception.DriverNotFound)
+    @_count_db_queries
     def get_driver_properties(self, context, driver_name):
         """Get the properties of the driver.
 
@@ -1461,7 +1903,17 @@ class ConductorManager(periodic_task.PeriodicTasks):
 
     @periodic_task.periodic_task(
             spacing=CONF.conductor.send_sensor_data_interval)
+    @_count_db_queries
     def _send_sensor_data(self, context):
+        """Periodically sends the sensor data of the nodes.
+
+        The sensor data of the associated nodes mapped to this conductor is
+        collected by a pool of CONF.conductor.send_sensor_data_workers
+        greenthreads, with at most
+        CONF.conductor.send_sensor_data_driver_concurrency nodes using the
+        same driver being collected at once. It is sent in notifications
+        of CONF.conductor.send_sensor_data_batch_size nodes.
+        """
         # do nothing if send_sensor_data option is False
         if not CONF.conductor.send_sensor_data:
             return
@@ -1470,49 +1922,138 @@ class ConductorManager(periodic_task.PeriodicTasks):
         node_iter = self.iter_nodes(fields=['instance_uuid'],
                                     filters=filters)
 
+        start = _time()
+        counters = collections.Counter()
+        latencies = []
+        messages = []
+        workers = CONF.conductor.send_sensor_data_workers
+        concurrency = (CONF.conductor.send_sensor_data_driver_concurrency
+                       or workers)
+        driver_locks = collections.defaultdict(
+            lambda: semaphore.Semaphore(concurrency))
+        pool = greenpool.GreenPool(size=workers)
+        collect_sensor_data = _with_query_counters(self._collect_sensor_data)
+
         for (node_uuid, driver, instance_uuid) in node_iter:
-            # populate the message which will be sent to ceilometer
-            message = {'message_id': uuidutils.generate_uuid(),
-                       'instance_uuid': instance_uuid,
-                       'node_uuid': node_uuid,
-                       'timestamp': datetime.datetime.utcnow(),
-                       'event_type': 'hardware.ipmi.metrics.update'}
+            pool.spawn_n(collect_sensor_data, context, node_uuid,
+                         driver, instance_uuid, driver_locks[driver],
+                         messages, counters, latencies)
+        pool.waitall()
+        if messages:
+            self._notify_sensor_data(context, messages, counters)
+
+        duration = _time() - start
+        LOG.debug("Sensor data collection took %(duration).2f seconds: "
+                  "%(collected)d nodes collected, %(dropped)d dropped, "
+                  "%(sent)d sent in %(notifications)d notifications, "
+                  "collection latency average %(avg).2f seconds, "
+                  "maximum %(max).2f seconds.",
+                  {'duration': duration,
+                   'collected': counters['collected'],
+                   'dropped': counters['dropped'],
+                   'sent': counters['sent'],
+                   'notifications': counters['notifications'],
+                   'avg': (sum(latencies) / len(latencies)
+                           if latencies else 0),
+                   'max': max(latencies) if latencies else 0})
+
+    def _collect_sensor_data(self, context, node_uuid, driver, instance_uuid,
+                             driver_lock, messages, counters, latencies):
+        """Collect the sensor data of a single node.
+
+        Runs in a greenthread of the pool used by :meth:`_send_sensor_data`.
 
-            try:
+        :param context: request context.
+        :param node_uuid: the UUID of the node.
+        :param driver: the name of the driver of the node.
+        :param instance_uuid: the UUID of the instance of the node.
+        :param driver_lock: semaphore limiting the number of concurrent
+                            collections for nodes using the same driver.
+        :param messages: list of the messages waiting to be sent, which is
+                         sent once it holds a batch.
+        :param counters: a collections.Counter updated with the number of
+                         'collected' and 'dropped' nodes, and the number of
+                         'sent' nodes and 'notifications'.
+        :param latencies: a list the collection time of the node is
+                          appended to.
+        """
+        # populate the message which will be sent to ceilometer
+        message = {'message_id': uuidutils.generate_uuid(),
+                   'instance_uuid': instance_uuid,
+                   'node_uuid': node_uuid,
+                   'timestamp': datetime.datetime.utcnow(),
+                   'event_type': 'hardware.ipmi.metrics.update'}
+
+        start = _time()
+        try:
+            with driver_lock:
                 with task_manager.acquire(context,
                                           node_uuid,
                                           shared=True) as task:
                     task.driver.management.validate(task)
                     sensors_data = task.driver.management.get_sensors_data(
                         task)
-            except NotImplementedError:
-                LOG.warn(_LW('get_sensors_data is not implemented for driver'
-                    ' %(driver)s, node_uuid is %(node)s'),
-                    {'node': node_uuid, 'driver': driver})
-            except exception.FailedToParseSensorData as fps:
-                LOG.warn(_LW("During get_sensors_data, could not parse "
-                    "sensor data for node %(node)s. Error: %(err)s."),
-                    {'node': node_uuid, 'err': str(fps)})
-            except exception.FailedToGetSensorData as fgs:
-                LOG.warn(_LW("During get_sensors_data, could not get "
-                    "sensor data for node %(node)s. Error: %(err)s."),
-                    {'node': node_uuid, 'err': str(fgs)})
-            except exception.NodeNotFound:
-                LOG.warn(_LW("During send_sensor_data, node %(node)s was not "
-                           "found and presumed deleted by another process."),
-                           {'node': node_uuid})
-            except Exception as e:
-                LOG.warn(_LW("Failed to get sensor data for node %(node)s. "
-                    "Error: %(error)s"), {'node': node_uuid, 'error': str(e)})
-            else:
-                message['payload'] = self._filter_out_unsupported_types(
-                                                              sensors_data)
-                if message['payload']:
-                    self.notifier.info(context, "hardware.ipmi.metrics",
-                                       message)
-            finally:
-                # Yield on every iteration
-                eventlet.sleep(0)
+        except NotImplementedError:
+            counters['dropped'] += 1
+            LOG.warn(_LW('get_sensors_data is not implemented for driver'
+                ' %(driver)s, node_uuid is %(node)s'),
+                {'node': node_uuid, 'driver': driver})
+        except exception.FailedToParseSensorData as fps:
+            counters['dropped'] += 1
+            LOG.warn(_LW("During get_sensors_data, could not parse "
+                "sensor data for node %(node)s. Error: %(err)s."),
+                {'node': node_uuid, 'err': str(fps)})
+        except exception.FailedToGetSensorData as fgs:
+            counters['dropped'] += 1
+            LOG.warn(_LW("During get_sensors_data, could not get "
+                "sensor data for node %(node)s. Error: %(err)s."),
+                {'node': node_uuid, 'err': str(fgs)})
+        except exception.NodeNotFound:
+            counters['dropped'] += 1
+            LOG.warn(_LW("During send_sensor_data, node %(node)s was not "
+                       "found and presumed deleted by another process."),
+                       {'node': node_uuid})
+        except Exception as e:
+            counters['dropped'] += 1
+            LOG.warn(_LW("Failed to get sensor data for node %(node)s. "
+                "Error: %(error)s"), {'node': node_uuid, 'error': str(e)})
+        else:
+            counters['collected'] += 1
+            latencies.append(_time() - start)
+            message['payload'] = self._filter_out_unsupported_types(
+                                                          sensors_data)
+            if message['payload']:
+                messages.append(message)
+                if (len(messages) >=
+                        CONF.conductor.send_sensor_data_batch_size):
+                    batch = messages[:]
+                    del messages[:]
+                    self._notify_sensor_data(context, batch, counters)
+        finally:
+            # Yield on every iteration
+            eventlet.sleep(0)
+
+    def _notify_sensor_data(self, context, messages, counters):
+        """Send the sensor data messages of a batch of nodes.
+
+        :param context: request context.
+        :param messages: a list of per-node sensor data messages.
+        :param counters: a collections.Counter updated with the number of
+                         'sent' nodes and 'notifications'.
+        """
+        if CONF.conductor.send_sensor_data_batch_size <= 1:
+            for message in messages:
+                self.notifier.info(context, "hardware.ipmi.metrics",
+                                   message)
+                counters['notifications'] += 1
+        else:
+            batch = {'message_id': uuidutils.generate_uuid(),
+                     'timestamp': datetime.datetime.utcnow(),
+                     'event_type': 'hardware.ipmi.metrics.batch',
+                     'payload': messages}
+            self.notifier.info(context, "hardware.ipmi.metrics.batch", batch)
+            counters['notifications'] += 1
+        counters['sent'] += len(messages)
 
     def _filter_out_unsupported_types(self, sensors_data):
         # support the CONF.send_sensor_data_types sensor types only
@@ -1528,6 +2069,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
                                    exception.UnsupportedDriverExtension,
                                    exception.InvalidParameterValue,
                                    exception.MissingParameterValue)
+    @_count_db_queries
     def set_boot_device(self, context, node_id, device, persistent=False):
         """Set the boot device for a node.
 
@@ -1557,10 +2099,62 @@ class ConductorManager(periodic_task.PeriodicTasks):
             task.driver.management.set_boot_device(task, device,
                                                    persistent=persistent)
 
+    @_count_db_queries
+    def set_nodes_boot_device(self, context, node_ids, device,
+                              persistent=False):
+        """RPC method to set the boot device of several nodes.
+
+        This calls set_boot_device() for each node, in parallel.
+
+        :param context: request context.
+        :param node_ids: list of node ids or uuids.
+        :param device: the boot device, one of
+                       :mod:`ironic.common.boot_devices`.
+        :param persistent: Whether to set next-boot, or make the change
+                           permanent. Default: False.
+        :returns: a dict mapping each node id to a dict, empty if the boot
+                  device was set, otherwise holding the 'error' message
+                  and HTTP 'code'.
+        """
+        LOG.debug('RPC set_nodes_boot_device called for %(count)d nodes '
+                  'with device %(device)s',
+                  {'count': len(node_ids), 'device': device})
+        return self._bulk_node_action(context, node_ids,
+                                      self.set_boot_device, device,
+                                      persistent=persistent)
+
+    def _set_node_maintenance(self, context, node_id, maintenance, reason):
+        with task_manager.acquire(context, node_id, shared=False) as task:
+            task.node.maintenance = maintenance
+            task.node.maintenance_reason = reason
+            task.node.save()
+
+    @_count_db_queries
+    def set_nodes_maintenance(self, context, node_ids, maintenance,
+                              reason=None):
+        """RPC method to put several nodes in or out of maintenance mode.
+
+        :param context: request context.
+        :param node_ids: list of node ids or uuids.
+        :param maintenance: True to put the nodes in maintenance mode,
+                            False to remove them from it.
+        :param reason: the reason why the nodes are in maintenance mode.
+        :returns: a dict mapping each node id to a dict, empty if the node
+                  was updated, otherwise holding the 'error' message and
+                  HTTP 'code'.
+        """
+        LOG.debug('RPC set_nodes_maintenance called for %(count)d nodes, '
+                  'maintenance %(maintenance)s',
+                  {'count': len(node_ids), 'maintenance': maintenance})
+        return self._bulk_node_action(context, node_ids,
+                                      self._set_node_maintenance,
+                                      maintenance, reason)
+
     @messaging.expected_exceptions(exception.NodeLocked,
                                    exception.UnsupportedDriverExtension,
                                    exception.InvalidParameterValue,
                                    exception.MissingParameterValue)
+    @_count_db_queries
     def get_boot_device(self, context, node_id):
         """Get the current boot device.
 
@@ -1594,6 +2188,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
                                    exception.UnsupportedDriverExtension,
                                    exception.InvalidParameterValue,
                                    exception.MissingParameterValue)
+    @_count_db_queries
     def get_supported_boot_devices(self, context, node_id):
         """Get the list of supported devices.
 
@@ -1623,6 +2218,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
                                    exception.HardwareInspectionFailure,
                                    exception.InvalidStateRequested,
                                    exception.UnsupportedDriverExtension)
+    @_count_db_queries
     def inspect_hardware(self, context, node_id):
         """Inspect hardware to obtain hardware properties.
 
@@ -1672,6 +2268,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
 
     @periodic_task.periodic_task(
         spacing=CONF.conductor.check_provision_state_interval)
+    @_count_db_queries
     def _check_inspect_timeouts(self, context):
         """Periodically checks inspect_timeout and fails upon reaching it.
 
@@ -1733,10 +2330,10 @@ class ConductorManager(periodic_task.PeriodicTasks):
 
                     # timeout has been reached - process the event 'fail'
                     if callback_method:
-                        task.process_event('fail',
-                                           callback=self._spawn_worker,
-                                           call_args=(callback_method, task),
-                                           err_handler=err_handler)
+                        task.process_event(
+                            'fail', callback=self._spawn_periodic_worker,
+                            call_args=(callback_method, task),
+                            err_handler=err_handler)
                     else:
                         task.node.last_error = last_error
                         task.process_event('fail')
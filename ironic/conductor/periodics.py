@@ -0,0 +1,165 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Execution of the periodic tasks of a conductor."""
+
+import random
+import time
+
+import eventlet
+
+from ironic.common.i18n import _LE
+from ironic.common.i18n import _LW
+from ironic.openstack.common import log
+from ironic.openstack.common import periodic_task
+
+LOG = log.getLogger(__name__)
+
+DURATION_BUCKETS = (0.1, 1, 10, 60, 600)
+"""Upper bounds, in seconds, of the buckets of the duration histograms."""
+
+
+def _new_stats():
+    return {'runs': 0, 'failures': 0, 'overruns': 0, 'total_time': 0.0,
+            'max_time': 0.0, 'last_time': None,
+            'histogram': [0] * (len(DURATION_BUCKETS) + 1)}
+
+
+class PeriodicTasks(periodic_task.PeriodicTasks):
+    """Periodic tasks each run in their own greenthread.
+
+    Unlike the tasks of :class:`periodic_task.PeriodicTasks`, which run
+    one after the other in the caller of run_periodic_tasks(), each due
+    task is spawned in a greenthread, so a slow task doesn't delay the
+    other ones. A task which is due while its previous run is still going
+    on is skipped until its next interval, and the skip is counted as an
+    overrun.
+
+    Every run is delayed by a random fraction of the interval of its task,
+    up to jitter, so that the conductors started at the same time don't
+    run their tasks at the same time.
+    """
+
+    def __init__(self, jitter=0.0):
+        """Initialize the periodic tasks.
+
+        :param jitter: maximum delay added to the runs of a task, as a
+                       fraction of its interval.
+        """
+        self._periodic_jitter = jitter
+        # task name -> GreenThread of the current run
+        self._periodic_threads = {}
+        # task name -> statistics, see periodic_tasks_stats()
+        self._periodic_stats = {}
+        super(PeriodicTasks, self).__init__()
+        for name, task in self._periodic_tasks:
+            self._delay_first_run(name)
+
+    def _jitter(self, name):
+        return (random.random() * self._periodic_jitter *
+                self._periodic_spacing[name])
+
+    def _delay_first_run(self, name):
+        last_run = self._periodic_last_run[name]
+        if last_run is not None:
+            self._periodic_last_run[name] = last_run + self._jitter(name)
+
+    def add_periodic_task(self, task):
+        """Add a periodic task to the list of periodic tasks.
+
+        The task should already be decorated by @periodic_task.
+        """
+        super(PeriodicTasks, self).add_periodic_task(task)
+        if task._periodic_name in self._periodic_last_run:
+            self._delay_first_run(task._periodic_name)
+
+    def _run_periodic_task(self, name, task, context):
+        full_task_name = '.'.join([self.__class__.__name__, name])
+        LOG.debug("Running periodic task %(full_task_name)s",
+                  {"full_task_name": full_task_name})
+        stats = self._periodic_stats.setdefault(name, _new_stats())
+        start = time.time()
+        try:
+            task(self, context)
+        except Exception as e:
+            stats['failures'] += 1
+            LOG.exception(_LE("Error during %(full_task_name)s: %(e)s"),
+                          {"full_task_name": full_task_name, "e": e})
+        finally:
+            duration = time.time() - start
+            stats['runs'] += 1
+            stats['total_time'] += duration
+            stats['max_time'] = max(stats['max_time'], duration)
+            stats['last_time'] = duration
+            bucket = 0
+            while (bucket < len(DURATION_BUCKETS) and
+                   duration > DURATION_BUCKETS[bucket]):
+                bucket += 1
+            stats['histogram'][bucket] += 1
+            self._periodic_threads.pop(name, None)
+
+    def run_periodic_tasks(self, context, raise_on_error=False):
+        """Spawn the periodic tasks which are due.
+
+        :param context: the context passed to the tasks.
+        :param raise_on_error: ignored, the errors of the tasks are logged
+                               in their greenthreads.
+        :returns: the number of seconds until the next task is due.
+        """
+        idle_for = periodic_task.DEFAULT_INTERVAL
+        now = time.time()
+        for name, task in self._periodic_tasks:
+            spacing = self._periodic_spacing[name]
+            last_run = self._periodic_last_run[name]
+
+            idle_for = min(idle_for, spacing)
+            if last_run is not None:
+                delta = last_run + spacing - now
+                if delta > 0:
+                    idle_for = min(idle_for, delta)
+                    continue
+
+            # The next run is due one interval after this one, whether this
+            # one actually runs or not.
+            self._periodic_last_run[name] = now + self._jitter(name)
+            if name in self._periodic_threads:
+                stats = self._periodic_stats.setdefault(name, _new_stats())
+                stats['overruns'] += 1
+                LOG.warn(_LW("Skipping periodic task %(task)s because its "
+                             "previous run is still in progress."),
+                         {'task': '.'.join([self.__class__.__name__, name])})
+                continue
+
+            self._periodic_threads[name] = eventlet.spawn(
+                self._run_periodic_task, name, task, context)
+
+        return idle_for
+
+    def stop_periodic_tasks(self):
+        """Kill the greenthreads of the periodic tasks still running."""
+        for thread in list(self._periodic_threads.values()):
+            thread.kill()
+        self._periodic_threads.clear()
+
+    def periodic_tasks_stats(self):
+        """Return the statistics of the periodic tasks which were due.
+
+        :returns: dict mapping the task names to a dict with the number of
+                  'runs', of 'failures' and of 'overruns' (runs skipped
+                  because the previous one was still in progress), the
+                  total, maximum and last duration of the runs in seconds
+                  ('total_time', 'max_time' and 'last_time') and the
+                  'histogram' of the durations: the number of runs which
+                  lasted up to each bound of DURATION_BUCKETS, then longer.
+        """
+        return dict((name, dict(stats, histogram=list(stats['histogram'])))
+                    for name, stats in self._periodic_stats.items())
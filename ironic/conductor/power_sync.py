@@ -0,0 +1,74 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Scheduling of the power state checks of the nodes of a conductor."""
+
+
+class PowerSyncScheduler(object):
+    """Decide which nodes are checked by each power state sync pass.
+
+    Each node has a check interval, counted in passes of the power state
+    sync periodic task. A node whose power state was found stable has its
+    interval doubled, up to max_interval passes; a node whose power state
+    changed or could not be synced is checked again on the next pass.
+
+    Nodes which are due but could not be checked (eg. because they were
+    locked or because the pass ran out of time) stay due, and are returned
+    before the nodes which became due later.
+    """
+
+    def __init__(self):
+        self._pass = 0
+        # node UUID -> (pass of the next check, current interval)
+        self._schedule = {}
+
+    def get_due_nodes(self, node_uuids, max_interval=1):
+        """Start a new pass and get the nodes to check during it.
+
+        :param node_uuids: an iterable of the UUIDs of all the nodes the
+                           pass may check. Nodes which are not in it are
+                           forgotten, new nodes are due immediately.
+        :param max_interval: maximum number of passes between two checks
+                             of a node.
+        :returns: a list of node UUIDs, the most overdue first, in the
+                  order of node_uuids otherwise.
+        """
+        self._pass += 1
+        schedule = {}
+        due = []
+        for index, node_uuid in enumerate(node_uuids):
+            next_pass, interval = self._schedule.get(node_uuid,
+                                                     (self._pass, 1))
+            # max_interval may have been lowered
+            interval = min(interval, max_interval)
+            next_pass = min(next_pass, self._pass - 1 + interval)
+            schedule[node_uuid] = (next_pass, interval)
+            if next_pass <= self._pass:
+                due.append((next_pass, index, node_uuid))
+        self._schedule = schedule
+        return [entry[-1] for entry in sorted(due)]
+
+    def record(self, node_uuid, stable, max_interval=1):
+        """Record the result of the check of a node during the current pass.
+
+        :param node_uuid: the UUID of the node.
+        :param stable: whether the power state of the node was successfully
+                       synced and had not changed.
+        :param max_interval: maximum number of passes between two checks
+                             of a node.
+        """
+        if stable:
+            interval = self._schedule.get(node_uuid, (None, 1))[1]
+            interval = max(1, min(interval * 2, max_interval))
+        else:
+            interval = 1
+        self._schedule[node_uuid] = (self._pass + interval, interval)
@@ -18,16 +18,26 @@
 Client side of the conductor RPC API.
 """
 
+import collections
 import random
 
+from eventlet import greenpool
 from oslo import messaging
+from oslo_config import cfg
+import six
 
 from ironic.common import exception
 from ironic.common import hash_ring
 from ironic.common.i18n import _
+from ironic.common.i18n import _LE
 from ironic.common import rpc
 from ironic.conductor import manager
 from ironic.objects import base as objects_base
+from ironic.openstack.common import log
+
+CONF = cfg.CONF
+
+LOG = log.getLogger(__name__)
 
 
 class ConductorAPI(object):
@@ -70,11 +80,13 @@ class ConductorAPI(object):
     |    1.25 - Added destroy_port
     |    1.26 - Added continue_node_clean
     |    1.27 - Convert continue_node_clean to cast
+    |    1.28 - Added change_nodes_power_state, set_nodes_boot_device and
+    |           set_nodes_maintenance
 
     """
 
     # NOTE(rloo): This must be in sync with manager.ConductorManager's.
-    RPC_API_VERSION = '1.27'
+    RPC_API_VERSION = '1.28'
 
     def __init__(self, topic=None):
         super(ConductorAPI, self).__init__()
@@ -99,8 +111,6 @@ class ConductorAPI(object):
         :raises: NoValidHost
 
         """
-        self.ring_manager.reset()
-
         try:
             ring = self.ring_manager[node.driver]
             dest = ring.get_hosts(node.uuid)
@@ -110,6 +120,91 @@ class ConductorAPI(object):
                         'driver %s.') % node.driver)
             raise exception.NoValidHost(reason=reason)
 
+    def get_topics_for(self, nodes):
+        """Group nodes by the RPC topic of the conductor they are mapped to.
+
+        :param nodes: a list of node objects.
+        :returns: a tuple of a dict mapping RPC topics to lists of node
+                  objects, and a list of the nodes whose driver is not
+                  supported by any conductor.
+
+        """
+        nodes_by_driver = collections.defaultdict(list)
+        for node in nodes:
+            nodes_by_driver[node.driver].append(node)
+
+        topics = collections.defaultdict(list)
+        unmapped = []
+        for driver, driver_nodes in nodes_by_driver.items():
+            try:
+                ring = self.ring_manager[driver]
+            except exception.DriverNotFound:
+                unmapped.extend(driver_nodes)
+                continue
+            hosts = ring.get_hosts_many([node.uuid for node in driver_nodes])
+            for node in driver_nodes:
+                topics[self.topic + "." + hosts[node.uuid][0]].append(node)
+        return topics, unmapped
+
+    def _call_for_nodes(self, context, method, version, nodes, **kwargs):
+        """Call a bulk method on the conductors the nodes are mapped to.
+
+        The conductors are called in parallel, each with at most
+        CONF.conductor.bulk_rpc_max_nodes nodes per call. A call which
+        fails, eg. because it timed out, doesn't affect the other ones: its
+        nodes get the error.
+
+        :param context: request context.
+        :param method: name of the bulk RPC method, taking the list of the
+                       uuids of the nodes as node_ids argument.
+        :param version: the RPC API version of the method.
+        :param nodes: a list of node objects.
+        :param kwargs: the other arguments of the method.
+        :returns: a dict mapping the uuid of each node to its result, as
+                  returned by the conductor. The nodes which are not
+                  mapped to any conductor, or whose call failed, get an
+                  error.
+
+        """
+        topics, unmapped = self.get_topics_for(nodes)
+        results = {}
+        for node in unmapped:
+            results[node.uuid] = {
+                'error': _('No conductor service registered which supports '
+                           'driver %s.') % node.driver,
+                'code': 400}
+
+        batch_size = CONF.conductor.bulk_rpc_max_nodes
+        calls = []
+        for topic, topic_nodes in topics.items():
+            node_ids = [n.uuid for n in topic_nodes]
+            step = batch_size if batch_size > 0 else len(node_ids)
+            for start in range(0, len(node_ids), step):
+                calls.append((topic, node_ids[start:start + step]))
+
+        def call(topic_and_node_ids):
+            topic, node_ids = topic_and_node_ids
+            cctxt = self.client.prepare(topic=topic, version=version)
+            try:
+                return cctxt.call(context, method, node_ids=node_ids,
+                                  **kwargs)
+            except messaging.MessagingTimeout as e:
+                error = {'error': six.text_type(e), 'code': 503}
+            except Exception as e:
+                error = {'error': six.text_type(e),
+                         'code': getattr(e, 'code', 500)}
+            LOG.error(_LE("RPC %(method)s call to %(topic)s for %(count)d "
+                          "nodes failed: %(error)s"),
+                      {'method': method, 'topic': topic,
+                       'count': len(node_ids), 'error': error['error']})
+            return dict((node_id, dict(error)) for node_id in node_ids)
+
+        if calls:
+            pool = greenpool.GreenPool(len(calls))
+            for call_results in pool.imap(call, calls):
+                results.update(call_results)
+        return results
+
     def get_topic_for_driver(self, driver_name):
         """Get RPC topic name for a conductor supporting the given driver.
 
@@ -122,8 +217,6 @@ class ConductorAPI(object):
         :raises: DriverNotFound
 
         """
-        self.ring_manager.reset()
-
         hash_ring = self.ring_manager[driver_name]
         host = random.choice(list(hash_ring.hosts))
         return self.topic + "." + host
@@ -167,6 +260,23 @@ class ConductorAPI(object):
         return cctxt.call(context, 'change_node_power_state', node_id=node_id,
                           new_state=new_state)
 
+    def change_nodes_power_state(self, context, nodes, new_state):
+        """Change the power state of several nodes.
+
+        The nodes are grouped by the conductor they are mapped to, and
+        each conductor changes the power state of its nodes in parallel.
+
+        :param context: request context.
+        :param nodes: a list of node objects.
+        :param new_state: one of ironic.common.states power state values
+        :returns: a dict mapping the uuid of each node to a dict, empty if
+                  the power state change was started, otherwise holding
+                  the 'error' message and HTTP 'code'.
+
+        """
+        return self._call_for_nodes(context, 'change_nodes_power_state',
+                                    '1.28', nodes, new_state=new_state)
+
     def vendor_passthru(self, context, node_id, driver_method, http_method,
                         info, topic=None):
         """Receive requests for vendor-specific actions.
@@ -457,6 +567,46 @@ class ConductorAPI(object):
         return cctxt.call(context, 'set_boot_device', node_id=node_id,
                           device=device, persistent=persistent)
 
+    def set_nodes_boot_device(self, context, nodes, device,
+                              persistent=False):
+        """Set the boot device of several nodes.
+
+        The nodes are grouped by the conductor they are mapped to, and
+        each conductor sets the boot device of its nodes in parallel.
+
+        :param context: request context.
+        :param nodes: a list of node objects.
+        :param device: the boot device, one of
+                       :mod:`ironic.common.boot_devices`.
+        :param persistent: Whether to set next-boot, or make the change
+                           permanent. Default: False.
+        :returns: a dict mapping the uuid of each node to a dict, empty if
+                  the boot device was set, otherwise holding the 'error'
+                  message and HTTP 'code'.
+
+        """
+        return self._call_for_nodes(context, 'set_nodes_boot_device',
+                                    '1.28', nodes, device=device,
+                                    persistent=persistent)
+
+    def set_nodes_maintenance(self, context, nodes, maintenance,
+                              reason=None):
+        """Put several nodes in or out of maintenance mode.
+
+        :param context: request context.
+        :param nodes: a list of node objects.
+        :param maintenance: True to put the nodes in maintenance mode,
+                            False to remove them from it.
+        :param reason: the reason why the nodes are in maintenance mode.
+        :returns: a dict mapping the uuid of each node to a dict, empty if
+                  the node was updated, otherwise holding the 'error'
+                  message and HTTP 'code'.
+
+        """
+        return self._call_for_nodes(context, 'set_nodes_maintenance',
+                                    '1.28', nodes, maintenance=maintenance,
+                                    reason=reason)
+
     def get_boot_device(self, context, node_id, topic=None):
         """Get the current boot device.
 
@@ -49,7 +49,8 @@ attributes that you may access:
     task.node
         The Node object
     task.ports
-        Ports belonging to the Node
+        Ports belonging to the Node, loaded from the database on first
+        access
     task.driver
         The Driver for the Node, or the Driver based on the
         'driver_name' kwarg of TaskManager().
@@ -102,6 +103,7 @@ import retrying
 
 from ironic.common import driver_factory
 from ironic.common import exception
+from ironic.common.i18n import _
 from ironic.common.i18n import _LW
 from ironic.common import states
 from ironic import objects
@@ -129,7 +131,8 @@ def require_exclusive_lock(f):
     return wrapper
 
 
-def acquire(context, node_id, shared=False, driver_name=None):
+def acquire(context, node_id, shared=False, driver_name=None, filters=None,
+            retry=True):
     """Shortcut for acquiring a lock on a Node.
 
     :param context: Request context.
@@ -137,11 +140,15 @@ def acquire(context, node_id, shared=False, driver_name=None):
     :param shared: Boolean indicating whether to take a shared or exclusive
                    lock. Default: False.
     :param driver_name: Name of Driver. Default: None.
+    :param filters: Filters the node must match to be locked, eg.
+                    {'maintenance': False}. Only valid for exclusive locks.
+                    Default: None.
+    :param retry: Whether to retry when the node is locked. Default: True.
     :returns: An instance of :class:`TaskManager`.
 
     """
     return TaskManager(context, node_id, shared=shared,
-                       driver_name=driver_name)
+                       driver_name=driver_name, filters=filters, retry=retry)
 
 
 class TaskManager(object):
@@ -152,7 +159,8 @@ class TaskManager(object):
 
     """
 
-    def __init__(self, context, node_id, shared=False, driver_name=None):
+    def __init__(self, context, node_id, shared=False, driver_name=None,
+                 filters=None, retry=True):
         """Create a new TaskManager.
 
         Acquire a lock on a node. The lock can be either shared or
@@ -166,39 +174,58 @@ class TaskManager(object):
                        lock. Default: False.
         :param driver_name: The name of the driver to load, if different
                             from the Node's current driver.
+        :param filters: Filters the node must match to be locked. They are
+                        checked by the same DB query which reserves the
+                        node, see :meth:`ironic.db.api.Connection.reserve_node`
+                        for the supported filters. Only valid for exclusive
+                        locks.
+        :param retry: Whether to retry, as configured by the
+                      node_locked_retry_* options, when the node is locked
+                      by another host. Default: True.
         :raises: DriverNotFound
         :raises: NodeNotFound
         :raises: NodeLocked
+        :raises: NodeFiltersNotMatched if the node does not match the filters.
+        :raises: InvalidParameterValue if filters are used with a shared
+                 lock.
 
         """
+        if filters and shared:
+            raise exception.InvalidParameterValue(
+                _("Node filters can only be used with exclusive locks."))
 
         self._spawn_method = None
         self._on_error_method = None
 
         self.context = context
         self.node = None
+        self.ports = None
         self.shared = shared
 
-        self.fsm = states.machine.copy()
+        # NOTE: the machine is frozen, so its tables can be shared instead
+        # of being copied on every acquisition.
+        self.fsm = states.machine.copy(shallow=True)
 
         # NodeLocked exceptions can be annoying. Let's try to alleviate
         # some of that pain by retrying our lock attempts. The retrying
         # module expects a wait_fixed value in milliseconds.
+        attempts = CONF.conductor.node_locked_retry_attempts if retry else 1
+
         @retrying.retry(
             retry_on_exception=lambda e: isinstance(e, exception.NodeLocked),
-            stop_max_attempt_number=CONF.conductor.node_locked_retry_attempts,
+            stop_max_attempt_number=attempts,
             wait_fixed=CONF.conductor.node_locked_retry_interval * 1000)
         def reserve_node():
             LOG.debug("Attempting to reserve node %(node)s",
                       {'node': node_id})
-            self.node = objects.Node.reserve(context, CONF.host, node_id)
+            self.node = objects.Node.reserve(context, CONF.host, node_id,
+                                             filters=filters)
 
         try:
             if not self.shared:
                 reserve_node()
             else:
                 self.node = objects.Node.get(context, node_id)
-            self.ports = objects.Port.list_by_node_id(context, self.node.id)
             self.driver = driver_factory.get_driver(driver_name or
                                                     self.node.driver)
 
@@ -214,12 +241,30 @@ class TaskManager(object):
             with excutils.save_and_reraise_exception():
                 self.release_resources()
 
+    @property
+    def ports(self):
+        """The ports of the node, loaded on first access."""
+        if self._ports is None and self.node is not None:
+            self._ports = objects.Port.list_by_node_id(self.context,
+                                                       self.node.id)
+        return self._ports
+
+    @ports.setter
+    def ports(self, ports):
+        self._ports = ports
+
     def spawn_after(self, _spawn_method, *args, **kwargs):
         """Call this to spawn a thread to complete the task.
 
         The specified method will be called when the TaskManager instance
         exits.
 
+        The lock on the node is only released when the spawned thread
+        finishes. The conductor's workers pool may queue a worker which
+        can't get a slot yet instead of refusing it, so the node stays
+        reserved while its worker waits in the queue as well as while it
+        runs.
+
         :param _spawn_method: a method that returns a GreenThread object
         :param args: args passed to the method.
         :param kwargs: additional kwargs passed to the method.
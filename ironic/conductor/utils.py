@@ -24,6 +24,9 @@ from ironic.openstack.common import log
 
 LOG = log.getLogger(__name__)
 
+BMC_ADDRESS_SUFFIXES = ('_address', '_host', '_api_endpoint')
+"""Suffixes of the driver_info keys which hold the address of a BMC."""
+
 
 @task_manager.require_exclusive_lock
 def node_set_boot_device(task, device, persistent=False):
@@ -158,3 +161,19 @@ def cleanup_after_timeout(task):
                             'encountered while aborting. More info may be '
                             'found in the log file.')
         node.save()
+
+
+def get_bmc_address(driver_info):
+    """Get the address of the BMC managing a node.
+
+    Drivers use different driver_info keys for the address of the BMC
+    (eg. ipmi_address, ilo_address, drac_host), so the first key, in sorted
+    order, ending with one of BMC_ADDRESS_SUFFIXES is used.
+
+    :param driver_info: the driver_info dictionary of a node.
+    :returns: the address of the BMC, or None if it can't be determined.
+    """
+    for key in sorted(driver_info or {}):
+        if key.endswith(BMC_ADDRESS_SUFFIXES) and driver_info[key]:
+            return driver_info[key]
+    return None
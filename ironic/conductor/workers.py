@@ -0,0 +1,168 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Scheduling of the background workers of a conductor."""
+
+import collections
+import time
+
+from eventlet import event
+from eventlet import greenpool
+
+from ironic.common import exception
+
+INTERACTIVE = 'interactive'
+"""Short operations requested by users, like power state changes."""
+
+PROVISION = 'provision'
+"""Long operations changing the provision state of nodes, like deploys."""
+
+PERIODIC = 'periodic'
+"""Background work of the periodic tasks."""
+
+PRIORITIES = (INTERACTIVE, PROVISION, PERIODIC)
+"""The priority classes of the workers, the most urgent first."""
+
+
+class _Worker(object):
+    """The scheduling state of a worker."""
+
+    def __init__(self, priority):
+        self.priority = priority
+        self.spawned_at = time.time()
+        # Set when the worker got a slot, None until then
+        self.started_at = None
+        # Sent when a worker waiting for a slot gets one
+        self.event = event.Event()
+
+
+class WorkerPool(object):
+    """A pool of greenthreads shared by several priority classes of work.
+
+    At most size workers run at once, and at most the quota of its class
+    run for each priority class. A worker which can't run yet waits in the
+    queue of its class; when a worker finishes, the waiting workers of the
+    most urgent classes start first, each class in FIFO order. A worker is
+    refused with NoFreeConductorWorker only if the queue of its class
+    already holds queue_size workers.
+
+    The workers don't switch to other greenthreads while they update the
+    state of the pool, so no lock is needed.
+    """
+
+    def __init__(self, size, quotas=None, queue_size=0):
+        """Create the pool.
+
+        :param size: maximum number of workers running at once.
+        :param quotas: dict mapping the priority classes to the maximum
+                       number of workers of the class running at once. A
+                       missing class or a quota of 0 means size.
+        :param queue_size: maximum number of workers of each priority class
+                           waiting for a slot.
+        """
+        quotas = quotas or {}
+        self.size = size
+        self.quotas = dict((p, min(quotas.get(p) or size, size))
+                           for p in PRIORITIES)
+        self.queue_size = queue_size
+        self._running = dict.fromkeys(PRIORITIES, 0)
+        self._queues = dict((p, collections.deque()) for p in PRIORITIES)
+        self._stats = dict((p, {'spawned': 0, 'queued': 0, 'refused': 0,
+                                'wait_time': 0.0, 'max_wait_time': 0.0})
+                           for p in PRIORITIES)
+        # Large enough to never block in spawn(), the limits are enforced
+        # by the pool itself.
+        self._pool = greenpool.GreenPool(
+            size + queue_size * len(PRIORITIES))
+
+    def _can_start(self, priority):
+        return (sum(self._running.values()) < self.size and
+                self._running[priority] < self.quotas[priority])
+
+    def _start(self, worker):
+        worker.started_at = time.time()
+        self._running[worker.priority] += 1
+        stats = self._stats[worker.priority]
+        wait_time = worker.started_at - worker.spawned_at
+        stats['wait_time'] += wait_time
+        stats['max_wait_time'] = max(stats['max_wait_time'], wait_time)
+
+    def _start_waiting_workers(self):
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue and self._can_start(priority):
+                worker = queue.popleft()
+                self._start(worker)
+                worker.event.send()
+
+    def _run(self, worker, func, args, kwargs):
+        if worker.started_at is None:
+            worker.event.wait()
+        return func(*args, **kwargs)
+
+    def _done(self, thread, worker):
+        if worker.started_at is None:
+            # Killed while waiting for a slot
+            self._queues[worker.priority].remove(worker)
+            return
+        self._running[worker.priority] -= 1
+        self._start_waiting_workers()
+
+    def spawn(self, priority, func, *args, **kwargs):
+        """Create a greenthread to run func(*args, **kwargs).
+
+        The greenthread starts running func once it gets a slot, execution
+        control returns immediately to the caller.
+
+        :param priority: the priority class of the worker, one of
+                         PRIORITIES.
+        :returns: GreenThread object.
+        :raises: NoFreeConductorWorker if the worker can't run immediately
+                 and the queue of its priority class is full.
+        """
+        worker = _Worker(priority)
+        stats = self._stats[priority]
+        if not self._queues[priority] and self._can_start(priority):
+            self._start(worker)
+        elif len(self._queues[priority]) < self.queue_size:
+            self._queues[priority].append(worker)
+            stats['queued'] += 1
+        else:
+            stats['refused'] += 1
+            raise exception.NoFreeConductorWorker()
+        stats['spawned'] += 1
+
+        thread = self._pool.spawn(self._run, worker, func, args, kwargs)
+        thread.link(self._done, worker)
+        return thread
+
+    def waitall(self):
+        """Wait until all the workers, including the waiting ones, finish."""
+        self._pool.waitall()
+
+    def stats(self):
+        """Return the statistics of each priority class.
+
+        :returns: dict mapping each priority class to a dict with the number
+                  of workers currently 'running' and 'waiting', and the
+                  total number of workers 'spawned', 'queued' before
+                  running and 'refused', with the total and maximum time
+                  spent waiting for a slot in seconds ('wait_time' and
+                  'max_wait_time').
+        """
+        result = {}
+        for priority in PRIORITIES:
+            stats = dict(self._stats[priority])
+            stats['running'] = self._running[priority]
+            stats['waiting'] = len(self._queues[priority])
+            result[priority] = stats
+        return result
@@ -60,9 +60,14 @@ class Connection(object):
                         :chassis_uuid: uuid of chassis
                         :driver: driver's name
                         :provision_state: provision state of node
+                        :provision_state_not_in: list of provision states
+                            the node must not be in
                         :provisioned_before:
                             nodes with provision_updated_at field before this
                             interval in seconds
+                        :ring_key_ranges: dict mapping driver names to lists
+                            of inclusive (first, last) ranges of hash ring
+                            keys the nodes must be within
         :param limit: Maximum number of nodes to return.
         :param marker: the last item of the previous page; we return the next
                        result set.
@@ -73,8 +78,31 @@ class Connection(object):
         """
 
     @abc.abstractmethod
-    def get_node_list(self, filters=None, limit=None, marker=None,
+    def iter_nodeinfo(self, columns=None, filters=None, batch_size=None,
                       sort_key=None, sort_dir=None):
+        """Iterate over specific columns of matching nodes.
+
+        Like get_nodeinfo_list(), but fetches the nodes from the database in
+        batches, paginated by the sort key and the node id, so that memory
+        usage does not depend on the number of nodes.
+
+        :param columns: List of column names to return.
+                        Defaults to 'id' column when columns == None.
+        :param filters: Filters to apply, see get_nodeinfo_list().
+                        Defaults to None.
+        :param batch_size: Maximum number of nodes to fetch at once.
+        :param sort_key: Attribute by which results should be sorted. Nodes
+                         for which it is NULL may be skipped when paginating,
+                         so it should only be used together with filters
+                         excluding them.
+        :param sort_dir: direction in which results should be sorted.
+                         (asc, desc)
+        :returns: A generator of tuples of the specified columns.
+        """
+
+    @abc.abstractmethod
+    def get_node_list(self, filters=None, limit=None, marker=None,
+                      sort_key=None, sort_dir=None, columns=None):
         """Return a list of nodes.
 
         :param filters: Filters to apply. Defaults to None.
@@ -84,7 +112,10 @@ class Connection(object):
                         :maintenance: True | False
                         :chassis_uuid: uuid of chassis
                         :driver: driver's name
+                        :uuids: list of uuids the node must have one of
                         :provision_state: provision state of node
+                        :provision_state_not_in: list of provision states
+                            the node must not be in
                         :provisioned_before:
                             nodes with provision_updated_at field before this
                             interval in seconds
@@ -94,10 +125,12 @@ class Connection(object):
         :param sort_key: Attribute by which results should be sorted.
         :param sort_dir: direction in which results should be sorted.
                          (asc, desc)
+        :param columns: List of the columns to load. Defaults to None,
+                        meaning all the columns. The id is always loaded.
         """
 
     @abc.abstractmethod
-    def reserve_node(self, tag, node_id):
+    def reserve_node(self, tag, node_id, filters=None):
         """Reserve a node.
 
         To prevent other ManagerServices from manipulating the given
@@ -105,9 +138,15 @@ class Connection(object):
 
         :param tag: A string uniquely identifying the reservation holder.
         :param node_id: A node id or uuid.
+        :param filters: Filters the node must match to be reserved. They
+                        are evaluated in the same statement which takes the
+                        reservation. Supports the same filters as
+                        get_nodeinfo_list(). Defaults to None.
         :returns: A Node object.
         :raises: NodeNotFound if the node is not found.
         :raises: NodeLocked if the node is already reserved.
+        :raises: NodeFiltersNotMatched if the node does not match the
+                 filters.
         """
 
     @abc.abstractmethod
@@ -145,6 +184,23 @@ class Connection(object):
         :returns: A node.
         """
 
+    @abc.abstractmethod
+    def create_nodes(self, values_list, batch_size=None):
+        """Create several nodes.
+
+        The nodes are created in batches, each one in a single transaction.
+        If some nodes of a batch can not be created, every node of this batch
+        is created in its own transaction instead, so that the other ones
+        still are.
+
+        :param values_list: A list of dicts of values, as accepted by
+                            create_node().
+        :param batch_size: Maximum number of nodes to create in a single
+                           transaction.
+        :returns: A list with, for each dict of values, the node created
+                  or the exception raised by create_node() for it.
+        """
+
     @abc.abstractmethod
     def get_node_by_id(self, node_id):
         """Return a node.
@@ -205,6 +261,8 @@ class Connection(object):
         :returns: A node.
         :raises: NodeAssociated
         :raises: NodeNotFound
+        :raises: NodeUpdateConflict if the node kept being changed
+                 concurrently while being updated.
         """
 
     @abc.abstractmethod
@@ -266,6 +324,23 @@ class Connection(object):
         :param values: Dict of values.
         """
 
+    @abc.abstractmethod
+    def create_ports(self, values_list, batch_size=None):
+        """Create several ports.
+
+        The ports are created in batches, each one in a single transaction.
+        If some ports of a batch can not be created, every port of this batch
+        is created in its own transaction instead, so that the other ones
+        still are.
+
+        :param values_list: A list of dicts of values, as accepted by
+                            create_port().
+        :param batch_size: Maximum number of ports to create in a single
+                           transaction.
+        :returns: A list with, for each dict of values, the port created
+                  or the exception raised by create_port() for it.
+        """
+
     @abc.abstractmethod
     def update_port(self, port_id, values):
         """Update properties of an port.
@@ -393,3 +468,47 @@ class Connection(object):
                     {driverA: set([host1, host2]),
                      driverB: set([host2, host3])}
         """
+
+    @abc.abstractmethod
+    def count_queries(self):
+        """Count the database queries issued by the current thread.
+
+        :returns: a context manager, whose value has a ``count`` attribute
+                  holding the number of queries issued by the current
+                  thread since the context was entered. For example:
+
+                  ::
+
+                    with dbapi.count_queries() as counter:
+                        ...
+                    LOG.debug('%d queries', counter.count)
+        """
+
+    @abc.abstractmethod
+    def get_query_counters(self):
+        """Get the query counters active in the current thread.
+
+        :returns: an opaque value to pass to inherit_query_counters() in
+                  another thread.
+        """
+
+    @abc.abstractmethod
+    def inherit_query_counters(self, counters):
+        """Count the queries of the current thread with another thread's.
+
+        :param counters: the value returned by get_query_counters() in
+                         the other thread.
+        :returns: a context manager; the queries issued by the current
+                  thread in this context are also counted by the
+                  counters of the other thread. For example:
+
+                  ::
+
+                    counters = dbapi.get_query_counters()
+
+                    def worker():
+                        with dbapi.inherit_query_counters(counters):
+                            ...
+
+                    eventlet.spawn(worker)
+        """
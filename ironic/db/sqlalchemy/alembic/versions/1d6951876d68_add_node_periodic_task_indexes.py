@@ -0,0 +1,39 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""add node periodic task indexes
+
+Revision ID: 1d6951876d68
+Revises: 3a1a4e9c7d2b
+Create Date: 2015-04-08 14:02:17.237415
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '1d6951876d68'
+down_revision = '3a1a4e9c7d2b'
+
+from alembic import op
+
+
+def upgrade():
+    op.create_index('node_reservation', 'nodes', ['reservation'])
+    op.create_index('node_provision_state_provision_updated_at', 'nodes',
+                    ['provision_state', 'provision_updated_at'])
+    op.create_index('node_provision_state_inspection_started_at', 'nodes',
+                    ['provision_state', 'inspection_started_at'])
+
+
+def downgrade():
+    op.drop_index('node_provision_state_inspection_started_at', 'nodes')
+    op.drop_index('node_provision_state_provision_updated_at', 'nodes')
+    op.drop_index('node_reservation', 'nodes')
@@ -0,0 +1,62 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""add node ring_key
+
+Revision ID: 3a1a4e9c7d2b
+Revises: 2fb93ffd2af1
+Create Date: 2015-04-02 11:23:40.614327
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3a1a4e9c7d2b'
+down_revision = '2fb93ffd2af1'
+
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import table, column
+
+node = table('nodes',
+        column('id', sa.Integer),
+        column('uuid', sa.String(36)),
+        column('ring_key', sa.BigInteger))
+
+
+# NOTE: The ring key is computed here rather than with
+# ironic.common.hash_ring.get_ring_key(), because that module may change in
+# the future. This migration script must still be able to be run with future
+# versions of the code and still produce the same results.
+def _ring_key(uuid):
+    return int(hashlib.md5(uuid.encode('utf-8')).hexdigest(), 16) >> 65
+
+
+def upgrade():
+    op.add_column('nodes', sa.Column('ring_key', sa.BigInteger(),
+                                     nullable=True))
+    op.create_index('node_driver_ring_key', 'nodes', ['driver', 'ring_key'])
+
+    connection = op.get_bind()
+    for node_id, uuid in connection.execute(
+            sa.select([node.c.id, node.c.uuid])):
+        if uuid is None:
+            continue
+        op.execute(
+            node.update().where(node.c.id == node_id).values(
+                {'ring_key': _ring_key(uuid)}))
+
+
+def downgrade():
+    op.drop_index('node_driver_ring_key', 'nodes')
+    op.drop_column('nodes', 'ring_key')
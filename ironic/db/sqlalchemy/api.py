@@ -18,6 +18,7 @@
 
 import collections
 import datetime
+import threading
 
 from oslo_config import cfg
 from oslo_db import exception as db_exc
@@ -26,9 +27,12 @@ from oslo_db.sqlalchemy import utils as db_utils
 from oslo_utils import strutils
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
+import sqlalchemy as sa
+from sqlalchemy import orm
 from sqlalchemy.orm.exc import NoResultFound
 
 from ironic.common import exception
+from ironic.common import hash_ring
 from ironic.common.i18n import _
 from ironic.common.i18n import _LW
 from ironic.common import states
@@ -47,14 +51,65 @@ LOG = log.getLogger(__name__)
 
 _FACADE = None
 
+# The query counters of each thread, see Connection.count_queries()
+_QUERY_COUNTERS = threading.local()
+
 
 def _create_facade_lazily():
     global _FACADE
     if _FACADE is None:
         _FACADE = db_session.EngineFacade.from_config(CONF)
+        sa.event.listen(_FACADE.get_engine(), 'before_cursor_execute',
+                        _count_query)
     return _FACADE
 
 
+def _get_query_counters():
+    """Return the list of the query counters of the current thread."""
+    counters = getattr(_QUERY_COUNTERS, 'counters', None)
+    if counters is None:
+        counters = _QUERY_COUNTERS.counters = []
+    return counters
+
+
+class _QueryCounter(object):
+    """Count the queries issued by the current thread."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __enter__(self):
+        _get_query_counters().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _get_query_counters().remove(self)
+
+
+class _InheritedQueryCounters(object):
+    """Count the queries of the current thread with another thread's."""
+
+    def __init__(self, counters):
+        self.counters = counters
+
+    def __enter__(self):
+        _get_query_counters().extend(self.counters)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        counters = _get_query_counters()
+        for counter in self.counters:
+            counters.remove(counter)
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    # oslo.db pings the connections with "SELECT 1" when checking them out,
+    # and starts the transactions of SQLite with an explicit "BEGIN"
+    if statement in ('SELECT 1', 'BEGIN'):
+        return
+    for counter in getattr(_QUERY_COUNTERS, 'counters', ()):
+        counter.count += 1
+
+
 def get_engine():
     facade = _create_facade_lazily()
     return facade.get_engine()
@@ -145,6 +200,109 @@ def _paginate_query(model, limit=None, marker=None, sort_key=None,
     return query.all()
 
 
+DEFAULT_BATCH_SIZE = 500
+
+# The maximum number of times a node is read and updated by
+# _do_update_node_cas() when it changes concurrently.
+UPDATE_NODE_MAX_ATTEMPTS = 10
+
+
+def _ring_key_ranges_clause(ring_key_ranges):
+    """Build the clause matching nodes within some ranges of ring keys.
+
+    :param ring_key_ranges: dict mapping driver names to lists of inclusive
+                            (first, last) ranges of ring keys.
+    """
+    clauses = []
+    for driver, ranges in ring_key_ranges.items():
+        for first, last in ranges:
+            clauses.append(sa.and_(models.Node.driver == driver,
+                                   models.Node.ring_key.between(first, last)))
+    return sa.or_(*clauses) if clauses else sa.false()
+
+
+# The dialects which can return the rows modified by an UPDATE statement
+_UPDATE_RETURNING_DIALECTS = ('postgresql',)
+
+
+def _update_returning_supported():
+    """Whether the database can return the rows modified by an UPDATE."""
+    return get_engine().dialect.name in _UPDATE_RETURNING_DIALECTS
+
+
+def _update_nodes_returning(session, query, values):
+    """Update the nodes matched by a query and return them.
+
+    This runs a single UPDATE ... RETURNING statement, it must only be
+    used if _update_returning_supported().
+
+    :param session: the session to run the statement in.
+    :param query: a query of nodes, only its WHERE criterion is used.
+    :param values: dict mapping the columns to update to their new values.
+    :returns: list of the updated nodes, as models.Node not attached to
+              any session.
+    """
+    table = models.Node.__table__
+    stmt = (table.update().where(query.whereclause).values(**values)
+            .returning(*table.c))
+    return [models.Node(**dict(row)) for row in session.execute(stmt)]
+
+
+def _create_many(values_list, batch_size, make_ref, create_one):
+    """Create several rows, in batches.
+
+    Each batch of rows is inserted in a single transaction. If the
+    insertion of a batch fails, e.g. because some of its rows are
+    duplicates or reference rows which do not exist, the rows of this
+    batch are created one by one instead, so that the other ones still
+    are.
+
+    :param values_list: list of dicts of values of the rows to create.
+    :param batch_size: maximum number of rows to insert in a transaction,
+                       defaults to DEFAULT_BATCH_SIZE.
+    :param make_ref: function returning the model of a row to create from
+                     its values.
+    :param create_one: function creating a row from its values in its own
+                       transaction.
+    :returns: list with, for each dict of values, the model created or the
+              exception which prevented its creation: the
+              exception.Conflict raised by create_one(),
+              exception.ReferenceNotFound or exception.DatabaseError.
+    """
+    if batch_size is None:
+        batch_size = DEFAULT_BATCH_SIZE
+
+    results = []
+    for start in range(0, len(values_list), batch_size):
+        batch = values_list[start:start + batch_size]
+        session = get_session()
+        try:
+            with session.begin():
+                refs = [make_ref(values) for values in batch]
+                session.add_all(refs)
+        except db_exc.DBError:
+            for values in batch:
+                try:
+                    results.append(create_one(values))
+                except exception.Conflict as e:
+                    results.append(e)
+                except db_exc.DBReferenceError as e:
+                    results.append(exception.ReferenceNotFound(
+                        key=e.key, key_table=e.key_table))
+                except db_exc.DBError as e:
+                    # NOTE: the message of the error may hold the values
+                    # of the row, including secrets like BMC passwords,
+                    # so it is neither logged nor returned.
+                    error = type(e).__name__
+                    LOG.warn(_LW('Failed to create the row %(uuid)s: '
+                                 '%(error)s'),
+                             {'uuid': values.get('uuid'), 'error': error})
+                    results.append(exception.DatabaseError(error=error))
+        else:
+            results.extend(refs)
+    return results
+
+
 class Connection(api.Connection):
     """SqlAlchemy connection."""
 
@@ -174,8 +332,15 @@ class Connection(api.Connection):
             query = query.filter_by(maintenance=filters['maintenance'])
         if 'driver' in filters:
             query = query.filter_by(driver=filters['driver'])
+        if 'uuids' in filters:
+            query = query.filter(models.Node.uuid.in_(filters['uuids']))
         if 'provision_state' in filters:
             query = query.filter_by(provision_state=filters['provision_state'])
+        if 'provision_state_not_in' in filters:
+            query = query.filter(sa.or_(
+                models.Node.provision_state == None,
+                ~models.Node.provision_state.in_(
+                    filters['provision_state_not_in'])))
         if 'provisioned_before' in filters:
             limit = timeutils.utcnow() - datetime.timedelta(
                                          seconds=filters['provisioned_before'])
@@ -185,6 +350,9 @@ class Connection(api.Connection):
                       (datetime.timedelta(
                        seconds=filters['inspection_started_before'])))
             query = query.filter(models.Node.inspection_started_at < limit)
+        if 'ring_key_ranges' in filters:
+            query = query.filter(
+                _ring_key_ranges_clause(filters['ring_key_ranges']))
 
         return query
 
@@ -202,28 +370,68 @@ class Connection(api.Connection):
         return _paginate_query(models.Node, limit, marker,
                                sort_key, sort_dir, query)
 
-    def get_node_list(self, filters=None, limit=None, marker=None,
+    def iter_nodeinfo(self, columns=None, filters=None, batch_size=None,
                       sort_key=None, sort_dir=None):
+        if columns is None:
+            columns = ['id']
+        if batch_size is None:
+            batch_size = DEFAULT_BATCH_SIZE
+        # the keys of the last row of a batch are the marker of the next one
+        keys = ['id'] if sort_key in (None, 'id') else [sort_key, 'id']
+        query_columns = columns + [k for k in keys if k not in columns]
+        key_indexes = [query_columns.index(k) for k in keys]
+        query_columns = [getattr(models.Node, c) for c in query_columns]
+
+        marker = None
+        while True:
+            query = model_query(*query_columns, base_model=models.Node)
+            query = self._add_nodes_filters(query, filters)
+            rows = _paginate_query(models.Node, batch_size, marker,
+                                   sort_key, sort_dir, query)
+            for row in rows:
+                yield row[:len(columns)]
+            if len(rows) < batch_size:
+                return
+            marker = models.Node(**dict(
+                (k, rows[-1][i]) for k, i in zip(keys, key_indexes)))
+
+    def get_node_list(self, filters=None, limit=None, marker=None,
+                      sort_key=None, sort_dir=None, columns=None):
         query = model_query(models.Node)
+        if columns is not None:
+            # the other columns, like the large JSON ones, are neither
+            # fetched nor decoded
+            query = query.options(orm.load_only(*columns))
         query = self._add_nodes_filters(query, filters)
         return _paginate_query(models.Node, limit, marker,
                                sort_key, sort_dir, query)
 
-    def reserve_node(self, tag, node_id):
+    def reserve_node(self, tag, node_id, filters=None):
         session = get_session()
         with session.begin():
             query = model_query(models.Node, session=session)
             query = add_identity_filter(query, node_id)
             # be optimistic and assume we usually create a reservation
-            count = query.filter_by(reservation=None).update(
-                        {'reservation': tag}, synchronize_session=False)
+            reserve_query = self._add_nodes_filters(query, filters)
+            reserve_query = reserve_query.filter_by(reservation=None)
+            if _update_returning_supported():
+                nodes = _update_nodes_returning(session, reserve_query,
+                                                {'reservation': tag})
+                if nodes:
+                    return nodes[0]
+                count = 0
+            else:
+                count = reserve_query.update({'reservation': tag},
+                                             synchronize_session=False)
             try:
                 node = query.one()
                 if count != 1:
                     # Nothing updated and node exists. Must already be
-                    # locked.
-                    raise exception.NodeLocked(node=node_id,
-                                               host=node['reservation'])
+                    # locked or not matching the filters.
+                    if node['reservation'] is not None:
+                        raise exception.NodeLocked(node=node_id,
+                                                   host=node['reservation'])
+                    raise exception.NodeFiltersNotMatched(node=node_id)
                 return node
             except NoResultFound:
                 raise exception.NodeNotFound(node_id)
@@ -247,7 +455,8 @@ class Connection(api.Connection):
             except NoResultFound:
                 raise exception.NodeNotFound(node_id)
 
-    def create_node(self, values):
+    @staticmethod
+    def _make_node_ref(values):
         # ensure defaults are present for new nodes
         if 'uuid' not in values:
             values['uuid'] = uuidutils.generate_uuid()
@@ -256,9 +465,14 @@ class Connection(api.Connection):
         if 'provision_state' not in values:
             # TODO(deva): change this to ENROLL
             values['provision_state'] = states.AVAILABLE
+        values['ring_key'] = hash_ring.get_ring_key(values['uuid'])
 
         node = models.Node()
         node.update(values)
+        return node
+
+    def create_node(self, values):
+        node = self._make_node_ref(values)
         try:
             node.save()
         except db_exc.DBDuplicateEntry as exc:
@@ -271,6 +485,10 @@ class Connection(api.Connection):
             raise exception.NodeAlreadyExists(uuid=values['uuid'])
         return node
 
+    def create_nodes(self, values_list, batch_size=None):
+        return _create_many(values_list, batch_size, self._make_node_ref,
+                            self.create_node)
+
     def get_node_by_id(self, node_id):
         query = model_query(models.Node).filter_by(id=node_id)
         try:
@@ -349,35 +567,122 @@ class Connection(api.Connection):
                 raise e
 
     def _do_update_node(self, node_id, values):
+        if _update_returning_supported():
+            return self._do_update_node_returning(node_id, values)
+        return self._do_update_node_cas(node_id, values)
+
+    def _do_update_node_returning(self, node_id, values):
+        """Update a node with a single UPDATE ... RETURNING statement."""
         session = get_session()
         with session.begin():
             query = model_query(models.Node, session=session)
             query = add_identity_filter(query, node_id)
-            try:
-                ref = query.with_lockmode('update').one()
-            except NoResultFound:
-                raise exception.NodeNotFound(node=node_id)
+            update_query = query
+            values = dict(values)
 
             # Prevent instance_uuid overwriting
-            if values.get("instance_uuid") and ref.instance_uuid:
-                raise exception.NodeAssociated(node=node_id,
-                                instance=ref.instance_uuid)
+            if values.get("instance_uuid"):
+                update_query = update_query.filter_by(instance_uuid=None)
 
             if 'provision_state' in values:
-                values['provision_updated_at'] = timeutils.utcnow()
+                # NOTE: the expressions assigned to the columns see the
+                # values the row had before the update, so they can
+                # depend on the previous provision state.
+                now = timeutils.utcnow()
+                was_inspecting = (models.Node.provision_state ==
+                                  states.INSPECTING)
+                values['provision_updated_at'] = now
                 if values['provision_state'] == states.INSPECTING:
-                    values['inspection_started_at'] = timeutils.utcnow()
+                    values['inspection_started_at'] = now
                     values['inspection_finished_at'] = None
-                elif (ref.provision_state == states.INSPECTING and
-                      values['provision_state'] == states.MANAGEABLE):
-                    values['inspection_finished_at'] = timeutils.utcnow()
-                    values['inspection_started_at'] = None
-                elif (ref.provision_state == states.INSPECTING and
-                      values['provision_state'] == states.INSPECTFAIL):
-                    values['inspection_started_at'] = None
-
-            ref.update(values)
-        return ref
+                elif values['provision_state'] == states.MANAGEABLE:
+                    values['inspection_finished_at'] = sa.case(
+                        [(was_inspecting, now)],
+                        else_=models.Node.inspection_finished_at)
+                    values['inspection_started_at'] = sa.case(
+                        [(was_inspecting, sa.null())],
+                        else_=models.Node.inspection_started_at)
+                elif values['provision_state'] == states.INSPECTFAIL:
+                    values['inspection_started_at'] = sa.case(
+                        [(was_inspecting, sa.null())],
+                        else_=models.Node.inspection_started_at)
+
+            nodes = _update_nodes_returning(session, update_query, values)
+            if nodes:
+                return nodes[0]
+
+            # Nothing updated, the node does not exist or is associated
+            try:
+                ref = query.one()
+            except NoResultFound:
+                raise exception.NodeNotFound(node=node_id)
+            raise exception.NodeAssociated(node=node_id,
+                                           instance=ref.instance_uuid)
+
+    def _do_update_node_cas(self, node_id, values):
+        """Update a node with a compare-and-swap UPDATE statement.
+
+        This is used by the databases which can't return the updated rows,
+        like MySQL. The node is read without being locked, then updated
+        only if the columns the update depends on did not change in the
+        meantime. Otherwise the node is read again and the update retried,
+        at most UPDATE_NODE_MAX_ATTEMPTS times in all. Once updated, the
+        node is read again in the same transaction, so that the other
+        columns don't hold the values read before the update if other
+        writers changed them in the meantime.
+
+        :raises: NodeUpdateConflict if the node changed during each
+                 attempt.
+        """
+        session = get_session()
+        for attempt in range(UPDATE_NODE_MAX_ATTEMPTS):
+            with session.begin():
+                query = model_query(models.Node, session=session)
+                query = add_identity_filter(query, node_id)
+                try:
+                    ref = query.one()
+                except NoResultFound:
+                    raise exception.NodeNotFound(node=node_id)
+                session.expunge(ref)
+
+                now = timeutils.utcnow()
+                new_values = {'updated_at': now}
+                new_values.update(values)
+                update_query = query
+
+                # Prevent instance_uuid overwriting
+                if values.get("instance_uuid"):
+                    if ref.instance_uuid:
+                        raise exception.NodeAssociated(
+                            node=node_id, instance=ref.instance_uuid)
+                    update_query = update_query.filter_by(
+                        instance_uuid=None)
+
+                if 'provision_state' in values:
+                    new_values['provision_updated_at'] = now
+                    if values['provision_state'] == states.INSPECTING:
+                        new_values['inspection_started_at'] = now
+                        new_values['inspection_finished_at'] = None
+                    elif (ref.provision_state == states.INSPECTING and
+                          values['provision_state'] == states.MANAGEABLE):
+                        new_values['inspection_finished_at'] = now
+                        new_values['inspection_started_at'] = None
+                    elif (ref.provision_state == states.INSPECTING and
+                          values['provision_state'] == states.INSPECTFAIL):
+                        new_values['inspection_started_at'] = None
+                    update_query = update_query.filter_by(
+                        provision_state=ref.provision_state)
+
+                count = update_query.update(new_values,
+                                            synchronize_session=False)
+                if count:
+                    ref = query.one()
+                    session.expunge(ref)
+                    return ref
+            LOG.debug("Node %s changed while being updated, retrying.",
+                      node_id)
+        raise exception.NodeUpdateConflict(node=node_id,
+                                           attempts=UPDATE_NODE_MAX_ATTEMPTS)
 
     def get_port_by_id(self, port_id):
         query = model_query(models.Port).filter_by(id=port_id)
@@ -412,11 +717,16 @@ class Connection(api.Connection):
         return _paginate_query(models.Port, limit, marker,
                                sort_key, sort_dir, query)
 
-    def create_port(self, values):
+    @staticmethod
+    def _make_port_ref(values):
         if not values.get('uuid'):
             values['uuid'] = uuidutils.generate_uuid()
         port = models.Port()
         port.update(values)
+        return port
+
+    def create_port(self, values):
+        port = self._make_port_ref(values)
         try:
             port.save()
         except db_exc.DBDuplicateEntry as exc:
@@ -425,6 +735,10 @@ class Connection(api.Connection):
             raise exception.PortAlreadyExists(uuid=values['uuid'])
         return port
 
+    def create_ports(self, values_list, batch_size=None):
+        return _create_many(values_list, batch_size, self._make_port_ref,
+                            self.create_port)
+
     def update_port(self, port_id, values):
         # NOTE(dtantsur): this can lead to very strange errors
         if 'uuid' in values:
@@ -600,3 +914,12 @@ class Connection(api.Connection):
             for driver in row['drivers']:
                 d2c[driver].add(row['hostname'])
         return d2c
+
+    def count_queries(self):
+        return _QueryCounter()
+
+    def get_query_counters(self):
+        return tuple(_get_query_counters())
+
+    def inherit_query_counters(self, counters):
+        return _InheritedQueryCounters(counters)
@@ -24,8 +24,8 @@ from oslo_config import cfg
 from oslo_db import options as db_options
 from oslo_db.sqlalchemy import models
 import six.moves.urllib.parse as urlparse
-from sqlalchemy import Boolean, Column, DateTime
-from sqlalchemy import ForeignKey, Integer
+from sqlalchemy import BigInteger, Boolean, Column, DateTime
+from sqlalchemy import ForeignKey, Index, Integer
 from sqlalchemy import schema, String, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.types import TypeDecorator, TEXT
@@ -147,6 +147,14 @@ class Node(Base):
         schema.UniqueConstraint('instance_uuid',
                                 name='uniq_nodes0instance_uuid'),
         schema.UniqueConstraint('name', name='uniq_nodes0name'),
+        # Indexes matching the node filters of the periodic tasks, which
+        # are checked by ironic.tests.db.sqlalchemy.test_query_plans.
+        Index('node_driver_ring_key', 'driver', 'ring_key'),
+        Index('node_reservation', 'reservation'),
+        Index('node_provision_state_provision_updated_at',
+              'provision_state', 'provision_updated_at'),
+        Index('node_provision_state_inspection_started_at',
+              'provision_state', 'inspection_started_at'),
         table_args())
     id = Column(Integer, primary_key=True)
     uuid = Column(String(36))
@@ -190,6 +198,10 @@ class Node(Base):
     inspection_started_at = Column(DateTime, nullable=True)
     extra = Column(JSONEncodedDict)
 
+    # The most significant bits of the hash of the node's UUID, which is
+    # used to select the nodes mapped to a conductor by the hash ring.
+    ring_key = Column(BigInteger, nullable=True)
+
 
 class Port(Base):
     """Represents a network port of a bare metal node."""
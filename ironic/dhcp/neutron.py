@@ -14,8 +14,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import time
 
+from eventlet import greenpool
 from neutronclient.common import exceptions as neutron_client_exc
 from neutronclient.v2_0 import client as clientv20
 from oslo_config import cfg
@@ -52,7 +54,12 @@ neutron_opts = [
     cfg.StrOpt('cleaning_network_uuid',
                help='UUID of the network to create Neutron ports on when '
                     'booting to a ramdisk for cleaning/zapping using Neutron '
-                    'DHCP')
+                    'DHCP'),
+    cfg.IntOpt('port_requests_concurrency',
+               default=8,
+               help='Maximum number of requests made in parallel to '
+                    'Neutron to update, create or delete the ports of a '
+                    'node.'),
     ]
 
 CONF = cfg.CONF
@@ -60,9 +67,20 @@ CONF.import_opt('my_ip', 'ironic.netconf')
 CONF.register_opts(neutron_opts, group='neutron')
 LOG = logging.getLogger(__name__)
 
+# Maximum number of Neutron clients kept by _build_client()
+_CLIENT_CACHE_SIZE = 32
+
+# Parameters of the clients -> clients, the most recently used last
+_client_cache = collections.OrderedDict()
+
 
 def _build_client(token=None):
-    """Utility function to create Neutron client."""
+    """Utility function to get a Neutron client.
+
+    Clients are cached by their parameters, so that the callers using the
+    same token, or the admin credentials, share a client which only
+    authenticates and looks up the Neutron endpoint once.
+    """
     params = {
         'timeout': CONF.neutron.url_timeout,
         'retries': CONF.neutron.retries,
@@ -92,7 +110,54 @@ def _build_client(token=None):
         params['endpoint_url'] = CONF.neutron.url
         params['auth_strategy'] = None
 
-    return clientv20.Client(**params)
+    key = tuple(sorted(params.items()))
+    try:
+        client = _client_cache.pop(key)
+    except KeyError:
+        client = clientv20.Client(**params)
+        if len(_client_cache) >= _CLIENT_CACHE_SIZE:
+            _client_cache.popitem(last=False)
+    _client_cache[key] = client
+    return client
+
+
+def _clear_client_cache():
+    """Drop the cached Neutron clients."""
+    _client_cache.clear()
+
+
+def _call(client, method, *args, **kwargs):
+    """Call a method of a Neutron client and log how long it took."""
+    start = time.time()
+    try:
+        return getattr(client, method)(*args, **kwargs)
+    finally:
+        LOG.debug('Neutron %(method)s call took %(time).3f seconds.',
+                  {'method': method, 'time': time.time() - start})
+
+
+def _call_for_each(func, items, expected_exceptions):
+    """Call func(item) for each item in parallel.
+
+    At most CONF.neutron.port_requests_concurrency calls run at once, and
+    all of them are complete when this function returns.
+
+    :param func: a function taking a single item.
+    :param items: an iterable of items.
+    :param expected_exceptions: a tuple of the exception classes which are
+                                returned instead of being raised.
+    :returns: a list of the results of the calls, in the order of the
+              items. The result of a call which raised one of the expected
+              exceptions is the exception.
+    """
+    def call(item):
+        try:
+            return func(item)
+        except expected_exceptions as e:
+            return e
+
+    pool = greenpool.GreenPool(CONF.neutron.port_requests_concurrency)
+    return list(pool.imap(call, items))
 
 
 class NeutronDHCPApi(base.BaseDHCP):
@@ -123,7 +188,8 @@ class NeutronDHCPApi(base.BaseDHCP):
         """
         port_req_body = {'port': {'extra_dhcp_opts': dhcp_options}}
         try:
-            _build_client(token).update_port(port_id, port_req_body)
+            _call(_build_client(token), 'update_port', port_id,
+                  port_req_body)
         except neutron_client_exc.NeutronClientException:
             LOG.exception(_LE("Failed to update Neutron port %s."), port_id)
             raise exception.FailedToUpdateDHCPOptOnPort(port_id=port_id)
@@ -138,7 +204,8 @@ class NeutronDHCPApi(base.BaseDHCP):
         """
         port_req_body = {'port': {'mac_address': address}}
         try:
-            _build_client(token).update_port(port_id, port_req_body)
+            _call(_build_client(token), 'update_port', port_id,
+                  port_req_body)
         except neutron_client_exc.NeutronClientException:
             LOG.exception(_LE("Failed to update MAC address on Neutron "
                               "port %s."), port_id)
@@ -147,6 +214,8 @@ class NeutronDHCPApi(base.BaseDHCP):
     def update_dhcp_opts(self, task, options, vifs=None):
         """Send or update the DHCP BOOT options for this node.
 
+        The ports are updated in parallel.
+
         :param task: A TaskManager instance.
         :param options: this will be a list of dicts, e.g.
 
@@ -172,13 +241,15 @@ class NeutronDHCPApi(base.BaseDHCP):
                   "to update DHCP BOOT options.") %
                 {'node': task.node.uuid})
 
-        failures = []
-        for port_id, port_vif in vifs.items():
-            try:
-                self.update_port_dhcp_opts(port_vif, options,
-                                           token=task.context.auth_token)
-            except exception.FailedToUpdateDHCPOptOnPort:
-                failures.append(port_id)
+        def update(port_vif):
+            self.update_port_dhcp_opts(port_vif, options,
+                                       token=task.context.auth_token)
+
+        port_ids, port_vifs = zip(*vifs.items())
+        results = _call_for_each(update, port_vifs,
+                                 exception.FailedToUpdateDHCPOptOnPort)
+        failures = [port_id for port_id, result in zip(port_ids, results)
+                    if result is not None]
 
         if failures:
             if len(failures) == len(vifs):
@@ -209,14 +280,25 @@ class NeutronDHCPApi(base.BaseDHCP):
         :raises: FailedToGetIPAddressOnPort
         :raises: InvalidIPv4Address
         """
-        ip_address = None
         try:
-            neutron_port = client.show_port(port_uuid).get('port')
+            neutron_port = _call(client, 'show_port', port_uuid).get('port')
         except neutron_client_exc.NeutronClientException:
             LOG.exception(_LE("Failed to Get IP address on Neutron port %s."),
                           port_uuid)
             raise exception.FailedToGetIPAddressOnPort(port_id=port_uuid)
 
+        return self._get_neutron_port_ip_address(neutron_port, port_uuid)
+
+    def _get_neutron_port_ip_address(self, neutron_port, port_uuid):
+        """Get the fixed ip address of a Neutron port dict.
+
+        :param neutron_port: the Neutron port dict.
+        :param port_uuid: Neutron port id.
+        :returns: Neutron port ip address.
+        :raises: FailedToGetIPAddressOnPort
+        :raises: InvalidIPv4Address
+        """
+        ip_address = None
         fixed_ips = neutron_port.get('fixed_ips')
 
         # NOTE(faizan) At present only the first fixed_ip assigned to this
@@ -263,17 +345,40 @@ class NeutronDHCPApi(base.BaseDHCP):
     def get_ip_addresses(self, task):
         """Get IP addresses for all ports in `task`.
 
+        The Neutron ports of all the VIFs of the node are fetched with a
+        single request.
+
         :param task: a TaskManager instance.
         :returns: List of IP addresses associated with task.ports.
         """
         client = _build_client(task.context.auth_token)
+        vifs = network.get_node_vif_ids(task)
+        neutron_ports = {}
+        if not vifs:
+            LOG.warning(_LW("No VIFs found for node %(node)s when attempting "
+                            "to get port IP addresses."),
+                        {'node': task.node.uuid})
+        else:
+            try:
+                neutron_ports = dict(
+                    (neutron_port['id'], neutron_port)
+                    for neutron_port in _call(
+                        client, 'list_ports',
+                        id=list(vifs.values())).get('ports', []))
+            except neutron_client_exc.NeutronClientException:
+                LOG.exception(_LE("Failed to get the Neutron ports of node "
+                                  "%s."), task.node.uuid)
+
         failures = []
         ip_addresses = []
         for port in task.ports:
+            port_vif = vifs.get(port.uuid)
             try:
-                port_ip_address = self._get_port_ip_address(task, port.uuid,
-                                                            client)
-                ip_addresses.append(port_ip_address)
+                if port_vif not in neutron_ports:
+                    raise exception.FailedToGetIPAddressOnPort(
+                        port_id=port_vif)
+                ip_addresses.append(self._get_neutron_port_ip_address(
+                    neutron_ports[port_vif], port_vif))
             except (exception.FailedToGetIPAddressOnPort,
                     exception.InvalidIPv4Address):
                 failures.append(port.uuid)
@@ -289,6 +394,9 @@ class NeutronDHCPApi(base.BaseDHCP):
     def create_cleaning_ports(self, task):
         """Create neutron ports for each port on task.node to boot the ramdisk.
 
+        The ports are created in parallel. If any of them can't be created,
+        the created ones are deleted once all the requests are complete.
+
         :param task: a TaskManager instance.
         :raises: InvalidParameterValue if the cleaning network is None
         :returns: a dictionary in the form {port.uuid: neutron_port['id']}
@@ -297,39 +405,47 @@ class NeutronDHCPApi(base.BaseDHCP):
             raise exception.InvalidParameterValue(_('Valid cleaning network '
                                                     'UUID not provided'))
         neutron_client = _build_client(task.context.auth_token)
-        body = {
-            'port': {
-                'network_id': CONF.neutron.cleaning_network_uuid,
-                'admin_state_up': True,
+
+        def create(ironic_port):
+            body = {
+                'port': {
+                    'network_id': CONF.neutron.cleaning_network_uuid,
+                    'admin_state_up': True,
+                    'mac_address': ironic_port.address,
+                }
             }
-        }
+            return _call(neutron_client, 'create_port', body)
+
+        results = _call_for_each(create, task.ports,
+                                 neutron_client_exc.NeutronClientException)
         ports = {}
-        for ironic_port in task.ports:
-            body['port']['mac_address'] = ironic_port.address
-            try:
-                port = neutron_client.create_port(body)
-            except neutron_client_exc.ConnectionFailed as e:
-                self._rollback_cleaning_ports(task)
+        msg = None
+        for ironic_port, port in zip(task.ports, results):
+            if isinstance(port, neutron_client_exc.NeutronClientException):
                 msg = (_('Could not create cleaning port on network %(net)s '
                          'from %(node)s. %(exc)s') %
                        {'net': CONF.neutron.cleaning_network_uuid,
                         'node': task.node.uuid,
-                        'exc': e})
-                LOG.exception(msg)
-                raise exception.NodeCleaningFailure(msg)
+                        'exc': port})
+                break
             if not port.get('port') or not port['port'].get('id'):
-                self._rollback_cleaning_ports(task)
                 msg = (_('Failed to create cleaning ports for node '
-                         '%(node)s') % task.node.uuid)
-                LOG.error(msg)
-                raise exception.NodeCleaningFailure(msg)
+                         '%(node)s') % {'node': task.node.uuid})
+                break
             # Match return value of get_node_vif_ids()
             ports[ironic_port.uuid] = port['port']['id']
+        if msg is not None:
+            self._rollback_cleaning_ports(task)
+            LOG.error(msg)
+            raise exception.NodeCleaningFailure(msg)
         return ports
 
     def delete_cleaning_ports(self, task):
         """Deletes the neutron port created for booting the ramdisk.
 
+        The ports are deleted in parallel, and all of them are tried even
+        if some can't be deleted.
+
         :param task: a TaskManager instance.
         """
         neutron_client = _build_client(task.context.auth_token)
@@ -338,8 +454,8 @@ class NeutronDHCPApi(base.BaseDHCP):
             'network_id': CONF.neutron.cleaning_network_uuid
         }
         try:
-            ports = neutron_client.list_ports(**params)
-        except neutron_client_exc.ConnectionFailed as e:
+            ports = _call(neutron_client, 'list_ports', **params)
+        except neutron_client_exc.NeutronClientException as e:
             msg = (_('Could not get cleaning network vif for %(node)s '
                      'from Neutron, possible network issue. %(exc)s') %
                    {'node': task.node.uuid,
@@ -347,21 +463,25 @@ class NeutronDHCPApi(base.BaseDHCP):
             LOG.exception(msg)
             raise exception.NodeCleaningFailure(msg)
 
-        # Iterate the list of Neutron port dicts, remove the ones we added
-        for neutron_port in ports.get('ports', []):
-            # Only delete ports using the node's mac addresses
-            if neutron_port.get('mac_address') in macs:
-                try:
-                    neutron_client.delete_port(neutron_port.get('id'))
-                except neutron_client_exc.ConnectionFailed as e:
-                    msg = (_('Could not remove cleaning ports on network '
-                             '%(net)s from %(node)s, possible network issue. '
-                             '%(exc)s') %
-                           {'net': CONF.neutron.cleaning_network_uuid,
-                            'node': task.node.uuid,
-                            'exc': e})
-                    LOG.exception(msg)
-                    raise exception.NodeCleaningFailure(msg)
+        # Only delete ports using the node's mac addresses
+        port_ids = [neutron_port.get('id')
+                    for neutron_port in ports.get('ports', [])
+                    if neutron_port.get('mac_address') in macs]
+        results = _call_for_each(
+            lambda port_id: _call(neutron_client, 'delete_port', port_id),
+            port_ids, neutron_client_exc.NeutronClientException)
+        errors = [result for result in results
+                  if isinstance(result,
+                                neutron_client_exc.NeutronClientException)]
+        if errors:
+            msg = (_('Could not remove cleaning ports on network '
+                     '%(net)s from %(node)s, possible network issue. '
+                     '%(exc)s') %
+                   {'net': CONF.neutron.cleaning_network_uuid,
+                    'node': task.node.uuid,
+                    'exc': errors[0]})
+            LOG.error(msg)
+            raise exception.NodeCleaningFailure(msg)
 
     def _rollback_cleaning_ports(self, task):
         """Attempts to delete any ports created by cleaning
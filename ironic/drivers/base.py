@@ -23,7 +23,6 @@ import copy
 import functools
 import inspect
 
-import eventlet
 from oslo_utils import excutils
 import six
 
@@ -804,34 +803,17 @@ def driver_periodic_task(parallel=True, **other):
             def task(self, manager, context):
                 # do some job
 
-    :param parallel: If True (default), this task is run in a separate thread.
-            If False, this task will be run in the conductor's periodic task
-            loop, rather than a separate greenthread. False should be used with
-            caution, as it will cause all other periodic tasks to be blocked
-            from starting while the non-parallel task is running. Long running
-            tasks, especially any tasks that make a remote call (to a BMC,
-            HTTP, etc.) must be parallelized.
+    The conductor runs each periodic task in its own greenthread, and skips
+    a run of a task if its previous run is still in progress.
+
+    :param parallel: ignored, kept for compatibility. Periodic tasks used
+            to run in the conductor's periodic task loop unless it was True.
     :param other: arguments to pass to @periodic_task.periodic_task
     """
-    # TODO(dtantsur): drop all this magic once
-    # https://review.openstack.org/#/c/134303/ lands
-    semaphore = eventlet.semaphore.BoundedSemaphore()
-
     def decorator2(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            if parallel:
-                def _internal():
-                    with semaphore:
-                        func(*args, **kwargs)
-
-                eventlet.greenthread.spawn_n(_internal)
-            else:
-                func(*args, **kwargs)
-
         # NOTE(dtantsur): name should be unique
         other.setdefault('name', '%s.%s' % (func.__module__, func.__name__))
         decorator = periodic_task.periodic_task(**other)
-        return decorator(wrapper)
+        return decorator(func)
 
     return decorator2
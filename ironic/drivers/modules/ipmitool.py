@@ -29,10 +29,14 @@ WHICH PROVIDES DIFFERENT COMMAND-LINE OPTIONS AND *IS NOT SUPPORTED* BY THIS
 DRIVER.
 """
 
+import collections
 import contextlib
 import os
 import re
+import select
+import subprocess
 import tempfile
+import threading
 import time
 
 from oslo_concurrency import processutils
@@ -53,7 +57,29 @@ from ironic.openstack.common import log as logging
 from ironic.openstack.common import loopingcall
 
 
+opts = [
+    cfg.BoolOpt('shell_sessions',
+                default=False,
+                help='Send the commands for a BMC through a long-lived '
+                     '"ipmitool shell" process, which keeps its IPMI '
+                     'session open, instead of starting a new ipmitool '
+                     'process for each command. Requires ipmitool to be '
+                     'built with readline support.'),
+    cfg.IntOpt('shell_session_idle_timeout',
+               default=120,
+               help='Time (in seconds) after which an "ipmitool shell" '
+                    'process which was not used is stopped. Should be '
+                    'greater than [conductor]sync_power_state_interval for '
+                    'the processes to be reused by the power state sync.'),
+    cfg.IntOpt('shell_session_max_count',
+               default=100,
+               help='Maximum number of "ipmitool shell" processes a '
+                    'conductor keeps running. The least recently used '
+                    'ones are stopped first.'),
+    ]
+
 CONF = cfg.CONF
+CONF.register_opts(opts, group='ipmi')
 CONF.import_opt('retry_timeout',
                 'ironic.drivers.modules.ipminative',
                 group='ipmi')
@@ -118,6 +144,14 @@ ipmitool_command_options = {
 # form regardless of locale.
 IPMITOOL_RETRYABLE_FAILURES = ['insufficient resources for session']
 
+# NOTE: "ipmitool shell" does not report the exit status of the commands,
+# their failure is recovered from the messages ipmitool writes to its
+# standard error when a command fails, which start with "Error" or "Unable
+# to", or end with "failed: <reason>". Warnings such as "Get HPM.x
+# Capabilities request failed, compcode = c9" are not failures.
+IPMITOOL_SHELL_FAILURE_RE = re.compile(r'^(Error|Unable to)|failed:',
+                                       re.MULTILINE)
+
 
 def _check_option_support(options):
     """Checks if the specific ipmitool options are supported on host.
@@ -214,6 +248,261 @@ def _make_password_file(password):
             f.close()
 
 
+class _ShellSession(object):
+    """An "ipmitool shell" process sending commands to a single BMC.
+
+    The process is started on first use, and restarted after it was closed
+    or after it died or timed out.
+    """
+
+    PROMPT = 'ipmitool> '
+
+    def __init__(self, args, password):
+        """Constructor.
+
+        :param args: the ipmitool command line, without the password file.
+        :param password: the password for the BMC.
+        """
+        self.args = args
+        self.password = password
+        self.lock = threading.Lock()
+        """Lock which must be held while using the session."""
+        self.last_used = time.time()
+        self.retired = False
+        """Whether the session was removed from its pool."""
+        self._process = None
+        self._last_command = None
+
+    def _start(self):
+        env = os.environ.copy()
+        env['LC_ALL'] = 'C'
+        env['TERM'] = 'dumb'
+        with _make_password_file(self.password) as pw_file:
+            cmd_args = self.args + ['-f', pw_file, 'shell']
+            try:
+                self._process = subprocess.Popen(cmd_args,
+                                                 stdin=subprocess.PIPE,
+                                                 stdout=subprocess.PIPE,
+                                                 stderr=subprocess.PIPE,
+                                                 close_fds=True, env=env)
+            except OSError as e:
+                raise processutils.ProcessExecutionError(
+                    cmd=' '.join(cmd_args), description=str(e))
+            # NOTE: ipmitool reads the password file when starting, so it
+            # must not be deleted before the first prompt.
+            self._read_output(' '.join(cmd_args))
+
+    def execute(self, command):
+        """Run an ipmitool command through the shell.
+
+        The shell does not report the exit status of the commands: a
+        command failed if it wrote to its standard error but not to its
+        standard output, or if it wrote an ipmitool error message (see
+        IPMITOOL_SHELL_FAILURE_RE). What a successful command wrote to its
+        standard error is logged as a warning.
+
+        :param command: the ipmitool command to be executed.
+        :returns: (stdout, stderr) of the command.
+        :raises: processutils.ProcessExecutionError if the shell could not
+                 be started, died or timed out, in which case it is
+                 closed, or if the command failed, in which case the
+                 shell is kept running.
+        """
+        self.last_used = time.time()
+        try:
+            if self._process is None:
+                self._start()
+            else:
+                self._log_late_errors()
+            self._last_command = command
+            self._process.stdin.write(command + '\n')
+            self._process.stdin.flush()
+            out, err = self._read_output(command)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                self.close()
+        # the shell may echo the command
+        if out.startswith(command):
+            out = out[len(command):].lstrip('\r\n')
+        if err:
+            if not out.strip() or IPMITOOL_SHELL_FAILURE_RE.search(err):
+                raise processutils.ProcessExecutionError(
+                    stdout=out, stderr=err, cmd=command)
+            LOG.warning(_LW('ipmitool command "%(command)s" succeeded but '
+                            'wrote to its standard error: %(error)s'),
+                        {'command': command, 'error': err})
+        return out, err
+
+    def _log_late_errors(self):
+        """Log what was written to the standard error between commands.
+
+        It is read before sending a command, so that it is not mistaken
+        for an error of this command.
+        """
+        errors = self._read_errors()
+        if errors:
+            LOG.warning(_LW('ipmitool shell wrote to its standard error '
+                            'after the command "%(command)s" completed: '
+                            '%(error)s'),
+                        {'command': self._last_command, 'error': errors})
+
+    def _read_output(self, command):
+        """Read the output of a command up to the next prompt."""
+        stdout = self._process.stdout.fileno()
+        deadline = time.time() + CONF.ipmi.retry_timeout
+        output = ''
+        while not output.endswith(self.PROMPT):
+            timeout = max(deadline - time.time(), 0)
+            if not select.select([stdout], [], [], timeout)[0]:
+                raise processutils.ProcessExecutionError(
+                    stdout=output, stderr=self._read_errors(), cmd=command,
+                    description=_('Timed out waiting for ipmitool shell'))
+            data = os.read(stdout, 4096)
+            if not data:
+                raise processutils.ProcessExecutionError(
+                    stdout=output, stderr=self._read_errors(), cmd=command,
+                    exit_code=self._process.poll(),
+                    description=_('ipmitool shell exited'))
+            output += data
+        return output[:-len(self.PROMPT)], self._read_errors()
+
+    def _read_errors(self):
+        """Read what was written to the standard error, without blocking."""
+        stderr = self._process.stderr.fileno()
+        errors = ''
+        while select.select([stderr], [], [], 0)[0]:
+            data = os.read(stderr, 4096)
+            if not data:
+                break
+            errors += data
+        return errors
+
+    def close(self):
+        """Stop the shell process, if it is running."""
+        if self._process is None:
+            return
+        process, self._process = self._process, None
+        try:
+            # ipmitool closes the IPMI session and exits on end of input
+            process.stdin.close()
+            if process.poll() is None:
+                process.terminate()
+            process.wait()
+        except (IOError, OSError) as e:
+            LOG.debug('Error while stopping ipmitool shell: %s', e)
+
+    @property
+    def running(self):
+        return self._process is not None
+
+
+class _ShellSessionPool(object):
+    """The "ipmitool shell" sessions of a conductor, one per BMC.
+
+    At most CONF.ipmi.shell_session_max_count sessions are kept, the least
+    recently used ones being stopped first. The sessions which are stopped
+    are removed from the pool, so are the passwords of their BMCs.
+    """
+
+    def __init__(self):
+        # least recently used first
+        self._sessions = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def execute(self, args, password, command):
+        """Run an ipmitool command through the session for a BMC.
+
+        Commands sent to the same BMC are serialized.
+
+        :param args: the ipmitool command line, without the password file.
+        :param password: the password for the BMC.
+        :param command: the ipmitool command to be executed.
+        :returns: (stdout, stderr) of the command.
+        :raises: processutils.ProcessExecutionError
+        """
+        key = (tuple(args), password)
+        while True:
+            session = self._get_session(key)
+            with session.lock:
+                # the session may have been stopped while waiting for it
+                if session.retired:
+                    continue
+                try:
+                    return session.execute(command)
+                finally:
+                    # the shell died or timed out
+                    if not session.running:
+                        self._remove(key, session)
+
+    def _get_session(self, key):
+        """Get the session for a BMC, stopping the least recently used ones.
+
+        :param key: the (args, password) of the BMC.
+        :returns: a _ShellSession.
+        """
+        with self._lock:
+            session = self._sessions.pop(key, None)
+            if session is None:
+                session = _ShellSession(list(key[0]), key[1])
+            self._sessions[key] = session
+            excess = len(self._sessions) - CONF.ipmi.shell_session_max_count
+            evicted = []
+            # NOTE: the sessions in use are skipped, there may be more
+            # sessions than allowed until they are released.
+            for other_key, other in list(self._sessions.items())[:-1]:
+                if len(evicted) >= excess:
+                    break
+                if other.lock.acquire(False):
+                    del self._sessions[other_key]
+                    other.retired = True
+                    evicted.append(other)
+        self._close(evicted)
+        return session
+
+    def _remove(self, key, session):
+        """Remove a session from the pool, the caller holds its lock."""
+        with self._lock:
+            if self._sessions.get(key) is session:
+                del self._sessions[key]
+        session.retired = True
+
+    @staticmethod
+    def _close(sessions):
+        """Stop sessions whose lock is held, then release them."""
+        for session in sessions:
+            try:
+                session.close()
+            finally:
+                session.lock.release()
+
+    def evict_idle(self):
+        """Stop the sessions which were not used for a while."""
+        idle_timeout = CONF.ipmi.shell_session_idle_timeout
+        now = time.time()
+        evicted = []
+        with self._lock:
+            for key, session in list(self._sessions.items()):
+                if (now - session.last_used > idle_timeout
+                        and session.lock.acquire(False)):
+                    del self._sessions[key]
+                    session.retired = True
+                    evicted.append(session)
+        self._close(evicted)
+
+    def close(self):
+        """Stop all the sessions."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            with session.lock:
+                session.retired = True
+                session.close()
+
+
+SHELL_SESSIONS = _ShellSessionPool()
+
+
 def _parse_driver_info(node):
     """Gets the parameters required for ipmitool to access the node.
 
@@ -362,48 +651,51 @@ def _exec_ipmitool(driver_info, command):
                 time.time() - LAST_CMD_TIME.get(driver_info['address'], 0))
         if time_till_next_poll > 0:
             time.sleep(time_till_next_poll)
-        # Resetting the list that will be utilized so the password arguments
-        # from any previous execution are preserved.
-        cmd_args = args[:]
-        # 'ipmitool' command will prompt password if there is no '-f'
-        # option, we set it to '\0' to write a password file to support
-        # empty password
-        with _make_password_file(
-                    driver_info['password'] or '\0'
-                ) as pw_file:
-            cmd_args.append('-f')
-            cmd_args.append(pw_file)
-            cmd_args.extend(command.split(" "))
-            try:
+        try:
+            if CONF.ipmi.shell_sessions:
+                return SHELL_SESSIONS.execute(
+                    args, driver_info['password'] or '\0', command)
+            # Resetting the list that will be utilized so the password
+            # arguments from any previous execution are preserved.
+            cmd_args = args[:]
+            # 'ipmitool' command will prompt password if there is no '-f'
+            # option, we set it to '\0' to write a password file to support
+            # empty password
+            with _make_password_file(
+                        driver_info['password'] or '\0'
+                    ) as pw_file:
+                cmd_args.append('-f')
+                cmd_args.append(pw_file)
+                cmd_args.extend(command.split(" "))
                 out, err = utils.execute(*cmd_args)
                 return out, err
-            except processutils.ProcessExecutionError as e:
-                with excutils.save_and_reraise_exception() as ctxt:
-                    err_list = [x for x in IPMITOOL_RETRYABLE_FAILURES
-                                if x in e.message]
-                    if ((time.time() > end_time) or
-                        (num_tries == 0) or
-                        not err_list):
-                        LOG.error(_LE('IPMI Error while attempting '
-                                  '"%(cmd)s" for node %(node)s. '
-                                  'Error: %(error)s'),
-                                  {
-                                      'node': driver_info['uuid'],
-                                      'cmd': e.cmd,
-                                      'error': e
-                                  })
-                    else:
-                        ctxt.reraise = False
-                        LOG.warning(_LW('IPMI Error encountered, retrying '
-                                    '"%(cmd)s" for node %(node)s. '
-                                    'Error: %(error)s'),
-                                    {
-                                        'node': driver_info['uuid'],
-                                        'cmd': e.cmd,
-                                        'error': e
-                                    })
-            finally:
-                LAST_CMD_TIME[driver_info['address']] = time.time()
+        except processutils.ProcessExecutionError as e:
+            with excutils.save_and_reraise_exception() as ctxt:
+                err_list = [x for x in IPMITOOL_RETRYABLE_FAILURES
+                            if x in e.message]
+                if ((time.time() > end_time) or
+                    (num_tries == 0) or
+                    not err_list):
+                    LOG.error(_LE('IPMI Error while attempting '
+                              '"%(cmd)s" for node %(node)s. '
+                              'Error: %(error)s'),
+                              {
+                                  'node': driver_info['uuid'],
+                                  'cmd': e.cmd,
+                                  'error': e
+                              })
+                else:
+                    ctxt.reraise = False
+                    LOG.warning(_LW('IPMI Error encountered, retrying '
+                                '"%(cmd)s" for node %(node)s. '
+                                'Error: %(error)s'),
+                                {
+                                    'node': driver_info['uuid'],
+                                    'cmd': e.cmd,
+                                    'error': e
+                                })
+        finally:
+            LAST_CMD_TIME[driver_info['address']] = time.time()
 
 
 def _sleep_time(iter):
@@ -717,6 +1009,12 @@ class IPMIPower(base.PowerInterface):
         if state != states.POWER_ON:
             raise exception.PowerStateFailure(pstate=states.POWER_ON)
 
+    @base.driver_periodic_task(
+        spacing=CONF.ipmi.shell_session_idle_timeout)
+    def _evict_idle_shell_sessions(self, manager, context):
+        """Periodic task stopping the idle "ipmitool shell" processes."""
+        SHELL_SESSIONS.evict_idle()
+
 
 class IPMIManagement(base.ManagementInterface):
 
@@ -325,7 +325,7 @@ def _create_token_file(task):
     if token:
         timeout = CONF.conductor.deploy_callback_timeout
         if timeout and keystone.token_expires_soon(token, timeout):
-            token = keystone.get_admin_auth_token()
+            token = keystone.get_admin_auth_token(valid_for=timeout)
         utils.write_to_file(token_file_path, token)
     else:
         utils.unlink_without_raise(token_file_path)
@@ -19,6 +19,7 @@ import copy
 
 from oslo import messaging
 from oslo_context import context
+from oslo_serialization import jsonutils
 import six
 
 from ironic.common import exception
@@ -41,6 +42,20 @@ def get_attrname(name):
     return '_%s' % name
 
 
+# The types of the fields holding mutable containers, which can be changed
+# in place and are compared to their original values to find the changes.
+_CONTAINER_TYPES = (obj_utils.dict_or_none, obj_utils.list_or_none)
+
+# The original value of a container field which was not handed out since
+# its changes were reset, so it can't have been changed in place.
+_NOT_FINGERPRINTED = object()
+
+
+def _fingerprint(value):
+    """Return a cheap to keep and compare image of a container value."""
+    return jsonutils.dumps(value, sort_keys=True)
+
+
 def make_class_properties(cls):
     # NOTE(danms/comstud): Inherit fields from super classes.
     # mro() returns the current class first and returns 'object' last, so
@@ -60,9 +75,17 @@ def make_class_properties(cls):
             attrname = get_attrname(name)
             if not hasattr(self, attrname):
                 self.obj_load_attr(name)
-            return getattr(self, attrname)
+            value = getattr(self, attrname)
+            # the caller may change the value in place from now on
+            if self._original_values.get(name) is _NOT_FINGERPRINTED:
+                self._original_values[name] = _fingerprint(value)
+            return value
 
         def setter(self, value, name=name, typefn=typefn):
+            # keep the original value to compare the new one to
+            if self._original_values.get(name) is _NOT_FINGERPRINTED:
+                self._original_values[name] = _fingerprint(
+                    getattr(self, get_attrname(name)))
             self._changed_fields.add(name)
             try:
                 return setattr(self, get_attrname(name), typefn(value))
@@ -74,6 +97,15 @@ def make_class_properties(cls):
 
         setattr(cls, name, property(getter, setter))
 
+    # NOTE: precompute what obj_to_primitive() and obj_from_primitive()
+    # look up for each field, as they are called for every object sent
+    # over RPC.
+    cls._obj_field_codecs = [
+        (name, get_attrname(name),
+         getattr(cls, '_attr_%s_to_primitive' % name, None),
+         getattr(cls, '_attr_%s_from_primitive' % name, None))
+        for name in cls.fields]
+
 
 class IronicObjectMetaclass(type):
     """Metaclass that allows tracking of object classes."""
@@ -86,10 +118,14 @@ class IronicObjectMetaclass(type):
         if not hasattr(cls, '_obj_classes'):
             # This will be set in the 'IronicObject' class.
             cls._obj_classes = collections.defaultdict(list)
+            # The classes found by obj_class_from_name(), by name and
+            # version
+            cls._obj_class_cache = {}
         else:
             # Add the subclass to IronicObject._obj_classes
             make_class_properties(cls)
             cls._obj_classes[cls.obj_name()].append(cls)
+            cls._obj_class_cache.clear()
 
 
 # These are decorators that mark an object's method as remotable.
@@ -138,6 +174,8 @@ def remotable(fn):
                 if key in self.fields:
                     self[key] = self._attr_from_primitive(key, value)
             self._changed_fields = set(updates.get('obj_what_changed', []))
+            self._obj_save_original_values(
+                [f for f in self.fields if f not in self._changed_fields])
             return result
         else:
             return fn(self, ctxt, *args, **kwargs)
@@ -205,6 +243,9 @@ class IronicObject(object):
 
     def __init__(self, context, **kwargs):
         self._changed_fields = set()
+        # fingerprints of the values of the container fields when their
+        # changes were last reset, see obj_what_changed()
+        self._original_values = {}
         self._context = context
         self.update(kwargs)
 
@@ -219,6 +260,16 @@ class IronicObject(object):
     @classmethod
     def obj_class_from_name(cls, objname, objver):
         """Returns a class from the registry based on a name and version."""
+        try:
+            return cls._obj_class_cache[objname, objver]
+        except KeyError:
+            pass
+        objclass = cls._obj_class_from_name(objname, objver)
+        cls._obj_class_cache[objname, objver] = objclass
+        return objclass
+
+    @classmethod
+    def _obj_class_from_name(cls, objname, objver):
         if objname not in cls._obj_classes:
             LOG.error(_LE('Unable to instantiate unregistered object type '
                           '%(objtype)s'), dict(objtype=objname))
@@ -265,11 +316,16 @@ class IronicObject(object):
         self.VERSION = objver
         objdata = primitive['ironic_object.data']
         changes = primitive.get('ironic_object.changes', [])
-        for name in self.fields:
+        for name, attrname, to_primitive, from_primitive in (
+                cls._obj_field_codecs):
             if name in objdata:
-                setattr(self, name,
-                        self._attr_from_primitive(name, objdata[name]))
+                value = objdata[name]
+                if from_primitive is not None:
+                    value = from_primitive(self, value)
+                setattr(self, name, value)
         self._changed_fields = set([x for x in changes if x in self.fields])
+        self._obj_save_original_values(
+            [f for f in self.fields if f not in self._changed_fields])
         return self
 
     @classmethod
@@ -304,6 +360,7 @@ class IronicObject(object):
                 nval = copy.deepcopy(getattr(self, name), memo)
                 setattr(nobj, name, nval)
         nobj._changed_fields = set(self._changed_fields)
+        nobj._original_values = dict(self._original_values)
         return nobj
 
     def obj_clone(self):
@@ -326,18 +383,25 @@ class IronicObject(object):
     def obj_to_primitive(self):
         """Simple base-case dehydration.
 
-        This calls self._attr_to_primitive() for each item in fields.
+        This is self._attr_to_primitive() for each item in fields, with
+        the handlers looked up once per class.
         """
         primitive = dict()
-        for name in self.fields:
-            if hasattr(self, get_attrname(name)):
-                primitive[name] = self._attr_to_primitive(name)
+        values = self.__dict__
+        for name, attrname, to_primitive, from_primitive in (
+                self._obj_field_codecs):
+            if attrname in values:
+                if to_primitive is not None:
+                    primitive[name] = to_primitive(self)
+                else:
+                    primitive[name] = values[attrname]
         obj = {'ironic_object.name': self.obj_name(),
                'ironic_object.namespace': 'ironic',
                'ironic_object.version': self.VERSION,
                'ironic_object.data': primitive}
-        if self.obj_what_changed():
-            obj['ironic_object.changes'] = list(self.obj_what_changed())
+        changes = self.obj_what_changed()
+        if changes:
+            obj['ironic_object.changes'] = list(changes)
         return obj
 
     def obj_load_attr(self, attrname):
@@ -366,8 +430,22 @@ class IronicObject(object):
         return changes
 
     def obj_what_changed(self):
-        """Returns a set of fields that have been modified."""
-        return self._changed_fields
+        """Returns a set of fields that have been modified.
+
+        The container fields, like dicts, are compared to their values when
+        the changes were last reset: they are changed if they were modified
+        in place, and not changed if they were set to an equal value.
+        """
+        changed = set(self._changed_fields)
+        for name, original in self._original_values.items():
+            if (original is _NOT_FINGERPRINTED or
+                    not hasattr(self, get_attrname(name))):
+                continue
+            if _fingerprint(getattr(self, get_attrname(name))) == original:
+                changed.discard(name)
+            else:
+                changed.add(name)
+        return changed
 
     def obj_reset_changes(self, fields=None):
         """Reset the list of fields that have been changed.
@@ -378,6 +456,29 @@ class IronicObject(object):
             self._changed_fields -= set(fields)
         else:
             self._changed_fields.clear()
+            fields = self.fields
+        self._obj_save_original_values(fields)
+
+    def _obj_save_original_values(self, fields):
+        """Save the current values of some container fields.
+
+        The values are only fingerprinted once they may be changed in
+        place, that is once they are handed out by their property. A value
+        which was already handed out is fingerprinted right away, since
+        the caller may still hold it.
+        """
+        for name in fields:
+            if self.fields.get(name) not in _CONTAINER_TYPES:
+                continue
+            attrname = get_attrname(name)
+            if not hasattr(self, attrname):
+                self._original_values.pop(name, None)
+            elif self._original_values.get(
+                    name, _NOT_FINGERPRINTED) is _NOT_FINGERPRINTED:
+                self._original_values[name] = _NOT_FINGERPRINTED
+            else:
+                self._original_values[name] = _fingerprint(
+                    getattr(self, attrname))
 
     def obj_attr_is_set(self, attrname):
         """Test object to see if attrname is present.
@@ -455,7 +556,7 @@ class IronicObject(object):
     def as_dict(self):
         return dict((k, getattr(self, k))
                 for k in self.fields
-                if hasattr(self, k))
+                if self.obj_attr_is_set(k))
 
 
 class ObjectListBase(object):
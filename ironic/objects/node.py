@@ -36,7 +36,9 @@ class Node(base.IronicObject):
     # Version 1.9: Add driver_internal_info
     # Version 1.10: Add name and get_by_name()
     # Version 1.11: Add clean_step
-    VERSION = '1.11'
+    # Version 1.12: Add filters to reserve()
+    # Version 1.13: Add fields to list()
+    VERSION = '1.13'
 
     dbapi = db_api.get_instance()
 
@@ -92,13 +94,26 @@ class Node(base.IronicObject):
             }
 
     @staticmethod
-    def _from_db_object(node, db_node):
-        """Converts a database entity to a formal object."""
-        for field in node.fields:
+    def _from_db_object(node, db_node, fields=None):
+        """Converts a database entity to a formal object.
+
+        :param fields: the fields to convert, defaults to all of them.
+        """
+        for field in fields or node.fields:
             node[field] = db_node[field]
         node.obj_reset_changes()
         return node
 
+    def obj_load_attr(self, attrname):
+        """Load the fields left unset by list() from the database."""
+        if attrname not in self.fields or not self.obj_attr_is_set('id'):
+            return super(Node, self).obj_load_attr(attrname)
+        db_node = self.dbapi.get_node_by_id(self.id)
+        unset = [f for f in self.fields if not self.obj_attr_is_set(f)]
+        for field in unset:
+            self[field] = db_node[field]
+        self.obj_reset_changes(unset)
+
     @base.remotable_classmethod
     def get(cls, context, node_id):
         """Find a node based on its id or uuid and return a Node object.
@@ -159,7 +174,7 @@ class Node(base.IronicObject):
 
     @base.remotable_classmethod
     def list(cls, context, limit=None, marker=None, sort_key=None,
-             sort_dir=None, filters=None):
+             sort_dir=None, filters=None, fields=None):
         """Return a list of Node objects.
 
         :param context: Security context.
@@ -168,16 +183,22 @@ class Node(base.IronicObject):
         :param sort_key: column to sort results by.
         :param sort_dir: direction to sort. "asc" or "desc".
         :param filters: Filters to apply.
+        :param fields: the fields to load, defaults to all of them. The
+                       id is always loaded, and the other fields are
+                       loaded from the database when first accessed.
         :returns: a list of :class:`Node` object.
 
         """
+        if fields is not None:
+            fields = ['id'] + [f for f in fields if f != 'id']
         db_nodes = cls.dbapi.get_node_list(filters=filters, limit=limit,
                                            marker=marker, sort_key=sort_key,
-                                           sort_dir=sort_dir)
-        return [Node._from_db_object(cls(context), obj) for obj in db_nodes]
+                                           sort_dir=sort_dir, columns=fields)
+        return [Node._from_db_object(cls(context), obj, fields)
+                for obj in db_nodes]
 
     @base.remotable_classmethod
-    def reserve(cls, context, tag, node_id):
+    def reserve(cls, context, tag, node_id, filters=None):
         """Get and reserve a node.
 
         To prevent other ManagerServices from manipulating the given
@@ -186,11 +207,14 @@ class Node(base.IronicObject):
         :param context: Security context.
         :param tag: A string uniquely identifying the reservation holder.
         :param node_id: A node id or uuid.
+        :param filters: Filters the node must match to be reserved.
         :raises: NodeNotFound if the node is not found.
+        :raises: NodeFiltersNotMatched if the node does not match the
+                 filters.
         :returns: a :class:`Node` object.
 
         """
-        db_node = cls.dbapi.reserve_node(tag, node_id)
+        db_node = cls.dbapi.reserve_node(tag, node_id, filters=filters)
         node = Node._from_db_object(cls(context), db_node)
         return node
 
@@ -227,6 +251,32 @@ class Node(base.IronicObject):
         db_node = self.dbapi.create_node(values)
         self._from_db_object(self, db_node)
 
+    @classmethod
+    def create_many(cls, context, nodes, batch_size=None):
+        """Create several Node records in the DB.
+
+        The nodes are created in batches, each one in a single
+        transaction, see the create_nodes() method of the database API. The
+        nodes which are created are updated like by create().
+
+        :param context: Security context.
+        :param nodes: a list of Node objects to create.
+        :param batch_size: maximum number of nodes to create in a single
+                           transaction.
+        :returns: a list with, for each node, None if it was created or
+                  the exception which prevented its creation.
+        """
+        values_list = [node.obj_get_changes() for node in nodes]
+        results = cls.dbapi.create_nodes(values_list, batch_size=batch_size)
+        errors = []
+        for node, result in zip(nodes, results):
+            if isinstance(result, exception.IronicException):
+                errors.append(result)
+            else:
+                cls._from_db_object(node, result)
+                errors.append(None)
+        return errors
+
     @base.remotable
     def destroy(self, context=None):
         """Delete the Node from the DB.
@@ -246,7 +296,8 @@ class Node(base.IronicObject):
         """Save updates to this Node.
 
         Column-wise updates will be made based on the result of
-        self.what_changed(). If target_power_state is provided,
+        self.what_changed(), nothing is written if no field changed.
+        If target_power_state is provided,
         it will be checked against the in-database copy of the
         node before updates are made.
 
@@ -262,7 +313,8 @@ class Node(base.IronicObject):
             # Clean driver_internal_info when changes driver
             self.driver_internal_info = {}
             updates = self.obj_get_changes()
-        self.dbapi.update_node(self.uuid, updates)
+        if updates:
+            self.dbapi.update_node(self.uuid, updates)
         self.obj_reset_changes()
 
     @base.remotable
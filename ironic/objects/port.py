@@ -162,6 +162,32 @@ class Port(base.IronicObject):
         db_port = self.dbapi.create_port(values)
         self._from_db_object(self, db_port)
 
+    @classmethod
+    def create_many(cls, context, ports, batch_size=None):
+        """Create several Port records in the DB.
+
+        The ports are created in batches, each one in a single
+        transaction, see the create_ports() method of the database API. The
+        ports which are created are updated like by create().
+
+        :param context: Security context.
+        :param ports: a list of Port objects to create.
+        :param batch_size: maximum number of ports to create in a single
+                           transaction.
+        :returns: a list with, for each port, None if it was created or
+                  the exception which prevented its creation.
+        """
+        values_list = [port.obj_get_changes() for port in ports]
+        results = cls.dbapi.create_ports(values_list, batch_size=batch_size)
+        errors = []
+        for port, result in zip(ports, results):
+            if isinstance(result, exception.IronicException):
+                errors.append(result)
+            else:
+                cls._from_db_object(port, result)
+                errors.append(None)
+        return errors
+
     @base.remotable
     def destroy(self, context=None):
         """Delete the Port from the DB.
@@ -22,8 +22,10 @@ from oslo_config import cfg
 from webob import exc as webob_exc
 
 from ironic.api.controllers import root
+from ironic.api.controllers.v1 import utils as api_utils
 from ironic.api import hooks
 from ironic.common import context
+from ironic.conductor import rpcapi
 from ironic.tests.api import base
 from ironic.tests import policy_fixture
 
@@ -270,6 +272,36 @@ class TestContextHookCompatJuno(TestContextHook):
             roles=headers['X-Roles'].split(','))
 
 
+class TestRPCHook(base.FunctionalTest):
+    @mock.patch.object(rpcapi, 'ConductorAPI')
+    def test_rpc_hook_shares_rpcapi(self, mock_rpcapi):
+        rpc_hook = hooks.RPCHook()
+        self.assertFalse(mock_rpcapi.called)
+        reqstate1 = FakeRequestState()
+        reqstate2 = FakeRequestState()
+        rpc_hook.before(reqstate1)
+        rpc_hook.before(reqstate2)
+        mock_rpcapi.assert_called_once_with()
+        self.assertIs(mock_rpcapi.return_value, reqstate1.request.rpcapi)
+        self.assertIs(mock_rpcapi.return_value, reqstate2.request.rpcapi)
+
+
+class TestListCacheHook(base.FunctionalTest):
+    @mock.patch.object(api_utils, 'clear_list_cache')
+    def test_list_cache_hook_get(self, mock_clear):
+        reqstate = FakeRequestState()
+        reqstate.request.method = 'GET'
+        hooks.ListCacheHook().after(reqstate)
+        self.assertFalse(mock_clear.called)
+
+    @mock.patch.object(api_utils, 'clear_list_cache')
+    def test_list_cache_hook_change(self, mock_clear):
+        reqstate = FakeRequestState()
+        reqstate.request.method = 'PATCH'
+        hooks.ListCacheHook().after(reqstate)
+        mock_clear.assert_called_once_with()
+
+
 class TestTrustedCallHook(base.FunctionalTest):
     def test_trusted_call_hook_not_admin(self):
         headers = fake_headers(admin=False)
@@ -19,6 +19,7 @@ import datetime
 import json
 
 import mock
+from oslo import messaging
 from oslo_config import cfg
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
@@ -108,6 +109,19 @@ class TestListNodes(test_api_base.FunctionalTest):
         # never expose the chassis_id
         self.assertNotIn('chassis_id', data['nodes'][0])
 
+    @mock.patch.object(objects.Node, 'list')
+    def test_get_all_loads_returned_fields(self, mock_list):
+        mock_list.return_value = []
+        self.get_json('/nodes')
+        self.assertEqual(api_node._DEFAULT_RETURN_FIELDS,
+                         mock_list.call_args[1]['fields'])
+
+    @mock.patch.object(objects.Node, 'list')
+    def test_detail_loads_all_fields(self, mock_list):
+        mock_list.return_value = []
+        self.get_json('/nodes/detail')
+        self.assertIsNone(mock_list.call_args[1]['fields'])
+
     def test_get_one(self):
         node = obj_utils.create_test_node(self.context,
                                           chassis_id=self.chassis.id)
@@ -209,6 +223,87 @@ class TestListNodes(test_api_base.FunctionalTest):
         self.assertEqual(some_time, started)
         self.assertEqual(None, data['inspection_finished_at'])
 
+    def test_get_one_not_modified(self):
+        node = obj_utils.create_test_node(self.context)
+        response = self.get_json('/nodes/%s' % node.uuid,
+                                 expect_errors=True)
+        self.assertEqual(200, response.status_int)
+        etag = response.headers['ETag']
+        response = self.get_json('/nodes/%s' % node.uuid,
+                                 headers={'If-None-Match': etag},
+                                 expect_errors=True)
+        self.assertEqual(304, response.status_int)
+        self.assertEqual('', response.body)
+        self.assertEqual(etag, response.headers['ETag'])
+
+    def test_get_one_modified(self):
+        node = obj_utils.create_test_node(self.context)
+        response = self.get_json('/nodes/%s' % node.uuid,
+                                 expect_errors=True)
+        etag = response.headers['ETag']
+        node.power_state = states.POWER_OFF
+        node.save()
+        response = self.get_json('/nodes/%s' % node.uuid,
+                                 headers={'If-None-Match': etag},
+                                 expect_errors=True)
+        self.assertEqual(200, response.status_int)
+        self.assertEqual(states.POWER_OFF, response.json['power_state'])
+        self.assertNotEqual(etag, response.headers['ETag'])
+
+    def test_get_one_etag_depends_on_version(self):
+        node = obj_utils.create_test_node(self.context)
+        response = self.get_json('/nodes/%s' % node.uuid,
+                                 expect_errors=True)
+        etag = response.headers['ETag']
+        response = self.get_json('/nodes/%s' % node.uuid,
+                 headers={'If-None-Match': etag,
+                          api_base.Version.string: str(api_v1.MAX_VER)},
+                 expect_errors=True)
+        self.assertEqual(200, response.status_int)
+        self.assertNotEqual(etag, response.headers['ETag'])
+
+    @mock.patch.object(api_node.NodeCollection, 'convert_with_links')
+    def test_detail_not_modified(self, mock_convert):
+        mock_convert.return_value = api_node.NodeCollection.sample()
+        obj_utils.create_test_node(self.context)
+        response = self.get_json('/nodes/detail', expect_errors=True)
+        etag = response.headers['ETag']
+        response = self.get_json('/nodes/detail',
+                                 headers={'If-None-Match': etag},
+                                 expect_errors=True)
+        self.assertEqual(304, response.status_int)
+        # The collection is converted for the first request only
+        self.assertEqual(1, mock_convert.call_count)
+
+    @mock.patch.object(objects.Node, 'list')
+    def test_detail_cached(self, mock_list):
+        cfg.CONF.set_override('list_cache_ttl', 60, 'api')
+        self.addCleanup(api_utils.clear_list_cache)
+        node = obj_utils.create_test_node(self.context)
+        mock_list.return_value = [node]
+        data = self.get_json('/nodes/detail')
+        self.assertEqual(node.uuid, data['nodes'][0]['uuid'])
+        data = self.get_json('/nodes/detail')
+        self.assertEqual(node.uuid, data['nodes'][0]['uuid'])
+        mock_list.assert_called_once_with(mock.ANY, mock.ANY, None,
+                                          sort_key='id', sort_dir='asc',
+                                          filters={}, fields=None)
+        # Other queries are not served from the cache
+        self.get_json('/nodes/detail?maintenance=true')
+        self.assertEqual(2, mock_list.call_count)
+
+    @mock.patch.object(api_utils, 'time')
+    @mock.patch.object(objects.Node, 'list')
+    def test_detail_cache_expired(self, mock_list, mock_time):
+        cfg.CONF.set_override('list_cache_ttl', 60, 'api')
+        self.addCleanup(api_utils.clear_list_cache)
+        mock_list.return_value = []
+        # Cached at 100 for 60 seconds, looked up again at 161
+        mock_time.time.side_effect = [100, 161, 161]
+        self.get_json('/nodes/detail')
+        self.get_json('/nodes/detail')
+        self.assertEqual(2, mock_list.call_count)
+
     def test_many(self):
         nodes = []
         for id in range(5):
@@ -1363,6 +1458,123 @@ class TestPost(test_api_base.FunctionalTest):
         self.assertFalse(get_methods_mock.called)
 
 
+class TestBulk(test_api_base.FunctionalTest):
+
+    def setUp(self):
+        super(TestBulk, self).setUp()
+        self.chassis = obj_utils.create_test_chassis(self.context)
+        p = mock.patch.object(rpcapi.ConductorAPI, 'get_topic_for')
+        self.mock_gtf = p.start()
+        self.mock_gtf.return_value = 'test-topic'
+        self.addCleanup(p.stop)
+        p = mock.patch.object(rpcapi.ConductorAPI, 'update_node')
+        self.mock_update_node = p.start()
+        self.addCleanup(p.stop)
+        self.headers = {api_base.Version.string: str(api_v1.MAX_VER)}
+
+    def test_bulk_create(self):
+        ndicts = [test_api_utils.post_get_test_node(
+                      uuid=uuidutils.generate_uuid(), name='node-%d' % i)
+                  for i in range(3)]
+        with mock.patch.object(self.dbapi, 'create_nodes',
+                               wraps=self.dbapi.create_nodes) as cn_mock:
+            response = self.post_json('/nodes/bulk_create', ndicts,
+                                      headers=self.headers)
+            cn_mock.assert_called_once_with(mock.ANY, batch_size=100)
+        self.assertEqual(200, response.status_int)
+        results = response.json['nodes']
+        self.assertEqual([201] * 3, [r['status'] for r in results])
+        self.assertEqual([n['uuid'] for n in ndicts],
+                         [r['node']['uuid'] for r in results])
+        for ndict in ndicts:
+            result = self.get_json('/nodes/%s' % ndict['uuid'],
+                                   headers=self.headers)
+            self.assertEqual(ndict['name'], result['name'])
+
+    def test_bulk_create_partial_failure(self):
+        obj_utils.create_test_node(self.context, name='node-1')
+        ndicts = [test_api_utils.post_get_test_node(
+                      uuid=uuidutils.generate_uuid(), name=name)
+                  for name in ('node-0', 'node-1', 'invalid name')]
+        response = self.post_json('/nodes/bulk_create', ndicts,
+                                  headers=self.headers)
+        self.assertEqual(200, response.status_int)
+        results = response.json['nodes']
+        self.assertEqual([201, 409, 400], [r['status'] for r in results])
+        self.assertEqual(ndicts[0]['uuid'], results[0]['node']['uuid'])
+        self.assertNotIn('node', results[1])
+        self.assertTrue(results[1]['error'])
+        self.assertTrue(results[2]['error'])
+        self.get_json('/nodes/%s' % ndicts[0]['uuid'])
+
+    def test_bulk_create_old_version(self):
+        ndict = test_api_utils.post_get_test_node()
+        response = self.post_json('/nodes/bulk_create', [ndict],
+                                  headers={api_base.Version.string: '1.6'},
+                                  expect_errors=True)
+        self.assertEqual(406, response.status_int)
+
+    def test_bulk_create_too_many_nodes(self):
+        cfg.CONF.set_override('max_limit', 1, 'api')
+        ndicts = [test_api_utils.post_get_test_node(
+                      uuid=uuidutils.generate_uuid()) for i in range(2)]
+        response = self.post_json('/nodes/bulk_create', ndicts,
+                                  headers=self.headers, expect_errors=True)
+        self.assertEqual(400, response.status_int)
+        self.assertFalse(self.dbapi.get_node_list())
+
+    def test_bulk_update(self):
+        node = obj_utils.create_test_node(self.context)
+        self.mock_update_node.return_value = node
+        updates = [{'node': node.uuid,
+                    'patch': [{'path': '/extra/foo', 'value': 'bar',
+                               'op': 'add'}]},
+                   {'node': uuidutils.generate_uuid(),
+                    'patch': [{'path': '/extra/foo', 'value': 'bar',
+                               'op': 'add'}]},
+                   {'node': node.uuid,
+                    'patch': [{'path': '/uuid', 'op': 'remove'}]}]
+        response = self.post_json('/nodes/bulk_update', updates,
+                                  headers=self.headers)
+        self.assertEqual(200, response.status_int)
+        results = response.json['nodes']
+        self.assertEqual([200, 404, 400], [r['status'] for r in results])
+        self.assertEqual(node.uuid, results[0]['node']['uuid'])
+        self.mock_update_node.assert_called_once_with(
+            mock.ANY, mock.ANY, 'test-topic')
+        rpc_node = self.mock_update_node.call_args[0][1]
+        self.assertEqual({'foo': 'bar'}, rpc_node.extra)
+
+    def test_bulk_update_node_locked(self):
+        node = obj_utils.create_test_node(self.context)
+        self.mock_update_node.side_effect = exception.NodeLocked(
+            node=node.uuid, host='test-host')
+        updates = [{'node': node.uuid,
+                    'patch': [{'path': '/extra/foo', 'value': 'bar',
+                               'op': 'add'}]}]
+        response = self.post_json('/nodes/bulk_update', updates,
+                                  headers=self.headers)
+        self.assertEqual(200, response.status_int)
+        self.assertEqual(409, response.json['nodes'][0]['status'])
+
+    def test_bulk_update_rpc_errors(self):
+        node = obj_utils.create_test_node(self.context)
+        self.mock_update_node.side_effect = [
+            messaging.MessagingTimeout(),
+            messaging.RemoteError('ValueError', 'boom', 'traceback'),
+            node]
+        updates = [{'node': node.uuid,
+                    'patch': [{'path': '/extra/foo', 'value': 'bar',
+                               'op': 'add'}]}] * 3
+        response = self.post_json('/nodes/bulk_update', updates,
+                                  headers=self.headers)
+        self.assertEqual(200, response.status_int)
+        results = response.json['nodes']
+        self.assertEqual([503, 500, 200], [r['status'] for r in results])
+        self.assertIn('boom', results[1]['error'])
+        self.assertNotIn('traceback', results[1]['error'])
+
+
 class TestDelete(test_api_base.FunctionalTest):
 
     def setUp(self):
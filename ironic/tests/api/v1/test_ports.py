@@ -18,6 +18,7 @@ Tests for the API /ports/ methods.
 import datetime
 
 import mock
+from oslo import messaging
 from oslo_config import cfg
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
@@ -31,6 +32,7 @@ from ironic.api.controllers.v1 import port as api_port
 from ironic.api.controllers.v1 import utils as api_utils
 from ironic.common import exception
 from ironic.conductor import rpcapi
+from ironic import objects
 from ironic.tests.api import base as api_base
 from ironic.tests.api import utils as apiutils
 from ironic.tests import base
@@ -85,6 +87,46 @@ class TestListPorts(api_base.FunctionalTest):
         # never expose the node_id
         self.assertNotIn('node_id', data)
 
+    def test_get_one_not_modified(self):
+        port = obj_utils.create_test_port(self.context, node_id=self.node.id)
+        response = self.get_json('/ports/%s' % port.uuid,
+                                 expect_errors=True)
+        etag = response.headers['ETag']
+        response = self.get_json('/ports/%s' % port.uuid,
+                                 headers={'If-None-Match': etag},
+                                 expect_errors=True)
+        self.assertEqual(304, response.status_int)
+        self.assertEqual('', response.body)
+
+    def test_get_one_modified(self):
+        port = obj_utils.create_test_port(self.context, node_id=self.node.id)
+        response = self.get_json('/ports/%s' % port.uuid,
+                                 expect_errors=True)
+        etag = response.headers['ETag']
+        port.extra = {'foo': 'bar'}
+        port.save()
+        response = self.get_json('/ports/%s' % port.uuid,
+                                 headers={'If-None-Match': etag},
+                                 expect_errors=True)
+        self.assertEqual(200, response.status_int)
+        self.assertEqual({'foo': 'bar'}, response.json['extra'])
+
+    def test_get_all_not_modified(self):
+        obj_utils.create_test_port(self.context, node_id=self.node.id)
+        response = self.get_json('/ports', expect_errors=True)
+        etag = response.headers['ETag']
+        response = self.get_json('/ports', headers={'If-None-Match': etag},
+                                 expect_errors=True)
+        self.assertEqual(304, response.status_int)
+        # A new port changes the list
+        obj_utils.create_test_port(self.context, node_id=self.node.id,
+                                   uuid=uuidutils.generate_uuid(),
+                                   address='52:54:00:cf:2d:32')
+        response = self.get_json('/ports', headers={'If-None-Match': etag},
+                                 expect_errors=True)
+        self.assertEqual(200, response.status_int)
+        self.assertEqual(2, len(response.json['ports']))
+
     def test_detail(self):
         port = obj_utils.create_test_port(self.context, node_id=self.node.id)
         data = self.get_json('/ports/detail')
@@ -685,6 +727,112 @@ class TestPost(api_base.FunctionalTest):
         self.assertIn(address, error_msg.upper())
 
 
+class TestBulk(api_base.FunctionalTest):
+
+    def setUp(self):
+        super(TestBulk, self).setUp()
+        self.node = obj_utils.create_test_node(self.context)
+        p = mock.patch.object(rpcapi.ConductorAPI, 'get_topic_for')
+        self.mock_gtf = p.start()
+        self.mock_gtf.return_value = 'test-topic'
+        self.addCleanup(p.stop)
+        self.headers = {api_controller.Version.string: '1.7'}
+
+    def test_bulk_create(self):
+        pdicts = [post_get_test_port(uuid=uuidutils.generate_uuid(),
+                                     address='52:54:00:cf:2e:%02x' % i)
+                  for i in range(3)]
+        pdicts[2]['address'] = pdicts[0]['address']
+        response = self.post_json('/ports/bulk_create', pdicts,
+                                  headers=self.headers)
+        self.assertEqual(200, response.status_int)
+        results = response.json['ports']
+        self.assertEqual([201, 201, 409], [r['status'] for r in results])
+        self.assertEqual(pdicts[1]['uuid'], results[1]['port']['uuid'])
+        self.assertTrue(results[2]['error'])
+        self.get_json('/ports/%s' % pdicts[0]['uuid'])
+        self.get_json('/ports/%s' % pdicts[1]['uuid'])
+
+    @mock.patch.object(objects.Node, 'get')
+    def test_bulk_create_nodes_looked_up_at_once(self, mock_get):
+        other_node = obj_utils.create_test_node(
+            self.context, id=2, uuid=uuidutils.generate_uuid())
+        pdicts = [post_get_test_port(uuid=uuidutils.generate_uuid(),
+                                     address='52:54:00:cf:2e:%02x' % i,
+                                     node_uuid=node.uuid)
+                  for i, node in enumerate([self.node, other_node,
+                                            self.node])]
+        with mock.patch.object(objects.Node, 'list',
+                               wraps=objects.Node.list) as mock_list:
+            response = self.post_json('/ports/bulk_create', pdicts,
+                                      headers=self.headers)
+        self.assertEqual([201, 201, 201],
+                         [r['status'] for r in response.json['ports']])
+        self.assertEqual(1, mock_list.call_count)
+        self.assertFalse(mock_get.called)
+        port = objects.Port.get_by_uuid(self.context, pdicts[1]['uuid'])
+        self.assertEqual(other_node.id, port.node_id)
+
+    def test_bulk_create_node_not_found(self):
+        pdicts = [post_get_test_port(uuid=uuidutils.generate_uuid(),
+                                     address='52:54:00:cf:2e:%02x' % i)
+                  for i in range(2)]
+        pdicts[0]['node_uuid'] = uuidutils.generate_uuid()
+        response = self.post_json('/ports/bulk_create', pdicts,
+                                  headers=self.headers)
+        self.assertEqual(200, response.status_int)
+        results = response.json['ports']
+        self.assertEqual([400, 201], [r['status'] for r in results])
+        self.assertIn(pdicts[0]['node_uuid'], results[0]['error'])
+        self.get_json('/ports/%s' % pdicts[1]['uuid'])
+
+    def test_bulk_create_old_version(self):
+        response = self.post_json('/ports/bulk_create', [post_get_test_port()],
+                                  headers={api_controller.Version.string:
+                                           '1.6'},
+                                  expect_errors=True)
+        self.assertEqual(406, response.status_int)
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'update_port')
+    def test_bulk_update(self, mock_upd):
+        port = obj_utils.create_test_port(self.context, node_id=self.node.id)
+        mock_upd.return_value = port
+        updates = [{'port': port.uuid,
+                    'patch': [{'path': '/extra/foo', 'value': 'bar',
+                               'op': 'add'}]},
+                   {'port': port.uuid,
+                    'patch': [{'path': '/address', 'op': 'remove'}]},
+                   {'port': uuidutils.generate_uuid(),
+                    'patch': [{'path': '/extra/foo', 'value': 'bar',
+                               'op': 'add'}]}]
+        response = self.post_json('/ports/bulk_update', updates,
+                                  headers=self.headers)
+        self.assertEqual(200, response.status_int)
+        results = response.json['ports']
+        self.assertEqual([200, 400, 404], [r['status'] for r in results])
+        self.assertEqual(port.uuid, results[0]['port']['uuid'])
+        mock_upd.assert_called_once_with(mock.ANY, mock.ANY, 'test-topic')
+        self.assertEqual({'foo': 'bar'}, mock_upd.call_args[0][1].extra)
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'update_port')
+    def test_bulk_update_rpc_errors(self, mock_upd):
+        port = obj_utils.create_test_port(self.context, node_id=self.node.id)
+        mock_upd.side_effect = [
+            messaging.MessagingTimeout(),
+            messaging.RemoteError('ValueError', 'boom', 'traceback'),
+            port]
+        updates = [{'port': port.uuid,
+                    'patch': [{'path': '/extra/foo', 'value': 'bar',
+                               'op': 'add'}]}] * 3
+        response = self.post_json('/ports/bulk_update', updates,
+                                  headers=self.headers)
+        self.assertEqual(200, response.status_int)
+        results = response.json['ports']
+        self.assertEqual([503, 500, 200], [r['status'] for r in results])
+        self.assertIn('boom', results[1]['error'])
+        self.assertNotIn('traceback', results[1]['error'])
+
+
 @mock.patch.object(rpcapi.ConductorAPI, 'destroy_port')
 class TestDelete(api_base.FunctionalTest):
 
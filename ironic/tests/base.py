@@ -33,6 +33,7 @@ from oslo_context import context as ironic_context
 import testtools
 
 from ironic.common import hash_ring
+from ironic.common import keystone
 from ironic.objects import base as objects_base
 from ironic.openstack.common import log as logging
 from ironic.tests import conf_fixture
@@ -106,6 +107,7 @@ class TestCase(testtools.TestCase):
 
         self.addCleanup(self._clear_attrs)
         self.addCleanup(hash_ring.HashRingManager().reset)
+        self.addCleanup(keystone.reset_admin_client)
         self.useFixture(fixtures.EnvironmentVariable('http_proxy'))
         self.policy = self.useFixture(policy_fixture.PolicyFixture())
         CONF.set_override('fatal_exception_format_errors', True)
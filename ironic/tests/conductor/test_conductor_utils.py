@@ -333,3 +333,29 @@ class CleanupAfterTimeoutTestCase(tests_base.TestCase):
         self.task.driver.deploy.clean_up.assert_called_once_with(self.task)
         self.assertEqual([mock.call()] * 2, self.node.save.call_args_list)
         self.assertIn('Deploy timed out', self.node.last_error)
+
+
+class GetBmcAddressTestCase(tests_base.TestCase):
+
+    def test_get_bmc_address(self):
+        driver_info = {'ipmi_address': '1.2.3.4',
+                       'ipmi_transit_address': '5.6.7.8',
+                       'ipmi_username': 'admin'}
+        self.assertEqual('1.2.3.4',
+                         conductor_utils.get_bmc_address(driver_info))
+
+    def test_get_bmc_address_host(self):
+        driver_info = {'drac_host': 'drac.example.com', 'drac_port': 443}
+        self.assertEqual('drac.example.com',
+                         conductor_utils.get_bmc_address(driver_info))
+
+    def test_get_bmc_address_empty_value(self):
+        driver_info = {'ipmi_address': '', 'ssh_address': '1.2.3.4'}
+        self.assertEqual('1.2.3.4',
+                         conductor_utils.get_bmc_address(driver_info))
+
+    def test_get_bmc_address_unknown(self):
+        self.assertIsNone(conductor_utils.get_bmc_address(
+            {'deploy_kernel': 'kernel'}))
+        self.assertIsNone(conductor_utils.get_bmc_address({}))
+        self.assertIsNone(conductor_utils.get_bmc_address(None))
@@ -39,8 +39,10 @@ from ironic.common import swift
 from ironic.conductor import manager
 from ironic.conductor import task_manager
 from ironic.conductor import utils as conductor_utils
+from ironic.conductor import workers
 from ironic.db import api as dbapi
 from ironic.drivers import base as drivers_base
+from ironic.drivers.modules import ipmitool
 from ironic import objects
 from ironic.tests import base as tests_base
 from ironic.tests.conductor import utils as mgr_utils
@@ -58,7 +60,8 @@ class _CommonMixIn(object):
                  'uuid': uuidutils.generate_uuid(),
                  'power_state': states.POWER_OFF,
                  'maintenance': False,
-                 'reservation': None}
+                 'reservation': None,
+                 'driver_info': {}}
         attrs.update(kwargs)
         node = mock.Mock(spec_set=objects.Node)
         for attr in attrs:
@@ -75,6 +78,19 @@ class _CommonMixIn(object):
         task.node = node
         return task
 
+    def _mock_ring_key_ranges(self):
+        """Helper method to mock the ring key ranges of the conductor.
+
+        :returns: the ring key ranges iter_nodes() will filter nodes with.
+        """
+        ranges = mock.sentinel.ring_key_ranges
+        patcher = mock.patch.object(manager.ConductorManager,
+                                    '_get_ring_key_ranges',
+                                    return_value=ranges)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return ranges
+
     def _get_nodeinfo_list_response(self, nodes=None):
         if nodes is None:
             nodes = [self.node]
@@ -291,12 +307,26 @@ class StartStopTestCase(_ServiceSetUpMixin, tests_db_base.DbTestCase):
                           self.service.init_host)
         self.assertTrue(log_mock.error.called)
 
+    @mock.patch.object(eventlet, 'spawn')
+    def test_start_spawns_keepalive_outside_workers_pool(self, spawn_mock):
+        self._start_service()
+        spawn_mock.assert_called_once_with(
+            self.service._conductor_service_record_keepalive)
+        stats = self.service._worker_pool.stats()
+        self.assertEqual(0, sum(s['spawned'] for s in stats.values()))
+
     @mock.patch.object(eventlet.greenpool.GreenPool, 'waitall')
     def test_del_host_waits_on_workerpool(self, wait_mock):
         self._start_service()
         self.service.del_host()
         self.assertTrue(wait_mock.called)
 
+    @mock.patch.object(ipmitool.SHELL_SESSIONS, 'close', autospec=True)
+    def test_del_host_closes_ipmitool_shell_sessions(self, close_mock):
+        self._start_service()
+        self.service.del_host()
+        close_mock.assert_called_once_with()
+
 
 class KeepAliveTestCase(_ServiceSetUpMixin, tests_db_base.DbTestCase):
     def test__conductor_service_record_keepalive(self):
@@ -392,7 +422,7 @@ class ChangeNodePowerStateTestCase(_ServiceSetUpMixin,
         self._start_service()
 
         with mock.patch.object(self.service,
-                               '_spawn_worker') as spawn_mock:
+                               '_spawn_interactive_worker') as spawn_mock:
             spawn_mock.side_effect = exception.NoFreeConductorWorker()
 
             exc = self.assertRaises(messaging.rpc.ExpectedException,
@@ -475,6 +505,79 @@ class ChangeNodePowerStateTestCase(_ServiceSetUpMixin,
             self.assertIsNone(node.last_error)
 
 
+@_mock_record_keepalive
+class BulkNodeActionsTestCase(_ServiceSetUpMixin, tests_db_base.DbTestCase):
+
+    def test_change_nodes_power_state(self):
+        node = obj_utils.create_test_node(self.context, driver='fake',
+                                          power_state=states.POWER_OFF)
+        locked = obj_utils.create_test_node(
+            self.context, driver='fake', uuid=uuidutils.generate_uuid(),
+            reservation='fake-reserv')
+        self._start_service()
+
+        with mock.patch.object(self.driver.power,
+                               'get_power_state') as get_power_mock:
+            get_power_mock.return_value = states.POWER_OFF
+            results = self.service.change_nodes_power_state(
+                self.context, [node.uuid, locked.uuid], states.POWER_ON)
+            self.service._worker_pool.waitall()
+
+        self.assertEqual({}, results[node.uuid])
+        self.assertEqual(exception.NodeLocked.code,
+                         results[locked.uuid]['code'])
+        self.assertIn('fake-reserv', results[locked.uuid]['error'])
+        node.refresh()
+        self.assertEqual(states.POWER_ON, node.power_state)
+        self.assertIsNone(node.reservation)
+
+    def test_set_nodes_boot_device(self):
+        nodes = [obj_utils.create_test_node(self.context, driver='fake',
+                                            uuid=uuidutils.generate_uuid())
+                 for i in range(3)]
+        self._start_service()
+
+        with mock.patch.object(self.driver.management,
+                               'set_boot_device') as mock_sbd:
+            results = self.service.set_nodes_boot_device(
+                self.context, [n.uuid for n in nodes], boot_devices.PXE,
+                persistent=True)
+
+        self.assertEqual(dict((n.uuid, {}) for n in nodes), results)
+        self.assertEqual(3, mock_sbd.call_count)
+        mock_sbd.assert_called_with(mock.ANY, boot_devices.PXE,
+                                    persistent=True)
+
+    def test_set_nodes_maintenance(self):
+        node = obj_utils.create_test_node(self.context, driver='fake')
+        self._start_service()
+
+        results = self.service.set_nodes_maintenance(
+            self.context, [node.uuid, 'missing'], True, reason='broken')
+
+        self.assertEqual({}, results[node.uuid])
+        self.assertEqual(exception.InvalidIdentity.code,
+                         results['missing']['code'])
+        node.refresh()
+        self.assertTrue(node.maintenance)
+        self.assertEqual('broken', node.maintenance_reason)
+        self.assertIsNone(node.reservation)
+
+    def test__bulk_node_action_unexpected_error(self):
+        self._start_service()
+        method = mock.Mock(__name__='method', side_effect=[ValueError('boom'),
+                                                            'result'])
+
+        results = self.service._bulk_node_action(self.context, ['n1'],
+                                                 method, 'arg')
+        results.update(self.service._bulk_node_action(self.context, ['n2'],
+                                                      method, 'arg'))
+
+        self.assertEqual({'n1': {'error': 'boom', 'code': 500},
+                          'n2': {'result': 'result'}}, results)
+        method.assert_called_with(self.context, 'n2', 'arg')
+
+
 @_mock_record_keepalive
 class UpdateNodeTestCase(_ServiceSetUpMixin, tests_db_base.DbTestCase):
     def test_update_node(self):
@@ -774,8 +877,6 @@ class VendorPassthruTestCase(_ServiceSetUpMixin, tests_db_base.DbTestCase):
                                             'async': False,
                                             'http_methods': ['POST']}}
         self.service.init_host()
-        # init_host() called _spawn_worker because of the heartbeat
-        mock_spawn.reset_mock()
 
         vendor_args = {'test': 'arg'}
         got, is_async = self.service.driver_vendor_passthru(self.context,
@@ -799,8 +900,6 @@ class VendorPassthruTestCase(_ServiceSetUpMixin, tests_db_base.DbTestCase):
                                             'async': True,
                                             'http_methods': ['POST']}}
         self.service.init_host()
-        # init_host() called _spawn_worker because of the heartbeat
-        mock_spawn.reset_mock()
 
         vendor_args = {'test': 'arg'}
         got, is_async = self.service.driver_vendor_passthru(self.context,
@@ -1975,6 +2074,34 @@ class DoNodeCleanTestCase(_ServiceSetUpMixin, tests_db_base.DbTestCase):
 
 @_mock_record_keepalive
 class MiscTestCase(_ServiceSetUpMixin, _CommonMixIn, tests_db_base.DbTestCase):
+    @mock.patch.object(manager, 'LOG')
+    def test__count_db_queries(self, log_mock):
+        node = obj_utils.create_test_node(self.context, driver='fake')
+
+        @manager._count_db_queries
+        def get_node(node_id):
+            return objects.Node.get(self.context, node_id)
+
+        self.assertEqual(node.uuid, get_node(node.uuid).uuid)
+        log_mock.debug.assert_called_once_with(
+            mock.ANY, {'method': 'get_node', 'count': 1})
+
+    @mock.patch.object(manager, 'LOG')
+    def test__count_db_queries_workers(self, log_mock):
+        node = obj_utils.create_test_node(self.context, driver='fake')
+
+        @manager._count_db_queries
+        def get_nodes(node_id):
+            pool = eventlet.greenpool.GreenPool()
+            get = manager._with_query_counters(objects.Node.get)
+            for i in range(2):
+                pool.spawn_n(get, self.context, node_id)
+            pool.waitall()
+
+        get_nodes(node.uuid)
+        log_mock.debug.assert_called_once_with(
+            mock.ANY, {'method': 'get_nodes', 'count': 2})
+
     def test_get_driver_known(self):
         self._start_service()
         driver = self.service._get_driver('fake')
@@ -2024,7 +2151,7 @@ class MiscTestCase(_ServiceSetUpMixin, _CommonMixIn, tests_db_base.DbTestCase):
             mock_iwdi.assert_called_once_with(self.context, node.instance_info)
 
     @mock.patch.object(manager.ConductorManager, '_mapped_to_this_conductor')
-    @mock.patch.object(dbapi.IMPL, 'get_nodeinfo_list')
+    @mock.patch.object(dbapi.IMPL, 'iter_nodeinfo')
     def test_iter_nodes(self, mock_nodeinfo_list, mock_mapped):
         self._start_service()
         self.columns = ['uuid', 'driver', 'id']
@@ -2032,12 +2159,36 @@ class MiscTestCase(_ServiceSetUpMixin, _CommonMixIn, tests_db_base.DbTestCase):
         mock_nodeinfo_list.return_value = self._get_nodeinfo_list_response(
             nodes)
         mock_mapped.side_effect = [True, False]
+        filters = {'reserved': False}
 
         result = list(self.service.iter_nodes(fields=['id'],
-                                              filters=mock.sentinel.filters))
+                                              filters=filters))
         self.assertEqual([(nodes[0].uuid, 'fake', 0)], result)
+        ranges = self.service.ring_manager['fake'].get_key_ranges(
+            self.hostname)
         mock_nodeinfo_list.assert_called_once_with(
-            columns=self.columns, filters=mock.sentinel.filters)
+            columns=self.columns,
+            filters={'reserved': False,
+                     'ring_key_ranges': {'fake': ranges}},
+            batch_size=CONF.conductor.periodic_node_batch_size)
+        self.assertEqual({'reserved': False}, filters)
+
+    def test_iter_nodes_only_mapped_nodes(self):
+        self._start_service()
+        self.service.ring_manager.reset()
+        self.dbapi.register_conductor({'hostname': 'other-host',
+                                       'drivers': ['fake']})
+        nodes = [obj_utils.create_test_node(self.context, id=i,
+                                            uuid=uuidutils.generate_uuid(),
+                                            driver='fake')
+                 for i in range(20)]
+        expected = set(n.uuid for n in nodes
+                       if self.service._mapped_to_this_conductor(n.uuid,
+                                                                 'fake'))
+        self.assertTrue(0 < len(expected) < 20)
+
+        result = set(uuid for uuid, driver in self.service.iter_nodes())
+        self.assertEqual(expected, result)
 
 
 @_mock_record_keepalive
@@ -2046,7 +2197,7 @@ class ConsoleTestCase(_ServiceSetUpMixin, tests_db_base.DbTestCase):
         node = obj_utils.create_test_node(self.context, driver='fake')
         self._start_service()
         with mock.patch.object(self.service,
-                               '_spawn_worker') as spawn_mock:
+                               '_spawn_interactive_worker') as spawn_mock:
             spawn_mock.side_effect = exception.NoFreeConductorWorker()
 
             exc = self.assertRaises(messaging.rpc.ExpectedException,
@@ -2359,7 +2510,7 @@ class UpdatePortTestCase(_ServiceSetUpMixin, tests_db_base.DbTestCase):
         self.assertEqual(expected_result, actual_result)
 
     @mock.patch.object(manager.ConductorManager, '_mapped_to_this_conductor')
-    @mock.patch.object(dbapi.IMPL, 'get_nodeinfo_list')
+    @mock.patch.object(dbapi.IMPL, 'iter_nodeinfo')
     @mock.patch.object(task_manager, 'acquire')
     def test___send_sensor_data(self, acquire_mock, get_nodeinfo_list_mock,
          _mapped_to_this_conductor_mock):
@@ -2384,7 +2535,7 @@ class UpdatePortTestCase(_ServiceSetUpMixin, tests_db_base.DbTestCase):
                 self.assertTrue(validate_mock.called)
 
     @mock.patch.object(manager.ConductorManager, '_mapped_to_this_conductor')
-    @mock.patch.object(dbapi.IMPL, 'get_nodeinfo_list')
+    @mock.patch.object(dbapi.IMPL, 'iter_nodeinfo')
     @mock.patch.object(task_manager, 'acquire')
     def test___send_sensor_data_disabled(self, acquire_mock,
                                          get_nodeinfo_list_mock,
@@ -2408,6 +2559,96 @@ class UpdatePortTestCase(_ServiceSetUpMixin, tests_db_base.DbTestCase):
                 self.assertFalse(get_sensors_data_mock.called)
                 self.assertFalse(validate_mock.called)
 
+    def _test__send_sensor_data_nodes(self, sensors_data_mock, nodes=3):
+        self._start_service()
+        CONF.set_override('send_sensor_data', True, group='conductor')
+        nodes = [obj_utils.create_test_node(
+                     self.context, driver='fake',
+                     uuid=uuidutils.generate_uuid(),
+                     instance_uuid=uuidutils.generate_uuid())
+                 for i in range(nodes)]
+        node_info = [(node.uuid, node.driver, node.instance_uuid)
+                     for node in nodes]
+        with mock.patch.object(self.service, 'iter_nodes',
+                               return_value=iter(node_info)):
+            with mock.patch.object(self.driver.management,
+                                   'get_sensors_data',
+                                   side_effect=sensors_data_mock):
+                with mock.patch.object(self.service,
+                                       'notifier') as notifier_mock:
+                    self.service._send_sensor_data(self.context)
+        return nodes, notifier_mock
+
+    def test___send_sensor_data_one_per_notification(self):
+        nodes, notifier_mock = self._test__send_sensor_data_nodes(
+            lambda task: {'t1': {'f1': task.node.uuid}})
+
+        self.assertEqual(3, notifier_mock.info.call_count)
+        for node, call in zip(nodes, notifier_mock.info.call_args_list):
+            context, event_type, message = call[0]
+            self.assertEqual('hardware.ipmi.metrics', event_type)
+            self.assertEqual(node.uuid, message['node_uuid'])
+            self.assertEqual(node.instance_uuid, message['instance_uuid'])
+            self.assertEqual({'t1': {'f1': node.uuid}}, message['payload'])
+
+    def test___send_sensor_data_batches(self):
+        CONF.set_override('send_sensor_data_batch_size', 2,
+                          group='conductor')
+        nodes, notifier_mock = self._test__send_sensor_data_nodes(
+            lambda task: {'t1': {'f1': task.node.uuid}})
+
+        self.assertEqual(2, notifier_mock.info.call_count)
+        batches = []
+        for call in notifier_mock.info.call_args_list:
+            context, event_type, message = call[0]
+            self.assertEqual('hardware.ipmi.metrics.batch', event_type)
+            self.assertEqual('hardware.ipmi.metrics.batch',
+                             message['event_type'])
+            batches.append([m['node_uuid'] for m in message['payload']])
+        self.assertEqual([[nodes[0].uuid, nodes[1].uuid], [nodes[2].uuid]],
+                         batches)
+
+    def test___send_sensor_data_drops_failed_nodes(self):
+        calls = []
+
+        def get_sensors_data(task):
+            calls.append(task.node.uuid)
+            if len(calls) == 2:
+                raise exception.FailedToGetSensorData(node=task.node.uuid,
+                                                      error='boom')
+            return {'t1': {'f1': 'v1'}}
+
+        nodes, notifier_mock = self._test__send_sensor_data_nodes(
+            get_sensors_data)
+
+        self.assertEqual([nodes[0].uuid, nodes[2].uuid],
+                         [call[0][2]['node_uuid']
+                          for call in notifier_mock.info.call_args_list])
+
+    def _test__send_sensor_data_concurrency(self):
+        active = [0]
+        max_active = [0]
+
+        def get_sensors_data(task):
+            active[0] += 1
+            max_active[0] = max(max_active[0], active[0])
+            eventlet.sleep(0.01)
+            active[0] -= 1
+            return {'t1': {'f1': 'v1'}}
+
+        self._test__send_sensor_data_nodes(get_sensors_data, nodes=4)
+        return max_active[0]
+
+    def test___send_sensor_data_workers(self):
+        CONF.set_override('send_sensor_data_workers', 4, group='conductor')
+        self.assertEqual(4, self._test__send_sensor_data_concurrency())
+
+    def test___send_sensor_data_driver_concurrency(self):
+        CONF.set_override('send_sensor_data_workers', 4, group='conductor')
+        CONF.set_override('send_sensor_data_driver_concurrency', 2,
+                          group='conductor')
+        self.assertEqual(2, self._test__send_sensor_data_concurrency())
+
     def test_set_boot_device(self):
         node = obj_utils.create_test_node(self.context, driver='fake')
         with mock.patch.object(self.driver.management, 'validate') as mock_val:
@@ -2508,25 +2749,44 @@ class ManagerSpawnWorkerTestCase(tests_base.TestCase):
         super(ManagerSpawnWorkerTestCase, self).setUp()
         self.service = manager.ConductorManager('hostname', 'test-topic')
 
-    def test__spawn_worker(self):
-        worker_pool = mock.Mock(spec_set=['free', 'spawn'])
-        worker_pool.free.return_value = True
+    def _test__spawn_worker(self, spawn_method, priority):
+        worker_pool = mock.Mock(spec_set=['spawn'])
         self.service._worker_pool = worker_pool
 
-        self.service._spawn_worker('fake', 1, 2, foo='bar', cat='meow')
+        spawn_method('fake', 1, 2, foo='bar', cat='meow')
 
         worker_pool.spawn.assert_called_once_with(
-                'fake', 1, 2, foo='bar', cat='meow')
+                priority, 'fake', 1, 2, foo='bar', cat='meow')
+
+    def test__spawn_worker(self):
+        self._test__spawn_worker(self.service._spawn_worker,
+                                 workers.PROVISION)
+
+    def test__spawn_interactive_worker(self):
+        self._test__spawn_worker(self.service._spawn_interactive_worker,
+                                 workers.INTERACTIVE)
+
+    def test__spawn_periodic_worker(self):
+        self._test__spawn_worker(self.service._spawn_periodic_worker,
+                                 workers.PERIODIC)
 
     def test__spawn_worker_none_free(self):
-        worker_pool = mock.Mock(spec_set=['free', 'spawn'])
-        worker_pool.free.return_value = False
+        worker_pool = mock.Mock(spec_set=['spawn'])
+        worker_pool.spawn.side_effect = exception.NoFreeConductorWorker()
         self.service._worker_pool = worker_pool
 
         self.assertRaises(exception.NoFreeConductorWorker,
                           self.service._spawn_worker, 'fake')
 
-        self.assertFalse(worker_pool.spawn.called)
+    def test__spawn_worker_waits_for_free_slot(self):
+        pool = workers.WorkerPool(1, queue_size=1)
+        self.service._worker_pool = pool
+        results = []
+        self.service._spawn_worker(results.append, 'deploy')
+        self.service._spawn_interactive_worker(results.append, 'power')
+        self.assertEqual(1, pool.stats()[workers.INTERACTIVE]['waiting'])
+        pool.waitall()
+        self.assertEqual(['deploy', 'power'], results)
 
 
 @mock.patch.object(conductor_utils, 'node_power_action')
@@ -2727,104 +2987,61 @@ class ManagerDoSyncPowerStateTestCase(tests_db_base.DbTestCase):
 @mock.patch.object(manager, 'do_sync_power_state')
 @mock.patch.object(task_manager, 'acquire')
 @mock.patch.object(manager.ConductorManager, '_mapped_to_this_conductor')
-@mock.patch.object(objects.Node, 'get_by_id')
-@mock.patch.object(dbapi.IMPL, 'get_nodeinfo_list')
+@mock.patch.object(dbapi.IMPL, 'iter_nodeinfo')
 class ManagerSyncPowerStatesTestCase(_CommonMixIn, tests_db_base.DbTestCase):
     def setUp(self):
         super(ManagerSyncPowerStatesTestCase, self).setUp()
         self.service = manager.ConductorManager('hostname', 'test-topic')
         self.service.dbapi = self.dbapi
         self.node = self._create_node()
-        self.filters = {'reserved': False, 'maintenance': False}
-        self.columns = ['uuid', 'driver', 'id']
+        self.filters = {'maintenance': False,
+                        'ring_key_ranges': self._mock_ring_key_ranges()}
+        self.columns = ['uuid', 'driver', 'driver_info', 'reservation']
+        self.acquire_filters = {'maintenance': False,
+                                'provision_state_not_in': [states.DEPLOYWAIT]}
 
-    def test_node_not_mapped(self, get_nodeinfo_mock, get_node_mock,
+    def _acquire_call(self, node):
+        return mock.call(self.context, node.uuid,
+                         filters=self.acquire_filters, retry=False)
+
+    def test_node_not_mapped(self, get_nodeinfo_mock,
                              mapped_mock, acquire_mock, sync_mock):
         get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response()
-        get_node_mock.return_value = self.node
         mapped_mock.return_value = False
 
         self.service._sync_power_states(self.context)
 
         get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
+                columns=self.columns, filters=self.filters,
+                batch_size=CONF.conductor.periodic_node_batch_size)
         mapped_mock.assert_called_once_with(self.node.uuid,
                                             self.node.driver)
-        self.assertFalse(get_node_mock.called)
         self.assertFalse(acquire_mock.called)
         self.assertFalse(sync_mock.called)
 
-    def test_node_disappeared(self, get_nodeinfo_mock, get_node_mock,
-                              mapped_mock, acquire_mock, sync_mock):
+    def test_node_filters_not_matched_on_acquire(self, get_nodeinfo_mock,
+                                                 mapped_mock, acquire_mock,
+                                                 sync_mock):
         get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response()
-        get_node_mock.return_value = self.node
         mapped_mock.return_value = True
-        get_node_mock.side_effect = exception.NodeNotFound(node=self.node.uuid)
-
-        self.service._sync_power_states(self.context)
-
-        get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
-        mapped_mock.assert_called_once_with(self.node.uuid,
-                                            self.node.driver)
-        get_node_mock.assert_called_once_with(self.context, self.node.id)
-        self.assertFalse(acquire_mock.called)
-        self.assertFalse(sync_mock.called)
-
-    def test_node_in_deploywait(self, get_nodeinfo_mock, get_node_mock,
-                                mapped_mock, acquire_mock, sync_mock):
-        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response()
-        get_node_mock.return_value = self.node
-        self.node.provision_state = states.DEPLOYWAIT
-        self.node.target_provision_state = states.ACTIVE
-        self.node.save()
+        acquire_mock.side_effect = exception.NodeFiltersNotMatched(
+                node=self.node.uuid)
 
         self.service._sync_power_states(self.context)
 
         get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
-        mapped_mock.assert_called_once_with(self.node.uuid,
-                                            self.node.driver)
-        get_node_mock.assert_called_once_with(self.context, self.node.id)
-        self.assertFalse(acquire_mock.called)
-        self.assertFalse(sync_mock.called)
-
-    def test_node_in_maintenance(self, get_nodeinfo_mock, get_node_mock,
-                                 mapped_mock, acquire_mock, sync_mock):
-        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response()
-        get_node_mock.return_value = self.node
-        self.node.maintenance = True
-
-        self.service._sync_power_states(self.context)
-
-        get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
-        mapped_mock.assert_called_once_with(self.node.uuid,
-                                            self.node.driver)
-        get_node_mock.assert_called_once_with(self.context, self.node.id)
-        self.assertFalse(acquire_mock.called)
-        self.assertFalse(sync_mock.called)
-
-    def test_node_has_reservation(self, get_nodeinfo_mock, get_node_mock,
-                                  mapped_mock, acquire_mock, sync_mock):
-        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response()
-        get_node_mock.return_value = self.node
-        self.node.reservation = 'fake'
-
-        self.service._sync_power_states(self.context)
-
-        get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
+                columns=self.columns, filters=self.filters,
+                batch_size=CONF.conductor.periodic_node_batch_size)
         mapped_mock.assert_called_once_with(self.node.uuid,
                                             self.node.driver)
-        get_node_mock.assert_called_once_with(self.context, self.node.id)
-        self.assertFalse(acquire_mock.called)
+        acquire_mock.assert_called_once_with(self.context, self.node.uuid,
+                                             filters=self.acquire_filters,
+                                             retry=False)
         self.assertFalse(sync_mock.called)
 
-    def test_node_locked_on_acquire(self, get_nodeinfo_mock, get_node_mock,
+    def test_node_locked_on_acquire(self, get_nodeinfo_mock,
                                     mapped_mock, acquire_mock, sync_mock):
         get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response()
-        get_node_mock.return_value = self.node
         mapped_mock.return_value = True
         acquire_mock.side_effect = exception.NodeLocked(node=self.node.uuid,
                                                         host='fake')
@@ -2832,60 +3049,19 @@ class ManagerSyncPowerStatesTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         self.service._sync_power_states(self.context)
 
         get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
-        mapped_mock.assert_called_once_with(self.node.uuid,
-                                            self.node.driver)
-        get_node_mock.assert_called_once_with(self.context, self.node.id)
-        acquire_mock.assert_called_once_with(self.context, self.node.uuid)
-        self.assertFalse(sync_mock.called)
-
-    def test_node_in_deploywait_on_acquire(self, get_nodeinfo_mock,
-                                           get_node_mock, mapped_mock,
-                                           acquire_mock, sync_mock):
-        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response()
-        get_node_mock.return_value = self.node
-        mapped_mock.return_value = True
-        task = self._create_task(
-                node_attrs=dict(provision_state=states.DEPLOYWAIT,
-                                target_provision_state=states.ACTIVE,
-                                uuid=self.node.uuid))
-        acquire_mock.side_effect = self._get_acquire_side_effect(task)
-
-        self.service._sync_power_states(self.context)
-
-        get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
-        mapped_mock.assert_called_once_with(self.node.uuid,
-                                            self.node.driver)
-        get_node_mock.assert_called_once_with(self.context, self.node.id)
-        acquire_mock.assert_called_once_with(self.context, self.node.uuid)
-        self.assertFalse(sync_mock.called)
-
-    def test_node_in_maintenance_on_acquire(self, get_nodeinfo_mock,
-                                            get_node_mock, mapped_mock,
-                                            acquire_mock, sync_mock):
-        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response()
-        get_node_mock.return_value = self.node
-        mapped_mock.return_value = True
-        task = self._create_task(
-                node_attrs=dict(maintenance=True, uuid=self.node.uuid))
-        acquire_mock.side_effect = self._get_acquire_side_effect(task)
-
-        self.service._sync_power_states(self.context)
-
-        get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
+                columns=self.columns, filters=self.filters,
+                batch_size=CONF.conductor.periodic_node_batch_size)
         mapped_mock.assert_called_once_with(self.node.uuid,
                                             self.node.driver)
-        get_node_mock.assert_called_once_with(self.context, self.node.id)
-        acquire_mock.assert_called_once_with(self.context, self.node.uuid)
+        acquire_mock.assert_called_once_with(self.context, self.node.uuid,
+                                             filters=self.acquire_filters,
+                                             retry=False)
         self.assertFalse(sync_mock.called)
 
     def test_node_disappears_on_acquire(self, get_nodeinfo_mock,
-                                        get_node_mock, mapped_mock,
-                                        acquire_mock, sync_mock):
+                                        mapped_mock, acquire_mock,
+                                        sync_mock):
         get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response()
-        get_node_mock.return_value = self.node
         mapped_mock.return_value = True
         acquire_mock.side_effect = exception.NodeNotFound(node=self.node.uuid,
                                                           host='fake')
@@ -2893,17 +3069,18 @@ class ManagerSyncPowerStatesTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         self.service._sync_power_states(self.context)
 
         get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
+                columns=self.columns, filters=self.filters,
+                batch_size=CONF.conductor.periodic_node_batch_size)
         mapped_mock.assert_called_once_with(self.node.uuid,
                                             self.node.driver)
-        get_node_mock.assert_called_once_with(self.context, self.node.id)
-        acquire_mock.assert_called_once_with(self.context, self.node.uuid)
+        acquire_mock.assert_called_once_with(self.context, self.node.uuid,
+                                             filters=self.acquire_filters,
+                                             retry=False)
         self.assertFalse(sync_mock.called)
 
-    def test_single_node(self, get_nodeinfo_mock, get_node_mock,
+    def test_single_node(self, get_nodeinfo_mock,
                          mapped_mock, acquire_mock, sync_mock):
         get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response()
-        get_node_mock.return_value = self.node
         mapped_mock.return_value = True
         task = self._create_task(node_attrs=dict(uuid=self.node.uuid))
         acquire_mock.side_effect = self._get_acquire_side_effect(task)
@@ -2911,68 +3088,43 @@ class ManagerSyncPowerStatesTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         self.service._sync_power_states(self.context)
 
         get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
+                columns=self.columns, filters=self.filters,
+                batch_size=CONF.conductor.periodic_node_batch_size)
         mapped_mock.assert_called_once_with(self.node.uuid,
                                             self.node.driver)
-        get_node_mock.assert_called_once_with(self.context, self.node.id)
-        acquire_mock.assert_called_once_with(self.context, self.node.uuid)
+        acquire_mock.assert_called_once_with(self.context, self.node.uuid,
+                                             filters=self.acquire_filters,
+                                             retry=False)
         sync_mock.assert_called_once_with(task, mock.ANY)
 
     def test__sync_power_state_multiple_nodes(self, get_nodeinfo_mock,
-                                              get_node_mock, mapped_mock,
-                                              acquire_mock, sync_mock):
-        # Create 11 nodes:
+                                              mapped_mock, acquire_mock,
+                                              sync_mock):
+        # Create 6 nodes:
         # 1st node: Should acquire and try to sync
         # 2nd node: Not mapped to this conductor
-        # 3rd node: In DEPLOYWAIT provision_state
-        # 4th node: In maintenance mode
-        # 5th node: Has a reservation
-        # 6th node: Disappears after getting nodeinfo list.
-        # 7th node: task_manger.acquire() fails due to lock
-        # 8th node: task_manger.acquire() fails due to node disappearing
-        # 9th node: In DEPLOYWAIT provision_state acquire()
-        # 10th node: In maintenance mode on acquire()
-        # 11th node: Should acquire and try to sync
+        # 3rd node: task_manger.acquire() fails due to lock
+        # 4th node: task_manger.acquire() fails due to node disappearing
+        # 5th node: task_manger.acquire() fails due to filters not matching
+        # 6th node: Should acquire and try to sync
         nodes = []
-        get_node_map = {}
         mapped_map = {}
-        for i in range(1, 12):
+        for i in range(1, 7):
             attrs = {'id': i,
                      'uuid': uuidutils.generate_uuid()}
-            if i == 3:
-                attrs['provision_state'] = states.DEPLOYWAIT
-                attrs['target_provision_state'] = states.ACTIVE
-            elif i == 4:
-                attrs['maintenance'] = True
-            elif i == 5:
-                attrs['reservation'] = 'fake'
-
             n = self._create_node(**attrs)
             nodes.append(n)
             mapped_map[n.uuid] = False if i == 2 else True
-            get_node_map[n.uuid] = n
 
         tasks = [self._create_task(node_attrs=dict(uuid=nodes[0].uuid)),
-                 exception.NodeLocked(node=7, host='fake'),
-                 exception.NodeNotFound(node=8, host='fake'),
-                 self._create_task(
-                     node_attrs=dict(uuid=nodes[8].uuid,
-                                    provision_state=states.DEPLOYWAIT,
-                                    target_provision_state=states.ACTIVE)),
-                 self._create_task(
-                     node_attrs=dict(uuid=nodes[9].uuid, maintenance=True)),
-                 self._create_task(node_attrs=dict(uuid=nodes[10].uuid))]
-
-        def _get_node_side_effect(ctxt, node_id):
-            if node_id == 6:
-                # Make this node disappear
-                raise exception.NodeNotFound(node=node_id)
-            return nodes[node_id - 1]
+                 exception.NodeLocked(node=3, host='fake'),
+                 exception.NodeNotFound(node=4, host='fake'),
+                 exception.NodeFiltersNotMatched(node=5),
+                 self._create_task(node_attrs=dict(uuid=nodes[5].uuid))]
 
         get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response(
                 nodes)
         mapped_mock.side_effect = lambda x, y: mapped_map[x]
-        get_node_mock.side_effect = _get_node_side_effect
         acquire_mock.side_effect = self._get_acquire_side_effect(tasks)
 
         with mock.patch.object(eventlet, 'sleep') as sleep_mock:
@@ -2982,24 +3134,258 @@ class ManagerSyncPowerStatesTestCase(_CommonMixIn, tests_db_base.DbTestCase):
             self.assertEqual(len(nodes) - 1, sleep_mock.call_count)
 
         get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
+                columns=self.columns, filters=self.filters,
+                batch_size=CONF.conductor.periodic_node_batch_size)
         mapped_calls = [mock.call(x.uuid, x.driver) for x in nodes]
         self.assertEqual(mapped_calls, mapped_mock.call_args_list)
-        get_node_calls = [mock.call(self.context, x.id)
-                for x in nodes[:1] + nodes[2:]]
-        self.assertEqual(get_node_calls,
-                         get_node_mock.call_args_list)
-        acquire_calls = [mock.call(self.context, x.uuid)
-                for x in nodes[:1] + nodes[6:]]
+        acquire_calls = [self._acquire_call(x)
+                         for x in nodes[:1] + nodes[2:]]
         self.assertEqual(acquire_calls, acquire_mock.call_args_list)
         sync_calls = [mock.call(tasks[0], mock.ANY),
-                      mock.call(tasks[5], mock.ANY)]
+                      mock.call(tasks[4], mock.ANY)]
         self.assertEqual(sync_calls, sync_mock.call_args_list)
 
+    @mock.patch.object(manager, '_time')
+    def test_deadline_defers_nodes(self, time_mock, get_nodeinfo_mock,
+                                   mapped_mock, acquire_mock, sync_mock):
+        self.config(sync_power_state_pass_timeout=10, group='conductor')
+        nodes = [self._create_node(id=i, uuid=uuidutils.generate_uuid())
+                 for i in range(1, 4)]
+        tasks = [self._create_task(node_attrs=dict(uuid=n.uuid))
+                 for n in nodes]
+        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response(
+                nodes)
+        mapped_mock.return_value = True
+        acquire_mock.side_effect = self._get_acquire_side_effect(tasks[0])
+        # start, 1st node, 2nd node (deadline reached), 3rd node, end
+        time_mock.side_effect = [0, 5, 10, 11, 12]
+
+        self.service._sync_power_states(self.context)
+
+        acquire_mock.assert_called_once_with(self.context, nodes[0].uuid,
+                                             filters=self.acquire_filters,
+                                             retry=False)
+
+        # The deferred nodes are synced first during the next pass
+        acquire_mock.reset_mock()
+        time_mock.side_effect = [20, 21, 22, 23, 24]
+        acquire_mock.side_effect = self._get_acquire_side_effect(
+                [tasks[1], tasks[2], tasks[0]])
+
+        self.service._sync_power_states(self.context)
+
+        acquire_calls = [self._acquire_call(nodes[1]),
+                         self._acquire_call(nodes[2]),
+                         self._acquire_call(nodes[0])]
+        self.assertEqual(acquire_calls, acquire_mock.call_args_list)
+
+    def test_bmc_concurrency(self, get_nodeinfo_mock,
+                             mapped_mock, acquire_mock, sync_mock):
+        driver_info = {'ipmi_address': '1.2.3.4'}
+        nodes = [self._create_node(id=i, uuid=uuidutils.generate_uuid(),
+                                   driver_info=driver_info)
+                 for i in range(1, 4)]
+        tasks = [self._create_task(node_attrs=dict(uuid=n.uuid))
+                 for n in nodes]
+        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response(
+                nodes)
+        mapped_mock.return_value = True
+        acquire_mock.side_effect = self._get_acquire_side_effect(tasks)
+
+        running = []
+        max_running = []
+
+        def _sync(task, count):
+            running.append(task)
+            max_running.append(len(running))
+            eventlet.sleep(0.01)
+            running.remove(task)
+            return 0
+
+        sync_mock.side_effect = _sync
+
+        self.service._sync_power_states(self.context)
+
+        self.assertEqual(3, sync_mock.call_count)
+        self.assertEqual(1, max(max_running))
+
+    def test_busy_bmc_does_not_block_workers(self, get_nodeinfo_mock,
+                                             mapped_mock, acquire_mock,
+                                             sync_mock):
+        self.config(sync_power_state_workers=2, group='conductor')
+        nodes = [self._create_node(id=i, uuid=uuidutils.generate_uuid(),
+                                   driver_info={'ipmi_address': address})
+                 for i, address in ((1, '1.2.3.4'), (2, '1.2.3.4'),
+                                    (3, '5.6.7.8'))]
+        tasks = [self._create_task(node_attrs=dict(uuid=n.uuid))
+                 for n in nodes]
+        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response(
+                nodes)
+        mapped_mock.return_value = True
+        # The node of the other BMC is synced while the first BMC is busy
+        order = [tasks[0], tasks[2], tasks[1]]
+        acquire_mock.side_effect = self._get_acquire_side_effect(order)
+
+        def _sync(task, count):
+            eventlet.sleep(0.01)
+            return 0
+
+        sync_mock.side_effect = _sync
+
+        self.service._sync_power_states(self.context)
+
+        self.assertEqual([self._acquire_call(nodes[i]) for i in (0, 2, 1)],
+                         acquire_mock.call_args_list)
+        self.assertEqual(order, [c[0][0] for c in sync_mock.call_args_list])
+
+    def _sync_passes(self, passes, get_nodeinfo_mock, acquire_mock):
+        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response()
+        synced = []
+        for i in range(passes):
+            acquire_mock.reset_mock()
+            task = self._create_task(node=self.node)
+            acquire_mock.side_effect = self._get_acquire_side_effect(task)
+            self.service._sync_power_states(self.context)
+            synced.append(acquire_mock.called)
+        return synced
+
+    def test_stable_node_backoff(self, get_nodeinfo_mock,
+                                 mapped_mock, acquire_mock, sync_mock):
+        self.config(sync_power_state_interval=60,
+                    sync_power_state_max_interval=240, group='conductor')
+        mapped_mock.return_value = True
+        sync_mock.return_value = 0
+
+        synced = self._sync_passes(8, get_nodeinfo_mock, acquire_mock)
+
+        self.assertEqual([True, False, True, False, False, False, True,
+                          False], synced)
+
+    def test_reserved_node_keeps_schedule(self, get_nodeinfo_mock,
+                                          mapped_mock, acquire_mock,
+                                          sync_mock):
+        self.config(sync_power_state_interval=60,
+                    sync_power_state_max_interval=240, group='conductor')
+        mapped_mock.return_value = True
+        sync_mock.return_value = 0
+
+        synced = self._sync_passes(1, get_nodeinfo_mock, acquire_mock)
+        self.node.reservation = 'other-host'
+        synced += self._sync_passes(1, get_nodeinfo_mock, acquire_mock)
+        self.node.reservation = None
+        synced += self._sync_passes(5, get_nodeinfo_mock, acquire_mock)
+
+        # The backoff goes on as if the node had not been reserved
+        self.assertEqual([True, False, True, False, False, False, True],
+                         synced)
+
+    def test_reserved_node_stays_due(self, get_nodeinfo_mock,
+                                     mapped_mock, acquire_mock, sync_mock):
+        mapped_mock.return_value = True
+        self.node.reservation = 'other-host'
+
+        synced = self._sync_passes(2, get_nodeinfo_mock, acquire_mock)
+        self.node.reservation = None
+        synced += self._sync_passes(1, get_nodeinfo_mock, acquire_mock)
+
+        self.assertEqual([False, False, True], synced)
+
+    def test_changed_node_no_backoff(self, get_nodeinfo_mock,
+                                     mapped_mock, acquire_mock, sync_mock):
+        self.config(sync_power_state_interval=60,
+                    sync_power_state_max_interval=240, group='conductor')
+        mapped_mock.return_value = True
+
+        def _sync(task, count):
+            task.node.power_state = (states.POWER_ON
+                                     if task.node.power_state ==
+                                     states.POWER_OFF else states.POWER_OFF)
+            return 0
+
+        sync_mock.side_effect = _sync
+
+        synced = self._sync_passes(4, get_nodeinfo_mock, acquire_mock)
+
+        self.assertEqual([True] * 4, synced)
+
+    def test_failing_node_no_backoff(self, get_nodeinfo_mock,
+                                     mapped_mock, acquire_mock, sync_mock):
+        self.config(sync_power_state_interval=60,
+                    sync_power_state_max_interval=240, group='conductor')
+        mapped_mock.return_value = True
+        sync_mock.return_value = 1
+
+        synced = self._sync_passes(4, get_nodeinfo_mock, acquire_mock)
+
+        self.assertEqual([True] * 4, synced)
+
+    def test_no_backoff_by_default(self, get_nodeinfo_mock,
+                                   mapped_mock, acquire_mock, sync_mock):
+        mapped_mock.return_value = True
+        sync_mock.return_value = 0
+
+        synced = self._sync_passes(4, get_nodeinfo_mock, acquire_mock)
+
+        self.assertEqual([True] * 4, synced)
+
+    @mock.patch.object(eventlet, 'sleep')
+    @mock.patch.object(manager, '_time')
+    def test_max_rate(self, time_mock, sleep_mock, get_nodeinfo_mock,
+                      mapped_mock, acquire_mock, sync_mock):
+        # 4 nodes/sec shared by 2 conductors
+        self.config(sync_power_state_max_rate=4, group='conductor')
+        self.service.ring_manager = mock.Mock()
+        self.service.ring_manager.ring = {
+            'fake': mock.Mock(hosts=set(['hostname', 'other-host'])),
+            'other': mock.Mock(hosts=set(['hostname']))}
+        nodes = [self._create_node(id=i, uuid=uuidutils.generate_uuid())
+                 for i in range(1, 4)]
+        tasks = [self._create_task(node_attrs=dict(uuid=n.uuid))
+                 for n in nodes]
+        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response(
+                nodes)
+        mapped_mock.return_value = True
+        acquire_mock.side_effect = self._get_acquire_side_effect(tasks)
+        time_mock.return_value = 0
+
+        self.service._sync_power_states(self.context)
+
+        self.assertEqual(3, acquire_mock.call_count)
+        self.assertIn(mock.call(0.5), sleep_mock.call_args_list)
+        self.assertIn(mock.call(1.0), sleep_mock.call_args_list)
+
+    @mock.patch.object(eventlet, 'sleep')
+    @mock.patch.object(manager, '_time')
+    def test_max_rate_ignores_reserved_nodes(self, time_mock, sleep_mock,
+                                             get_nodeinfo_mock, mapped_mock,
+                                             acquire_mock, sync_mock):
+        self.config(sync_power_state_max_rate=2, group='conductor')
+        self.service.ring_manager = mock.Mock()
+        self.service.ring_manager.ring = {
+            'fake': mock.Mock(hosts=set(['hostname']))}
+        reserved = self._create_node(id=1, uuid=uuidutils.generate_uuid(),
+                                     reservation='other-host')
+        nodes = [self._create_node(id=i, uuid=uuidutils.generate_uuid())
+                 for i in range(2, 4)]
+        tasks = [self._create_task(node_attrs=dict(uuid=n.uuid))
+                 for n in nodes]
+        get_nodeinfo_mock.return_value = self._get_nodeinfo_list_response(
+                [reserved] + nodes)
+        mapped_mock.return_value = True
+        acquire_mock.side_effect = self._get_acquire_side_effect(tasks)
+        time_mock.return_value = 0
+
+        self.service._sync_power_states(self.context)
+
+        self.assertEqual(2, acquire_mock.call_count)
+        # The 2nd synced node waits for half a second, not for a second
+        self.assertIn(mock.call(0.5), sleep_mock.call_args_list)
+        self.assertNotIn(mock.call(1.0), sleep_mock.call_args_list)
+
 
 @mock.patch.object(task_manager, 'acquire')
 @mock.patch.object(manager.ConductorManager, '_mapped_to_this_conductor')
-@mock.patch.object(dbapi.IMPL, 'get_nodeinfo_list')
+@mock.patch.object(dbapi.IMPL, 'iter_nodeinfo')
 class ManagerCheckDeployTimeoutsTestCase(_CommonMixIn,
                                          tests_db_base.DbTestCase):
     def setUp(self):
@@ -3018,13 +3404,15 @@ class ManagerCheckDeployTimeoutsTestCase(_CommonMixIn,
 
         self.filters = {'reserved': False, 'maintenance': False,
                         'provisioned_before': 300,
-                        'provision_state': states.DEPLOYWAIT}
+                        'provision_state': states.DEPLOYWAIT,
+                        'ring_key_ranges': self._mock_ring_key_ranges()}
         self.columns = ['uuid', 'driver']
 
     def _assert_get_nodeinfo_args(self, get_nodeinfo_mock):
         get_nodeinfo_mock.assert_called_once_with(
                 columns=self.columns, filters=self.filters,
-                sort_key='provision_updated_at', sort_dir='asc')
+                sort_key='provision_updated_at', sort_dir='asc',
+                batch_size=CONF.conductor.periodic_node_batch_size)
 
     def test_disabled(self, get_nodeinfo_mock, mapped_mock,
                       acquire_mock):
@@ -3058,7 +3446,7 @@ class ManagerCheckDeployTimeoutsTestCase(_CommonMixIn,
         acquire_mock.assert_called_once_with(self.context, self.node.uuid)
         self.task.process_event.assert_called_with(
                 'fail',
-                callback=self.service._spawn_worker,
+                callback=self.service._spawn_periodic_worker,
                 call_args=(conductor_utils.cleanup_after_timeout, self.task),
                 err_handler=manager.provisioning_error_handler)
 
@@ -3140,7 +3528,7 @@ class ManagerCheckDeployTimeoutsTestCase(_CommonMixIn,
         # Second node spawned
         self.task2.process_event.assert_called_with(
                 'fail',
-                callback=self.service._spawn_worker,
+                callback=self.service._spawn_periodic_worker,
                 call_args=(conductor_utils.cleanup_after_timeout, self.task2),
                 err_handler=manager.provisioning_error_handler)
 
@@ -3164,7 +3552,7 @@ class ManagerCheckDeployTimeoutsTestCase(_CommonMixIn,
                                              self.node.uuid)
         self.task.process_event.assert_called_with(
                 'fail',
-                callback=self.service._spawn_worker,
+                callback=self.service._spawn_periodic_worker,
                 call_args=(conductor_utils.cleanup_after_timeout, self.task),
                 err_handler=manager.provisioning_error_handler)
 
@@ -3190,7 +3578,7 @@ class ManagerCheckDeployTimeoutsTestCase(_CommonMixIn,
                                              self.node.uuid)
         self.task.process_event.assert_called_with(
                 'fail',
-                callback=self.service._spawn_worker,
+                callback=self.service._spawn_periodic_worker,
                 call_args=(conductor_utils.cleanup_after_timeout, self.task),
                 err_handler=manager.provisioning_error_handler)
 
@@ -3215,7 +3603,7 @@ class ManagerCheckDeployTimeoutsTestCase(_CommonMixIn,
                          acquire_mock.call_args_list)
         process_event_call = mock.call(
                 'fail',
-                callback=self.service._spawn_worker,
+                callback=self.service._spawn_periodic_worker,
                 call_args=(conductor_utils.cleanup_after_timeout, self.task),
                 err_handler=manager.provisioning_error_handler)
         self.assertEqual([process_event_call] * 2,
@@ -3363,7 +3751,7 @@ class ManagerTestProperties(tests_db_base.DbTestCase):
 @mock.patch.object(keystone, 'get_admin_auth_token')
 @mock.patch.object(task_manager, 'acquire')
 @mock.patch.object(manager.ConductorManager, '_mapped_to_this_conductor')
-@mock.patch.object(dbapi.IMPL, 'get_nodeinfo_list')
+@mock.patch.object(dbapi.IMPL, 'iter_nodeinfo')
 class ManagerSyncLocalStateTestCase(_CommonMixIn, tests_db_base.DbTestCase):
 
     def setUp(self):
@@ -3381,12 +3769,14 @@ class ManagerSyncLocalStateTestCase(_CommonMixIn, tests_db_base.DbTestCase):
 
         self.filters = {'reserved': False,
                         'maintenance': False,
-                        'provision_state': states.ACTIVE}
+                        'provision_state': states.ACTIVE,
+                        'ring_key_ranges': self._mock_ring_key_ranges()}
         self.columns = ['uuid', 'driver', 'id', 'conductor_affinity']
 
     def _assert_get_nodeinfo_args(self, get_nodeinfo_mock):
         get_nodeinfo_mock.assert_called_once_with(
-                columns=self.columns, filters=self.filters)
+                columns=self.columns, filters=self.filters,
+                batch_size=CONF.conductor.periodic_node_batch_size)
 
     def test_not_mapped(self, get_nodeinfo_mock, mapped_mock, acquire_mock,
                         get_authtoken_mock):
@@ -3399,7 +3789,7 @@ class ManagerSyncLocalStateTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         mapped_mock.assert_called_once_with(self.node.uuid, self.node.driver)
         self.assertFalse(acquire_mock.called)
         self.assertFalse(get_authtoken_mock.called)
-        self.service.ring_manager.reset.assert_called_once_with()
+        self.service.ring_manager.refresh.assert_called_once_with()
 
     def test_already_mapped(self, get_nodeinfo_mock, mapped_mock,
                              acquire_mock, get_authtoken_mock):
@@ -3416,7 +3806,7 @@ class ManagerSyncLocalStateTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         mapped_mock.assert_called_once_with(self.node.uuid, self.node.driver)
         self.assertFalse(acquire_mock.called)
         self.assertFalse(get_authtoken_mock.called)
-        self.service.ring_manager.reset.assert_called_once_with()
+        self.service.ring_manager.refresh.assert_called_once_with()
 
     @mock.patch.object(context, 'get_admin_context')
     def test_good(self, get_ctx_mock, get_nodeinfo_mock, mapped_mock,
@@ -3434,7 +3824,7 @@ class ManagerSyncLocalStateTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         acquire_mock.assert_called_once_with(self.context, self.node.uuid)
         # assert spawn_after has been called
         self.task.spawn_after.assert_called_once_with(
-                self.service._spawn_worker,
+                self.service._spawn_periodic_worker,
                 self.service._do_takeover, self.task)
 
     @mock.patch.object(context, 'get_admin_context')
@@ -3472,7 +3862,7 @@ class ManagerSyncLocalStateTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         get_authtoken_mock.assert_called_once_with()
 
         # assert spawn_after has been called twice
-        expected = [mock.call(self.service._spawn_worker,
+        expected = [mock.call(self.service._spawn_periodic_worker,
                     self.service._do_takeover, self.task)] * 2
         self.assertEqual(expected, self.task.spawn_after.call_args_list)
 
@@ -3505,7 +3895,7 @@ class ManagerSyncLocalStateTestCase(_CommonMixIn, tests_db_base.DbTestCase):
         get_authtoken_mock.assert_called_once_with()
 
         # assert spawn_after has been called only 2 times
-        expected = [mock.call(self.service._spawn_worker,
+        expected = [mock.call(self.service._spawn_periodic_worker,
                     self.service._do_takeover, self.task)] * 2
         self.assertEqual(expected, self.task.spawn_after.call_args_list)
 
@@ -3540,7 +3930,7 @@ class ManagerSyncLocalStateTestCase(_CommonMixIn, tests_db_base.DbTestCase):
 
         # assert spawn_after has been called
         self.task.spawn_after.assert_called_once_with(
-                self.service._spawn_worker,
+                self.service._spawn_periodic_worker,
                 self.service._do_takeover, self.task)
 
 
@@ -3717,7 +4107,7 @@ class NodeInspectHardware(_ServiceSetUpMixin,
 
 @mock.patch.object(task_manager, 'acquire')
 @mock.patch.object(manager.ConductorManager, '_mapped_to_this_conductor')
-@mock.patch.object(dbapi.IMPL, 'get_nodeinfo_list')
+@mock.patch.object(dbapi.IMPL, 'iter_nodeinfo')
 class ManagerCheckInspectTimeoutsTestCase(_CommonMixIn,
                                          tests_db_base.DbTestCase):
     def setUp(self):
@@ -3736,13 +4126,15 @@ class ManagerCheckInspectTimeoutsTestCase(_CommonMixIn,
 
         self.filters = {'reserved': False,
                         'inspection_started_before': 300,
-                        'provision_state': states.INSPECTING}
+                        'provision_state': states.INSPECTING,
+                        'ring_key_ranges': self._mock_ring_key_ranges()}
         self.columns = ['uuid', 'driver']
 
     def _assert_get_nodeinfo_args(self, get_nodeinfo_mock):
         get_nodeinfo_mock.assert_called_once_with(sort_dir='asc',
                 columns=self.columns, filters=self.filters,
-                sort_key='inspection_started_at')
+                sort_key='inspection_started_at',
+                batch_size=CONF.conductor.periodic_node_batch_size)
 
     def test__check_inspect_timeouts_disabled(self, get_nodeinfo_mock,
                                               mapped_mock, acquire_mock):
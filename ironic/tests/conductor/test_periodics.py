@@ -0,0 +1,135 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for :class:`ironic.conductor.periodics.PeriodicTasks`."""
+
+import random
+import time
+
+import eventlet
+from eventlet import event
+import mock
+
+from ironic.conductor import periodics
+from ironic.openstack.common import periodic_task
+from ironic.tests import base as tests_base
+
+
+class FakeTasks(periodics.PeriodicTasks):
+
+    def __init__(self, jitter=0.0):
+        super(FakeTasks, self).__init__(jitter=jitter)
+        self.started = []
+        self.release = event.Event()
+
+    @periodic_task.periodic_task(spacing=10, run_immediately=True)
+    def slow(self, context):
+        self.started.append('slow')
+        self.release.wait()
+
+    @periodic_task.periodic_task(spacing=20, run_immediately=True)
+    def fast(self, context):
+        self.started.append('fast')
+
+    @periodic_task.periodic_task(spacing=30, run_immediately=True)
+    def failing(self, context):
+        self.started.append('failing')
+        raise RuntimeError('boom')
+
+    @periodic_task.periodic_task(spacing=100)
+    def later(self, context):
+        self.started.append('later')
+
+
+class PeriodicTasksTestCase(tests_base.TestCase):
+
+    def setUp(self):
+        super(PeriodicTasksTestCase, self).setUp()
+        self.tasks = FakeTasks()
+        self.context = mock.sentinel.context
+
+    def test_run_in_greenthreads(self):
+        idle_for = self.tasks.run_periodic_tasks(self.context)
+        # Not started yet, the caller doesn't wait for the tasks
+        self.assertEqual([], self.tasks.started)
+        self.assertEqual(10, idle_for)
+        eventlet.sleep(0)
+        # The slow task doesn't block the other ones
+        self.assertEqual(['failing', 'fast', 'slow'],
+                         sorted(self.tasks.started))
+        self.tasks.release.send()
+        eventlet.sleep(0)
+        stats = self.tasks.periodic_tasks_stats()
+        self.assertEqual(['failing', 'fast', 'slow'], sorted(stats))
+        self.assertEqual(1, stats['slow']['runs'])
+        self.assertEqual(0, stats['slow']['failures'])
+        self.assertEqual(1, stats['failing']['runs'])
+        self.assertEqual(1, stats['failing']['failures'])
+
+    def test_skip_overlapping_run(self):
+        self.tasks.run_periodic_tasks(self.context)
+        eventlet.sleep(0)
+        # Make all the tasks due again
+        for name in self.tasks._periodic_last_run:
+            self.tasks._periodic_last_run[name] = 0
+        self.tasks.run_periodic_tasks(self.context)
+        eventlet.sleep(0)
+        # The tasks run in no particular order
+        self.assertEqual(['failing', 'failing', 'fast', 'fast', 'later',
+                          'slow'], sorted(self.tasks.started))
+        stats = self.tasks.periodic_tasks_stats()
+        self.assertEqual(1, stats['slow']['overruns'])
+        self.assertEqual(0, stats['slow']['runs'])
+        self.assertEqual(0, stats['fast']['overruns'])
+        self.assertEqual(2, stats['fast']['runs'])
+        # The skipped task is due again after its interval
+        self.assertGreater(self.tasks._periodic_last_run['slow'],
+                           time.time() - 1)
+        self.tasks.release.send()
+        eventlet.sleep(0)
+        self.assertEqual(1, self.tasks.periodic_tasks_stats()['slow']['runs'])
+
+    @mock.patch.object(periodics, 'time', autospec=True)
+    def test_durations(self, mock_time):
+        mock_time.time.side_effect = [100.0, 100.05, 200.0, 225.0]
+        self.tasks._run_periodic_task('fast', FakeTasks.fast, self.context)
+        self.tasks._run_periodic_task('fast', FakeTasks.fast, self.context)
+        stats = self.tasks.periodic_tasks_stats()['fast']
+        self.assertEqual(2, stats['runs'])
+        self.assertAlmostEqual(25.05, stats['total_time'])
+        self.assertEqual(25.0, stats['max_time'])
+        self.assertEqual(25.0, stats['last_time'])
+        self.assertEqual([1, 0, 0, 1, 0, 0], stats['histogram'])
+
+    @mock.patch.object(random, 'random', return_value=0.5)
+    def test_jitter(self, mock_random):
+        decorated_at = FakeTasks.later._periodic_last_run
+        tasks = FakeTasks(jitter=0.2)
+        self.assertEqual(decorated_at + 10,
+                         tasks._periodic_last_run['later'])
+        self.assertIsNone(tasks._periodic_last_run['slow'])
+
+        now = time.time()
+        tasks.run_periodic_tasks(self.context)
+        # The next runs are delayed by up to 20% of the interval
+        self.assertGreaterEqual(tasks._periodic_last_run['fast'], now + 2)
+        self.assertLess(tasks._periodic_last_run['fast'], now + 3)
+        tasks.release.send()
+        eventlet.sleep(0)
+
+    def test_stop_periodic_tasks(self):
+        self.tasks.run_periodic_tasks(self.context)
+        eventlet.sleep(0)
+        self.tasks.stop_periodic_tasks()
+        self.assertEqual({}, self.tasks._periodic_threads)
+        # The killed run is still accounted for
+        self.assertEqual(1, self.tasks.periodic_tasks_stats()['slow']['runs'])
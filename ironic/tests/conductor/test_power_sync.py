@@ -0,0 +1,79 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for :class:`ironic.conductor.power_sync.PowerSyncScheduler`."""
+
+from ironic.conductor import power_sync
+from ironic.tests import base as tests_base
+
+
+class PowerSyncSchedulerTestCase(tests_base.TestCase):
+
+    def setUp(self):
+        super(PowerSyncSchedulerTestCase, self).setUp()
+        self.scheduler = power_sync.PowerSyncScheduler()
+        self.nodes = ['node1', 'node2', 'node3']
+
+    def _run_passes(self, passes, stable, max_interval):
+        due_passes = []
+        for i in range(passes):
+            due = self.scheduler.get_due_nodes(self.nodes, max_interval)
+            due_passes.append(due)
+            for node in due:
+                self.scheduler.record(node, stable(node), max_interval)
+        return due_passes
+
+    def test_new_nodes_due(self):
+        self.assertEqual(self.nodes,
+                         self.scheduler.get_due_nodes(self.nodes, 4))
+
+    def test_no_backoff(self):
+        due = self._run_passes(3, lambda node: True, 1)
+        self.assertEqual([self.nodes] * 3, due)
+
+    def test_stable_backoff(self):
+        due = self._run_passes(8, lambda node: node != 'node2', 4)
+        self.assertEqual([self.nodes, ['node2'], self.nodes, ['node2'],
+                          ['node2'], ['node2'], self.nodes, ['node2']], due)
+
+    def test_unstable_resets_interval(self):
+        self._run_passes(3, lambda node: True, 4)
+        # the nodes are now checked every 4 passes
+        for i in range(3):
+            self.assertEqual([], self.scheduler.get_due_nodes(self.nodes, 4))
+        self.assertEqual(self.nodes,
+                         self.scheduler.get_due_nodes(self.nodes, 4))
+        self.scheduler.record('node1', False, 4)
+        self.scheduler.record('node2', True, 4)
+        self.scheduler.record('node3', True, 4)
+        self.assertEqual(['node1'],
+                         self.scheduler.get_due_nodes(self.nodes, 4))
+
+    def test_not_recorded_nodes_first(self):
+        self.scheduler.get_due_nodes(self.nodes)
+        self.scheduler.record('node1', True)
+        self.scheduler.record('node3', True)
+        self.assertEqual(['node2', 'node1', 'node3'],
+                         self.scheduler.get_due_nodes(self.nodes))
+
+    def test_removed_nodes_forgotten(self):
+        self._run_passes(3, lambda node: True, 8)
+        self.assertEqual([], self.scheduler.get_due_nodes(['node1'], 8))
+        self.assertEqual(['node2', 'node3'],
+                         self.scheduler.get_due_nodes(self.nodes, 8))
+
+    def test_max_interval_lowered(self):
+        self._run_passes(3, lambda node: True, 8)
+        # the nodes were last checked on pass 3 with an interval of 4
+        self.assertEqual([], self.scheduler.get_due_nodes(self.nodes, 2))
+        self.assertEqual(self.nodes,
+                         self.scheduler.get_due_nodes(self.nodes, 2))
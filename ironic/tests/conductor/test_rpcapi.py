@@ -21,6 +21,7 @@ Unit Tests for :py:class:`ironic.conductor.rpcapi.ConductorAPI`.
 import copy
 
 import mock
+from oslo import messaging
 from oslo_config import cfg
 
 from ironic.common import boot_devices
@@ -128,6 +129,101 @@ class RPCAPITestCase(base.DbTestCase):
         self.assertEqual('fake-topic.fake-host',
                          rpcapi.get_topic_for_driver('fake-driver'))
 
+    def test_get_topics_for(self):
+        CONF.set_override('host', 'fake-host')
+        self.dbapi.register_conductor({'hostname': 'fake-host',
+                                       'drivers': ['fake-driver']})
+        other_node = objects.Node(self.context, uuid='other-uuid',
+                                  driver='other-driver')
+
+        rpcapi = conductor_rpcapi.ConductorAPI(topic='fake-topic')
+        topics, unmapped = rpcapi.get_topics_for([self.fake_node_obj,
+                                                  other_node])
+        self.assertEqual({'fake-topic.fake-host': [self.fake_node_obj]},
+                         topics)
+        self.assertEqual([other_node], unmapped)
+
+    def test_change_nodes_power_state(self):
+        CONF.set_override('host', 'fake-host')
+        self.dbapi.register_conductor({'hostname': 'fake-host',
+                                       'drivers': ['fake-driver']})
+        other_node = objects.Node(self.context, uuid='other-uuid',
+                                  driver='other-driver')
+        rpcapi = conductor_rpcapi.ConductorAPI(topic='fake-topic')
+        node_uuid = self.fake_node_obj.uuid
+
+        with mock.patch.object(rpcapi.client, 'prepare') as mock_prepare:
+            mock_prepare.return_value.call.return_value = {node_uuid: {}}
+            results = rpcapi.change_nodes_power_state(
+                self.context, [self.fake_node_obj, other_node],
+                states.POWER_ON)
+
+        mock_prepare.assert_called_once_with(topic='fake-topic.fake-host',
+                                             version='1.28')
+        mock_prepare.return_value.call.assert_called_once_with(
+            self.context, 'change_nodes_power_state', node_ids=[node_uuid],
+            new_state=states.POWER_ON)
+        self.assertEqual({}, results[node_uuid])
+        self.assertEqual(400, results['other-uuid']['code'])
+
+    def _register_two_conductors(self):
+        for host in ('fake-host', 'other-host'):
+            self.dbapi.register_conductor({'hostname': host,
+                                           'drivers': ['fake-driver']})
+        rpcapi = conductor_rpcapi.ConductorAPI(topic='fake-topic')
+        nodes = [objects.Node(self.context, uuid='uuid%d' % i,
+                              driver='fake-driver')
+                 for i in range(10)]
+        topics, unmapped = rpcapi.get_topics_for(nodes)
+        self.assertEqual(2, len(topics))
+        return rpcapi, nodes, topics
+
+    def test_change_nodes_power_state_call_fails(self):
+        rpcapi, nodes, topics = self._register_two_conductors()
+        failing_topic = 'fake-topic.other-host'
+
+        def prepare(topic, version):
+            cctxt = mock.Mock()
+            if topic == failing_topic:
+                cctxt.call.side_effect = messaging.MessagingTimeout('boom')
+            else:
+                cctxt.call.side_effect = (
+                    lambda context, method, node_ids, new_state:
+                        dict((node_id, {}) for node_id in node_ids))
+            return cctxt
+
+        with mock.patch.object(rpcapi.client, 'prepare',
+                               side_effect=prepare):
+            results = rpcapi.change_nodes_power_state(
+                self.context, nodes, states.POWER_ON)
+
+        self.assertEqual(len(nodes), len(results))
+        for topic, topic_nodes in topics.items():
+            for node in topic_nodes:
+                if topic == failing_topic:
+                    self.assertEqual(503, results[node.uuid]['code'])
+                    self.assertIn('boom', results[node.uuid]['error'])
+                else:
+                    self.assertEqual({}, results[node.uuid])
+
+    def test_change_nodes_power_state_max_nodes(self):
+        CONF.set_override('bulk_rpc_max_nodes', 2, group='conductor')
+        rpcapi, nodes, topics = self._register_two_conductors()
+
+        with mock.patch.object(rpcapi.client, 'prepare') as mock_prepare:
+            mock_call = mock_prepare.return_value.call
+            mock_call.side_effect = (
+                lambda context, method, node_ids, new_state:
+                    dict((node_id, {}) for node_id in node_ids))
+            results = rpcapi.change_nodes_power_state(
+                self.context, nodes, states.POWER_ON)
+
+        self.assertEqual(dict((node.uuid, {}) for node in nodes), results)
+        expected_calls = sum((len(n) + 1) // 2 for n in topics.values())
+        self.assertEqual(expected_calls, mock_call.call_count)
+        for call in mock_call.call_args_list:
+            self.assertTrue(1 <= len(call[1]['node_ids']) <= 2)
+
     def _test_rpcapi(self, method, rpc_method, **kwargs):
         rpcapi = conductor_rpcapi.ConductorAPI(topic='fake-topic')
 
@@ -27,6 +27,7 @@ from ironic.common import exception
 from ironic.common import fsm
 from ironic.common import states
 from ironic.conductor import task_manager
+from ironic.db import api as dbapi
 from ironic import objects
 from ironic.tests import base as tests_base
 from ironic.tests.db import base as tests_db_base
@@ -58,7 +59,7 @@ class TaskManagerTestCase(tests_db_base.DbTestCase):
             self.assertFalse(task.shared)
 
         reserve_mock.assert_called_once_with(self.context, self.host,
-                                             'fake-node-id')
+                                             'fake-node-id', filters=None)
         get_ports_mock.assert_called_once_with(self.context, self.node.id)
         get_driver_mock.assert_called_once_with(self.node.driver)
         release_mock.assert_called_once_with(self.context, self.host,
@@ -78,13 +79,56 @@ class TaskManagerTestCase(tests_db_base.DbTestCase):
             self.assertFalse(task.shared)
 
         reserve_mock.assert_called_once_with(self.context, self.host,
-                                             'fake-node-id')
+                                             'fake-node-id', filters=None)
         get_ports_mock.assert_called_once_with(self.context, self.node.id)
         get_driver_mock.assert_called_once_with('fake-driver')
         release_mock.assert_called_once_with(self.context, self.host,
                                              self.node.id)
         self.assertFalse(node_get_mock.called)
 
+    def test_excl_lock_with_filters(self, get_ports_mock, get_driver_mock,
+                                    reserve_mock, release_mock,
+                                    node_get_mock):
+        reserve_mock.return_value = self.node
+        filters = {'maintenance': False}
+        with task_manager.acquire(self.context, 'fake-node-id',
+                                  filters=filters) as task:
+            self.assertEqual(self.node, task.node)
+
+        reserve_mock.assert_called_once_with(self.context, self.host,
+                                             'fake-node-id', filters=filters)
+        release_mock.assert_called_once_with(self.context, self.host,
+                                             self.node.id)
+
+    def test_excl_lock_filters_not_matched(self, get_ports_mock,
+                                           get_driver_mock, reserve_mock,
+                                           release_mock, node_get_mock):
+        self.config(node_locked_retry_attempts=3, group='conductor')
+        filters = {'maintenance': False}
+        reserve_mock.side_effect = exception.NodeFiltersNotMatched(
+            node='fake-node-id')
+
+        self.assertRaises(exception.NodeFiltersNotMatched,
+                          task_manager.acquire,
+                          self.context, 'fake-node-id', filters=filters)
+
+        # Not matching the filters is not retried, unlike NodeLocked
+        reserve_mock.assert_called_once_with(self.context, self.host,
+                                             'fake-node-id', filters=filters)
+        self.assertFalse(get_ports_mock.called)
+        self.assertFalse(get_driver_mock.called)
+        self.assertFalse(release_mock.called)
+
+    def test_shared_lock_with_filters(self, get_ports_mock, get_driver_mock,
+                                      reserve_mock, release_mock,
+                                      node_get_mock):
+        self.assertRaises(exception.InvalidParameterValue,
+                          task_manager.acquire,
+                          self.context, 'fake-node-id', shared=True,
+                          filters={'maintenance': False})
+        self.assertFalse(node_get_mock.called)
+        self.assertFalse(reserve_mock.called)
+
     def test_excl_nested_acquire(self, get_ports_mock, get_driver_mock,
                                  reserve_mock, release_mock,
                                  node_get_mock):
@@ -97,6 +141,8 @@ class TaskManagerTestCase(tests_db_base.DbTestCase):
         get_driver_mock.return_value = mock.sentinel.driver1
 
         with task_manager.TaskManager(self.context, 'node-id1') as task:
+            # ports are loaded on first access
+            self.assertEqual(mock.sentinel.ports1, task.ports)
             reserve_mock.return_value = node2
             get_ports_mock.return_value = mock.sentinel.ports2
             get_driver_mock.return_value = mock.sentinel.driver2
@@ -112,8 +158,10 @@ class TaskManagerTestCase(tests_db_base.DbTestCase):
                 self.assertEqual(mock.sentinel.driver2, task2.driver)
                 self.assertFalse(task2.shared)
 
-        self.assertEqual([mock.call(self.context, self.host, 'node-id1'),
-                          mock.call(self.context, self.host, 'node-id2')],
+        self.assertEqual([mock.call(self.context, self.host, 'node-id1',
+                                    filters=None),
+                          mock.call(self.context, self.host, 'node-id2',
+                                    filters=None)],
                          reserve_mock.call_args_list)
         self.assertEqual([mock.call(self.context, self.node.id),
                           mock.call(self.context, node2.id)],
@@ -160,7 +208,7 @@ class TaskManagerTestCase(tests_db_base.DbTestCase):
                           'fake-node-id')
 
         reserve_mock.assert_called_with(self.context, self.host,
-                                        'fake-node-id')
+                                        'fake-node-id', filters=None)
         self.assertEqual(retry_attempts, reserve_mock.call_count)
         self.assertFalse(get_ports_mock.called)
         self.assertFalse(get_driver_mock.called)
@@ -173,15 +221,17 @@ class TaskManagerTestCase(tests_db_base.DbTestCase):
         reserve_mock.return_value = self.node
         get_ports_mock.side_effect = exception.IronicException('foo')
 
-        self.assertRaises(exception.IronicException,
-                          task_manager.TaskManager,
-                          self.context,
-                          'fake-node-id')
+        def _test_it():
+            with task_manager.TaskManager(self.context,
+                                          'fake-node-id') as task:
+                task.ports
+
+        self.assertRaises(exception.IronicException, _test_it)
 
         reserve_mock.assert_called_once_with(self.context, self.host,
-                                             'fake-node-id')
+                                             'fake-node-id', filters=None)
         get_ports_mock.assert_called_once_with(self.context, self.node.id)
-        self.assertFalse(get_driver_mock.called)
+        get_driver_mock.assert_called_once_with(self.node.driver)
         release_mock.assert_called_once_with(self.context, self.host,
                                              self.node.id)
         self.assertFalse(node_get_mock.called)
@@ -199,8 +249,8 @@ class TaskManagerTestCase(tests_db_base.DbTestCase):
                           'fake-node-id')
 
         reserve_mock.assert_called_once_with(self.context, self.host,
-                                             'fake-node-id')
-        get_ports_mock.assert_called_once_with(self.context, self.node.id)
+                                             'fake-node-id', filters=None)
+        self.assertFalse(get_ports_mock.called)
         get_driver_mock.assert_called_once_with(self.node.driver)
         release_mock.assert_called_once_with(self.context, self.host,
                                              self.node.id)
@@ -266,17 +316,37 @@ class TaskManagerTestCase(tests_db_base.DbTestCase):
         node_get_mock.return_value = self.node
         get_ports_mock.side_effect = exception.IronicException('foo')
 
-        self.assertRaises(exception.IronicException,
-                          task_manager.TaskManager,
-                          self.context,
-                          'fake-node-id',
-                          shared=True)
+        def _test_it():
+            with task_manager.TaskManager(self.context, 'fake-node-id',
+                                          shared=True) as task:
+                task.ports
+
+        self.assertRaises(exception.IronicException, _test_it)
 
         self.assertFalse(reserve_mock.called)
         self.assertFalse(release_mock.called)
         node_get_mock.assert_called_once_with(self.context, 'fake-node-id')
         get_ports_mock.assert_called_once_with(self.context, self.node.id)
-        self.assertFalse(get_driver_mock.called)
+        get_driver_mock.assert_called_once_with(self.node.driver)
+
+    def test_ports_loaded_lazily(self, get_ports_mock, get_driver_mock,
+                                 reserve_mock, release_mock, node_get_mock):
+        reserve_mock.return_value = self.node
+        with task_manager.TaskManager(self.context, 'fake-node-id') as task:
+            self.assertFalse(get_ports_mock.called)
+            self.assertEqual(get_ports_mock.return_value, task.ports)
+            self.assertEqual(get_ports_mock.return_value, task.ports)
+
+        get_ports_mock.assert_called_once_with(self.context, self.node.id)
+        self.assertIsNone(task.ports)
+
+    def test_ports_not_loaded(self, get_ports_mock, get_driver_mock,
+                              reserve_mock, release_mock, node_get_mock):
+        reserve_mock.return_value = self.node
+        with task_manager.TaskManager(self.context, 'fake-node-id'):
+            pass
+
+        self.assertFalse(get_ports_mock.called)
 
     def test_shared_lock_get_driver_exception(self, get_ports_mock,
                                               get_driver_mock, reserve_mock,
@@ -294,7 +364,7 @@ class TaskManagerTestCase(tests_db_base.DbTestCase):
         self.assertFalse(reserve_mock.called)
         self.assertFalse(release_mock.called)
         node_get_mock.assert_called_once_with(self.context, 'fake-node-id')
-        get_ports_mock.assert_called_once_with(self.context, self.node.id)
+        self.assertFalse(get_ports_mock.called)
         get_driver_mock.assert_called_once_with(self.node.driver)
 
     def test_spawn_after(self, get_ports_mock, get_driver_mock,
@@ -430,10 +500,45 @@ class TaskManagerTestCase(tests_db_base.DbTestCase):
         reserve_mock.return_value = self.node
         copy_mock.return_value = m
         t = task_manager.TaskManager('fake', 'fake')
-        copy_mock.assert_called_once_with()
+        copy_mock.assert_called_once_with(shallow=True)
         self.assertIs(m, t.fsm)
         m.initialize.assert_called_once_with(self.node.provision_state)
 
+    def test_init_shares_fsm_tables(self, get_ports_mock, get_driver_mock,
+                                    reserve_mock, release_mock,
+                                    node_get_mock):
+        reserve_mock.return_value = self.node
+        t1 = task_manager.TaskManager('fake', 'fake')
+        t2 = task_manager.TaskManager('fake', 'fake')
+        self.assertIs(states.machine._states, t1.fsm._states)
+        self.assertIs(states.machine._transitions, t2.fsm._transitions)
+        self.assertIsNot(t1.fsm, t2.fsm)
+
+
+@mock.patch.object(driver_factory, 'get_driver')
+class TaskManagerQueriesTestCase(tests_db_base.DbTestCase):
+    def setUp(self):
+        super(TaskManagerQueriesTestCase, self).setUp()
+        self.node = obj_utils.create_test_node(
+            self.context, provision_state=states.AVAILABLE)
+        obj_utils.create_test_port(self.context, node_id=self.node.id)
+
+    def test_shared_lock(self, get_driver_mock):
+        with dbapi.get_instance().count_queries() as counter:
+            with task_manager.acquire(self.context, self.node.uuid,
+                                      shared=True):
+                pass
+        # the node is loaded, the ports are not
+        self.assertEqual(1, counter.count)
+
+    def test_shared_lock_ports(self, get_driver_mock):
+        with dbapi.get_instance().count_queries() as counter:
+            with task_manager.acquire(self.context, self.node.uuid,
+                                      shared=True) as task:
+                self.assertEqual(1, len(task.ports))
+                self.assertEqual(1, len(task.ports))
+        self.assertEqual(2, counter.count)
+
 
 class TaskManagerStateModelTestCases(tests_base.TestCase):
     def setUp(self):
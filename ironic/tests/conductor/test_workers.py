@@ -0,0 +1,122 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for :class:`ironic.conductor.workers.WorkerPool`."""
+
+import eventlet
+from eventlet import event
+
+from ironic.common import exception
+from ironic.conductor import workers
+from ironic.tests import base as tests_base
+
+
+class WorkerPoolTestCase(tests_base.TestCase):
+
+    def setUp(self):
+        super(WorkerPoolTestCase, self).setUp()
+        self.pool = workers.WorkerPool(
+            3, quotas={workers.PROVISION: 2, workers.PERIODIC: 1},
+            queue_size=2)
+        self.started = []
+        self.release = event.Event()
+
+    def _work(self, name):
+        self.started.append(name)
+        self.release.wait()
+        return name
+
+    def _spawn(self, priority, name):
+        return self.pool.spawn(priority, self._work, name)
+
+    def test_spawn(self):
+        thread = self._spawn(workers.PROVISION, 'deploy')
+        eventlet.sleep(0)
+        self.assertEqual(['deploy'], self.started)
+        self.release.send()
+        self.assertEqual('deploy', thread.wait())
+        stats = self.pool.stats()[workers.PROVISION]
+        self.assertEqual(1, stats['spawned'])
+        self.assertEqual(0, stats['queued'])
+        self.assertEqual(0, stats['running'])
+
+    def test_quota(self):
+        self._spawn(workers.PROVISION, 'deploy1')
+        self._spawn(workers.PROVISION, 'deploy2')
+        self._spawn(workers.PROVISION, 'deploy3')
+        self._spawn(workers.INTERACTIVE, 'power')
+        eventlet.sleep(0)
+        self.assertEqual(['deploy1', 'deploy2', 'power'], self.started)
+        stats = self.pool.stats()
+        self.assertEqual(2, stats[workers.PROVISION]['running'])
+        self.assertEqual(1, stats[workers.PROVISION]['waiting'])
+        self.assertEqual(1, stats[workers.INTERACTIVE]['running'])
+        self.release.send()
+        self.pool.waitall()
+        self.assertEqual(['deploy1', 'deploy2', 'power', 'deploy3'],
+                         self.started)
+        stats = self.pool.stats()[workers.PROVISION]
+        self.assertEqual(1, stats['queued'])
+        self.assertEqual(0, stats['waiting'])
+        self.assertEqual(0, stats['running'])
+        self.assertGreater(stats['max_wait_time'], 0)
+
+    def test_priority(self):
+        self._spawn(workers.PROVISION, 'deploy1')
+        self._spawn(workers.PROVISION, 'deploy2')
+        self._spawn(workers.PERIODIC, 'takeover')
+        self._spawn(workers.PERIODIC, 'timeout')
+        self._spawn(workers.PROVISION, 'deploy3')
+        self._spawn(workers.INTERACTIVE, 'power')
+        eventlet.sleep(0)
+        self.assertEqual(['deploy1', 'deploy2', 'takeover'], self.started)
+        self.release.send()
+        self.pool.waitall()
+        # The interactive worker started first, then the provisioning one
+        self.assertEqual(['deploy1', 'deploy2', 'takeover', 'power',
+                          'deploy3', 'timeout'], self.started)
+
+    def test_queue_full(self):
+        self._spawn(workers.PERIODIC, 'takeover1')
+        self._spawn(workers.PERIODIC, 'takeover2')
+        self._spawn(workers.PERIODIC, 'takeover3')
+        self.assertRaises(exception.NoFreeConductorWorker,
+                          self._spawn, workers.PERIODIC, 'takeover4')
+        # Other classes are not affected
+        self._spawn(workers.INTERACTIVE, 'power')
+        stats = self.pool.stats()[workers.PERIODIC]
+        self.assertEqual(3, stats['spawned'])
+        self.assertEqual(1, stats['refused'])
+        self.assertEqual(2, stats['waiting'])
+        self.release.send()
+        self.pool.waitall()
+
+    def test_kill_waiting_worker(self):
+        self._spawn(workers.PERIODIC, 'takeover1')
+        thread = self._spawn(workers.PERIODIC, 'takeover2')
+        thread.cancel()
+        self.assertEqual(0, self.pool.stats()[workers.PERIODIC]['waiting'])
+        self.release.send()
+        self.pool.waitall()
+        self.assertEqual(['takeover1'], self.started)
+        self.assertEqual(0, self.pool.stats()[workers.PERIODIC]['running'])
+
+    def test_failed_worker_frees_slot(self):
+        def fail():
+            raise RuntimeError()
+
+        thread = self.pool.spawn(workers.PERIODIC, fail)
+        self._spawn(workers.PERIODIC, 'takeover')
+        self.assertRaises(RuntimeError, thread.wait)
+        self.release.send()
+        self.pool.waitall()
+        self.assertEqual(['takeover'], self.started)
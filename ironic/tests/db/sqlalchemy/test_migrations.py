@@ -46,6 +46,7 @@ from oslo_utils import uuidutils
 import sqlalchemy
 import sqlalchemy.exc
 
+from ironic.common import hash_ring
 from ironic.common.i18n import _LE
 from ironic.db.sqlalchemy import migration
 from ironic.db.sqlalchemy import models
@@ -373,6 +374,33 @@ class MigrationCheckersMixin(object):
         node = nodes.select(nodes.c.uuid == uuid).execute().first()
         self.assertEqual(bigstring, node['name'])
 
+    def _pre_upgrade_3a1a4e9c7d2b(self, engine):
+        nodes = db_utils.get_table(engine, 'nodes')
+        data = [{'uuid': uuidutils.generate_uuid()} for i in range(3)]
+        nodes.insert().values(data).execute()
+        return data
+
+    def _check_3a1a4e9c7d2b(self, engine, data):
+        nodes = db_utils.get_table(engine, 'nodes')
+        col_names = [column.name for column in nodes.c]
+        self.assertIn('ring_key', col_names)
+        self.assertIsInstance(nodes.c.ring_key.type,
+                              sqlalchemy.types.BigInteger)
+        for row in data:
+            node = nodes.select(nodes.c.uuid == row['uuid']).execute().first()
+            self.assertEqual(hash_ring.get_ring_key(row['uuid']),
+                             node['ring_key'])
+
+    def _check_1d6951876d68(self, engine, data):
+        indexes = dict((index['name'], index['column_names'])
+                       for index in sqlalchemy.inspect(engine).get_indexes(
+                           'nodes'))
+        self.assertEqual(['reservation'], indexes['node_reservation'])
+        self.assertEqual(['provision_state', 'provision_updated_at'],
+                         indexes['node_provision_state_provision_updated_at'])
+        self.assertEqual(['provision_state', 'inspection_started_at'],
+                         indexes['node_provision_state_inspection_started_at'])
+
     def test_upgrade_and_version(self):
         with patch_with_engine(self.engine):
             self.migration_api.upgrade('head')
@@ -0,0 +1,138 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the query plans of the node queries of periodic tasks."""
+
+import re
+
+import sqlalchemy
+
+from ironic.common import states
+import ironic.db.sqlalchemy.api as sa_api
+from ironic.tests.db import base
+
+
+RING_KEY_RANGES = {'fake': [(0, 2 ** 40), (2 ** 50, 2 ** 60)],
+                   'other': [(2 ** 30, 2 ** 62)]}
+
+
+class NodeQueryPlansTestCase(base.DbTestCase):
+    """Check that the node queries of periodic tasks use an index.
+
+    The statements run by the database API are captured and explained
+    with SQLite's EXPLAIN QUERY PLAN, which reports "SCAN" steps when a
+    whole table or index is read.
+    """
+
+    def setUp(self):
+        super(NodeQueryPlansTestCase, self).setUp()
+        self.engine = sa_api.get_engine()
+        if self.engine.name != 'sqlite':
+            self.skipTest('Query plans are only checked with SQLite')
+        self.statements = []
+        sqlalchemy.event.listen(self.engine, 'before_cursor_execute',
+                                self._record_statement)
+        self.addCleanup(sqlalchemy.event.remove, self.engine,
+                        'before_cursor_execute', self._record_statement)
+
+    def _record_statement(self, conn, cursor, statement, parameters,
+                          context, executemany):
+        self.statements.append((statement, parameters))
+
+    def _get_plan(self, statement, parameters):
+        with self.engine.connect() as conn:
+            rows = conn.execute('EXPLAIN QUERY PLAN ' + statement,
+                                parameters)
+            return [row['detail'] for row in rows]
+
+    def _assert_no_scan(self, index=None):
+        statement, parameters = self.statements[-1]
+        plan = self._get_plan(statement, parameters)
+        message = ('Query %(query)s has plan %(plan)s' %
+                   {'query': statement, 'plan': plan})
+        self.assertTrue(plan)
+        for step in plan:
+            self.assertFalse(step.startswith('SCAN'), message)
+        if index is not None:
+            self.assertTrue(any(re.search(r'INDEX %s\b' % index, step)
+                                for step in plan), message)
+
+    def _assert_iter_nodeinfo_no_scan(self, index=None, **kwargs):
+        list(self.dbapi.iter_nodeinfo(columns=['uuid', 'driver'],
+                                      batch_size=10, **kwargs))
+        self._assert_no_scan(index)
+
+    def test_sync_power_states(self):
+        self._assert_iter_nodeinfo_no_scan(
+            filters={'maintenance': False,
+                     'ring_key_ranges': RING_KEY_RANGES})
+
+    def test_check_deploy_timeouts(self):
+        self._assert_iter_nodeinfo_no_scan(
+            filters={'reserved': False, 'maintenance': False,
+                     'provisioned_before': 300,
+                     'provision_state': states.DEPLOYWAIT,
+                     'ring_key_ranges': RING_KEY_RANGES},
+            sort_key='provision_updated_at', sort_dir='asc')
+
+    def test_check_deploy_timeouts_without_ring(self):
+        self._assert_iter_nodeinfo_no_scan(
+            filters={'reserved': False, 'maintenance': False,
+                     'provisioned_before': 300,
+                     'provision_state': states.DEPLOYWAIT},
+            sort_key='provision_updated_at', sort_dir='asc',
+            index='node_provision_state_provision_updated_at')
+
+    def test_check_inspect_timeouts(self):
+        self._assert_iter_nodeinfo_no_scan(
+            filters={'reserved': False,
+                     'inspection_started_before': 300,
+                     'provision_state': states.INSPECTING,
+                     'ring_key_ranges': RING_KEY_RANGES},
+            sort_key='inspection_started_at', sort_dir='asc')
+
+    def test_check_inspect_timeouts_without_ring(self):
+        self._assert_iter_nodeinfo_no_scan(
+            filters={'reserved': False,
+                     'inspection_started_before': 300,
+                     'provision_state': states.INSPECTING},
+            sort_key='inspection_started_at', sort_dir='asc',
+            index='node_provision_state_inspection_started_at')
+
+    def test_sync_local_state(self):
+        self._assert_iter_nodeinfo_no_scan(
+            filters={'reserved': False, 'maintenance': False,
+                     'provision_state': states.ACTIVE,
+                     'ring_key_ranges': RING_KEY_RANGES})
+
+    def test_sync_local_state_without_ring(self):
+        self._assert_iter_nodeinfo_no_scan(
+            filters={'reserved': False, 'maintenance': False,
+                     'provision_state': states.ACTIVE})
+
+    def test_send_sensor_data(self):
+        self._assert_iter_nodeinfo_no_scan(
+            filters={'associated': True,
+                     'ring_key_ranges': RING_KEY_RANGES})
+
+    def test_discoverd_periodic_check_result(self):
+        self._assert_iter_nodeinfo_no_scan(
+            filters={'provision_state': states.INSPECTING,
+                     'ring_key_ranges': RING_KEY_RANGES})
+
+    def test_discoverd_periodic_check_result_without_ring(self):
+        self._assert_iter_nodeinfo_no_scan(
+            filters={'provision_state': states.INSPECTING})
+
+    def test_clear_node_reservations_for_conductor(self):
+        self.dbapi.clear_node_reservations_for_conductor('fake-host')
+        self._assert_no_scan()
@@ -15,15 +15,25 @@
 
 """Tests for manipulating Nodes via the DB API"""
 
+from __future__ import absolute_import
+
 import datetime
+import types
 
+import eventlet
 import mock
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
 import six
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy import orm
 
 from ironic.common import exception
+from ironic.common import hash_ring
 from ironic.common import states
+from ironic.db.sqlalchemy import api as sqlalchemy_api
+from ironic.db.sqlalchemy import models
 from ironic.tests.db import base
 from ironic.tests.db import utils
 
@@ -33,6 +43,10 @@ class DbNodeTestCase(base.DbTestCase):
     def test_create_node(self):
         utils.create_test_node()
 
+    def test_create_node_sets_ring_key(self):
+        node = utils.create_test_node()
+        self.assertEqual(hash_ring.get_ring_key(node.uuid), node.ring_key)
+
     def test_create_node_already_exists(self):
         utils.create_test_node()
         self.assertRaises(exception.NodeAlreadyExists,
@@ -53,6 +67,48 @@ class DbNodeTestCase(base.DbTestCase):
                           utils.create_test_node,
                           name=node.name)
 
+    def _get_new_nodes_values(self, count):
+        values_list = []
+        for i in range(count):
+            values = utils.get_test_node(uuid=uuidutils.generate_uuid(),
+                                         name='node-%d' % i)
+            del values['id']
+            values_list.append(values)
+        return values_list
+
+    def test_create_nodes(self):
+        values_list = self._get_new_nodes_values(5)
+        with self.dbapi.count_queries() as counter:
+            nodes = self.dbapi.create_nodes(values_list, batch_size=2)
+        self.assertEqual([v['uuid'] for v in values_list],
+                         [n.uuid for n in nodes])
+        for node in nodes:
+            self.assertEqual(hash_ring.get_ring_key(node.uuid), node.ring_key)
+            self.assertEqual(node.id,
+                             self.dbapi.get_node_by_uuid(node.uuid).id)
+        # One INSERT per node, nothing else
+        self.assertEqual(5, counter.count)
+
+    def test_create_nodes_duplicate(self):
+        utils.create_test_node(uuid=uuidutils.generate_uuid(),
+                               name='node-1')
+        values_list = self._get_new_nodes_values(5)
+        results = self.dbapi.create_nodes(values_list, batch_size=2)
+        self.assertIsInstance(results[1], exception.DuplicateName)
+        for i in (0, 2, 3, 4):
+            self.assertEqual(values_list[i]['uuid'], results[i].uuid)
+            self.dbapi.get_node_by_uuid(results[i].uuid)
+
+    def test_create_nodes_duplicate_in_request(self):
+        values_list = self._get_new_nodes_values(3)
+        values_list[2]['uuid'] = values_list[0]['uuid']
+        results = self.dbapi.create_nodes(values_list)
+        self.assertEqual(values_list[0]['uuid'], results[0].uuid)
+        self.assertEqual(values_list[1]['uuid'], results[1].uuid)
+        self.assertIsInstance(results[2], exception.NodeAlreadyExists)
+        self.assertEqual('node-0', self.dbapi.get_node_by_uuid(
+            values_list[0]['uuid']).name)
+
     def test_get_node_by_id(self):
         node = utils.create_test_node()
         res = self.dbapi.get_node_by_id(node.id)
@@ -187,6 +243,76 @@ class DbNodeTestCase(base.DbTestCase):
                                                     states.INSPECTING})
         self.assertEqual([node2.id], [r[0] for r in res])
 
+    def _create_test_nodes(self, count, **kwargs):
+        return [utils.create_test_node(uuid=uuidutils.generate_uuid(),
+                                       **kwargs)
+                for i in range(count)]
+
+    def test_iter_nodeinfo(self):
+        nodes = self._create_test_nodes(5)
+        res = self.dbapi.iter_nodeinfo(batch_size=2)
+        self.assertIsInstance(res, types.GeneratorType)
+        self.assertEqual([(n.id,) for n in nodes], list(res))
+
+    def test_iter_nodeinfo_with_cols(self):
+        nodes = self._create_test_nodes(3)
+        res = self.dbapi.iter_nodeinfo(columns=['uuid', 'driver'],
+                                       batch_size=2)
+        self.assertEqual([(n.uuid, n.driver) for n in nodes], list(res))
+
+    @mock.patch.object(sqlalchemy_api, '_paginate_query', autospec=True,
+                       side_effect=sqlalchemy_api._paginate_query)
+    def test_iter_nodeinfo_batches(self, mock_paginate):
+        self._create_test_nodes(4)
+        self.assertEqual(4, len(list(self.dbapi.iter_nodeinfo(batch_size=2))))
+        # the last query returns an empty batch
+        self.assertEqual(3, mock_paginate.call_count)
+        for call in mock_paginate.call_args_list:
+            self.assertEqual(2, call[0][1])
+
+    def test_iter_nodeinfo_with_filters(self):
+        nodes = self._create_test_nodes(3, maintenance=True)
+        self._create_test_nodes(3, maintenance=False)
+        res = self.dbapi.iter_nodeinfo(filters={'maintenance': True},
+                                       batch_size=2)
+        self.assertEqual([(n.id,) for n in nodes], list(res))
+
+    def test_iter_nodeinfo_sort_key(self):
+        past = datetime.datetime(2000, 1, 1, 0, 0)
+        nodes = [utils.create_test_node(
+                     uuid=uuidutils.generate_uuid(),
+                     provision_updated_at=past + datetime.timedelta(minutes=m))
+                 for m in (3, 1, 2, 1, 0)]
+        expected = sorted(nodes,
+                          key=lambda n: (n.provision_updated_at, n.id))
+        res = self.dbapi.iter_nodeinfo(sort_key='provision_updated_at',
+                                       sort_dir='asc', batch_size=2)
+        self.assertEqual([(n.id,) for n in expected], list(res))
+        res = self.dbapi.iter_nodeinfo(sort_key='provision_updated_at',
+                                       sort_dir='desc', batch_size=2)
+        self.assertEqual([(n.id,) for n in reversed(expected)], list(res))
+
+    def test_get_nodeinfo_list_ring_key_ranges(self):
+        nodes = [utils.create_test_node(uuid=uuidutils.generate_uuid(),
+                                        driver=driver)
+                 for driver in ('fake', 'fake', 'other')]
+        keys = [n.ring_key for n in nodes]
+        filters = {'ring_key_ranges': {'fake': [(keys[0], keys[0])],
+                                       'other': [(0, hash_ring.MAX_RING_KEY)]}}
+        res = self.dbapi.get_nodeinfo_list(filters=filters)
+        self.assertEqual(sorted([nodes[0].id, nodes[2].id]),
+                         sorted(r[0] for r in res))
+
+        filters = {'ring_key_ranges': {'fake': [(0, hash_ring.MAX_RING_KEY)]}}
+        res = self.dbapi.get_nodeinfo_list(filters=filters)
+        self.assertEqual(sorted([nodes[0].id, nodes[1].id]),
+                         sorted(r[0] for r in res))
+
+    def test_get_nodeinfo_list_ring_key_ranges_empty(self):
+        utils.create_test_node()
+        res = self.dbapi.get_nodeinfo_list(filters={'ring_key_ranges': {}})
+        self.assertEqual([], res)
+
     def test_get_node_list(self):
         uuids = []
         for i in range(1, 6):
@@ -196,6 +322,16 @@ class DbNodeTestCase(base.DbTestCase):
         res_uuids = [r.uuid for r in res]
         six.assertCountEqual(self, uuids, res_uuids)
 
+    def test_get_node_list_columns(self):
+        node = utils.create_test_node()
+        res = self.dbapi.get_node_list(columns=['uuid', 'power_state'])
+        self.assertEqual([(node.id, node.uuid, node.power_state)],
+                         [(r.id, r.uuid, r.power_state) for r in res])
+        unloaded = sa.inspect(res[0]).unloaded
+        self.assertIn('driver_info', unloaded)
+        self.assertIn('instance_info', unloaded)
+        self.assertNotIn('uuid', unloaded)
+
     def test_get_node_list_with_filters(self):
         ch1 = utils.create_test_chassis(uuid=uuidutils.generate_uuid())
         ch2 = utils.create_test_chassis(uuid=uuidutils.generate_uuid())
@@ -240,6 +376,10 @@ class DbNodeTestCase(base.DbTestCase):
         res = self.dbapi.get_node_list(filters={'maintenance': False})
         self.assertEqual([node1.id], [r.id for r in res])
 
+        res = self.dbapi.get_node_list(
+            filters={'uuids': [node2.uuid, uuidutils.generate_uuid()]})
+        self.assertEqual([node2.id], [r.id for r in res])
+
     def test_get_node_list_chassis_not_found(self):
         self.assertRaises(exception.ChassisNotFound,
                           self.dbapi.get_node_list,
@@ -402,6 +542,162 @@ class DbNodeTestCase(base.DbTestCase):
                          timeutils.normalize_time(result))
         self.assertIsNone(res['inspection_started_at'])
 
+    def test_update_node_retried_if_changed(self):
+        node = utils.create_test_node(provision_state=states.INSPECTING)
+        real_update = orm.Query.update
+        calls = []
+
+        def update(query, *args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                # the node changed after being read
+                return 0
+            return real_update(query, *args, **kwargs)
+
+        with mock.patch.object(orm.Query, 'update', autospec=True,
+                               side_effect=update):
+            res = self.dbapi.update_node(
+                node.id, {'provision_state': states.MANAGEABLE})
+
+        self.assertEqual(2, len(calls))
+        self.assertEqual(states.MANAGEABLE, res.provision_state)
+        self.assertIsNotNone(res.inspection_finished_at)
+        res = self.dbapi.get_node_by_id(node.id)
+        self.assertEqual(states.MANAGEABLE, res.provision_state)
+
+    def test_update_node_returns_current_row(self):
+        node = utils.create_test_node(extra={'foo': 'bar'})
+        real_update = orm.Query.update
+
+        def update(query, *args, **kwargs):
+            # another writer changes a column which is not updated
+            if not update.done:
+                update.done = True
+                sqlalchemy_api.model_query(models.Node).filter_by(
+                    id=node.id).update({'extra': {'foo': 'baz'}})
+            return real_update(query, *args, **kwargs)
+        update.done = False
+
+        with mock.patch.object(sqlalchemy_api, '_update_returning_supported',
+                               autospec=True, return_value=False):
+            with mock.patch.object(orm.Query, 'update', autospec=True,
+                                   side_effect=update):
+                res = self.dbapi.update_node(node.id,
+                                             {'power_state': states.POWER_ON})
+
+        self.assertEqual(states.POWER_ON, res.power_state)
+        self.assertEqual({'foo': 'baz'}, res.extra)
+
+    def test_update_node_retries_bounded(self):
+        node = utils.create_test_node(provision_state=states.INSPECTING)
+
+        # the node changes after being read, every time
+        with mock.patch.object(orm.Query, 'update', autospec=True,
+                               return_value=0) as update_mock:
+            self.assertRaises(exception.NodeUpdateConflict,
+                              self.dbapi.update_node, node.id,
+                              {'provision_state': states.MANAGEABLE})
+
+        self.assertEqual(sqlalchemy_api.UPDATE_NODE_MAX_ATTEMPTS,
+                         update_mock.call_count)
+        res = self.dbapi.get_node_by_id(node.id)
+        self.assertEqual(states.INSPECTING, res.provision_state)
+
+    def test_update_node_provision_state_compared(self):
+        node = utils.create_test_node(provision_state=states.INSPECTING)
+        real_update = orm.Query.update
+
+        def update(query, *args, **kwargs):
+            # another conductor changes the provision state first
+            if not update.done:
+                update.done = True
+                sqlalchemy_api.model_query(models.Node).filter_by(
+                    id=node.id).update({'provision_state': states.ACTIVE})
+            return real_update(query, *args, **kwargs)
+        update.done = False
+
+        with mock.patch.object(orm.Query, 'update', autospec=True,
+                               side_effect=update):
+            res = self.dbapi.update_node(
+                node.id, {'provision_state': states.MANAGEABLE})
+
+        # the node was not inspecting anymore when it was updated
+        self.assertIsNone(res.inspection_finished_at)
+
+    def test__update_nodes_returning(self):
+        session = mock.Mock()
+        session.execute.return_value = [{'id': 1, 'reservation': 'fake'}]
+        query = sqlalchemy_api.model_query(models.Node).filter_by(id=1)
+
+        nodes = sqlalchemy_api._update_nodes_returning(
+            session, query, {'reservation': 'fake'})
+
+        self.assertEqual([(1, 'fake')],
+                         [(n.id, n.reservation) for n in nodes])
+        stmt = session.execute.call_args[0][0]
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        self.assertTrue(sql.startswith('UPDATE nodes SET '))
+        self.assertIn('reservation=', sql)
+        self.assertIn('WHERE nodes.id = ', sql)
+        self.assertIn('RETURNING nodes.', sql)
+
+    @mock.patch.object(sqlalchemy_api, '_update_nodes_returning',
+                       autospec=True)
+    @mock.patch.object(sqlalchemy_api, '_update_returning_supported',
+                       autospec=True, return_value=True)
+    def test_update_node_returning(self, supported_mock, update_mock):
+        node = utils.create_test_node()
+        update_mock.return_value = [mock.sentinel.node]
+
+        res = self.dbapi.update_node(node.id, {'extra': {'foo': 'bar'}})
+
+        self.assertEqual(mock.sentinel.node, res)
+        update_mock.assert_called_once_with(mock.ANY, mock.ANY,
+                                            {'extra': {'foo': 'bar'}})
+
+    @mock.patch.object(sqlalchemy_api, '_update_nodes_returning',
+                       autospec=True)
+    @mock.patch.object(sqlalchemy_api, '_update_returning_supported',
+                       autospec=True, return_value=True)
+    def test_update_node_returning_inspection(self, supported_mock,
+                                              update_mock):
+        node = utils.create_test_node()
+        update_mock.return_value = [mock.sentinel.node]
+
+        self.dbapi.update_node(node.id,
+                               {'provision_state': states.MANAGEABLE})
+
+        values = update_mock.call_args[0][2]
+        self.assertEqual(
+            set(['provision_state', 'provision_updated_at',
+                 'inspection_started_at', 'inspection_finished_at']),
+            set(values))
+        sql = str(values['inspection_finished_at'].compile(
+            dialect=postgresql.dialect()))
+        self.assertTrue(sql.startswith('CASE WHEN'))
+
+    @mock.patch.object(sqlalchemy_api, '_update_nodes_returning',
+                       autospec=True, return_value=[])
+    @mock.patch.object(sqlalchemy_api, '_update_returning_supported',
+                       autospec=True, return_value=True)
+    def test_update_node_returning_already_associated(self, supported_mock,
+                                                      update_mock):
+        node = utils.create_test_node(
+            instance_uuid=uuidutils.generate_uuid())
+        self.assertRaises(exception.NodeAssociated,
+                          self.dbapi.update_node, node.id,
+                          {'instance_uuid': uuidutils.generate_uuid()})
+
+    @mock.patch.object(sqlalchemy_api, '_update_nodes_returning',
+                       autospec=True, return_value=[])
+    @mock.patch.object(sqlalchemy_api, '_update_returning_supported',
+                       autospec=True, return_value=True)
+    def test_update_node_returning_not_found(self, supported_mock,
+                                             update_mock):
+        self.assertRaises(exception.NodeNotFound,
+                          self.dbapi.update_node,
+                          uuidutils.generate_uuid(), {'extra': {}})
+
     def test_reserve_node(self):
         node = utils.create_test_node()
         uuid = node.uuid
@@ -415,6 +711,68 @@ class DbNodeTestCase(base.DbTestCase):
         res = self.dbapi.get_node_by_uuid(uuid)
         self.assertEqual(r1, res.reservation)
 
+    @mock.patch.object(sqlalchemy_api, '_update_nodes_returning',
+                       autospec=True)
+    @mock.patch.object(sqlalchemy_api, '_update_returning_supported',
+                       autospec=True, return_value=True)
+    def test_reserve_node_returning(self, supported_mock, update_mock):
+        node = utils.create_test_node()
+        update_mock.return_value = [mock.sentinel.node]
+
+        res = self.dbapi.reserve_node('fake-reservation', node.uuid)
+
+        self.assertEqual(mock.sentinel.node, res)
+        update_mock.assert_called_once_with(
+            mock.ANY, mock.ANY, {'reservation': 'fake-reservation'})
+
+    @mock.patch.object(sqlalchemy_api, '_update_nodes_returning',
+                       autospec=True, return_value=[])
+    @mock.patch.object(sqlalchemy_api, '_update_returning_supported',
+                       autospec=True, return_value=True)
+    def test_reserve_node_returning_locked(self, supported_mock,
+                                           update_mock):
+        node = utils.create_test_node(reservation='fake-reservation')
+        self.assertRaises(exception.NodeLocked,
+                          self.dbapi.reserve_node, 'another-reservation',
+                          node.uuid)
+
+    def test_reserve_node_with_filters(self):
+        node = utils.create_test_node()
+        filters = {'maintenance': False,
+                   'provision_state_not_in': [states.DEPLOYWAIT]}
+
+        self.dbapi.reserve_node('fake-reservation', node.uuid,
+                                filters=filters)
+
+        res = self.dbapi.get_node_by_uuid(node.uuid)
+        self.assertEqual('fake-reservation', res.reservation)
+
+    def test_reserve_node_filters_not_matched(self):
+        node = utils.create_test_node(maintenance=True)
+
+        self.assertRaises(exception.NodeFiltersNotMatched,
+                          self.dbapi.reserve_node, 'fake-reservation',
+                          node.uuid, filters={'maintenance': False})
+
+        res = self.dbapi.get_node_by_uuid(node.uuid)
+        self.assertIsNone(res.reservation)
+
+    def test_reserve_node_provision_state_not_in(self):
+        node = utils.create_test_node(provision_state=states.DEPLOYWAIT)
+        filters = {'provision_state_not_in': [states.DEPLOYWAIT]}
+
+        self.assertRaises(exception.NodeFiltersNotMatched,
+                          self.dbapi.reserve_node, 'fake-reservation',
+                          node.uuid, filters=filters)
+
+    def test_reserve_reserved_node_with_filters(self):
+        node = utils.create_test_node(maintenance=True,
+                                      reservation='fake-reservation')
+
+        self.assertRaises(exception.NodeLocked,
+                          self.dbapi.reserve_node, 'another-reservation',
+                          node.uuid, filters={'maintenance': False})
+
     def test_release_reservation(self):
         node = utils.create_test_node()
         uuid = node.uuid
@@ -497,3 +855,32 @@ class DbNodeTestCase(base.DbTestCase):
                           self.dbapi.release_node, 'fake', node.id)
         self.assertRaises(exception.NodeNotLocked,
                           self.dbapi.release_node, 'fake', node.uuid)
+
+    def test_count_queries(self):
+        node = utils.create_test_node()
+        with self.dbapi.count_queries() as counter:
+            self.dbapi.get_node_by_id(node.id)
+            with self.dbapi.count_queries() as nested:
+                self.dbapi.get_node_by_uuid(node.uuid)
+            self.assertEqual(1, nested.count)
+        self.dbapi.get_node_by_id(node.id)
+        self.assertEqual(2, counter.count)
+
+    def test_count_queries_other_thread(self):
+        node = utils.create_test_node()
+        with self.dbapi.count_queries() as counter:
+            eventlet.spawn(self.dbapi.get_node_by_id, node.id).wait()
+        self.assertEqual(0, counter.count)
+
+    def test_inherit_query_counters(self):
+        node = utils.create_test_node()
+
+        def worker(counters):
+            with self.dbapi.inherit_query_counters(counters):
+                self.dbapi.get_node_by_id(node.id)
+            self.dbapi.get_node_by_id(node.id)
+
+        with self.dbapi.count_queries() as counter:
+            counters = self.dbapi.get_query_counters()
+            eventlet.spawn(worker, counters).wait()
+        self.assertEqual(1, counter.count)
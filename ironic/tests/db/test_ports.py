@@ -15,10 +15,13 @@
 
 """Tests for manipulating Ports via the DB API"""
 
+import mock
+from oslo_db import exception as db_exc
 from oslo_utils import uuidutils
 import six
 
 from ironic.common import exception
+from ironic.db.sqlalchemy import api as sqlalchemy_api
 from ironic.tests.db import base
 from ironic.tests.db import utils as db_utils
 
@@ -105,3 +108,56 @@ class DbPortTestCase(base.DbTestCase):
                           uuid=self.port.uuid,
                           node_id=self.node.id,
                           address='aa-bb-cc-33-11-22')
+
+    def _get_new_ports_values(self, count):
+        values_list = []
+        for i in range(count):
+            values = db_utils.get_test_port(uuid=uuidutils.generate_uuid(),
+                                            node_id=self.node.id,
+                                            address='52:54:00:cf:2e:%02x' % i)
+            del values['id']
+            values_list.append(values)
+        return values_list
+
+    def test_create_ports(self):
+        values_list = self._get_new_ports_values(3)
+        ports = self.dbapi.create_ports(values_list, batch_size=2)
+        self.assertEqual([v['uuid'] for v in values_list],
+                         [p.uuid for p in ports])
+        res = self.dbapi.get_ports_by_node_id(self.node.id)
+        self.assertEqual(sorted([self.port.uuid] +
+                                [v['uuid'] for v in values_list]),
+                         sorted(p.uuid for p in res))
+
+    def test_create_ports_duplicated_address(self):
+        values_list = self._get_new_ports_values(3)
+        values_list[1]['address'] = self.port.address
+        results = self.dbapi.create_ports(values_list)
+        self.assertEqual(values_list[0]['uuid'], results[0].uuid)
+        self.assertIsInstance(results[1], exception.MACAlreadyExists)
+        self.assertEqual(values_list[2]['uuid'], results[2].uuid)
+        self.assertEqual(3, len(self.dbapi.get_ports_by_node_id(self.node.id)))
+
+    def test_create_ports_db_errors(self):
+        values_list = self._get_new_ports_values(4)
+        make_port_ref = sqlalchemy_api.Connection._make_port_ref
+
+        def fake_make_port_ref(values):
+            if values['address'] == values_list[1]['address']:
+                raise db_exc.DBReferenceError('ports', 'ports_ibfk_1',
+                                              'node_id', 'nodes')
+            if values['address'] == values_list[2]['address']:
+                raise db_exc.DBError('boom')
+            return make_port_ref(values)
+
+        with mock.patch.object(sqlalchemy_api.Connection, '_make_port_ref',
+                               side_effect=fake_make_port_ref):
+            results = self.dbapi.create_ports(values_list)
+        self.assertEqual(values_list[0]['uuid'], results[0].uuid)
+        self.assertIsInstance(results[1], exception.ReferenceNotFound)
+        self.assertEqual(400, results[1].code)
+        self.assertIsInstance(results[2], exception.DatabaseError)
+        self.assertEqual(500, results[2].code)
+        self.assertNotIn('boom', six.text_type(results[2]))
+        self.assertEqual(values_list[3]['uuid'], results[3].uuid)
+        self.assertEqual(3, len(self.dbapi.get_ports_by_node_id(self.node.id)))
@@ -14,6 +14,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import eventlet
 import mock
 from neutronclient.common import exceptions as neutron_client_exc
 from neutronclient.v2_0 import client
@@ -62,6 +63,7 @@ class TestNeutron(db_base.DbTestCase):
                              'mac_address': '52:54:00:cf:2d:32'}
 
         dhcp_factory.DHCPFactory._dhcp_provider = None
+        self.addCleanup(neutron._clear_client_cache)
 
     def test__build_client_invalid_auth_strategy(self):
         self.config(auth_strategy='wrong_config', group='neutron')
@@ -134,6 +136,32 @@ class TestNeutron(db_base.DbTestCase):
         neutron._build_client(token=None)
         mock_client_init.assert_called_once_with(**expected)
 
+    @mock.patch.object(client.Client, "__init__")
+    def test__build_client_cached(self, mock_client_init):
+        mock_client_init.return_value = None
+        client1 = neutron._build_client(token='token1')
+        self.assertIs(client1, neutron._build_client(token='token1'))
+        client2 = neutron._build_client(token='token2')
+        self.assertIsNot(client1, client2)
+        self.assertEqual(2, mock_client_init.call_count)
+        # A configuration change gives a new client
+        self.config(url_timeout=60, group='neutron')
+        self.assertIsNot(client1, neutron._build_client(token='token1'))
+        self.assertEqual(3, mock_client_init.call_count)
+
+    @mock.patch.object(neutron, '_CLIENT_CACHE_SIZE', 2)
+    @mock.patch.object(client.Client, "__init__")
+    def test__build_client_cache_size(self, mock_client_init):
+        mock_client_init.return_value = None
+        client1 = neutron._build_client(token='token1')
+        client2 = neutron._build_client(token='token2')
+        # token1 is now the most recently used
+        self.assertIs(client1, neutron._build_client(token='token1'))
+        neutron._build_client(token='token3')
+        self.assertIs(client1, neutron._build_client(token='token1'))
+        self.assertIsNot(client2, neutron._build_client(token='token2'))
+        self.assertEqual(4, mock_client_init.call_count)
+
     @mock.patch.object(client.Client, 'update_port')
     @mock.patch.object(client.Client, "__init__")
     def test_update_port_dhcp_opts(self, mock_client_init, mock_update_port):
@@ -349,19 +377,68 @@ class TestNeutron(db_base.DbTestCase):
                               mock.sentinel.client)
             mock_gnvi.assert_called_once_with(task)
 
-    @mock.patch('ironic.dhcp.neutron.NeutronDHCPApi._get_port_ip_address')
-    def test_get_ip_addresses(self, get_ip_mock):
+    @mock.patch.object(client.Client, 'list_ports')
+    @mock.patch('ironic.common.network.get_node_vif_ids')
+    def test_get_ip_addresses(self, mock_gnvi, list_mock):
         ip_address = '10.10.0.1'
-        expected = [ip_address]
+        port = object_utils.create_test_port(self.context,
+                                             node_id=self.node.id,
+                                             address='aa:bb:cc',
+                                             uuid=uuidutils.generate_uuid())
+        mock_gnvi.return_value = {self.ports[0].uuid: 'vif-uuid1',
+                                  port.uuid: 'vif-uuid2'}
+        list_mock.return_value = {'ports': [
+            {'id': 'vif-uuid1', 'fixed_ips': [{'ip_address': ip_address}]},
+            {'id': 'vif-uuid2', 'fixed_ips': [{'ip_address': '10.10.0.2'}]}]}
 
-        get_ip_mock.return_value = ip_address
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            api = dhcp_factory.DHCPFactory().provider
+            result = api.get_ip_addresses(task)
+            mock_gnvi.assert_called_once_with(task)
+        self.assertEqual(sorted([ip_address, '10.10.0.2']), sorted(result))
+        list_mock.assert_called_once_with(id=mock.ANY)
+        self.assertEqual(['vif-uuid1', 'vif-uuid2'],
+                         sorted(list_mock.call_args[1]['id']))
+
+    @mock.patch.object(client.Client, 'list_ports')
+    @mock.patch('ironic.common.network.get_node_vif_ids')
+    def test_get_ip_addresses_some_failures(self, mock_gnvi, list_mock):
+        port = object_utils.create_test_port(self.context,
+                                             node_id=self.node.id,
+                                             address='aa:bb:cc',
+                                             uuid=uuidutils.generate_uuid())
+        mock_gnvi.return_value = {self.ports[0].uuid: 'vif-uuid1',
+                                  port.uuid: 'vif-uuid2'}
+        # The second port isn't known by Neutron
+        list_mock.return_value = {'ports': [
+            {'id': 'vif-uuid1', 'fixed_ips': [{'ip_address': '10.10.0.1'}]}]}
 
         with task_manager.acquire(self.context, self.node.uuid) as task:
             api = dhcp_factory.DHCPFactory().provider
             result = api.get_ip_addresses(task)
-            get_ip_mock.assert_called_once_with(task, self.ports[0].uuid,
-                                                mock.ANY)
-        self.assertEqual(expected, result)
+        self.assertEqual(['10.10.0.1'], result)
+
+    @mock.patch.object(client.Client, 'list_ports')
+    @mock.patch('ironic.common.network.get_node_vif_ids')
+    def test_get_ip_addresses_list_fail(self, mock_gnvi, list_mock):
+        mock_gnvi.return_value = {self.ports[0].uuid: 'vif-uuid1'}
+        list_mock.side_effect = neutron_client_exc.ConnectionFailed()
+
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            api = dhcp_factory.DHCPFactory().provider
+            result = api.get_ip_addresses(task)
+        self.assertEqual([], result)
+
+    @mock.patch.object(client.Client, 'list_ports')
+    @mock.patch('ironic.common.network.get_node_vif_ids')
+    def test_get_ip_addresses_no_vifs(self, mock_gnvi, list_mock):
+        mock_gnvi.return_value = {}
+
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            api = dhcp_factory.DHCPFactory().provider
+            result = api.get_ip_addresses(task)
+        self.assertEqual([], result)
+        self.assertFalse(list_mock.called)
 
     @mock.patch.object(client.Client, 'create_port')
     def test_create_cleaning_ports(self, create_mock):
@@ -393,6 +470,83 @@ class TestNeutron(db_base.DbTestCase):
                 'admin_state_up': True, 'mac_address': self.ports[0].address}})
             rollback_mock.assert_called_once_with(task)
 
+    @mock.patch.object(neutron.NeutronDHCPApi, '_rollback_cleaning_ports')
+    @mock.patch.object(client.Client, 'create_port')
+    def test_create_cleaning_ports_some_failures(self, create_mock,
+                                                 rollback_mock):
+        # All the ports are tried, then the created ones are cleaned up
+        port = object_utils.create_test_port(self.context,
+                                             node_id=self.node.id,
+                                             address='aa:bb:cc',
+                                             uuid=uuidutils.generate_uuid())
+
+        def create_port(body):
+            if body['port']['mac_address'] == port.address:
+                raise neutron_client_exc.ConnectionFailed()
+            return {'port': self.neutron_port}
+
+        create_mock.side_effect = create_port
+        api = dhcp_factory.DHCPFactory().provider
+
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            self.assertRaises(exception.NodeCleaningFailure,
+                              api.create_cleaning_ports,
+                              task)
+            self.assertEqual(2, create_mock.call_count)
+            self.assertEqual(
+                sorted([self.ports[0].address, port.address]),
+                sorted(c[0][0]['port']['mac_address']
+                       for c in create_mock.call_args_list))
+            rollback_mock.assert_called_once_with(task)
+
+    @mock.patch.object(neutron.NeutronDHCPApi, '_rollback_cleaning_ports')
+    @mock.patch.object(client.Client, 'create_port')
+    def test_create_cleaning_ports_client_errors(self, create_mock,
+                                                 rollback_mock):
+        # Any client error is handled, and the ports are cleaned up once
+        port = object_utils.create_test_port(self.context,
+                                             node_id=self.node.id,
+                                             address='aa:bb:cc',
+                                             uuid=uuidutils.generate_uuid())
+        create_mock.side_effect = neutron_client_exc.NeutronClientException(
+            status_code=409)
+        api = dhcp_factory.DHCPFactory().provider
+
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            self.assertRaises(exception.NodeCleaningFailure,
+                              api.create_cleaning_ports,
+                              task)
+            self.assertEqual(
+                sorted([self.ports[0].address, port.address]),
+                sorted(c[0][0]['port']['mac_address']
+                       for c in create_mock.call_args_list))
+            rollback_mock.assert_called_once_with(task)
+
+    @mock.patch.object(client.Client, 'create_port')
+    def test_create_cleaning_ports_concurrency(self, create_mock):
+        # At most port_requests_concurrency ports are created at once
+        self.config(port_requests_concurrency=1, group='neutron')
+        port = object_utils.create_test_port(self.context,
+                                             node_id=self.node.id,
+                                             address='aa:bb:cc',
+                                             uuid=uuidutils.generate_uuid())
+        running = []
+
+        def create_port(body):
+            running.append(body['port']['mac_address'])
+            self.assertEqual(1, len(running))
+            eventlet.sleep(0)
+            running.pop()
+            return {'port': {'id': body['port']['mac_address']}}
+
+        create_mock.side_effect = create_port
+        api = dhcp_factory.DHCPFactory().provider
+
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            ports = api.create_cleaning_ports(task)
+        self.assertEqual({self.ports[0].uuid: self.ports[0].address,
+                          port.uuid: port.address}, ports)
+
     @mock.patch.object(client.Client, 'create_port')
     def test_create_cleaning_ports_bad_config(self, create_mock):
         # Check an error is raised if the cleaning network is not set
@@ -447,3 +601,42 @@ class TestNeutron(db_base.DbTestCase):
             list_mock.assert_called_once_with(
                 network_id='00000000-0000-0000-0000-000000000000')
             delete_mock.assert_called_once_with(self.neutron_port['id'])
+
+    @mock.patch.object(client.Client, 'delete_port')
+    @mock.patch.object(client.Client, 'list_ports')
+    def test_delete_cleaning_ports_client_error(self, list_mock, delete_mock):
+        # Any client error is handled
+        list_mock.return_value = {'ports': [self.neutron_port]}
+        delete_mock.side_effect = neutron_client_exc.NeutronClientException(
+            status_code=409)
+        api = dhcp_factory.DHCPFactory().provider
+
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            self.assertRaises(exception.NodeCleaningFailure,
+                              api.delete_cleaning_ports,
+                              task)
+            delete_mock.assert_called_once_with(self.neutron_port['id'])
+
+    @mock.patch.object(client.Client, 'delete_port')
+    @mock.patch.object(client.Client, 'list_ports')
+    def test_delete_cleaning_ports_some_failures(self, list_mock,
+                                                 delete_mock):
+        # All the ports are tried even if some can't be deleted
+        port = object_utils.create_test_port(self.context,
+                                             node_id=self.node.id,
+                                             address='aa:bb:cc',
+                                             uuid=uuidutils.generate_uuid())
+        other_port = {'id': '132f871f-eaec-4fed-9475-0d54465e0f01',
+                      'mac_address': port.address}
+        list_mock.return_value = {'ports': [self.neutron_port, other_port]}
+        delete_mock.side_effect = [neutron_client_exc.ConnectionFailed,
+                                   None]
+        api = dhcp_factory.DHCPFactory().provider
+
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            self.assertRaises(exception.NodeCleaningFailure,
+                              api.delete_cleaning_ports,
+                              task)
+            self.assertEqual(
+                sorted([self.neutron_port['id'], other_port['id']]),
+                sorted(c[0][0] for c in delete_mock.call_args_list))
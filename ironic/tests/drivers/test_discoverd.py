@@ -188,8 +188,6 @@ class CheckStatusTestCase(BaseTestCase):
         self.task.process_event.assert_called_once_with('done')
 
 
-@mock.patch.object(eventlet.greenthread, 'spawn_n',
-                   lambda f, *a, **kw: f(*a, **kw))
 @mock.patch.object(ironic_discoverd, '__version_info__', (1, 0, 0))
 @mock.patch.object(task_manager, 'acquire', autospec=True)
 @mock.patch.object(discoverd, '_check_status', autospec=True)
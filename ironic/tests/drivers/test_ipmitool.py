@@ -22,7 +22,9 @@
 
 import os
 import stat
+import sys
 import tempfile
+import textwrap
 import time
 
 import mock
@@ -921,6 +923,49 @@ class IPMIToolPrivateMethodTestCase(db_base.DbTestCase):
         mock_support.assert_called_once_with('timing')
         self.assertEqual(2, mock_exec.call_count)
 
+    @mock.patch.object(ipmi, '_is_option_supported', autospec=True)
+    @mock.patch.object(ipmi.SHELL_SESSIONS, 'execute', autospec=True)
+    @mock.patch.object(utils, 'execute', autospec=True)
+    def test__exec_ipmitool_shell_sessions(self, mock_exec, mock_shell,
+                                           mock_support, mock_sleep):
+        ipmi.LAST_CMD_TIME = {}
+        args = [
+            'ipmitool',
+            '-I', 'lanplus',
+            '-H', self.info['address'],
+            '-L', self.info['priv_level'],
+            '-U', self.info['username'],
+        ]
+        mock_support.return_value = False
+        mock_shell.return_value = ('out', '')
+        self.config(shell_sessions=True, group='ipmi')
+
+        self.assertEqual(('out', ''), ipmi._exec_ipmitool(self.info, 'A B C'))
+
+        mock_shell.assert_called_once_with(args, self.info['password'],
+                                           'A B C')
+        self.assertFalse(mock_exec.called)
+        self.assertIn(self.info['address'], ipmi.LAST_CMD_TIME)
+
+    @mock.patch.object(ipmi, '_is_option_supported', autospec=True)
+    @mock.patch.object(ipmi.SHELL_SESSIONS, 'execute', autospec=True)
+    def test__exec_ipmitool_shell_sessions_retry(self, mock_shell,
+                                                 mock_support, mock_sleep):
+        ipmi.LAST_CMD_TIME = {}
+        mock_support.return_value = False
+        mock_shell.side_effect = iter([
+            processutils.ProcessExecutionError(
+                stderr="insufficient resources for session"
+            ),
+            ('out', ''),
+            ])
+        self.config(shell_sessions=True, group='ipmi')
+        self.config(min_command_interval=1, group='ipmi')
+        self.config(retry_timeout=2, group='ipmi')
+
+        self.assertEqual(('out', ''), ipmi._exec_ipmitool(self.info, 'A B C'))
+        self.assertEqual(2, mock_shell.call_count)
+
     @mock.patch.object(ipmi, '_exec_ipmitool', autospec=True)
     def test__power_status_on(self, mock_exec, mock_sleep):
         mock_exec.return_value = ["Chassis Power is on\n", None]
@@ -978,6 +1023,210 @@ class IPMIToolPrivateMethodTestCase(db_base.DbTestCase):
         self.assertEqual(states.ERROR, state)
 
 
+# A fake "ipmitool shell": echoes the commands, and fails on "fail" and
+# "exit". "warn" writes a warning with its output, "partial" an error, and
+# "late" writes a warning after the next prompt.
+FAKE_IPMITOOL_SHELL = textwrap.dedent("""
+    import sys
+    import time
+
+    args = sys.argv[1:]
+    assert args[-1] == 'shell', args
+    with open(args[args.index('-f') + 1]) as f:
+        assert f.read() == 'password'
+    late = False
+    while True:
+        sys.stdout.write('ipmitool> ')
+        sys.stdout.flush()
+        if late:
+            time.sleep(0.1)
+            sys.stderr.write('Warning: late\\n')
+            sys.stderr.flush()
+            late = False
+        line = sys.stdin.readline()
+        if not line or line.strip() == 'exit':
+            break
+        if line.strip() == 'fail':
+            sys.stderr.write('Error: failed\\n')
+            sys.stderr.flush()
+        else:
+            if line.strip() == 'warn':
+                sys.stderr.write('Warning: warned\\n')
+                sys.stderr.flush()
+            if line.strip() == 'partial':
+                sys.stderr.write('Set Boot Device failed: Invalid\\n')
+                sys.stderr.flush()
+            late = line.strip() == 'late'
+            sys.stdout.write('got %s' % line)
+""")
+
+
+class IPMIToolShellSessionTestCase(base.TestCase):
+
+    def setUp(self):
+        super(IPMIToolShellSessionTestCase, self).setUp()
+        self.config(retry_timeout=10, group='ipmi')
+        script = tempfile.NamedTemporaryFile(mode='w', suffix='.py')
+        script.write(FAKE_IPMITOOL_SHELL)
+        script.flush()
+        self.addCleanup(script.close)
+        self.args = [sys.executable, script.name]
+        self.session = ipmi._ShellSession(self.args, 'password')
+        self.addCleanup(self.session.close)
+
+    def test_execute(self):
+        self.assertFalse(self.session.running)
+        self.assertEqual(('got power status\n', ''),
+                         self.session.execute('power status'))
+        process = self.session._process
+        self.assertEqual(('got chassis status\n', ''),
+                         self.session.execute('chassis status'))
+        # the process is reused
+        self.assertIs(process, self.session._process)
+
+    def test_execute_error(self):
+        self.session.execute('power status')
+        process = self.session._process
+        exc = self.assertRaises(processutils.ProcessExecutionError,
+                                self.session.execute, 'fail')
+        self.assertEqual('Error: failed\n', exc.stderr)
+        # the process is kept running
+        self.assertTrue(self.session.running)
+        self.assertEqual(('got power status\n', ''),
+                         self.session.execute('power status'))
+        self.assertIs(process, self.session._process)
+
+    @mock.patch.object(ipmi.LOG, 'warning', autospec=True)
+    def test_execute_warning(self, mock_log):
+        self.assertEqual(('got warn\n', 'Warning: warned\n'),
+                         self.session.execute('warn'))
+        self.assertTrue(self.session.running)
+        self.assertEqual(1, mock_log.call_count)
+
+    @mock.patch.object(ipmi.LOG, 'warning', autospec=True)
+    def test_execute_error_with_output(self, mock_log):
+        exc = self.assertRaises(processutils.ProcessExecutionError,
+                                self.session.execute, 'partial')
+        self.assertEqual('got partial\n', exc.stdout)
+        self.assertEqual('Set Boot Device failed: Invalid\n', exc.stderr)
+        self.assertTrue(self.session.running)
+        self.assertFalse(mock_log.called)
+
+    @mock.patch.object(ipmi.LOG, 'warning', autospec=True)
+    def test_execute_late_error(self, mock_log):
+        self.assertEqual(('got late\n', ''), self.session.execute('late'))
+        time.sleep(0.3)
+        # the late warning is not blamed on the next command
+        self.assertEqual(('got power status\n', ''),
+                         self.session.execute('power status'))
+        self.assertEqual(1, mock_log.call_count)
+        self.assertEqual('late', mock_log.call_args[0][1]['command'])
+        self.assertEqual('Warning: late\n', mock_log.call_args[0][1]['error'])
+
+    def test_execute_exit(self):
+        self.assertRaises(processutils.ProcessExecutionError,
+                          self.session.execute, 'exit')
+        self.assertFalse(self.session.running)
+
+    @mock.patch.object(ipmi.select, 'select', autospec=True)
+    def test_execute_timeout(self, mock_select):
+        mock_select.return_value = ([], [], [])
+        self.assertRaises(processutils.ProcessExecutionError,
+                          self.session.execute, 'power status')
+        self.assertFalse(self.session.running)
+
+    def test_close(self):
+        self.session.execute('power status')
+        process = self.session._process
+        self.session.close()
+        self.assertFalse(self.session.running)
+        self.assertIsNotNone(process.returncode)
+
+    def test_pool(self):
+        pool = ipmi._ShellSessionPool()
+        self.addCleanup(pool.close)
+        self.assertEqual(('got power status\n', ''),
+                         pool.execute(self.args, 'password', 'power status'))
+        self.assertEqual(('got power status\n', ''),
+                         pool.execute(self.args, 'password', 'power status'))
+        self.assertEqual(1, len(pool._sessions))
+        session = list(pool._sessions.values())[0]
+        self.assertTrue(session.running)
+
+        pool.close()
+        self.assertFalse(session.running)
+        self.assertEqual({}, pool._sessions)
+
+    def test_pool_dead_session_removed(self):
+        pool = ipmi._ShellSessionPool()
+        self.addCleanup(pool.close)
+        pool.execute(self.args, 'password', 'power status')
+        session = list(pool._sessions.values())[0]
+        self.assertRaises(processutils.ProcessExecutionError,
+                          pool.execute, self.args, 'password', 'exit')
+        self.assertTrue(session.retired)
+        self.assertEqual({}, pool._sessions)
+
+    def test_pool_max_count(self):
+        self.config(shell_session_max_count=2, group='ipmi')
+        pool = ipmi._ShellSessionPool()
+        self.addCleanup(pool.close)
+        sessions = [pool._get_session((tuple(self.args), password))
+                    for password in ('a', 'b', 'a', 'c')]
+        self.assertIs(sessions[0], sessions[2])
+        # "b" was the least recently used session
+        self.assertTrue(sessions[1].retired)
+        self.assertEqual([(tuple(self.args), 'a'), (tuple(self.args), 'c')],
+                         list(pool._sessions))
+
+    def test_pool_max_count_skips_busy_sessions(self):
+        self.config(shell_session_max_count=1, group='ipmi')
+        pool = ipmi._ShellSessionPool()
+        self.addCleanup(pool.close)
+        busy = pool._get_session((tuple(self.args), 'a'))
+        with busy.lock:
+            pool._get_session((tuple(self.args), 'b'))
+        self.assertFalse(busy.retired)
+        self.assertEqual(2, len(pool._sessions))
+        pool._get_session((tuple(self.args), 'c'))
+        self.assertTrue(busy.retired)
+        self.assertEqual([(tuple(self.args), 'c')], list(pool._sessions))
+
+    def test_pool_retired_session_not_used(self):
+        pool = ipmi._ShellSessionPool()
+        self.addCleanup(pool.close)
+        key = (tuple(self.args), 'password')
+        retired = ipmi._ShellSession(self.args, 'password')
+        retired.retired = True
+        with mock.patch.object(pool, '_get_session', autospec=True,
+                               side_effect=[retired,
+                                            pool._get_session(key)]):
+            self.assertEqual(('got power status\n', ''),
+                             pool.execute(self.args, 'password',
+                                          'power status'))
+        self.assertFalse(retired.running)
+        self.assertTrue(pool._sessions[key].running)
+
+    @mock.patch.object(time, 'time', autospec=True)
+    def test_pool_evict_idle(self, mock_time):
+        self.config(shell_session_idle_timeout=60, group='ipmi')
+        mock_time.return_value = 1000
+        pool = ipmi._ShellSessionPool()
+        self.addCleanup(pool.close)
+        pool.execute(self.args, 'password', 'power status')
+        session = list(pool._sessions.values())[0]
+
+        mock_time.return_value = 1030
+        pool.evict_idle()
+        self.assertTrue(session.running)
+
+        mock_time.return_value = 1100
+        pool.evict_idle()
+        self.assertFalse(session.running)
+        self.assertTrue(session.retired)
+        self.assertEqual({}, pool._sessions)
+
+
 class IPMIToolDriverTestCase(db_base.DbTestCase):
 
     def setUp(self):
@@ -1000,6 +1249,11 @@ class IPMIToolDriverTestCase(db_base.DbTestCase):
         self.assertEqual(sorted(expected),
                          sorted(self.driver.get_properties().keys()))
 
+    @mock.patch.object(ipmi.SHELL_SESSIONS, 'evict_idle', autospec=True)
+    def test_evict_idle_shell_sessions(self, mock_evict):
+        self.driver.power._evict_idle_shell_sessions(None, self.context)
+        mock_evict.assert_called_once_with()
+
     @mock.patch.object(ipmi, '_exec_ipmitool', autospec=True)
     def test_get_power_state(self, mock_exec):
         returns = iter([["Chassis Power is off\n", None],
@@ -863,7 +863,7 @@ class PXEDriverTestCase(db_base.DbTestCase):
             task.driver.deploy.deploy(task)
 
             mock_expire.assert_called_once_with(self.context.auth_token, 600)
-            mock_admin_token.assert_called_once_with()
+            mock_admin_token.assert_called_once_with(valid_for=600)
             # ensure token file created with new token
             t_path = pxe._get_token_file_path(self.node.uuid)
             token = open(t_path, 'r').read()
@@ -77,6 +77,33 @@ class TestNodeObject(base.DbTestCase):
                 self.assertEqual(self.context, n._context)
                 self.assertEqual({}, n.driver_internal_info)
 
+    def test_save_no_changes(self):
+        with mock.patch.object(self.dbapi, 'get_node_by_uuid',
+                               autospec=True) as mock_get_node:
+            mock_get_node.return_value = self.fake_node
+            with mock.patch.object(self.dbapi, 'update_node',
+                                   autospec=True) as mock_update_node:
+                n = objects.Node.get(self.context, self.fake_node['uuid'])
+                n.driver_info = dict(self.fake_node['driver_info'])
+                n.save()
+                self.assertFalse(mock_update_node.called)
+
+    def test_save_changed_in_place(self):
+        uuid = self.fake_node['uuid']
+        with mock.patch.object(self.dbapi, 'get_node_by_uuid',
+                               autospec=True) as mock_get_node:
+            mock_get_node.return_value = self.fake_node
+            with mock.patch.object(self.dbapi, 'update_node',
+                                   autospec=True) as mock_update_node:
+                n = objects.Node.get(self.context, uuid)
+                n.driver_internal_info['agent_last_heartbeat'] = 42
+                n.save()
+                expected = dict(self.fake_node['driver_internal_info'],
+                                agent_last_heartbeat=42)
+                mock_update_node.assert_called_once_with(
+                    uuid, {'driver_internal_info': expected})
+                self.assertEqual(set(), n.obj_what_changed())
+
     def test_refresh(self):
         uuid = self.fake_node['uuid']
         returns = [dict(self.fake_node, properties={"fake": "first"}),
@@ -101,6 +128,35 @@ class TestNodeObject(base.DbTestCase):
             self.assertIsInstance(nodes[0], objects.Node)
             self.assertEqual(self.context, nodes[0]._context)
 
+    def test_list_fields(self):
+        with mock.patch.object(self.dbapi, 'get_node_list',
+                               autospec=True) as mock_get_list:
+            mock_get_list.return_value = [self.fake_node]
+            nodes = objects.Node.list(self.context, fields=['uuid', 'name'])
+            mock_get_list.assert_called_once_with(
+                filters=None, limit=None, marker=None, sort_key=None,
+                sort_dir=None, columns=['id', 'uuid', 'name'])
+            self.assertEqual(set(['id', 'uuid', 'name']),
+                             set(nodes[0].as_dict()))
+            self.assertFalse(nodes[0].obj_what_changed())
+
+    def test_list_fields_loaded_on_access(self):
+        with mock.patch.object(self.dbapi, 'get_node_list',
+                               autospec=True) as mock_get_list:
+            mock_get_list.return_value = [self.fake_node]
+            node = objects.Node.list(self.context, fields=['uuid'])[0]
+        with mock.patch.object(self.dbapi, 'get_node_by_id',
+                               autospec=True) as mock_get_node:
+            mock_get_node.return_value = self.fake_node
+            node.name = 'spam'
+            self.assertEqual(self.fake_node['driver_info'],
+                             node.driver_info)
+            self.assertEqual(self.fake_node['extra'], node.extra)
+            mock_get_node.assert_called_once_with(self.fake_node['id'])
+        # the field changed before the others were loaded is kept
+        self.assertEqual('spam', node.name)
+        self.assertEqual(set(['name']), node.obj_what_changed())
+
     def test_reserve(self):
         with mock.patch.object(self.dbapi, 'reserve_node',
                                autospec=True) as mock_reserve:
@@ -109,7 +165,8 @@ class TestNodeObject(base.DbTestCase):
             fake_tag = 'fake-tag'
             node = objects.Node.reserve(self.context, fake_tag, node_id)
             self.assertIsInstance(node, objects.Node)
-            mock_reserve.assert_called_once_with(fake_tag, node_id)
+            mock_reserve.assert_called_once_with(fake_tag, node_id,
+                                                 filters=None)
             self.assertEqual(self.context, node._context)
 
     def test_reserve_node_not_found(self):
@@ -137,3 +194,22 @@ class TestNodeObject(base.DbTestCase):
             self.assertRaises(exception.NodeNotFound,
                               objects.Node.release, self.context,
                               'fake-tag', node_id)
+
+    def test_create_many(self):
+        error = exception.DuplicateName(name='spam')
+        with mock.patch.object(self.dbapi, 'create_nodes',
+                               autospec=True) as mock_create_nodes:
+            mock_create_nodes.return_value = [self.fake_node, error]
+            nodes = [objects.Node(self.context, uuid=self.fake_node['uuid']),
+                     objects.Node(self.context, name='spam')]
+
+            errors = objects.Node.create_many(self.context, nodes,
+                                              batch_size=10)
+
+            mock_create_nodes.assert_called_once_with(
+                [{'uuid': self.fake_node['uuid']}, {'name': 'spam'}],
+                batch_size=10)
+            self.assertEqual([None, error], errors)
+            self.assertEqual(self.fake_node['id'], nodes[0].id)
+            self.assertEqual({}, nodes[0].obj_get_changes())
+            self.assertFalse(nodes[1].obj_attr_is_set('id'))
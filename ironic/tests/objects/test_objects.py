@@ -17,6 +17,7 @@ import datetime
 import gettext
 
 import iso8601
+import mock
 import netaddr
 from oslo_context import context
 from oslo_utils import timeutils
@@ -343,6 +344,24 @@ class _TestObject(object):
         obj2.obj_reset_changes()
         self.assertEqual(set(), obj2.obj_what_changed())
 
+    def test_obj_class_from_name_new_version(self):
+        class CachedObj(base.IronicObject):
+            VERSION = '1.0'
+
+        self.assertIs(CachedObj,
+                      base.IronicObject.obj_class_from_name('CachedObj',
+                                                            '1.0'))
+        self.assertRaises(exception.IncompatibleObjectVersion,
+                          base.IronicObject.obj_class_from_name,
+                          'CachedObj', '1.1')
+
+        class CachedObj(base.IronicObject):
+            VERSION = '1.1'
+
+        self.assertIs(CachedObj,
+                      base.IronicObject.obj_class_from_name('CachedObj',
+                                                            '1.1'))
+
     def test_unknown_objtype(self):
         self.assertRaises(exception.UnsupportedObjectError,
                           base.IronicObject.obj_class_from_name, 'foo', '1.0')
@@ -488,6 +507,70 @@ class _TestObject(object):
         obj.obj_reset_changes()
         self.assertEqual({}, obj.obj_get_changes())
 
+    def test_container_field_changed_in_place(self):
+        class TestObj(base.IronicObject):
+            fields = {'info': utils.dict_or_none}
+
+        obj = TestObj(self.context, info={'foo': {'bar': 1}})
+        obj.obj_reset_changes()
+        obj.info['foo']['bar'] = 2
+        self.assertEqual(set(['info']), obj.obj_what_changed())
+        self.assertEqual({'info': {'foo': {'bar': 2}}},
+                         obj.obj_get_changes())
+        obj.obj_reset_changes()
+        self.assertEqual(set(), obj.obj_what_changed())
+
+    def test_container_field_changed_after_reset(self):
+        class TestObj(base.IronicObject):
+            fields = {'info': utils.dict_or_none}
+
+        obj = TestObj(self.context, info={'foo': 'bar'})
+        obj.obj_reset_changes()
+        info = obj.info
+        obj.obj_reset_changes()
+        info['foo'] = 'baz'
+        self.assertEqual(set(['info']), obj.obj_what_changed())
+
+    def test_container_field_fingerprinted_when_handed_out(self):
+        class TestObj(base.IronicObject):
+            fields = {'info': utils.dict_or_none}
+
+        with mock.patch.object(base, '_fingerprint',
+                               wraps=base._fingerprint) as mock_fp:
+            obj = TestObj(self.context, info={'foo': 'bar'})
+            obj.obj_reset_changes()
+            obj2 = TestObj.obj_from_primitive(obj.obj_to_primitive())
+            self.assertEqual(set(), obj2.obj_what_changed())
+            self.assertFalse(mock_fp.called)
+            obj2.info['foo'] = 'baz'
+            self.assertEqual(set(['info']), obj2.obj_what_changed())
+
+    def test_container_field_set_to_equal_value(self):
+        class TestObj(base.IronicObject):
+            fields = {'info': utils.dict_or_none}
+
+        obj = TestObj(self.context, info={'foo': 'bar'})
+        obj.obj_reset_changes()
+        obj.info = {'foo': 'bar'}
+        self.assertEqual(set(), obj.obj_what_changed())
+        obj.info = {'foo': 'baz'}
+        self.assertEqual(set(['info']), obj.obj_what_changed())
+        obj.info = {'foo': 'bar'}
+        self.assertEqual(set(), obj.obj_what_changed())
+
+    def test_container_field_changes_in_primitive(self):
+        class TestObj(base.IronicObject):
+            fields = {'info': utils.dict_or_none,
+                      'extra': utils.dict_or_none}
+
+        obj = TestObj(self.context, info={'foo': 'bar'}, extra={})
+        obj.obj_reset_changes()
+        obj.info = {'foo': 'baz'}
+        obj2 = TestObj.obj_from_primitive(obj.obj_to_primitive())
+        self.assertEqual(set(['info']), obj2.obj_what_changed())
+        obj2.extra['foo'] = 'bar'
+        self.assertEqual(set(['info', 'extra']), obj2.obj_what_changed())
+
     def test_obj_fields(self):
         class TestObj(base.IronicObject):
             fields = {'foo': int}
@@ -105,3 +105,21 @@ class TestPortObject(base.DbTestCase):
             self.assertThat(ports, HasLength(1))
             self.assertIsInstance(ports[0], objects.Port)
             self.assertEqual(self.context, ports[0]._context)
+
+    def test_create_many(self):
+        error = exception.MACAlreadyExists(mac='52:54:00:cf:2d:32')
+        with mock.patch.object(self.dbapi, 'create_ports',
+                               autospec=True) as mock_create_ports:
+            mock_create_ports.return_value = [self.fake_port, error]
+            ports = [objects.Port(self.context,
+                                  address=self.fake_port['address']),
+                     objects.Port(self.context, address='52:54:00:cf:2d:32')]
+
+            errors = objects.Port.create_many(self.context, ports)
+
+            mock_create_ports.assert_called_once_with(
+                [{'address': self.fake_port['address']},
+                 {'address': '52:54:00:cf:2d:32'}], batch_size=None)
+            self.assertEqual([None, error], errors)
+            self.assertEqual(self.fake_port['uuid'], ports[0].uuid)
+            self.assertFalse(ports[1].obj_attr_is_set('uuid'))
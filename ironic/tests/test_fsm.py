@@ -109,6 +109,39 @@ class FSMTest(base.TestCase):
         self.assertEqual('up', c.current_state)
         self.assertEqual(None, d.current_state)
 
+    def test_freeze(self):
+        self.assertFalse(self.jumper.frozen)
+        self.jumper.freeze()
+        self.assertTrue(self.jumper.frozen)
+        self.assertRaises(excp.InvalidState, self.jumper.add_state, 'left')
+        self.assertRaises(excp.InvalidState, self.jumper.add_transition,
+                          'up', 'up', 'stay')
+        # the machine can still be used
+        self.jumper.initialize('down')
+        self.jumper.process_event('jump')
+        self.assertEqual('up', self.jumper.current_state)
+
+    def test_copy_frozen(self):
+        self.jumper.freeze()
+        deep = self.jumper.copy()
+        shallow = self.jumper.copy(shallow=True)
+
+        self.assertFalse(deep.frozen)
+        deep.add_state('left')
+        self.assertTrue(shallow.frozen)
+        self.assertRaises(excp.InvalidState, shallow.add_state, 'left')
+
+        # shallow copies have their own current state
+        shallow.initialize('down')
+        other = self.jumper.copy(shallow=True)
+        other.initialize('up')
+        shallow.process_event('jump')
+        self.assertEqual('up', shallow.current_state)
+        self.assertEqual('up', other.current_state)
+        other.process_event('fall')
+        self.assertEqual('up', shallow.current_state)
+        self.assertEqual('down', other.current_state)
+
     def test_invalid_callbacks(self):
         m = fsm.FSM('working')
         m.add_state('working')
@@ -17,6 +17,8 @@ import hashlib
 
 import mock
 from oslo_config import cfg
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
 from testtools import matchers
 
 from ironic.common import exception
@@ -209,6 +211,114 @@ class HashRingTestCase(base.TestCase):
                           ring.get_hosts,
                           None)
 
+    def test_get_hosts_many(self):
+        hosts = ['foo', 'bar', 'baz']
+        data = [uuidutils.generate_uuid() for i in range(200)]
+        for replicas in (1, 2, 3):
+            ring = hash_ring.HashRing(hosts, replicas=replicas)
+            expected = dict((d, ring.get_hosts(d)) for d in data)
+            self.assertEqual(expected, ring.get_hosts_many(data))
+
+    def test_get_hosts_many_ignore_hosts(self):
+        hosts = ['foo', 'bar', 'baz']
+        data = [uuidutils.generate_uuid() for i in range(200)]
+        ring = hash_ring.HashRing(hosts, replicas=2)
+        expected = dict((d, ring.get_hosts(d, ignore_hosts=['bar', 'qux']))
+                        for d in data)
+        self.assertEqual(expected,
+                         ring.get_hosts_many(data,
+                                             ignore_hosts=['bar', 'qux']))
+
+    def test_get_hosts_many_empty(self):
+        ring = hash_ring.HashRing(['foo', 'bar'])
+        self.assertEqual({}, ring.get_hosts_many([]))
+
+    def test_get_hosts_many_invalid_data(self):
+        ring = hash_ring.HashRing(['foo', 'bar'])
+        self.assertRaises(exception.Invalid, ring.get_hosts_many, [None])
+
+    def _assert_rings_equal(self, expected, ring):
+        self.assertEqual(expected.hosts, ring.hosts)
+        self.assertEqual(expected.replicas, ring.replicas)
+        self.assertEqual(expected._host_hashes, ring._host_hashes)
+        self.assertEqual(expected._partitions, ring._partitions)
+
+    def test_rebuild_add_host(self):
+        ring = hash_ring.HashRing(['foo', 'bar'], replicas=2)
+        new_ring = ring.rebuild(['foo', 'bar', 'baz'])
+        self._assert_rings_equal(
+            hash_ring.HashRing(['foo', 'bar', 'baz'], replicas=2), new_ring)
+        self._assert_rings_equal(
+            hash_ring.HashRing(['foo', 'bar'], replicas=2), ring)
+
+    def test_rebuild_remove_host(self):
+        ring = hash_ring.HashRing(['foo', 'bar', 'baz'], replicas=2)
+        new_ring = ring.rebuild(['foo'])
+        self._assert_rings_equal(hash_ring.HashRing(['foo'], replicas=2),
+                                 new_ring)
+        self.assertEqual(1, new_ring.replicas)
+        self.assertEqual(['foo'], new_ring.get_hosts('fake'))
+
+    def test_rebuild_replace_host(self):
+        ring = hash_ring.HashRing(['foo', 'bar'])
+        ring.get_key_ranges('foo')
+        new_ring = ring.rebuild(['foo', 'baz'])
+        self._assert_rings_equal(hash_ring.HashRing(['foo', 'baz']),
+                                 new_ring)
+        self.assertEqual(hash_ring.HashRing(['foo', 'baz']).get_key_ranges(
+                         'foo'), new_ring.get_key_ranges('foo'))
+
+    @mock.patch.object(hash_ring.HashRing, '_hash_host', autospec=True,
+                       side_effect=hash_ring.HashRing._hash_host)
+    def test_rebuild_hashes_new_hosts_only(self, mock_hash_host):
+        ring = hash_ring.HashRing(['foo', 'bar'])
+        mock_hash_host.reset_mock()
+        ring.rebuild(['foo', 'baz'])
+        mock_hash_host.assert_called_once_with(ring, 'baz')
+
+    def test_rebuild_invalid_data(self):
+        ring = hash_ring.HashRing(['foo', 'bar'])
+        self.assertRaises(exception.Invalid, ring.rebuild, None)
+
+    def test_get_ring_key(self):
+        key = hash_ring.get_ring_key('fake')
+        self.assertEqual(int(hashlib.md5('fake').hexdigest(), 16) >> 65, key)
+        self.assertEqual(key, hash_ring.get_ring_key(u'fake'))
+        self.assertTrue(0 <= key <= hash_ring.MAX_RING_KEY)
+
+    def _in_ranges(self, key, ranges):
+        return any(first <= key <= last for first, last in ranges)
+
+    def test_get_key_ranges(self):
+        hosts = ['foo', 'bar', 'baz']
+        for replicas in (1, 2):
+            ring = hash_ring.HashRing(hosts, replicas=replicas)
+            ranges = dict((host, ring.get_key_ranges(host)) for host in hosts)
+            for i in range(200):
+                data = uuidutils.generate_uuid()
+                key = hash_ring.get_ring_key(data)
+                for host in ring.get_hosts(data):
+                    self.assertTrue(self._in_ranges(key, ranges[host]))
+
+    def test_get_key_ranges_one_host(self):
+        ring = hash_ring.HashRing(['foo'])
+        self.assertEqual([(0, hash_ring.MAX_RING_KEY)],
+                         ring.get_key_ranges('foo'))
+
+    def test_get_key_ranges_disjoint(self):
+        hosts = ['foo', 'bar', 'baz']
+        ring = hash_ring.HashRing(hosts, replicas=1)
+        ranges = sorted(r for host in hosts for r in ring.get_key_ranges(host))
+        self.assertEqual(0, ranges[0][0])
+        self.assertEqual(hash_ring.MAX_RING_KEY, ranges[-1][1])
+        # Ranges of different hosts may only share their boundary keys
+        for (first, last), (next_first, next_last) in zip(ranges, ranges[1:]):
+            self.assertTrue(first <= last <= next_first <= next_last)
+
+    def test_get_key_ranges_unknown_host(self):
+        ring = hash_ring.HashRing(['foo', 'bar'])
+        self.assertEqual([], ring.get_key_ranges('baz'))
+
 
 class HashRingManagerTestCase(db_base.DbTestCase):
 
@@ -237,14 +347,53 @@ class HashRingManagerTestCase(db_base.DbTestCase):
                           self.ring_manager.__getitem__,
                           'driver3')
 
-    def test_hash_ring_manager_no_refresh(self):
+    def test_hash_ring_manager_refresh_unknown_driver(self):
         # If a new conductor is registered after the ring manager is
-        # initialized, it won't be seen. Long term this is probably
-        # undesirable, but today is the intended behavior.
+        # initialized, it is seen when looking for a driver the rings
+        # do not know yet.
         self.assertRaises(exception.DriverNotFound,
                           self.ring_manager.__getitem__,
                           'driver1')
         self.register_conductors()
-        self.assertRaises(exception.DriverNotFound,
-                          self.ring_manager.__getitem__,
-                          'driver1')
+        ring = self.ring_manager['driver1']
+        self.assertEqual(set(['host1', 'host2']), ring.hosts)
+
+    def test_hash_ring_manager_cached(self):
+        self.register_conductors()
+        ring = self.ring_manager['driver1']
+        self.dbapi.register_conductor({'hostname': 'host3',
+                                       'drivers': ['driver1']})
+        self.assertIs(ring, self.ring_manager['driver1'])
+
+    @mock.patch.object(timeutils, 'utcnow_ts', autospec=True)
+    def test_hash_ring_manager_expire(self, mock_utcnow_ts):
+        mock_utcnow_ts.return_value = 1000
+        self.register_conductors()
+        ring = self.ring_manager['driver1']
+        ring2 = self.ring_manager['driver2']
+        self.dbapi.register_conductor({'hostname': 'host3',
+                                       'drivers': ['driver1']})
+        mock_utcnow_ts.return_value += CONF.hash_ring_reset_interval
+
+        new_ring = self.ring_manager['driver1']
+        self.assertEqual(set(['host1', 'host2', 'host3']), new_ring.hosts)
+        self.assertEqual(set(['host1', 'host2']), ring.hosts)
+        # Rings of drivers whose conductors did not change are kept
+        self.assertIs(ring2, self.ring_manager['driver2'])
+
+    @mock.patch.object(hash_ring.HashRing, 'rebuild', autospec=True)
+    def test_hash_ring_manager_refresh(self, mock_rebuild):
+        self.register_conductors()
+        ring = self.ring_manager['driver1']
+        self.dbapi.unregister_conductor('host2')
+        self.ring_manager.refresh()
+
+        self.assertEqual(mock_rebuild.return_value,
+                         self.ring_manager['driver1'])
+        mock_rebuild.assert_called_once_with(ring, set(['host1']))
+
+    def test_hash_ring_manager_reset(self):
+        self.register_conductors()
+        ring = self.ring_manager['driver1']
+        self.ring_manager.reset()
+        self.assertIsNot(ring, self.ring_manager['driver1'])
@@ -12,6 +12,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import eventlet
 from keystoneclient import exceptions as ksexception
 import mock
 
@@ -25,9 +26,18 @@ class FakeCatalog:
         return 'fake-url'
 
 
+class FakeAuthRef:
+    def __init__(self, expires_in=3600):
+        self.expires_in = expires_in
+
+    def will_expire_soon(self, stale_duration=None):
+        return self.expires_in <= (stale_duration or 0)
+
+
 class FakeClient:
     def __init__(self, **kwargs):
         self.service_catalog = FakeCatalog()
+        self.auth_ref = FakeAuthRef()
 
     def has_service_catalog(self):
         return True
@@ -146,3 +156,95 @@ class KeystoneTestCase(base.TestCase):
                                         tenant_name='fake',
                                         region_name=expected_region,
                                         auth_url=expected_url)
+
+    @mock.patch('keystoneclient.v2_0.client.Client', autospec=True)
+    def test_get_admin_auth_token_cached(self, mock_ks):
+        fake_client = FakeClient()
+        fake_client.auth_token = '123456'
+        mock_ks.return_value = fake_client
+        self.assertEqual('123456', keystone.get_admin_auth_token())
+        self.assertEqual('fake-url', keystone.get_service_url())
+        self.assertEqual('123456', keystone.get_admin_auth_token())
+        self.assertEqual(1, mock_ks.call_count)
+
+    @mock.patch('keystoneclient.v2_0.client.Client', autospec=True)
+    def test_get_admin_auth_token_expired(self, mock_ks):
+        old_client = FakeClient()
+        old_client.auth_token = 'old'
+        old_client.auth_ref = FakeAuthRef(expires_in=10)
+        new_client = FakeClient()
+        new_client.auth_token = 'new'
+        mock_ks.side_effect = [old_client, new_client]
+        self.assertEqual('old', keystone.get_admin_auth_token())
+        self.assertEqual('new', keystone.get_admin_auth_token())
+        self.assertEqual('new', keystone.get_admin_auth_token())
+        self.assertEqual(2, mock_ks.call_count)
+
+    @mock.patch('keystoneclient.v2_0.client.Client', autospec=True)
+    def test_get_admin_auth_token_valid_for(self, mock_ks):
+        old_client = FakeClient()
+        old_client.auth_token = 'old'
+        new_client = FakeClient()
+        new_client.auth_token = 'new'
+        mock_ks.side_effect = [old_client, new_client]
+        self.assertEqual('old', keystone.get_admin_auth_token())
+        self.assertEqual('new',
+                         keystone.get_admin_auth_token(valid_for=7200))
+        self.assertEqual(2, mock_ks.call_count)
+
+    @mock.patch.object(eventlet, 'spawn_n', autospec=True)
+    @mock.patch('keystoneclient.v2_0.client.Client', autospec=True)
+    def test_get_admin_auth_token_refresh_in_background(self, mock_ks,
+                                                        mock_spawn):
+        old_client = FakeClient()
+        old_client.auth_token = 'old'
+        old_client.auth_ref = FakeAuthRef(expires_in=120)
+        new_client = FakeClient()
+        new_client.auth_token = 'new'
+        mock_ks.side_effect = [old_client, new_client]
+        self.assertEqual('old', keystone.get_admin_auth_token())
+        self.assertEqual('old', keystone.get_admin_auth_token())
+        # Only one refresh at a time
+        self.assertEqual('old', keystone.get_admin_auth_token())
+        mock_spawn.assert_called_once_with(keystone._refresh_admin_client)
+        self.assertEqual(1, mock_ks.call_count)
+
+        keystone._refresh_admin_client()
+        self.assertEqual('new', keystone.get_admin_auth_token())
+        self.assertEqual(2, mock_ks.call_count)
+        self.assertEqual(1, mock_spawn.call_count)
+
+    @mock.patch('keystoneclient.v2_0.client.Client', autospec=True)
+    def test_token_expires_soon(self, mock_ks):
+        fake_client = FakeClient()
+        fake_client.auth_ref = FakeAuthRef(expires_in=100)
+        mock_ks.return_value = fake_client
+        self.assertTrue(keystone.token_expires_soon('token', 600))
+        self.assertFalse(keystone.token_expires_soon('token', 60))
+        self.assertEqual(2, mock_ks.call_count)
+        mock_ks.assert_called_with(token='token',
+                                   auth_url='http://127.0.0.1:9898/v2.0')
+
+    @mock.patch('keystoneclient.v2_0.client.Client', autospec=True)
+    def test_token_expires_soon_admin_token(self, mock_ks):
+        fake_client = FakeClient()
+        fake_client.auth_token = '123456'
+        mock_ks.return_value = fake_client
+        token = keystone.get_admin_auth_token()
+        self.assertFalse(keystone.token_expires_soon(token, 600))
+        self.assertEqual(1, mock_ks.call_count)
+
+    @mock.patch('keystoneclient.v2_0.client.Client', autospec=True)
+    def test_get_stats(self, mock_ks):
+        fake_client = FakeClient()
+        fake_client.auth_token = '123456'
+        mock_ks.return_value = fake_client
+        before = keystone.get_stats()
+        keystone.get_admin_auth_token()
+        keystone.get_service_url()
+        keystone.token_expires_soon('other', 600)
+        after = keystone.get_stats()
+        self.assertEqual(1, after['authentications'] -
+                         before['authentications'])
+        self.assertEqual(1, after['validations'] - before['validations'])
+        self.assertEqual(1, after['cache_hits'] - before['cache_hits'])
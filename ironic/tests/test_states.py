@@ -36,3 +36,6 @@ class StatesTest(base.TestCase):
                     (len(value) <= 15),
                     "Value for state: {} is greater than 15 characters".format(
                         key))
+
+    def test_machine_frozen(self):
+        self.assertTrue(states.machine.frozen)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the per-request overhead of the RPC API in the API service.
+
+Requests to GET /v1/nodes/<uuid>/states and PUT /v1/nodes/<uuid>/states/power
+are sent to the API application through webtest, first with a ConductorAPI
+built for each request, then with the ConductorAPI shared by all requests.
+The RPC transport is a fake one and no conductor runs, so the RPC call of
+the power state change is skipped. The database must be empty, the tables
+are created if needed.
+"""
+
+import optparse
+import os
+import sys
+import timeit
+
+top_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                       os.pardir))
+sys.path.insert(0, top_dir)
+
+from oslo import messaging
+from oslo_config import cfg
+import webtest
+
+from ironic.api import app
+from ironic.api import hooks
+from ironic.common import rpc
+from ironic.conductor import rpcapi
+from ironic.db import api as dbapi
+from ironic.db.sqlalchemy import api as sqla_api
+from ironic.db.sqlalchemy import models
+
+CONF = cfg.CONF
+
+
+class PerRequestRPCHook(hooks.RPCHook):
+    """The RPC hook building a new ConductorAPI for each request."""
+
+    def before(self, state):
+        state.request.rpcapi = rpcapi.ConductorAPI()
+
+
+def make_app(rpc_hook_class):
+    pecan_config = app.get_pecan_config()
+    pecan_config.app.enable_acl = False
+    shared_hook_class = hooks.RPCHook
+    hooks.RPCHook = rpc_hook_class
+    try:
+        return webtest.TestApp(app.setup_app(pecan_config=pecan_config))
+    finally:
+        hooks.RPCHook = shared_hook_class
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option("-d", "--database", dest="database",
+                      help="database connection URL (default: an in-memory "
+                           "SQLite database)",
+                      default="sqlite://")
+    parser.add_option("-n", "--number", dest="number", type="int",
+                      help="number of requests (default: 500)",
+                      default=500)
+    parser.add_option("-t", "--times", dest="times", type="int",
+                      help="number of repetitions (default: 3)",
+                      default=3)
+    (options, args) = parser.parse_args()
+
+    CONF.set_override('connection', options.database, group='database')
+    CONF.set_override('auth_strategy', 'noauth')
+    models.Base.metadata.create_all(sqla_api.get_engine())
+    rpc.TRANSPORT = messaging.get_transport(CONF, 'fake:/',
+                                            aliases=rpc.TRANSPORT_ALIASES)
+    rpcapi.ConductorAPI.change_node_power_state = (
+        lambda self, context, node_id, new_state, topic=None: None)
+
+    db = dbapi.get_instance()
+    db.register_conductor({'hostname': 'benchmark-conductor',
+                           'drivers': ['fake']})
+    node = db.create_node({'driver': 'fake'})
+    path = '/v1/nodes/%s/states' % node.uuid
+
+    print("%d requests, best of %d:" % (options.number, options.times))
+    for name, hook_class in (('per-request', PerRequestRPCHook),
+                             ('shared', hooks.RPCHook)):
+        test_app = make_app(hook_class)
+        for request, func in (
+                ('GET states', lambda: test_app.get(path)),
+                ('PUT power', lambda: test_app.put_json(
+                    path + '/power', {'target': 'power on'}))):
+            best = min(timeit.repeat(func, number=options.number,
+                                     repeat=options.times))
+            print("  %-11s ConductorAPI %-10s %8.3f ms/request" % (
+                name, request, best * 1000 / options.number))
+
+
+if __name__ == '__main__':
+    main()
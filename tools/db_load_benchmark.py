@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the database load of a mix of deploys and power state syncs.
+
+A deploy reserves a node, updates it a few times and releases it, a power
+state sync reserves a node, updates its power state and releases it. The
+database must be empty, the nodes table is created if needed.
+"""
+
+import optparse
+import os
+import random
+import sys
+import time
+import uuid
+
+top_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                       os.pardir))
+sys.path.insert(0, top_dir)
+
+from oslo_config import cfg
+
+from ironic.common import states
+from ironic.db import api as dbapi
+from ironic.db.sqlalchemy import api as sqla_api
+from ironic.db.sqlalchemy import models
+
+CONF = cfg.CONF
+
+TAG = 'benchmark-conductor'
+
+
+def deploy(db, node_id):
+    db.reserve_node(TAG, node_id,
+                    filters={'maintenance': False,
+                             'provision_state': states.AVAILABLE})
+    db.update_node(node_id, {'provision_state': states.DEPLOYING,
+                             'target_provision_state': states.ACTIVE,
+                             'instance_uuid': str(uuid.uuid4())})
+    db.update_node(node_id, {'driver_internal_info': {'is_whole_disk_image':
+                                                      False}})
+    db.update_node(node_id, {'provision_state': states.ACTIVE,
+                             'target_provision_state': states.NOSTATE})
+    db.release_node(TAG, node_id)
+
+
+def undeploy(db, node_id):
+    db.update_node(node_id, {'provision_state': states.AVAILABLE,
+                             'instance_uuid': None})
+
+
+def sync_power_state(db, node_id):
+    db.reserve_node(TAG, node_id, filters={'maintenance': False})
+    db.update_node(node_id, {'power_state': random.choice([states.POWER_ON,
+                                                           states.POWER_OFF])})
+    db.release_node(TAG, node_id)
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option("-d", "--database", dest="database",
+                      help="database connection URL (default: an in-memory "
+                           "SQLite database)",
+                      default="sqlite://")
+    parser.add_option("-n", "--nodes", dest="nodes", type="int",
+                      help="number of nodes (default: 100)",
+                      default=100)
+    parser.add_option("-o", "--operations", dest="operations", type="int",
+                      help="number of operations (default: 2000)",
+                      default=2000)
+    parser.add_option("-r", "--deploy-ratio", dest="deploy_ratio",
+                      type="float",
+                      help="ratio of deploys among the operations, the "
+                           "other ones are power state syncs (default: 0.1)",
+                      default=0.1)
+    parser.add_option("--no-returning", dest="returning",
+                      action="store_false",
+                      help="never use UPDATE ... RETURNING statements",
+                      default=True)
+    (options, args) = parser.parse_args()
+
+    CONF.set_override('connection', options.database, group='database')
+    if not options.returning:
+        sqla_api._UPDATE_RETURNING_DIALECTS = ()
+    models.Base.metadata.create_all(sqla_api.get_engine())
+
+    db = dbapi.get_instance()
+    node_ids = [db.create_node({'driver': 'fake'}).id
+                for i in range(options.nodes)]
+
+    counts = {deploy: [0, 0], sync_power_state: [0, 0]}
+    start = time.time()
+    for i in range(options.operations):
+        node_id = random.choice(node_ids)
+        if random.random() < options.deploy_ratio:
+            operation = deploy
+        else:
+            operation = sync_power_state
+        with db.count_queries() as counter:
+            operation(db, node_id)
+        counts[operation][0] += 1
+        counts[operation][1] += counter.count
+        if operation is deploy:
+            undeploy(db, node_id)
+    elapsed = time.time() - start
+
+    print("%d operations on %d nodes (%s dialect, RETURNING %s) "
+          "in %.2f s, %.2f ms/operation:" % (
+              options.operations, options.nodes,
+              sqla_api.get_engine().dialect.name,
+              'used' if sqla_api._update_returning_supported() else 'unused',
+              elapsed, elapsed * 1000 / options.operations))
+    for operation, (number, queries) in sorted(counts.items(),
+                                               key=lambda i: i[0].__name__):
+        if number:
+            print("  %-16s %6d operations %6.2f queries/operation" % (
+                operation.__name__, number, float(queries) / number))
+
+
+if __name__ == '__main__':
+    main()
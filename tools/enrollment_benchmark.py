@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the time taken to enroll the nodes and ports of an inventory.
+
+The nodes and their ports are created one by one, like by the POST requests
+on /v1/nodes and /v1/ports, then in batches, like by the POST requests on
+/v1/nodes/bulk_create and /v1/ports/bulk_create. The database must be empty,
+the tables are created if needed and emptied between the runs.
+"""
+
+import optparse
+import os
+import sys
+import time
+import uuid
+
+top_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                       os.pardir))
+sys.path.insert(0, top_dir)
+
+from oslo_config import cfg
+
+from ironic.db import api as dbapi
+from ironic.db.sqlalchemy import api as sqla_api
+from ironic.db.sqlalchemy import models
+
+CONF = cfg.CONF
+
+
+def get_inventory(nodes, ports):
+    inventory = []
+    for i in range(nodes):
+        node = {'uuid': str(uuid.uuid4()), 'name': 'node-%d' % i,
+                'driver': 'agent_ipmitool',
+                'driver_info': {'ipmi_address': '10.0.%d.%d' % divmod(i, 256),
+                                'ipmi_username': 'admin',
+                                'ipmi_password': 'password'},
+                'properties': {'cpus': '8', 'cpu_arch': 'x86_64',
+                               'memory_mb': '65536', 'local_gb': '1000'}}
+        addresses = ['52:54:%02x:%02x:%02x:%02x' % ((j,) + divmod(i, 256) +
+                                                    (j,))
+                     for j in range(ports)]
+        inventory.append((node, addresses))
+    return inventory
+
+
+def enroll_one_by_one(db, inventory, batch_size):
+    for node, addresses in inventory:
+        node_id = db.create_node(dict(node)).id
+        for address in addresses:
+            db.create_port({'node_id': node_id, 'address': address})
+
+
+def enroll_in_batches(db, inventory, batch_size):
+    nodes = db.create_nodes([dict(node) for node, addresses in inventory],
+                            batch_size=batch_size)
+    db.create_ports([{'node_id': node.id, 'address': address}
+                     for node, (values, addresses) in zip(nodes, inventory)
+                     for address in addresses],
+                    batch_size=batch_size)
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option("-d", "--database", dest="database",
+                      help="database connection URL (default: an in-memory "
+                           "SQLite database)",
+                      default="sqlite://")
+    parser.add_option("-n", "--nodes", dest="nodes", type="int",
+                      help="number of nodes (default: 2000)",
+                      default=2000)
+    parser.add_option("-p", "--ports", dest="ports", type="int",
+                      help="number of ports per node (default: 2)",
+                      default=2)
+    parser.add_option("-b", "--batch-size", dest="batch_size", type="int",
+                      help="maximum number of nodes or ports created in a "
+                           "transaction (default: 100)",
+                      default=100)
+    (options, args) = parser.parse_args()
+
+    CONF.set_override('connection', options.database, group='database')
+    engine = sqla_api.get_engine()
+    models.Base.metadata.create_all(engine)
+
+    db = dbapi.get_instance()
+    inventory = get_inventory(options.nodes, options.ports)
+    resources = options.nodes * (options.ports + 1)
+
+    print("Enrolling %d nodes with %d ports each (%s dialect):" % (
+        options.nodes, options.ports, engine.dialect.name))
+    for enroll in (enroll_one_by_one, enroll_in_batches):
+        with db.count_queries() as counter:
+            start = time.time()
+            enroll(db, inventory, options.batch_size)
+            elapsed = time.time() - start
+        print("  %-18s %8.2f s %8.2f ms/resource %6.2f queries/resource" % (
+            enroll.__name__, elapsed, elapsed * 1000 / resources,
+            float(counter.count) / resources))
+        engine.execute(models.Port.__table__.delete())
+        engine.execute(models.Node.__table__.delete())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare deep and shallow copies of the provision state machine."""
+
+import optparse
+import os
+import sys
+import timeit
+
+top_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                       os.pardir))
+sys.path.insert(0, top_dir)
+
+from ironic.common import states
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option("-n", "--number", dest="number", type="int",
+                      help="number of tasks per repetition (default: 10000)",
+                      default=10000)
+    parser.add_option("-t", "--times", dest="times", type="int",
+                      help="number of repetitions (default: 5)",
+                      default=5)
+    (options, args) = parser.parse_args()
+
+    def deep_copy():
+        fsm = states.machine.copy()
+        fsm.initialize(states.AVAILABLE)
+
+    def shallow_copy():
+        fsm = states.machine.copy(shallow=True)
+        fsm.initialize(states.AVAILABLE)
+
+    print("Setting up the state machine of %d tasks, best of %d:" % (
+        options.number, options.times))
+    for func in (deep_copy, shallow_copy):
+        best = min(timeit.repeat(func, number=options.number,
+                                 repeat=options.times))
+        print("  %-14s %8.2f ms %10.0f tasks/s" % (
+            func.__name__, best * 1000, options.number / best))
+
+
+if __name__ == '__main__':
+    main()
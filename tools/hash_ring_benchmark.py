@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare HashRing.get_hosts() and HashRing.get_hosts_many() lookups."""
+
+import optparse
+import os
+import sys
+import timeit
+import uuid
+
+top_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                       os.pardir))
+sys.path.insert(0, top_dir)
+
+from ironic.common import hash_ring
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option("-c", "--conductors", dest="conductors", type="int",
+                      help="number of conductors in the ring (default: 10)",
+                      default=10)
+    parser.add_option("-n", "--nodes", dest="nodes", type="int",
+                      help="number of node UUIDs to map (default: 10000)",
+                      default=10000)
+    parser.add_option("-r", "--replicas", dest="replicas", type="int",
+                      help="number of replicas (default: 1)",
+                      default=1)
+    parser.add_option("-t", "--times", dest="times", type="int",
+                      help="number of repetitions (default: 5)",
+                      default=5)
+    (options, args) = parser.parse_args()
+
+    hosts = ['conductor-%d' % i for i in range(options.conductors)]
+    ring = hash_ring.HashRing(hosts, replicas=options.replicas)
+    nodes = [str(uuid.uuid4()) for i in range(options.nodes)]
+
+    def get_hosts():
+        return dict((node, ring.get_hosts(node)) for node in nodes)
+
+    def get_hosts_many():
+        return ring.get_hosts_many(nodes)
+
+    if get_hosts() != get_hosts_many():
+        sys.exit("get_hosts() and get_hosts_many() results differ")
+
+    print("Mapping %d nodes onto %d conductors (%d partitions, "
+          "%d replicas), best of %d:" % (options.nodes, options.conductors,
+                                         len(ring._partitions),
+                                         ring.replicas, options.times))
+    for func in (get_hosts, get_hosts_many):
+        best = min(timeit.repeat(func, number=1, repeat=options.times))
+        print("  %-16s %8.2f ms %8.2f us/node" % (
+            func.__name__, best * 1000, best * 1000000 / options.nodes))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare ipmitool commands run with and without "ipmitool shell" sessions.
+
+This needs ipmitool and a reachable BMC.
+"""
+
+import optparse
+import os
+import sys
+import time
+
+top_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                       os.pardir))
+sys.path.insert(0, top_dir)
+
+from oslo_config import cfg
+
+from ironic.drivers.modules import ipmitool
+
+CONF = cfg.CONF
+
+
+def main():
+    parser = optparse.OptionParser(usage="%prog [options] ADDRESS")
+    parser.add_option("-U", "--username", dest="username",
+                      help="BMC user name", default=None)
+    parser.add_option("-P", "--password", dest="password",
+                      help="BMC password", default=None)
+    parser.add_option("-L", "--priv-level", dest="priv_level",
+                      help="privilege level (default: ADMINISTRATOR)",
+                      default="ADMINISTRATOR")
+    parser.add_option("-c", "--command", dest="command",
+                      help="ipmitool command (default: 'power status')",
+                      default="power status")
+    parser.add_option("-n", "--number", dest="number", type="int",
+                      help="number of commands to run (default: 20)",
+                      default=20)
+    parser.add_option("-i", "--interval", dest="interval", type="int",
+                      help="minimum interval in seconds between two "
+                           "commands (default: 0)",
+                      default=0)
+    (options, args) = parser.parse_args()
+    if len(args) != 1:
+        parser.error("the address of the BMC is required")
+
+    driver_info = {'address': args[0],
+                   'username': options.username,
+                   'password': options.password,
+                   'priv_level': options.priv_level,
+                   'uuid': 'benchmark'}
+    for name, option in ipmitool.BRIDGING_OPTIONS:
+        driver_info[name] = None
+    CONF.set_override('min_command_interval', options.interval,
+                      group='ipmi')
+
+    print("Running %d '%s' commands against %s:" % (
+        options.number, options.command, args[0]))
+    for shell_sessions in (False, True):
+        CONF.set_override('shell_sessions', shell_sessions, group='ipmi')
+        start = time.time()
+        for i in range(options.number):
+            ipmitool._exec_ipmitool(driver_info, options.command)
+        elapsed = time.time() - start
+        print("  %-18s %8.2f s %8.2f commands/s" % (
+            'shell sessions' if shell_sessions else 'one process each',
+            elapsed, options.number / elapsed))
+    ipmitool.SHELL_SESSIONS.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure the RPC serialization throughput of Node and Port objects."""
+
+import datetime
+import optparse
+import os
+import sys
+import timeit
+import uuid
+
+top_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                       os.pardir))
+sys.path.insert(0, top_dir)
+
+from ironic.common import context
+from ironic.common import states
+from ironic import objects
+from ironic.objects import base
+
+
+def make_node(ctxt, keys):
+    now = datetime.datetime.utcnow()
+    node = objects.Node(
+        ctxt, id=1, uuid=str(uuid.uuid4()), name='node-1',
+        chassis_id=None, instance_uuid=str(uuid.uuid4()),
+        driver='agent_ipmitool',
+        driver_info=dict(('ipmi_key_%d' % i, 'value-%d' % i)
+                         for i in range(keys)),
+        driver_internal_info={'agent_url': 'http://10.0.0.1:9999',
+                              'agent_last_heartbeat': 1444444444,
+                              'is_whole_disk_image': False},
+        clean_step={}, instance_info=dict(('image_key_%d' % i, 'v' * 32)
+                                          for i in range(keys)),
+        properties={'cpus': '8', 'cpu_arch': 'x86_64', 'memory_mb': '65536',
+                    'local_gb': '1000', 'capabilities': 'boot_mode:uefi'},
+        reservation=None, conductor_affinity=1,
+        power_state=states.POWER_ON, target_power_state=None,
+        provision_state=states.ACTIVE, provision_updated_at=now,
+        target_provision_state=None, maintenance=False,
+        maintenance_reason=None, console_enabled=False, last_error=None,
+        inspection_finished_at=None, inspection_started_at=None,
+        extra={'rack': 'r42'}, created_at=now, updated_at=now)
+    node.obj_reset_changes()
+    return node
+
+
+def make_port(ctxt):
+    now = datetime.datetime.utcnow()
+    port = objects.Port(ctxt, id=1, uuid=str(uuid.uuid4()), node_id=1,
+                        address='52:54:00:cf:2d:31',
+                        extra={'vif_port_id': str(uuid.uuid4())},
+                        created_at=now, updated_at=now)
+    port.obj_reset_changes()
+    return port
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option("-k", "--keys", dest="keys", type="int",
+                      help="number of keys of the driver_info and "
+                           "instance_info of the node (default: 20)",
+                      default=20)
+    parser.add_option("-n", "--number", dest="number", type="int",
+                      help="number of objects to serialize (default: 10000)",
+                      default=10000)
+    parser.add_option("-t", "--times", dest="times", type="int",
+                      help="number of repetitions (default: 5)",
+                      default=5)
+    (options, args) = parser.parse_args()
+
+    ctxt = context.RequestContext(is_admin=True)
+    serializer = base.IronicObjectSerializer()
+
+    print("Serializing %d objects, best of %d:" % (options.number,
+                                                   options.times))
+    for name, obj in (('Node', make_node(ctxt, options.keys)),
+                      ('Port', make_port(ctxt))):
+        primitive = serializer.serialize_entity(ctxt, obj)
+        if serializer.deserialize_entity(
+                ctxt, primitive).obj_to_primitive() != primitive:
+            sys.exit("%s changed when serialized and deserialized" % name)
+
+        for action, func in (
+                ('serialize', lambda: serializer.serialize_entity(ctxt,
+                                                                  obj)),
+                ('deserialize', lambda: serializer.deserialize_entity(
+                    ctxt, primitive))):
+            best = min(timeit.repeat(func, number=options.number,
+                                     repeat=options.times))
+            print("  %-4s %-12s %8.2f us/object %10d objects/s" % (
+                name, action, best * 1000000 / options.number,
+                options.number / best))
+
+
+if __name__ == '__main__':
+    main()